@@ -14,9 +14,7 @@ from rest_framework.decorators import (
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from django.conf import settings
 from django.contrib.gis.db.models import PointField
-from django.core.mail import send_mail
 from django.db import transaction
 from django.db.models import (
     Case,
@@ -49,11 +47,13 @@ from main.models import (
     OrderLine,
     PaymentAttempt,
     Subscription,
-    TaxRate,
     User,
     Wallet,
 )
+from main.services import config_cache
+from main.services.outbox import queue_email
 from main.services.posting import create_entry
+from nexus_backend.db_router import reporting_db
 from promotions.services import record_coupon_redemption_if_any
 
 # =========================
@@ -176,6 +176,7 @@ class RevenueSummaryView(APIView):
 
     permission_classes = [permissions.IsAuthenticated, IsFinanceOrManager]
 
+    @reporting_db
     def get(self, request, *args, **kwargs):
         try:
             start_date = self._resolve_start_date(request.query_params.get("from"))
@@ -460,11 +461,7 @@ class RevenueOptionsView(APIView):
         regions = list(Region.objects.order_by("name").values("id", "name"))
         agents = []
         agent_qs = (
-            User.objects.filter(
-                Q(roles__contains=["sales"])
-                | Q(roles__contains=["manager"])
-                | Q(roles__contains=["admin"])
-            )
+            User.objects.with_role("sales", "manager", "admin")
             .order_by("full_name", "email")
             .values("pk", "full_name", "email")
         )
@@ -753,9 +750,9 @@ def _apply_taxes(amount: Decimal, *, tax_exempt: bool) -> Decimal:
     if tax_exempt:
         return _qmoney(amount)
     total = _qmoney(amount)
-    for tr in TaxRate.objects.only("percentage"):
+    for percentage in config_cache.tax_percentages():
         try:
-            pct = Decimal(tr.percentage or 0) / Decimal("100")
+            pct = Decimal(percentage or 0) / Decimal("100")
         except (InvalidOperation, TypeError):
             pct = Decimal("0")
         total += _qmoney(amount * pct)
@@ -778,9 +775,9 @@ def _order_gross_amount(order: Order) -> Decimal:
         return subtotal
 
     total = subtotal
-    for tr in TaxRate.objects.only("percentage"):
+    for percentage in config_cache.tax_percentages():
         try:
-            pct = Decimal(tr.percentage or 0) / Decimal("100")
+            pct = Decimal(percentage or 0) / Decimal("100")
         except (InvalidOperation, TypeError):
             pct = Decimal("0")
         total += _qmoney(subtotal * pct)
@@ -1078,8 +1075,8 @@ def flexpay_callback_card(request):
             if order.user.is_tax_exempt:
                 return Decimal("0.00")
             return sum(
-                (tax.percentage / Decimal("100.00")) * amount
-                for tax in TaxRate.objects.all()
+                (percentage / Decimal("100.00")) * amount
+                for percentage in config_cache.tax_percentages()
             )
 
         # Status determination
@@ -1328,12 +1325,11 @@ def api_cancel_order(request, order_id: int):
     order.save(update_fields=["status"])
 
     if order.user and order.user.email:
-        send_mail(
-            subject="Order Cancelled",
-            message=reason or "Your order has been cancelled.",
-            from_email=getattr(settings, "DEFAULT_FROM_EMAIL", "no-reply@example.com"),
-            recipient_list=[order.user.email],
-            fail_silently=True,
+        queue_email(
+            "Order Cancelled",
+            reason or "Your order has been cancelled.",
+            [order.user.email],
+            category="order_cancelled",
         )
 
     return Response({"id": order.id, "status": order.status})
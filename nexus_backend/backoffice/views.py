@@ -1,23 +1,9 @@
 import base64
 import json
-import os
 from datetime import datetime, timedelta
 from decimal import Decimal
 from io import BytesIO
 
-from reportlab.lib import colors
-from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
-from reportlab.lib.units import mm
-from reportlab.platypus import (
-    Image,
-    Paragraph,
-    SimpleDocTemplate,
-    Spacer,
-    Table,
-    TableStyle,
-)
-
-from django.conf import settings as django_settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.gis.geos import Point
@@ -32,6 +18,7 @@ from django.utils import timezone as dj_timezone
 from django.utils.timezone import localtime, now
 from django.views.decorators.http import require_POST
 
+from billing_management.billing_helpers import _decode_cursor, _encode_cursor
 from billing_management.billing_services import (
     anchor_window,
     apply_wallet_to_order,
@@ -45,7 +32,6 @@ from feedbacks.models import Feedback
 from feedbacks.permissions import user_is_feedback_staff
 from geo_regions.models import Region
 from main.models import (
-    BillingConfig,
     CompanyKYC,
     InstallationActivity,
     Order,
@@ -56,6 +42,7 @@ from main.models import (
     TechnicianAssignment,
     User,
 )
+from main.services import config_cache, pdf_assets
 from user.permissions import require_staff_role
 
 # Create your views here.
@@ -118,26 +105,64 @@ def order_management(request):
 @login_required(login_url="login_page")
 @require_staff_role(["admin", "manager"])
 def admin_view_orders(request):
-    orders = Order.objects.select_related("user").order_by("-created_at")
-    page_number = request.GET.get("page", 1)  # Default to page 1
-    paginator = Paginator(orders, 20)  # Show 10 orders per page
+    """
+    Paginated order list. Kit/plan flags are resolved with EXISTS annotations
+    instead of two queries per row. Pass `cursor` (the previous `next_cursor`)
+    for keyset paging on (created_at, id); `page` keeps working as before.
+    """
+    page_size = 20
+    orders = (
+        Order.objects.select_related("user")
+        .annotate(
+            has_kit=Exists(
+                OrderLine.objects.filter(order=OuterRef("pk"), kind=OrderLine.Kind.KIT)
+            ),
+            has_plan=Exists(
+                OrderLine.objects.filter(
+                    order=OuterRef("pk"), kind=OrderLine.Kind.PLAN
+                )
+            ),
+        )
+        .order_by("-created_at", "-id")
+    )
 
-    try:
-        page_obj = paginator.page(page_number)
-    except Exception:
-        return JsonResponse({"success": False, "error": "Invalid page number"})
+    cursor = request.GET.get("cursor")
+    if cursor:
+        c_ts, c_id = _decode_cursor(cursor)
+        if c_ts is None:
+            return JsonResponse({"success": False, "error": "Invalid cursor"})
+        rows = list(
+            orders.filter(
+                Q(created_at__lt=c_ts) | Q(created_at=c_ts, id__lt=c_id)
+            )[: page_size + 1]
+        )
+        has_next = len(rows) > page_size
+        object_list = rows[:page_size]
+        page_meta = {"has_next": has_next, "has_previous": True}
+    else:
+        page_number = request.GET.get("page", 1)  # Default to page 1
+        paginator = Paginator(orders, page_size)
+        try:
+            page_obj = paginator.page(page_number)
+        except Exception:
+            return JsonResponse({"success": False, "error": "Invalid page number"})
+        object_list = list(page_obj.object_list)
+        has_next = page_obj.has_next()
+        page_meta = {
+            "page": page_obj.number,
+            "total_pages": paginator.num_pages,
+            "has_next": has_next,
+            "has_previous": page_obj.has_previous(),
+        }
 
     order_data = []
 
-    for order in page_obj.object_list:
-        has_kit = order.lines.filter(kind=OrderLine.Kind.KIT).exists()
-        has_plan = order.lines.filter(kind=OrderLine.Kind.PLAN).exists()
-
-        if has_kit and has_plan:
+    for order in object_list:
+        if order.has_kit and order.has_plan:
             description = "Kit & Subscription"
-        elif has_kit:
+        elif order.has_kit:
             description = "Kit Purchase"
-        elif has_plan:
+        elif order.has_plan:
             description = "Subscription"
         else:
             description = "N/A"
@@ -156,14 +181,19 @@ def admin_view_orders(request):
             }
         )
 
+    last = object_list[-1] if object_list else None
+    next_cursor = (
+        _encode_cursor(last.created_at, last.id)
+        if has_next and last is not None and last.created_at
+        else None
+    )
+
     return JsonResponse(
         {
             "success": True,
             "orders": order_data,
-            "page": page_obj.number,
-            "total_pages": paginator.num_pages,
-            "has_next": page_obj.has_next(),
-            "has_previous": page_obj.has_previous(),
+            **page_meta,
+            "next_cursor": next_cursor,
         }
     )
 
@@ -686,12 +716,9 @@ def completed_installations(request):
 
     # ---- Technicians for filter ----
     technicians = (
-        User.objects.filter(
-            Q(roles__icontains='"technician"') | Q(roles__icontains='"installer"'),
-            is_active=True,
-        )
+        User.objects.with_role("technician", "installer")
+        .filter(is_active=True)
         .order_by("first_name", "last_name")
-        .distinct()
     )
 
     # ---- KPIs (use explicit Django DurationField instance) ----
@@ -854,7 +881,7 @@ def start_billing(request, installation_id: int):
         order.installation_date = installation.completed_at or dj_timezone.now()
         order.save(update_fields=["is_installed", "installation_date"])
 
-    cfg = BillingConfig.get()
+    cfg = config_cache.billing_config()
     # Set subscription start; align immediately to the global anchor if configured
     sub.started_at = sub.started_at or start_localdate
     if cfg.align_first_cycle_to_anchor:
@@ -1082,6 +1109,18 @@ def installation_report_detail(request, installation_id):
 @require_staff_role(["admin", "manager"])
 def installation_report_pdf(request, installation_id):
     """Generate a PDF for the Installation Report, including signature if present."""
+    from reportlab.lib import colors
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.lib.units import mm
+    from reportlab.platypus import (
+        Image,
+        Paragraph,
+        SimpleDocTemplate,
+        Spacer,
+        Table,
+        TableStyle,
+    )
+
     installation = get_object_or_404(
         InstallationActivity.objects.select_related(
             "order", "order__user", "technician"
@@ -1124,12 +1163,10 @@ def installation_report_pdf(request, installation_id):
     elems = []
 
     # Header with logo + title
-    logo_path = os.path.join(
-        django_settings.BASE_DIR, "static", "images", "logo", "logo.png"
-    )
     left = []
-    if os.path.exists(logo_path):
-        left.append(Image(logo_path, width=40 * mm, height=12 * mm))
+    logo = pdf_assets.logo_image(width=40 * mm, height=12 * mm)
+    if logo is not None:
+        left.append(logo)
     left.append(Paragraph("Installation Report", styles["TITLE"]))
     left.append(
         Paragraph(getattr(installation.order, "order_reference", ""), styles["SUB"])
@@ -1220,6 +1257,29 @@ def installation_report_pdf(request, installation_id):
         except Exception:
             pass
 
+    # Photos: the pre-sized "screen" variant, never the phone original
+    cells = []
+    for photo in installation.photos.filter(image__isnull=False).exclude(image=""):
+        try:
+            with photo.open_variant("screen") as fh:
+                img = Image(
+                    BytesIO(fh.read()),
+                    width=84 * mm,
+                    height=63 * mm,
+                    kind="proportional",
+                )
+        except Exception:
+            continue
+        cells.append([img, Paragraph(photo.get_photo_type_display(), styles["LBL"])])
+    if cells:
+        rows = [cells[i : i + 2] for i in range(0, len(cells), 2)]
+        grid = Table(
+            [row + [""] * (2 - len(row)) for row in rows],
+            colWidths=[87 * mm, 87 * mm],
+        )
+        grid.setStyle(TableStyle([("VALIGN", (0, 0), (-1, -1), "TOP")]))
+        elems += [Paragraph("Photos", styles["TITLE"]), Spacer(1, 4), grid]
+
     doc.build(elems)
     pdf = buffer.getvalue()
     buffer.close()
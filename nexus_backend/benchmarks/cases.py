@@ -0,0 +1,308 @@
+"""
+Benchmark cases for the billing and checkout hot paths.
+
+Every case reads the synthetic dataset (``generate_synthetic_dataset``) and
+raises ``BenchmarkSkipped`` when it is missing. Cases that write (orders,
+renewal invoices, suspensions) roll each round back so rounds, and runs,
+see the same rows.
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection
+from django.db.models import Count
+from django.test import RequestFactory
+from django.urls import reverse
+
+from benchmarks.harness import BenchmarkSkipped, case, rolled_back
+from billing_management import billing_services
+from billing_management import views as billing_views
+from billing_management.services import invoice_pdf
+from client_app import views as client_views
+from main.invoices_helpers import next_invoice_number
+from main.models import (
+    AccountEntry,
+    Invoice,
+    Order,
+    Promotion,
+    StarlinkKit,
+    Subscription,
+    SubscriptionPlan,
+    User,
+)
+from main.services import synthetic_data
+from main.services.region_resolver import resolve_region_from_coords
+from main.utilities.pricing_helpers import (
+    DraftLine,
+    apply_promotions_and_coupon_to_draft_lines,
+)
+
+BATCH = 10_000  # subscriptions per prebill / cutoff round
+REGION_POINTS = 500
+CONTENDERS = 8  # threads drawing invoice numbers at once
+NUMBERS_PER_CONTENDER = 5
+
+
+# ---------- Dataset ----------
+def _synthetic_orders():
+    return Order.objects.filter(order_reference__startswith=f"{synthetic_data.PREFIX}-")
+
+
+def _synthetic_user() -> User:
+    user = (
+        User.objects.filter(email__endswith=synthetic_data.EMAIL_DOMAIN)
+        .order_by("pk")
+        .first()
+    )
+    if user is None:
+        raise BenchmarkSkipped("no synthetic dataset (run generate_synthetic_dataset)")
+    return user
+
+
+def _checkout_inputs():
+    kit = StarlinkKit.objects.filter(is_active=True).order_by("id").first()
+    plan = SubscriptionPlan.objects.filter(is_active=True).order_by("id").first()
+    if kit is None or plan is None:
+        raise BenchmarkSkipped("no active kit or plan")
+    return kit, plan
+
+
+def _renewal_batch():
+    """Up to BATCH synthetic subscriptions sharing the most common billing day."""
+    subs = Subscription.objects.filter(
+        order__order_reference__startswith=f"{synthetic_data.PREFIX}-",
+        status__in=["active", "suspended"],
+    )
+    modal = (
+        subs.exclude(next_billing_date=None)
+        .values("next_billing_date")
+        .annotate(n=Count("id"))
+        .order_by("-n")
+        .first()
+    )
+    if modal is None:
+        raise BenchmarkSkipped("no synthetic subscriptions")
+    billing_day = modal["next_billing_date"]
+    ids = list(
+        subs.filter(next_billing_date=billing_day)
+        .order_by("pk")
+        .values_list("pk", flat=True)[:BATCH]
+    )
+    return billing_day, ids
+
+
+def _billing_config(**overrides):
+    cfg = billing_services.config_cache.billing_config()  # a copy
+    for name, value in overrides.items():
+        setattr(cfg, name, value)
+    return cfg
+
+
+@contextmanager
+def _billing_day(today: date, cfg):
+    """Billing services see ``today`` and ``cfg`` instead of the real ones."""
+    with mock.patch.object(billing_services, "_today", lambda: today):
+        with mock.patch.object(
+            billing_services.config_cache, "billing_config", lambda: cfg
+        ):
+            yield
+
+
+# ---------- Checkout ----------
+@case("checkout", rounds=50)
+def checkout_pricing(benchmark):
+    user = _synthetic_user()
+    kit, plan = _checkout_inputs()
+    for i, discount in enumerate(("10.00", "5.00", "15.00")):
+        Promotion.objects.create(name=f"Benchmark promotion {i}", value=discount)
+    lines = [
+        DraftLine("kit", kit.name, 1, kit.base_price_usd or Decimal("0")),
+        DraftLine(
+            "plan",
+            plan.name,
+            1,
+            plan.effective_price or plan.monthly_price_usd or Decimal("0"),
+            plan_id=plan.pk,
+        ),
+        DraftLine("install", "Installation", 1, Decimal("100.00")),
+    ]
+    benchmark.extra_info["promotions"] = Promotion.objects.count()
+    benchmark(apply_promotions_and_coupon_to_draft_lines, user=user, draft_lines=lines)
+
+
+def _order_request(user, kit, plan, lat, lng):
+    request = RequestFactory().post(
+        reverse("submit_order"),
+        {
+            "lat": f"{lat:.6f}",
+            "lng": f"{lng:.6f}",
+            "kit_id": str(kit.pk),
+            "subscription_plan_id": str(plan.pk),
+            "billing_cycle": "monthly",
+            "payment_method": "cash",
+        },
+    )
+    request.user = user
+    return request
+
+
+def _submit(request):
+    response = client_views.submit_order(request)
+    if response.status_code != 200:
+        raise BenchmarkSkipped(f"submit_order answered {response.status_code}")
+    return response
+
+
+@case("checkout", rounds=20)
+def submit_order_end_to_end(benchmark):
+    user = _synthetic_user()
+    kit, plan = _checkout_inputs()
+    points = list(
+        _synthetic_orders()
+        .exclude(latitude=None)
+        .values_list("latitude", "longitude")[:100]
+    )
+    if not points:
+        raise BenchmarkSkipped("no synthetic orders")
+    rounds = iter(range(10**9))
+
+    def setup():
+        lat, lng = points[next(rounds) % len(points)]
+        return (_order_request(user, kit, plan, lat, lng),), {}
+
+    benchmark.pedantic(rolled_back(_submit), setup=setup)
+
+
+# ---------- Billing runs ----------
+@case("billing", rounds=3)
+def run_prebill_10k(benchmark):
+    billing_day, ids = _renewal_batch()
+    cfg = _billing_config(invoice_start_date=None)
+    benchmark.extra_info["subscriptions"] = len(ids)
+    today = billing_day - timedelta(days=1)  # inside every prebill window
+    subs = Subscription.objects.filter(pk__in=ids).select_related(
+        "user", "plan", "order"
+    )
+    with _billing_day(today, cfg):
+        benchmark.pedantic(rolled_back(billing_services.run_prebill), args=(subs,))
+
+
+@case("billing", rounds=3)
+def enforce_cutoff_10k(benchmark):
+    billing_day, ids = _renewal_batch()
+    cfg = _billing_config(auto_suspend_on_cutoff=True)
+    benchmark.extra_info["subscriptions"] = len(ids)
+    today = billing_day - timedelta(days=cfg.cutoff_days_before_anchor or 0)
+    subs = Subscription.objects.filter(pk__in=ids)
+    with _billing_day(today, cfg):
+        benchmark.pedantic(rolled_back(billing_services.enforce_cutoff), args=(subs,))
+
+
+# ---------- Regions ----------
+@case("regions", rounds=10)
+def region_resolution(benchmark):
+    points = list(
+        _synthetic_orders()
+        .exclude(latitude=None)
+        .order_by("pk")
+        .values_list("latitude", "longitude")[:REGION_POINTS]
+    )
+    if not points:
+        raise BenchmarkSkipped("no synthetic orders")
+    benchmark.extra_info["points"] = len(points)
+
+    def resolve_all():
+        for lat, lng in points:
+            resolve_region_from_coords(lat, lng)
+
+    benchmark(resolve_all)
+
+
+# ---------- Invoices ----------
+@case("invoices", rounds=5, isolated=False)
+def next_invoice_number_contention(benchmark):
+    """
+    CONTENDERS threads draw numbers at once, each in a transaction that is
+    rolled back: they still queue on the CompanySettings row lock, but the
+    counter does not move.
+    """
+    draw = rolled_back(next_invoice_number)
+    benchmark.extra_info["threads"] = CONTENDERS
+    benchmark.extra_info["numbers"] = CONTENDERS * NUMBERS_PER_CONTENDER
+
+    def contender(_):
+        for _ in range(NUMBERS_PER_CONTENDER):
+            draw()
+
+    with ThreadPoolExecutor(CONTENDERS) as pool:
+        try:
+            benchmark(lambda: list(pool.map(contender, range(CONTENDERS))))
+        finally:
+            # One task per thread (the barrier holds each until all arrived),
+            # so every worker closes its own connection.
+            barrier = threading.Barrier(CONTENDERS)
+
+            def close(_):
+                barrier.wait()
+                connection.close()
+
+            list(pool.map(close, range(CONTENDERS)))
+
+
+@case("invoices", rounds=5)
+def ledger_export_heaviest_user(benchmark):
+    heaviest = (
+        AccountEntry.objects.filter(
+            account__user__email__endswith=synthetic_data.EMAIL_DOMAIN
+        )
+        .values("account__user")
+        .annotate(n=Count("id"))
+        .order_by("-n")
+        .first()
+    )
+    if heaviest is None:
+        raise BenchmarkSkipped("no synthetic ledger entries")
+    user = User.objects.get(pk=heaviest["account__user"])
+    benchmark.extra_info["entries"] = heaviest["n"]
+    request = RequestFactory().get(
+        reverse("ledger_export"),
+        {
+            "user_id": user.pk,
+            "from": "2000-01-01",
+            "to": (date.today() + timedelta(days=366)).isoformat(),
+            "format": "xlsx",
+        },
+    )
+    request.user = user
+    response = benchmark(billing_views.ledger_export, request)
+    if response.status_code != 200:
+        raise BenchmarkSkipped(f"ledger_export answered {response.status_code}")
+
+
+@case("invoices", rounds=10)
+def invoice_pdf_render(benchmark):
+    user = _synthetic_user()
+    kit, plan = _checkout_inputs()
+    lat, lng = (
+        _synthetic_orders()
+        .exclude(latitude=None)
+        .values_list("latitude", "longitude")
+        .first()
+        or (None, None)
+    )
+    if lat is None:
+        raise BenchmarkSkipped("no synthetic orders")
+    last = Invoice.objects.order_by("-pk").values_list("pk", flat=True).first() or 0
+    _submit(_order_request(user, kit, plan, lat, lng))  # rolled back with the case
+    invoice = Invoice.objects.filter(pk__gt=last).order_by("pk").first()
+    if invoice is None:
+        raise BenchmarkSkipped("submit_order issued no invoice")
+    invoice_pdf.warm_up()
+    benchmark(lambda: invoice_pdf.render_pdf(invoice_pdf.load_invoice(invoice.pk)))
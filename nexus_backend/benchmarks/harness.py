@@ -0,0 +1,321 @@
+"""
+A small pytest-benchmark-style harness run by ``manage.py run_benchmarks``.
+
+Cases (``benchmarks.cases``) are plain functions taking a ``Benchmark``,
+with the same API as the pytest-benchmark fixture:
+
+    @case("pricing", rounds=50)
+    def checkout_pricing(benchmark):
+        user, lines = ...                      # setup, not timed
+        benchmark(apply_promotions_and_coupon_to_draft_lines, user=user, ...)
+
+``benchmark(func, *args)`` times ``func`` over warm-up + ``rounds`` rounds;
+``benchmark.pedantic(func, setup=..., rounds=..., iterations=...)`` gives
+control over per-round setup. ``benchmark.extra_info`` is stored with the
+result (dataset sizes, items per round...).
+
+Cases run against whatever database is configured, normally one filled by
+``generate_synthetic_dataset``. An isolated case runs inside a transaction
+that is rolled back, so every run sees the same data.
+
+A run is a ``Report``: metadata (commit, machine, dataset) plus ``Stats``
+per case. Reports are saved as JSON under ``.benchmarks/`` and compared on
+the median of each case.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+DEFAULT_THRESHOLD = 0.10  # relative change of the median reported as a change
+
+
+class BenchmarkSkipped(Exception):
+    """The case cannot run here (no dataset, optional dependency missing)."""
+
+
+# ---------- Timing ----------
+@dataclass
+class Stats:
+    rounds: int
+    min: float
+    max: float
+    mean: float
+    median: float
+    stddev: float
+    p95: float
+    extra_info: Dict = field(default_factory=dict)
+
+    @classmethod
+    def from_times(cls, times: List[float], extra_info=None) -> "Stats":
+        ordered = sorted(times)
+        return cls(
+            rounds=len(ordered),
+            min=ordered[0],
+            max=ordered[-1],
+            mean=statistics.fmean(ordered),
+            median=statistics.median(ordered),
+            stddev=statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+            p95=ordered[min(len(ordered) - 1, math.ceil(len(ordered) * 0.95) - 1)],
+            extra_info=dict(extra_info or {}),
+        )
+
+    @property
+    def ops(self) -> float:
+        return 1.0 / self.mean if self.mean else 0.0
+
+
+class Benchmark:
+    """What a case receives; mirrors the pytest-benchmark fixture."""
+
+    def __init__(self, rounds: int = 10, warmup_rounds: int = 1):
+        self.rounds = max(int(rounds), 1)
+        self.warmup_rounds = max(int(warmup_rounds), 0)
+        self.extra_info: Dict = {}
+        self.stats: Optional[Stats] = None
+
+    def __call__(self, func: Callable, *args, **kwargs):
+        return self.pedantic(func, args=args, kwargs=kwargs)
+
+    def pedantic(
+        self,
+        func: Callable,
+        args: Iterable = (),
+        kwargs: Optional[Dict] = None,
+        setup: Optional[Callable] = None,
+        rounds: Optional[int] = None,
+        warmup_rounds: Optional[int] = None,
+        iterations: int = 1,
+    ):
+        """
+        Time ``func``; ``setup()`` runs untimed before each round and may
+        return ``(args, kwargs)`` for it. With ``iterations`` > 1 a round
+        calls ``func`` that many times and the mean per call is kept.
+        """
+        rounds = self.rounds if rounds is None else max(int(rounds), 1)
+        warmup = self.warmup_rounds if warmup_rounds is None else warmup_rounds
+        iterations = max(int(iterations), 1)
+        args, kwargs = tuple(args), dict(kwargs or {})
+        times: List[float] = []
+        result = None
+        for i in range(warmup + rounds):
+            if setup is not None:
+                prepared = setup()
+                if prepared is not None:
+                    args, kwargs = prepared
+            started = time.perf_counter()
+            for _ in range(iterations):
+                result = func(*args, **kwargs)
+            elapsed = (time.perf_counter() - started) / iterations
+            if i >= warmup:
+                times.append(elapsed)
+        self.stats = Stats.from_times(times, self.extra_info)
+        return result
+
+
+def rolled_back(func: Callable) -> Callable:
+    """``func`` run in a transaction that is always rolled back."""
+
+    def wrapper(*args, **kwargs):
+        with transaction.atomic():
+            try:
+                return func(*args, **kwargs)
+            finally:
+                transaction.set_rollback(True)
+
+    wrapper.__name__ = getattr(func, "__name__", "rolled_back")
+    return wrapper
+
+
+# ---------- Registry ----------
+@dataclass(frozen=True)
+class Case:
+    name: str
+    group: str
+    func: Callable[[Benchmark], None]
+    rounds: int
+    isolated: bool
+
+
+CASES: Dict[str, Case] = {}
+
+
+def case(group: str, *, rounds: int = 10, isolated: bool = True):
+    """Register a benchmark case under its function name."""
+
+    def decorator(func):
+        CASES[func.__name__] = Case(func.__name__, group, func, rounds, isolated)
+        return func
+
+    return decorator
+
+
+# ---------- Reports ----------
+@dataclass
+class Report:
+    created_at: str
+    commit: str
+    machine: Dict
+    dataset: Dict
+    results: Dict[str, Stats] = field(default_factory=dict)
+    skipped: Dict[str, str] = field(default_factory=dict)
+
+    def to_json(self) -> Dict:
+        data = asdict(self)
+        for stats in data["results"].values():
+            stats["ops"] = 1.0 / stats["mean"] if stats["mean"] else 0.0
+        return data
+
+    @classmethod
+    def from_json(cls, data: Dict) -> "Report":
+        results = {}
+        for name, raw in (data.get("results") or {}).items():
+            raw = {k: v for k, v in raw.items() if k != "ops"}
+            results[name] = Stats(**raw)
+        return cls(
+            created_at=data.get("created_at", ""),
+            commit=data.get("commit", ""),
+            machine=data.get("machine") or {},
+            dataset=data.get("dataset") or {},
+            results=results,
+            skipped=data.get("skipped") or {},
+        )
+
+
+def _commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            timeout=5,
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def machine_info() -> Dict:
+    return {
+        "node": platform.node(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run(
+    names: Optional[Iterable[str]] = None,
+    rounds: Optional[int] = None,
+    dataset: Optional[Dict] = None,
+    on_result: Optional[Callable[[Case, Optional[Stats], str], None]] = None,
+) -> Report:
+    """Run the selected cases (all by default) and return the report."""
+    selected = [CASES[n] for n in names] if names else list(CASES.values())
+    report = Report(
+        created_at=timezone.now().isoformat(timespec="seconds"),
+        commit=_commit(),
+        machine=machine_info(),
+        dataset=dict(dataset or {}),
+    )
+    for c in selected:
+        bench = Benchmark(rounds or c.rounds)
+        try:
+            if c.isolated:
+                rolled_back(c.func)(bench)
+            else:
+                c.func(bench)
+        except BenchmarkSkipped as exc:
+            report.skipped[c.name] = str(exc)
+            if on_result:
+                on_result(c, None, str(exc))
+            continue
+        if bench.stats is None:
+            raise RuntimeError(f"Benchmark case {c.name} never called benchmark().")
+        report.results[c.name] = bench.stats
+        if on_result:
+            on_result(c, bench.stats, "")
+    return report
+
+
+# ---------- Storage and comparison ----------
+def storage_dir() -> Path:
+    return Path(
+        getattr(settings, "BENCHMARK_STORAGE", None)
+        or Path(settings.BASE_DIR) / ".benchmarks"
+    )
+
+
+def save(report: Report, name: str, directory: Optional[Path] = None) -> Path:
+    directory = Path(directory or storage_dir())
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{name}.json"
+    path.write_text(json.dumps(report.to_json(), indent=2, sort_keys=True))
+    return path
+
+
+def load(name: str, directory: Optional[Path] = None) -> Report:
+    path = Path(name)
+    if not path.suffix:
+        path = Path(directory or storage_dir()) / f"{name}.json"
+    return Report.from_json(json.loads(path.read_text()))
+
+
+@dataclass(frozen=True)
+class Comparison:
+    name: str
+    baseline: float  # median seconds
+    current: float
+    change: float  # relative: +0.25 is 25% slower
+    verdict: str  # "faster" | "slower" | "same"
+
+
+def compare(
+    current: Report, baseline: Report, threshold: float = DEFAULT_THRESHOLD
+) -> List[Comparison]:
+    """Median of every case present in both reports."""
+    rows = []
+    for name, stats in current.results.items():
+        base = baseline.results.get(name)
+        if base is None or not base.median:
+            continue
+        change = stats.median / base.median - 1.0
+        if change > threshold:
+            verdict = "slower"
+        elif change < -threshold:
+            verdict = "faster"
+        else:
+            verdict = "same"
+        rows.append(Comparison(name, base.median, stats.median, change, verdict))
+    return rows
+
+
+__all__ = [
+    "Benchmark",
+    "BenchmarkSkipped",
+    "CASES",
+    "Comparison",
+    "Report",
+    "Stats",
+    "case",
+    "compare",
+    "load",
+    "rolled_back",
+    "run",
+    "save",
+    "storage_dir",
+]
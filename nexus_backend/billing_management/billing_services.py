@@ -15,9 +15,9 @@ from main.models import (
     OrderLine,
     OrderTax,
     Subscription,
-    TaxRate,
     Wallet,
 )
+from main.services import config_cache
 from main.services.posting import create_entry
 
 ZERO = Decimal("0.00")
@@ -92,11 +92,7 @@ def tax_rate(code: str, *, user=None) -> Decimal:
     """
     if not is_tax_applicable(user, code):
         return ZERO
-    try:
-        r = TaxRate.objects.filter(description=code).latest("id")
-        pct = r.percentage or ZERO
-    except TaxRate.DoesNotExist:
-        pct = ZERO
+    pct = config_cache.tax_percentage(code, latest=True) or ZERO
     return (pct / Decimal("100.00")).quantize(Decimal("0.0001"))
 
 
@@ -106,7 +102,7 @@ def _tax_config():
     - vat_on_excise: True => VAT is applied on (base + excise); False => VAT on base only.
     """
     try:
-        cfg = BillingConfig.get()
+        cfg = config_cache.billing_config()
         # Example: reuse an existing boolean or add one: vat_on_excise = models.BooleanField(default=True)
         vat_on_excise = getattr(cfg, "vat_on_excise", True)  # default to compound VAT
     except Exception:
@@ -389,7 +385,7 @@ def run_prebill(
     Create renewal order+invoice for subscriptions in the prebill window and auto-apply wallet.
     Returns (processed_count, created_count).
     """
-    cfg = BillingConfig.get()
+    cfg = config_cache.billing_config()
     processed = 0
     created = 0
 
@@ -469,7 +465,7 @@ def enforce_cutoff(
     Suspend subscriptions on their cutoff day if their renewal invoice is still unpaid.
     Returns (checked_count, suspended_count).
     """
-    cfg = BillingConfig.get()
+    cfg = config_cache.billing_config()
     if not cfg.auto_suspend_on_cutoff:
         return 0, 0
 
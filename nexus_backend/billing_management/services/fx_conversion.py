@@ -0,0 +1,131 @@
+"""
+Batch USD→CDF conversion for ledger, statement and revenue exports.
+
+Exports used to call ``FxRate.get_rate()`` once per row. This module loads the
+FX series covering the export window once, maps every row date to its rate in
+a single pass (NumPy ``searchsorted`` over the sorted dates) and then applies
+the conversion column by column.
+
+Amounts stay ``Decimal`` end to end; NumPy is only used for the date → rate
+index mapping, so converted values are identical to the per-row path.
+"""
+
+from bisect import bisect_right
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Iterable, List, Optional, Sequence
+
+from main.models import FxRate
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover - numpy is in requirements.txt
+    np = None
+
+CENT = Decimal("0.01")
+
+
+def _as_date(d) -> Optional[date]:
+    if d is None:
+        return None
+    if isinstance(d, datetime):
+        return d.date()
+    return d
+
+
+class FxWindow:
+    """Sorted FX series for one currency pair over an export window."""
+
+    def __init__(self, dates: Sequence[date], rates: Sequence[Decimal]):
+        self.dates = list(dates)
+        self.rates = [Decimal(r) for r in rates]
+        self._np_dates = (
+            np.array(self.dates, dtype="datetime64[D]")
+            if np is not None and self.dates
+            else None
+        )
+
+    @classmethod
+    def load(
+        cls,
+        date_from: Optional[date],
+        date_to: Optional[date],
+        pair: str = "USD/CDF",
+    ) -> "FxWindow":
+        """
+        Load every rate inside [date_from, date_to] plus the latest rate before
+        ``date_from`` (the one that applies to the first days of the window).
+        Two queries regardless of the number of rows being converted.
+        """
+        qs = FxRate.objects.filter(pair=pair)
+        if date_to:
+            qs = qs.filter(date__lte=date_to)
+
+        rows: List[tuple] = []
+        if date_from:
+            anchor = (
+                qs.filter(date__lt=date_from)
+                .order_by("-date")
+                .values_list("date", "rate")
+                .first()
+            )
+            if anchor:
+                rows.append(anchor)
+            qs = qs.filter(date__gte=date_from)
+        rows.extend(qs.order_by("date").values_list("date", "rate"))
+        return cls([d for d, _ in rows], [r for _, r in rows])
+
+    def __bool__(self):
+        return bool(self.dates)
+
+    def rate_on(self, d) -> Optional[Decimal]:
+        d = _as_date(d)
+        if d is None:
+            return None
+        i = bisect_right(self.dates, d)
+        return self.rates[i - 1] if i else None
+
+    def rates_for(self, dates: Iterable) -> List[Optional[Decimal]]:
+        """Rate applying to each date (latest on or before it), or None."""
+        dates = [_as_date(d) for d in dates]
+        if not self.dates or not dates:
+            return [None] * len(dates)
+        if self._np_dates is None:
+            return [self.rate_on(d) for d in dates]
+
+        # None dates are looked up as the earliest possible day, then masked.
+        query = np.array(
+            [d if d is not None else date.min for d in dates], dtype="datetime64[D]"
+        )
+        idx = np.searchsorted(self._np_dates, query, side="right") - 1
+        rates = self.rates
+        return [
+            rates[i] if (i >= 0 and d is not None) else None
+            for i, d in zip(idx.tolist(), dates)
+        ]
+
+
+def convert_column(
+    amounts: Sequence, rates: Sequence[Optional[Decimal]]
+) -> List[Optional[Decimal]]:
+    """Element-wise ``amount * rate`` quantized to cents (None when no rate)."""
+    return [
+        (Decimal(a or 0) * r).quantize(CENT)
+        if r is not None
+        else None
+        for a, r in zip(amounts, rates)
+    ]
+
+
+def sum_converted(amounts: Sequence, rates: Sequence[Optional[Decimal]]) -> Decimal:
+    """Sum of per-row converted amounts, skipping rows without a rate."""
+    return sum(
+        (v for v in convert_column(amounts, rates) if v is not None), Decimal("0.00")
+    )
+
+
+__all__ = [
+    "FxWindow",
+    "convert_column",
+    "sum_converted",
+]
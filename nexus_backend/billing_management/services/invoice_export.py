@@ -0,0 +1,258 @@
+"""
+Bulk invoice export: a ZIP of every invoice PDF issued in a period.
+
+``run_export`` (via ``billing_management.tasks.export_invoices``) splits the
+selected invoices in two:
+
+- invoices whose stored PDF is current (see ``invoice_pdf.fingerprint``) are
+  copied from storage as-is;
+- the rest are rendered in a process pool, since xhtml2pdf/reportlab are
+  CPU-bound and hold the GIL. Every pool worker (``main.services.process_pool``)
+  sets Django up and warms the templates and company settings once
+  (``invoice_pdf.warm_up``), then renders and stores its share, so the next
+  export reuses them.
+
+Results are appended to a temporary ZIP as they arrive (PDFs are already
+compressed, so entries are stored), the archive is uploaded to private
+storage, and progress counters are written to the ``InvoiceExport`` row.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import tempfile
+import time
+import zipfile
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+
+from billing_management.services import invoice_pdf
+from main.models import Invoice, InvoiceExport
+from main.services import process_pool
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = "invoice_exports"
+PROGRESS_INTERVAL_SECONDS = 2.0
+POOL_CHUNKSIZE = 4
+MAX_ERRORS_KEPT = 20
+
+# (invoice pk, invoice number, PDF bytes or None, error message)
+RenderResult = Tuple[int, str, Optional[bytes], str]
+
+
+def export_workers() -> int:
+    """Pool size: INVOICE_EXPORT_WORKERS, default every core."""
+    configured = getattr(settings, "INVOICE_EXPORT_WORKERS", None)
+    return max(int(configured or os.cpu_count() or 1), 1)
+
+
+def invoice_queryset(export: InvoiceExport):
+    """Issued invoices in the export's period, oldest first."""
+    qs = Invoice.objects.exclude(status=Invoice.Status.DRAFT).filter(
+        issued_at__date__gte=export.period_start,
+        issued_at__date__lte=export.period_end,
+    )
+    filters = export.filters or {}
+    if filters.get("status"):
+        qs = qs.filter(status=filters["status"])
+    if filters.get("user_id"):
+        qs = qs.filter(user_id=filters["user_id"])
+    return qs.order_by("issued_at", "id")
+
+
+def archive_entry_name(number: str, pk: int) -> str:
+    safe = (number or f"invoice-{pk}").replace("/", "-").replace("\\", "-")
+    return f"{safe}.pdf"
+
+
+# ---------- Rendering (runs in pool workers) ----------
+def render_one(pk: int) -> RenderResult:
+    """Render and store one invoice's PDF; errors are returned, not raised."""
+    try:
+        doc = invoice_pdf.load_invoice(pk)
+        data = invoice_pdf.ensure_pdf(doc)
+        if data is None:  # became current meanwhile (e.g. issue-time render)
+            with doc.pdf_file.open("rb") as fh:
+                data = fh.read()
+        return pk, doc.number or "", data, ""
+    except Exception as exc:
+        logger.exception("Bulk render failed for invoice %s", pk)
+        return pk, "", None, f"{type(exc).__name__}: {exc}"
+
+
+def render_many(pks: List[int], workers: int) -> Iterator[RenderResult]:
+    """
+    Start rendering ``pks`` and return an iterator over the results (in
+    order). With more than one worker the whole batch is submitted to a
+    process pool right away, so the caller can do other work meanwhile.
+    """
+    if workers > 1 and len(pks) > 1:
+        try:
+            executor = process_pool.spawn_pool(
+                min(workers, len(pks)), warm_up=f"{invoice_pdf.__name__}.warm_up"
+            )
+            results = process_pool.map_path(
+                executor, f"{__name__}.render_one", pks, chunksize=POOL_CHUNKSIZE
+            )
+        except Exception:
+            logger.warning("Process pool unavailable; rendering invoices inline")
+        else:
+            return _shutdown_after(executor, results)
+    return _render_inline(pks)
+
+
+def _shutdown_after(executor, results) -> Iterator[RenderResult]:
+    with executor:
+        yield from results
+
+
+def _render_inline(pks: List[int]) -> Iterator[RenderResult]:
+    invoice_pdf.warm_up()
+    for pk in pks:
+        yield render_one(pk)
+
+
+# ---------- Job ----------
+class _Progress:
+    """Throttled writes of the counters to the export row."""
+
+    def __init__(self, export: InvoiceExport):
+        self.export = export
+        self.errors: List[str] = []
+        self.last_flush = 0.0
+
+    def add(self, *, reused=0, rendered=0, error: str = ""):
+        export = self.export
+        export.processed += 1
+        export.reused += reused
+        export.rendered += rendered
+        if error:
+            export.failed += 1
+            if len(self.errors) < MAX_ERRORS_KEPT:
+                self.errors.append(error)
+        if time.monotonic() - self.last_flush >= PROGRESS_INTERVAL_SECONDS:
+            self.flush()
+
+    def flush(self, *extra_fields: str):
+        export = self.export
+        export.error = "\n".join(self.errors)
+        export.save(
+            update_fields=[
+                "processed",
+                "reused",
+                "rendered",
+                "failed",
+                "error",
+                *extra_fields,
+            ]
+        )
+        self.last_flush = time.monotonic()
+
+
+def _split(invoices: Iterable[Invoice]) -> Tuple[List[Invoice], List[int]]:
+    """(invoices with a current stored PDF, pks that need rendering)."""
+    current, stale = [], []
+    for inv in invoices:
+        if (
+            inv.pdf_file
+            and inv.pdf_sha256
+            and inv.pdf_fingerprint == invoice_pdf.fingerprint(inv)
+        ):
+            current.append(inv)
+        else:
+            stale.append(inv.pk)
+    return current, stale
+
+
+def _stored_pdf(inv: Invoice) -> Tuple[bytes, bool]:
+    """(bytes, reused) for a current invoice; re-renders if the file is gone."""
+    try:
+        with inv.pdf_file.open("rb") as fh:
+            return fh.read(), True
+    except (FileNotFoundError, OSError):
+        return invoice_pdf.store_pdf(inv), False
+
+
+def run_export(export_id: int, workers: Optional[int] = None) -> InvoiceExport:
+    export = InvoiceExport.objects.get(pk=export_id)
+    export.status = InvoiceExport.Status.RUNNING
+    export.started_at = timezone.now()
+    export.processed = export.reused = export.rendered = export.failed = 0
+    export.error = ""
+
+    current, stale = _split(invoice_queryset(export).iterator(chunk_size=500))
+    export.total = len(current) + len(stale)
+    export.save(
+        update_fields=[
+            "status",
+            "started_at",
+            "total",
+            "processed",
+            "reused",
+            "rendered",
+            "failed",
+            "error",
+        ]
+    )
+    progress = _Progress(export)
+
+    try:
+        with tempfile.TemporaryFile() as tmp:
+            with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_STORED) as archive:
+                names = set()
+
+                def add(number: str, pk: int, data: bytes):
+                    name = archive_entry_name(number, pk)
+                    if name in names:
+                        name = f"{pk}-{name}"
+                    names.add(name)
+                    archive.writestr(name, data)
+
+                # Pool workers start rendering while stored PDFs are copied.
+                results = render_many(stale, workers or export_workers())
+                for inv in current:
+                    try:
+                        data, reused = _stored_pdf(inv)
+                    except Exception as exc:
+                        progress.add(error=f"{inv.number}: {exc}")
+                        continue
+                    add(inv.number, inv.pk, data)
+                    progress.add(reused=int(reused), rendered=int(not reused))
+
+                for pk, number, data, error in results:
+                    if data is None:
+                        progress.add(error=f"invoice {pk}: {error}")
+                        continue
+                    add(number, pk, data)
+                    progress.add(rendered=1)
+
+            tmp.seek(0)
+            name = (
+                f"{EXPORT_DIR}/{export.pk}/"
+                f"invoices_{export.period_start}_{export.period_end}.zip"
+            )
+            export.archive.save(name, File(tmp), save=False)
+    except Exception as exc:
+        logger.exception("Invoice export %s failed", export.pk)
+        export.status = InvoiceExport.Status.FAILED
+        progress.errors.insert(0, f"{type(exc).__name__}: {exc}")
+    else:
+        export.status = InvoiceExport.Status.DONE
+    export.finished_at = timezone.now()
+    progress.flush("status", "archive", "finished_at")
+    return export
+
+
+__all__ = [
+    "export_workers",
+    "invoice_queryset",
+    "archive_entry_name",
+    "render_one",
+    "render_many",
+    "run_export",
+]
@@ -0,0 +1,285 @@
+"""
+Pre-rendered invoice PDFs.
+
+Issued invoices don't change, so their PDF is rendered once, in the
+background, when ``issue_invoice`` / ``create_consolidated_invoice`` commits
+(``queue_invoice_pdf``), and stored in private storage under the SHA-256 of
+its bytes. Downloads (``pdf_response``) then cost one row read: the stored
+file is served (a signed URL redirect on Spaces) with the hash as ETag.
+
+Each stored PDF records a fingerprint of what it was rendered from: the
+invoice's own columns (number, status, totals, dates...) and the template
+version. A download whose fingerprint no longer matches (invoice paid,
+template edited, or an invoice from before this pipeline) re-renders inline
+once. Bump ``RENDER_VERSION`` when a change to the context builders should
+invalidate every stored PDF.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+from functools import lru_cache
+from importlib import import_module
+from io import BytesIO
+from typing import Optional, Union
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified, HttpResponseRedirect
+from django.template.loader import get_template, render_to_string
+from django.utils.cache import patch_cache_control
+
+from main.models import ConsolidatedInvoice, Invoice
+from main.services import config_cache, pdf_assets
+
+logger = logging.getLogger(__name__)
+
+RENDER_VERSION = "1"
+PDF_DIR = "invoices/pdf"
+SIGNED_URL_SECONDS = 5 * 60
+
+INVOICE_TEMPLATE = "invoices/inv_templates.html"
+CONSOLIDATED_TEMPLATE = "invoices/consolidated_inv_templates.html"
+
+InvoiceDocument = Union[Invoice, ConsolidatedInvoice]
+
+
+class InvoicePdfError(Exception):
+    """xhtml2pdf reported errors; ``log`` holds its output."""
+
+    def __init__(self, message: str, log: str = ""):
+        super().__init__(message)
+        self.log = log
+
+
+# ---------- Loading ----------
+def load_invoice(pk: int) -> Invoice:
+    return (
+        Invoice.objects.select_related("user")
+        .prefetch_related("lines", "order_links")
+        .get(pk=pk)
+    )
+
+
+def load_consolidated(pk: int) -> ConsolidatedInvoice:
+    return (
+        ConsolidatedInvoice.objects.select_related("user")
+        .prefetch_related("child_invoices__lines")
+        .get(pk=pk)
+    )
+
+
+# ---------- Fingerprints ----------
+@lru_cache(maxsize=None)
+def template_version(template_name: str) -> str:
+    """Hash of the template source (per process; deploys restart workers)."""
+    try:
+        source = get_template(template_name).template.source
+    except Exception:
+        source = ""
+    digest = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+    return f"{RENDER_VERSION}:{digest}"
+
+
+def _digest(*parts) -> str:
+    return hashlib.sha256("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+def fingerprint(doc: InvoiceDocument) -> str:
+    """What the PDF of ``doc`` depends on, as a hex digest."""
+    if isinstance(doc, ConsolidatedInvoice):
+        children = sorted(
+            doc.child_invoices.values_list("id", "number", "status", "grand_total")
+        )
+        return _digest(
+            template_version(CONSOLIDATED_TEMPLATE),
+            doc.number,
+            doc.status,
+            doc.total,
+            doc.currency,
+            doc.issued_at,
+            doc.due_date,
+            children,
+        )
+    return _digest(
+        template_version(INVOICE_TEMPLATE),
+        doc.number,
+        doc.status,
+        doc.currency,
+        doc.subtotal,
+        doc.tax_total,
+        doc.grand_total,
+        doc.vat_amount,
+        doc.excise_amount,
+        doc.issued_at,
+        doc.due_at,
+        doc.bill_to_name,
+        doc.bill_to_address,
+        doc.consolidated_of_id,
+    )
+
+
+# ---------- Rendering ----------
+def warm_up():
+    """
+    Import xhtml2pdf, compile the invoice templates and load company
+    settings, fonts and images once, so a long-lived render process (bulk
+    export worker) pays for them up front.
+    """
+    import_module("xhtml2pdf.pisa")
+    pdf_assets.warm_up((INVOICE_TEMPLATE, CONSOLIDATED_TEMPLATE))
+    for name in (INVOICE_TEMPLATE, CONSOLIDATED_TEMPLATE):
+        template_version(name)
+
+
+_warmed = False
+
+
+def warm_up_once():
+    """
+    ``warm_up`` on the first call in this process. Celery workers call it
+    from the first PDF task rather than at boot: most queues never render.
+    """
+    global _warmed
+    if _warmed:
+        return
+    _warmed = True
+    try:
+        warm_up()
+    except Exception:
+        logger.warning("PDF warm-up failed", exc_info=True)
+
+
+def render_html(doc: InvoiceDocument, request=None) -> str:
+    from billing_management.views import (
+        _build_consolidated_context,
+        _build_invoice_context,
+    )
+
+    cs = config_cache.company_settings()
+    if isinstance(doc, ConsolidatedInvoice):
+        context = _build_consolidated_context(doc, cs)
+        return render_to_string(CONSOLIDATED_TEMPLATE, context=context, request=request)
+    context = _build_invoice_context(doc, cs)
+    return render_to_string(INVOICE_TEMPLATE, context=context, request=request)
+
+
+def render_pdf(doc: InvoiceDocument, request=None) -> bytes:
+    from xhtml2pdf import pisa
+
+    buf = BytesIO()
+    status = pisa.CreatePDF(
+        src=render_html(doc, request),
+        dest=buf,
+        link_callback=pdf_assets.resolve_uri,
+        encoding="utf-8",
+    )
+    if getattr(status, "err", 0):
+        raise InvoicePdfError(
+            f"PDF generation failed for {doc._meta.verbose_name} {doc.number}",
+            str(getattr(status, "log", "") or ""),
+        )
+    return buf.getvalue()
+
+
+def store_pdf(doc: InvoiceDocument, request=None) -> bytes:
+    """Render ``doc``, store it under its content hash and record it on the row."""
+    current = fingerprint(doc)
+    data = render_pdf(doc, request)
+    digest = hashlib.sha256(data).hexdigest()
+    storage = doc.pdf_file.storage
+    name = f"{PDF_DIR}/{digest}.pdf"
+    if not storage.exists(name):
+        name = storage.save(name, ContentFile(data))
+
+    previous = doc.pdf_file.name
+    type(doc).objects.filter(pk=doc.pk).update(
+        pdf_file=name, pdf_sha256=digest, pdf_fingerprint=current
+    )
+    doc.pdf_file.name, doc.pdf_sha256, doc.pdf_fingerprint = name, digest, current
+    if previous and previous != name:
+        try:
+            storage.delete(previous)
+        except Exception:
+            logger.warning("Could not delete superseded invoice PDF %s", previous)
+    return data
+
+
+def ensure_pdf(doc: InvoiceDocument, request=None) -> Optional[bytes]:
+    """
+    Make sure the stored PDF is current. Returns the bytes when it had to be
+    rendered now, None when the stored file is up to date.
+    """
+    if doc.pdf_file and doc.pdf_sha256 and doc.pdf_fingerprint == fingerprint(doc):
+        return None
+    return store_pdf(doc, request)
+
+
+def queue_invoice_pdf(doc: InvoiceDocument):
+    """Render ``doc`` in the background once the current transaction commits."""
+    from billing_management.tasks import render_invoice_pdf
+
+    label, pk = doc._meta.label, doc.pk
+
+    def _send():
+        try:
+            render_invoice_pdf.delay(label, pk)
+        except Exception:
+            # Downloads render on demand when nothing is stored yet.
+            logger.warning("Invoice PDF queue unavailable for %s #%s", label, pk)
+
+    transaction.on_commit(_send)
+
+
+# ---------- Serving ----------
+def pdf_response(request, doc: InvoiceDocument, filename: str) -> HttpResponse:
+    """
+    Conditional response for the stored PDF: 304 when the client's ETag
+    matches, a short-lived signed URL on private object storage, or the bytes.
+    """
+    data = ensure_pdf(doc, request)
+    etag = f'"{doc.pdf_sha256}"'
+    disposition = f'inline; filename="{filename}"'
+    storage = doc.pdf_file.storage
+
+    if etag in request.headers.get("If-None-Match", ""):
+        resp = HttpResponseNotModified()
+    elif data is None and getattr(storage, "querystring_auth", False):
+        resp = HttpResponseRedirect(
+            storage.url(
+                doc.pdf_file.name,
+                parameters={
+                    "ResponseContentDisposition": disposition,
+                    "ResponseContentType": "application/pdf",
+                },
+                expire=SIGNED_URL_SECONDS,
+            )
+        )
+    else:
+        if data is None:
+            with storage.open(doc.pdf_file.name, "rb") as fh:
+                data = fh.read()
+        resp = HttpResponse(data, content_type="application/pdf")
+        resp["Content-Disposition"] = disposition
+
+    resp["ETag"] = etag
+    patch_cache_control(resp, private=True, no_cache=True)
+    return resp
+
+
+__all__ = [
+    "RENDER_VERSION",
+    "InvoicePdfError",
+    "load_invoice",
+    "load_consolidated",
+    "template_version",
+    "fingerprint",
+    "warm_up",
+    "warm_up_once",
+    "render_pdf",
+    "store_pdf",
+    "ensure_pdf",
+    "queue_invoice_pdf",
+    "pdf_response",
+]
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import logging
+
+from celery import shared_task
+
+from billing_management.services import invoice_export, invoice_pdf
+
+logger = logging.getLogger(__name__)
+
+LOADERS = {
+    "main.Invoice": invoice_pdf.load_invoice,
+    "main.ConsolidatedInvoice": invoice_pdf.load_consolidated,
+}
+
+
+@shared_task(bind=True, ignore_result=True, acks_late=True)
+def render_invoice_pdf(self, model_label: str, pk: int):
+    """Render and store the PDF of an issued (consolidated) invoice."""
+    try:
+        doc = LOADERS[model_label](pk)
+    except Exception:
+        logger.warning("Invoice PDF: %s #%s not found", model_label, pk)
+        return
+    invoice_pdf.warm_up_once()
+    try:
+        invoice_pdf.ensure_pdf(doc)
+    except invoice_pdf.InvoicePdfError as exc:
+        # Template problem: retrying won't help; downloads will report it.
+        logger.error("%s\n%s", exc, exc.log)
+
+
+@shared_task(bind=True, ignore_result=True)
+def export_invoices(self, export_id: int):
+    """Build the ZIP for an InvoiceExport (progress is written to the row)."""
+    export = invoice_export.run_export(export_id)
+    logger.info(
+        "Invoice export %s %s: %s reused, %s rendered, %s failed",
+        export.pk,
+        export.status,
+        export.reused,
+        export.rendered,
+        export.failed,
+    )
@@ -242,10 +242,17 @@ def test_payment_workflow(billing):
     request = factory.get(f"/site-survey/billing/payment/{billing.id}/")
     request.user = billing.customer
 
+    async def auser():
+        return billing.customer
+
+    request.auser = auser
+
     try:
+        from asgiref.sync import async_to_sync
+
         from site_survey.views import billing_payment
 
-        response = billing_payment(request, billing.id)
+        response = async_to_sync(billing_payment)(request, billing.id)
         print(
             f"   💳 Payment page: {'✅ Accessible' if response.status_code == 200 else '❌ Error'}"
         )
@@ -0,0 +1,66 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from billing_management.services.fx_conversion import (
+    FxWindow,
+    convert_column,
+    sum_converted,
+)
+from main.models import FxRate
+
+
+def test_rates_for_maps_each_date_to_latest_rate_on_or_before():
+    fx = FxWindow(
+        [date(2025, 1, 1), date(2025, 1, 10)],
+        [Decimal("2800.0000"), Decimal("2850.0000")],
+    )
+    rates = fx.rates_for(
+        [
+            date(2024, 12, 31),
+            date(2025, 1, 1),
+            datetime(2025, 1, 9, 23, 59),
+            date(2025, 1, 10),
+            None,
+            date(2025, 3, 1),
+        ]
+    )
+    assert rates == [
+        None,
+        Decimal("2800.0000"),
+        Decimal("2800.0000"),
+        Decimal("2850.0000"),
+        None,
+        Decimal("2850.0000"),
+    ]
+
+
+def test_empty_window_returns_no_rates():
+    assert FxWindow([], []).rates_for([date(2025, 1, 1)]) == [None]
+
+
+def test_convert_column_and_sum():
+    rates = [Decimal("2000"), None, Decimal("2500")]
+    amounts = [Decimal("1.005"), Decimal("10.00"), Decimal("-2.00")]
+    assert convert_column(amounts, rates) == [
+        Decimal("2010.00"),
+        None,
+        Decimal("-5000.00"),
+    ]
+    assert sum_converted(amounts, rates) == Decimal("-2990.00")
+
+
+@pytest.mark.django_db
+def test_load_includes_rate_preceding_window():
+    FxRate.objects.create(date=date(2024, 12, 20), rate=Decimal("2700.0000"))
+    FxRate.objects.create(date=date(2025, 1, 5), rate=Decimal("2800.0000"))
+    FxRate.objects.create(date=date(2025, 2, 5), rate=Decimal("2900.0000"))
+
+    fx = FxWindow.load(date(2025, 1, 1), date(2025, 1, 31))
+
+    assert fx.dates == [date(2024, 12, 20), date(2025, 1, 5)]
+    assert fx.rates_for([date(2025, 1, 2), date(2025, 1, 31)]) == [
+        Decimal("2700.0000"),
+        Decimal("2800.0000"),
+    ]
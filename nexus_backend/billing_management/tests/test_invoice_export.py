@@ -0,0 +1,108 @@
+"""
+Tests for bulk invoice export (billing_management.services.invoice_export)
+
+- Only issued invoices in the period (and filters) are exported
+- Stored, current PDFs are reused; the others are rendered and stored
+- The ZIP lands in storage and the export row reports its counters
+"""
+
+import zipfile
+from datetime import date, datetime, timezone as dt_tz
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from billing_management.services import invoice_export, invoice_pdf
+from main.factories import UserFactory
+from main.models import Invoice, InvoiceExport
+
+
+def _fake_create_pdf(src, dest, **kwargs):
+    dest.write(b"%PDF-1.4 fake")
+    return SimpleNamespace(err=0, log="")
+
+
+@pytest.fixture
+def pisa_calls():
+    # PDF libraries are imported where they are used (lazy imports).
+    with patch("xhtml2pdf.pisa.CreatePDF", side_effect=_fake_create_pdf) as mocked:
+        yield mocked
+
+
+def _invoice(user, number, day, status=Invoice.Status.ISSUED):
+    return Invoice.objects.create(
+        number=number,
+        user=user,
+        status=status,
+        issued_at=datetime(2026, 9, day, 12, tzinfo=dt_tz.utc),
+        grand_total=Decimal("10.00"),
+    )
+
+
+@pytest.mark.django_db
+def test_export_reuses_stored_pdfs_and_zips_the_period(settings, tmp_path, pisa_calls):
+    settings.MEDIA_ROOT = str(tmp_path)
+    user = UserFactory()
+    stored = _invoice(user, "2026-IND-000001", 2)
+    _invoice(user, "2026-IND-000002", 15)
+    _invoice(user, "2026-IND-000003", 30, status=Invoice.Status.PAID)
+    _invoice(user, "2026-IND-000004", 10, status=Invoice.Status.DRAFT)
+    Invoice.objects.create(number="2026-IND-000005", user=user)  # never issued
+    invoice_pdf.ensure_pdf(stored)
+    pisa_calls.reset_mock()
+
+    export = InvoiceExport.objects.create(
+        period_start=date(2026, 9, 1), period_end=date(2026, 9, 30)
+    )
+    export = invoice_export.run_export(export.pk, workers=1)
+
+    assert export.status == InvoiceExport.Status.DONE
+    assert (export.total, export.processed) == (3, 3)
+    assert (export.reused, export.rendered, export.failed) == (1, 2, 0)
+    assert export.progress == 100
+    assert pisa_calls.call_count == 2
+    with export.archive.open("rb") as fh, zipfile.ZipFile(fh) as archive:
+        assert sorted(archive.namelist()) == [
+            "2026-IND-000001.pdf",
+            "2026-IND-000002.pdf",
+            "2026-IND-000003.pdf",
+        ]
+    assert Invoice.objects.exclude(pdf_sha256="").count() == 3
+
+
+@pytest.mark.django_db
+def test_export_filters_by_status():
+    user = UserFactory()
+    _invoice(user, "2026-IND-000010", 5)
+    paid = _invoice(user, "2026-IND-000011", 6, status=Invoice.Status.PAID)
+    export = InvoiceExport(
+        period_start=date(2026, 9, 1),
+        period_end=date(2026, 9, 30),
+        filters={"status": "paid"},
+    )
+
+    assert list(invoice_export.invoice_queryset(export)) == [paid]
+
+
+@pytest.mark.django_db(transaction=True)  # pool workers use their own connections
+def test_export_renders_in_a_process_pool(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    user = UserFactory()
+    numbers = [f"2026-IND-00002{day}" for day in range(1, 6)]
+    for day, number in enumerate(numbers, start=1):
+        _invoice(user, number, day)
+    export = InvoiceExport.objects.create(
+        period_start=date(2026, 9, 1), period_end=date(2026, 9, 30)
+    )
+
+    export = invoice_export.run_export(export.pk, workers=2)
+
+    assert export.status == InvoiceExport.Status.DONE, export.error
+    assert (export.rendered, export.failed) == (5, 0)
+    with export.archive.open("rb") as fh, zipfile.ZipFile(fh) as archive:
+        assert sorted(archive.namelist()) == [f"{n}.pdf" for n in numbers]
+    # Workers stored the PDFs in the parent's database and MEDIA_ROOT.
+    assert Invoice.objects.exclude(pdf_sha256="").count() == 5
+    assert len(list(tmp_path.rglob("*.pdf"))) >= 5
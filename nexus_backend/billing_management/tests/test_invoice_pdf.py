@@ -173,7 +173,7 @@ class InvoicePDFLogoTests(TestCase):
 
         # Mock pisa.CreatePDF to avoid actual PDF generation in tests
         # but verify it's called with HTML containing logo
-        with patch("billing_management.views.pisa.CreatePDF") as mock_create_pdf:
+        with patch("xhtml2pdf.pisa.CreatePDF") as mock_create_pdf:
             # Configure mock to simulate successful PDF generation
             mock_status = MagicMock()
             mock_status.err = 0
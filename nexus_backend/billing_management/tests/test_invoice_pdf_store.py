@@ -0,0 +1,90 @@
+"""
+Tests for pre-rendered invoice PDFs (billing_management.services.invoice_pdf)
+
+- The PDF is rendered once and stored under its content hash
+- A changed invoice (or template version) renders again
+- Downloads carry the content hash as ETag and answer 304 on a match
+"""
+
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from django.test import RequestFactory
+
+from billing_management.services import invoice_pdf
+from main.factories import UserFactory
+from main.models import Invoice
+
+
+def _fake_create_pdf(src, dest, **kwargs):
+    dest.write(b"%PDF-1.4 " + str(len(src)).encode())
+    return SimpleNamespace(err=0, log="")
+
+
+@pytest.fixture
+def pisa_calls():
+    # PDF libraries are imported where they are used (lazy imports).
+    with patch("xhtml2pdf.pisa.CreatePDF", side_effect=_fake_create_pdf) as mocked:
+        yield mocked
+
+
+@pytest.fixture
+def invoice(db, settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return Invoice.objects.create(
+        number="2026-IND-000042",
+        user=UserFactory(),
+        status=Invoice.Status.ISSUED,
+        subtotal=Decimal("100.00"),
+        tax_total=Decimal("16.00"),
+        grand_total=Decimal("116.00"),
+    )
+
+
+def test_pdf_is_rendered_once_and_stored_by_content_hash(invoice, pisa_calls):
+    first = invoice_pdf.ensure_pdf(invoice)
+    again = invoice_pdf.ensure_pdf(Invoice.objects.get(pk=invoice.pk))
+
+    assert first.startswith(b"%PDF")
+    assert again is None
+    assert pisa_calls.call_count == 1
+    invoice.refresh_from_db()
+    assert invoice.pdf_file.name == f"invoices/pdf/{invoice.pdf_sha256}.pdf"
+    with invoice.pdf_file.open("rb") as fh:
+        assert fh.read() == first
+
+
+def test_invoice_or_template_change_renders_again(invoice, pisa_calls):
+    invoice_pdf.ensure_pdf(invoice)
+
+    invoice.status = Invoice.Status.PAID
+    invoice.save(update_fields=["status"])
+    assert invoice_pdf.ensure_pdf(invoice) is not None
+
+    with patch.object(invoice_pdf, "RENDER_VERSION", "2"):
+        invoice_pdf.template_version.cache_clear()
+        try:
+            assert invoice_pdf.ensure_pdf(invoice) is not None
+        finally:
+            invoice_pdf.template_version.cache_clear()
+    assert pisa_calls.call_count == 3
+
+
+def test_download_uses_content_hash_etag(invoice, pisa_calls):
+    factory = RequestFactory()
+
+    resp = invoice_pdf.pdf_response(factory.get("/"), invoice, "inv.pdf")
+    etag = resp["ETag"]
+    cached = invoice_pdf.pdf_response(
+        factory.get("/", HTTP_IF_NONE_MATCH=etag), invoice, "inv.pdf"
+    )
+
+    assert resp.status_code == 200
+    assert resp["Content-Type"] == "application/pdf"
+    assert etag == f'"{invoice.pdf_sha256}"'
+    assert "private" in resp["Cache-Control"]
+    assert cached.status_code == 304
+    assert pisa_calls.call_count == 1
@@ -53,4 +53,16 @@ urlpatterns = [
         views.consolidated_invoice_pdf,
         name="consolidated_invoice_pdf",
     ),
+    # Bulk invoice PDF packs (ZIP)
+    path("invoices/export/", views.invoice_export_create, name="invoice_export_create"),
+    path(
+        "invoices/export/<int:export_id>/",
+        views.invoice_export_status,
+        name="invoice_export_status",
+    ),
+    path(
+        "invoices/export/<int:export_id>/download/",
+        views.invoice_export_download,
+        name="invoice_export_download",
+    ),
 ]
@@ -6,63 +6,46 @@ from decimal import Decimal
 from io import BytesIO
 from urllib.parse import unquote
 
-from openpyxl.utils import get_column_letter
-from openpyxl.workbook import Workbook
-from xhtml2pdf import pisa
-
-from django.conf import settings as django_settings
 from django.contrib.auth.decorators import login_required
-from django.contrib.staticfiles import finders
 from django.db import models
 from django.db.models import Q
-from django.http import Http404, HttpResponse, JsonResponse
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseRedirect,
+    JsonResponse,
+)
 from django.shortcuts import get_object_or_404, render
 from django.template.loader import render_to_string
+from django.urls import reverse
 from django.utils import timezone
 from django.views.decorators.http import require_GET, require_POST
 
 from billing_management.billing_helpers import _decode_cursor, _encode_cursor
+from billing_management.services.fx_conversion import (
+    FxWindow,
+    convert_column,
+    sum_converted,
+)
+from billing_management.services import invoice_pdf
 from billing_management.services.invoice_grouping import group_invoice_lines_by_order
 from main.models import (
     AccountEntry,
-    CompanySettings,
     ConsolidatedInvoice,
     FxRate,
     Invoice,
+    InvoiceExport,
     Order,
     User,
 )
+from main.services import config_cache
+from main.services.pdf_assets import company_asset, resolve_uri
 from main.services.region_resolver import resolve_region_from_coords
+from nexus_backend.db_router import reporting_db
 from user.permissions import require_staff_role
 
 
-def resolve_uri(uri, rel=None):
-    """Convert HTML URIs (media/static) to absolute system paths for xhtml2pdf."""
-    # If it's already an absolute file path, return as is
-    if uri.startswith("file://"):
-        return uri.replace("file://", "")
-    # Media
-    media_url = getattr(django_settings, "MEDIA_URL", "/media/")
-    media_root = getattr(django_settings, "MEDIA_ROOT", "")
-    if media_url and uri.startswith(media_url):
-        path = os.path.join(media_root, uri.replace(media_url, ""))
-        return path
-    # Static
-    static_url = getattr(django_settings, "STATIC_URL", "/static/")
-    static_root = getattr(django_settings, "STATIC_ROOT", "")
-    if static_url and uri.startswith(static_url):
-        # Prefer STATIC_ROOT, fallback to finders
-        if static_root:
-            path = os.path.join(static_root, uri.replace(static_url, ""))
-            if os.path.exists(path):
-                return path
-        found = finders.find(uri.replace(static_url, ""))
-        if found:
-            return found
-    # Absolute URL (http/https) — xhtml2pdf may not fetch; return as-is
-    return uri
-
-
 def _money_format(val):
     try:
         return f"${Decimal(val or 0).quantize(Decimal('0.01')):,.2f}"
@@ -202,16 +185,9 @@ def _build_invoice_context(inv, cs):
     address = ", ".join(
         filter(None, [cs.street_address, cs.city, cs.province, cs.country])
     )
-    logo_url = None
-    try:
-        if getattr(cs, "logo", None) and hasattr(cs.logo, "url") and cs.logo.url:
-            # Only include logo if it resolves to a local file path that exists (xhtml2pdf limitation)
-            candidate = cs.logo.url
-            resolved = resolve_uri(candidate)
-            if resolved and os.path.exists(resolved):
-                logo_url = candidate
-    except Exception:
-        logo_url = None
+    # Local, print-sized copies (xhtml2pdf can't fetch from private storage)
+    logo = company_asset(cs, "logo")
+    logo_url = getattr(logo, "url", None)
 
     company = {
         "legal_name": cs.legal_name or cs.trade_name,
@@ -253,8 +229,8 @@ def _build_invoice_context(inv, cs):
         # Branding & Signature
         "signatory_name": getattr(cs, "signatory_name", ""),
         "signatory_title": getattr(cs, "signatory_title", ""),
-        "stamp": getattr(cs, "stamp", None),
-        "signature": getattr(cs, "signature", None),
+        "stamp": company_asset(cs, "stamp"),
+        "signature": company_asset(cs, "signature"),
         # Compliance & Legal
         "tax_office_name": getattr(cs, "tax_office_name", ""),
         "legal_notes": getattr(cs, "legal_notes", ""),
@@ -396,15 +372,9 @@ def _build_consolidated_context(cons, cs):
     address = ", ".join(
         filter(None, [cs.street_address, cs.city, cs.province, cs.country])
     )
-    logo_url = None
-    try:
-        if getattr(cs, "logo", None) and hasattr(cs.logo, "url") and cs.logo.url:
-            candidate = cs.logo.url
-            resolved = resolve_uri(candidate)
-            if resolved and os.path.exists(resolved):
-                logo_url = candidate
-    except Exception:
-        logo_url = None
+    # Local, print-sized copies (xhtml2pdf can't fetch from private storage)
+    logo = company_asset(cs, "logo")
+    logo_url = getattr(logo, "url", None)
 
     company = {
         "legal_name": cs.legal_name or cs.trade_name,
@@ -446,8 +416,8 @@ def _build_consolidated_context(cons, cs):
         # Branding & Signature
         "signatory_name": getattr(cs, "signatory_name", ""),
         "signatory_title": getattr(cs, "signatory_title", ""),
-        "stamp": getattr(cs, "stamp", None),
-        "signature": getattr(cs, "signature", None),
+        "stamp": company_asset(cs, "stamp"),
+        "signature": company_asset(cs, "signature"),
         # Compliance & Legal
         "tax_office_name": getattr(cs, "tax_office_name", ""),
         "legal_notes": getattr(cs, "legal_notes", ""),
@@ -944,7 +914,7 @@ def _find_invoice_by_identifier(invoice_id: str) -> Invoice:
 @login_required
 def invoice_json_by_number(request, invoice_id: str):
     inv = _find_invoice_by_identifier(invoice_id)
-    cs = CompanySettings.get()
+    cs = config_cache.company_settings()
 
     # Prefer stored separated amounts when present; otherwise compute from linked orders
     subtotal = Decimal(inv.subtotal or 0)
@@ -1126,35 +1096,13 @@ def invoice_json_by_number(request, invoice_id: str):
 @login_required
 def invoice_pdf_by_number(request, invoice_id: str):
     inv = _find_invoice_by_identifier(invoice_id)
-    cs = CompanySettings.get()
-
-    context = _build_invoice_context(inv, cs)
-
-    html = render_to_string(
-        "invoices/inv_templates.html", context=context, request=request
-    )
-
-    filename = f"{inv.number or 'invoice'}.pdf"
-    resp = HttpResponse(content_type="application/pdf")
-    resp["Content-Disposition"] = f'inline; filename="{filename}"'
-
-    # Ensure logo absolute URL if relative
-    # With xhtml2pdf, keep media/static URLs relative so resolve_uri can map them
-    buf = BytesIO()
-    pisa_status = pisa.CreatePDF(
-        src=html, dest=buf, link_callback=resolve_uri, encoding="utf-8"
-    )
-    if getattr(pisa_status, "err", 0):
-        log_txt = getattr(pisa_status, "log", None)
+    try:
+        return invoice_pdf.pdf_response(request, inv, f"{inv.number or 'invoice'}.pdf")
+    except invoice_pdf.InvoicePdfError as exc:
         msg = "PDF generation failed for invoice. Please check the template/CSS."
-        if log_txt:
-            try:
-                msg += "\n\n" + str(log_txt)
-            except Exception:
-                pass
+        if exc.log:
+            msg += "\n\n" + exc.log
         return HttpResponse(msg, status=500, content_type="text/plain")
-    resp.write(buf.getvalue())
-    return resp
 
 
 @login_required
@@ -1169,33 +1117,132 @@ def consolidated_invoice_pdf(request, consolidated_number: str):
         ),
         number=number,
     )
-    cs = CompanySettings.get()
+    try:
+        return invoice_pdf.pdf_response(
+            request, cons, f"{cons.number or 'consolidated'}.pdf"
+        )
+    except invoice_pdf.InvoicePdfError as exc:
+        msg = "PDF generation failed for consolidated invoice. Please check the template/CSS."
+        if exc.log:
+            msg += "\n\n" + exc.log
+        return HttpResponse(msg, status=500, content_type="text/plain")
+
+
+# ---------- BULK INVOICE EXPORT ----------
+
+
+def _export_payload(export: InvoiceExport) -> dict:
+    data = {
+        "id": export.pk,
+        "status": export.status,
+        "period_start": str(export.period_start),
+        "period_end": str(export.period_end),
+        "filters": export.filters,
+        "total": export.total,
+        "processed": export.processed,
+        "reused": export.reused,
+        "rendered": export.rendered,
+        "failed": export.failed,
+        "progress": export.progress,
+        "error": export.error,
+        "created_at": export.created_at.isoformat() if export.created_at else None,
+        "finished_at": export.finished_at.isoformat() if export.finished_at else None,
+        "download_url": None,
+    }
+    if export.status == InvoiceExport.Status.DONE and export.archive:
+        data["download_url"] = reverse("invoice_export_download", args=[export.pk])
+    return data
 
-    context = _build_consolidated_context(cons, cs)
 
-    html = render_to_string(
-        "invoices/consolidated_inv_templates.html", context=context, request=request
+@login_required
+@require_staff_role(["admin", "manager", "finance"])
+@require_POST
+def invoice_export_create(request):
+    """
+    Start a bulk export of invoice PDFs.
+    POST from=YYYY-MM-DD&to=YYYY-MM-DD[&status=paid][&user_id=12]
+    """
+    date_from = _parse_iso_date((request.POST.get("from") or "").strip())
+    date_to = _parse_iso_date((request.POST.get("to") or "").strip())
+    if not date_from or not date_to or date_from > date_to:
+        return JsonResponse(
+            {"success": False, "message": "Invalid or missing period"}, status=400
+        )
+    filters = {}
+    status = (request.POST.get("status") or "").strip()
+    if status:
+        if status not in Invoice.Status.values:
+            return JsonResponse(
+                {"success": False, "message": "Invalid status"}, status=400
+            )
+        filters["status"] = status
+    user_id = (request.POST.get("user_id") or "").strip()
+    if user_id:
+        if not user_id.isdigit():
+            return JsonResponse(
+                {"success": False, "message": "Invalid user_id"}, status=400
+            )
+        filters["user_id"] = int(user_id)
+
+    export = InvoiceExport.objects.create(
+        requested_by=request.user,
+        period_start=date_from,
+        period_end=date_to,
+        filters=filters,
     )
+    from billing_management.tasks import export_invoices
 
-    filename = f"{cons.number or 'consolidated'}.pdf"
-    resp = HttpResponse(content_type="application/pdf")
-    resp["Content-Disposition"] = f'inline; filename="{filename}"'
+    try:
+        export_invoices.delay(export.pk)
+    except Exception:
+        export.status = InvoiceExport.Status.FAILED
+        export.error = "Export queue unavailable, please retry later."
+        export.save(update_fields=["status", "error"])
+        return JsonResponse(
+            {
+                "success": False,
+                "message": export.error,
+                "export": _export_payload(export),
+            },
+            status=503,
+        )
+    return JsonResponse(
+        {"success": True, "export": _export_payload(export)}, status=202
+    )
 
-    buf = BytesIO()
-    pisa_status = pisa.CreatePDF(
-        src=html, dest=buf, link_callback=resolve_uri, encoding="utf-8"
+
+@login_required
+@require_staff_role(["admin", "manager", "finance"])
+@require_GET
+def invoice_export_status(request, export_id: int):
+    export = get_object_or_404(InvoiceExport, pk=export_id)
+    return JsonResponse({"success": True, "export": _export_payload(export)})
+
+
+@login_required
+@require_staff_role(["admin", "manager", "finance"])
+@require_GET
+def invoice_export_download(request, export_id: int):
+    export = get_object_or_404(
+        InvoiceExport, pk=export_id, status=InvoiceExport.Status.DONE
+    )
+    if not export.archive:
+        raise Http404("Export archive not found")
+    storage = export.archive.storage
+    filename = os.path.basename(export.archive.name)
+    if getattr(storage, "querystring_auth", False):
+        return HttpResponseRedirect(
+            storage.url(
+                export.archive.name,
+                parameters={
+                    "ResponseContentDisposition": f'attachment; filename="{filename}"'
+                },
+                expire=invoice_pdf.SIGNED_URL_SECONDS,
+            )
+        )
+    return FileResponse(
+        export.archive.open("rb"), as_attachment=True, filename=filename
     )
-    if getattr(pisa_status, "err", 0):
-        log_txt = getattr(pisa_status, "log", None)
-        msg = "PDF generation failed for consolidated invoice. Please check the template/CSS."
-        if log_txt:
-            try:
-                msg += "\n\n" + str(log_txt)
-            except Exception:
-                pass
-        return HttpResponse(msg, status=500, content_type="text/plain")
-    resp.write(buf.getvalue())
-    return resp
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -1236,6 +1283,7 @@ def _parse_iso_date(s: str):
 
 
 @login_required
+@reporting_db
 def ledger_export(request):
     # Params
     user_id = (request.GET.get("user_id") or "").strip()
@@ -1311,26 +1359,16 @@ def ledger_export(request):
         else:
             return Decimal("0.00"), -amt
 
+    amounts = []
+    row_dates = []
     for e in entries.iterator():
         amt = Decimal(e.amount_usd or 0)
         debit, credit = _debit_credit(amt)
         run_usd += amt
-        # CDF per-row
-        cdf_amt = None
-        cdf_run = None
-        if include_cdf:
-            try:
-                rate = FxRate.get_rate(e.created_at.date(), pair="USD/CDF")
-                if rate:
-                    cdf_amt = (amt * Decimal(rate)).quantize(Decimal("0.01"))
-                    cdf_run = (run_usd * Decimal(rate)).quantize(Decimal("0.01"))
-            except Exception:
-                cdf_amt = None
-                cdf_run = None
         total_debit += debit
         total_credit += credit
-        if cdf_amt is not None:
-            total_cdf += cdf_amt
+        amounts.append(amt)
+        row_dates.append(e.created_at.date())
         rows.append(
             {
                 "date": e.created_at.strftime("%Y-%m-%d"),
@@ -1339,14 +1377,31 @@ def ledger_export(request):
                 "debit_usd": debit,
                 "credit_usd": credit,
                 "balance_usd": run_usd,
-                "amount_cdf": cdf_amt,
-                "balance_cdf": cdf_run,
+                "amount_cdf": None,
+                "balance_cdf": None,
                 "order_ref": getattr(e.order, "order_reference", "") or "",
                 "subscription_id": e.subscription_id,
                 "payment_id": e.payment_id,
             }
         )
 
+    # CDF columns: one FX load for the window, one date→rate pass, then per column
+    if include_cdf and rows:
+        try:
+            fx = FxWindow.load(date_from or min(row_dates), date_to or max(row_dates))
+            rates = fx.rates_for(row_dates)
+            for row, cdf_amt, cdf_run in zip(
+                rows,
+                convert_column(amounts, rates),
+                convert_column([r["balance_usd"] for r in rows], rates),
+            ):
+                row["amount_cdf"] = cdf_amt
+                row["balance_cdf"] = cdf_run
+                if cdf_amt is not None:
+                    total_cdf += cdf_amt
+        except Exception:
+            total_cdf = Decimal("0.00")
+
     # Dispatch by format
     if fmt == "pdf":
         return _ledger_pdf_response(
@@ -1377,6 +1432,9 @@ def _ledger_xlsx_response(
     total_credit,
     total_cdf,
 ):
+    from openpyxl.utils import get_column_letter
+    from openpyxl.workbook import Workbook
+
     wb = Workbook()
     ws = wb.active
     ws.title = "Ledger"
@@ -1478,7 +1536,9 @@ def _ledger_xlsx_response(
 
 
 def _ledger_pdf_response(uid, date_from, date_to, rows, opening_balance, include_cdf):
-    cs = CompanySettings.get()
+    from xhtml2pdf import pisa
+
+    cs = config_cache.company_settings()
     context = {
         "company": cs,
         "filters": {
@@ -1507,6 +1567,7 @@ def _ledger_pdf_response(uid, date_from, date_to, rows, opening_balance, include
 
 
 @login_required
+@reporting_db
 def ledger_statement(request):
     # Params
     user_id = (request.GET.get("user_id") or "").strip()
@@ -1708,7 +1769,9 @@ def ledger_statement(request):
 def _statement_pdf_response(
     uid, date_from, date_to, opening, total_debit, total_credit, closing, aging, cdf
 ):
-    cs = CompanySettings.get()
+    from xhtml2pdf import pisa
+
+    cs = config_cache.company_settings()
     context = {
         "company": cs,
         "filters": {
@@ -1744,6 +1807,9 @@ def _statement_pdf_response(
 def _statement_xlsx_response(
     uid, date_from, date_to, opening, total_debit, total_credit, closing, aging, cdf
 ):
+    from openpyxl.utils import get_column_letter
+    from openpyxl.workbook import Workbook
+
     wb = Workbook()
     ws = wb.active
     ws.title = "Statement"
@@ -1898,6 +1964,12 @@ def revenue_summary(request):
                 "net",
             ]
         }
+        # One FX load for the whole window; rows are converted in batches below
+        fx = FxWindow.load(date_from, date_to)
+        cdf_dates = []
+        cdf_cols = {
+            k: [] for k in ("subtotal", "vat", "excise", "tax_total", "grand_total")
+        }
 
     if perspective == "invoiced":
         inv_qs = (
@@ -1935,17 +2007,18 @@ def revenue_summary(request):
             totals_usd["tax_total"] += tax_total
             totals_usd["grand_total"] += grand_total
 
-            if include_cdf and inv.issued_at:
-                rate = FxRate.get_rate(inv.issued_at.date(), pair="USD/CDF")
-                if rate:
-                    r = Decimal(rate)
-                    totals_cdf["subtotal"] += (subtotal * r).quantize(Decimal("0.01"))
-                    totals_cdf["vat"] += (vat * r).quantize(Decimal("0.01"))
-                    totals_cdf["excise"] += (exc * r).quantize(Decimal("0.01"))
-                    totals_cdf["tax_total"] += (tax_total * r).quantize(Decimal("0.01"))
-                    totals_cdf["grand_total"] += (grand_total * r).quantize(
-                        Decimal("0.01")
-                    )
+            if include_cdf:
+                cdf_dates.append(inv.issued_at)
+                cdf_cols["subtotal"].append(subtotal)
+                cdf_cols["vat"].append(vat)
+                cdf_cols["excise"].append(exc)
+                cdf_cols["tax_total"].append(tax_total)
+                cdf_cols["grand_total"].append(grand_total)
+
+        if include_cdf:
+            rates = fx.rates_for(cdf_dates)
+            for k, col in cdf_cols.items():
+                totals_cdf[k] += sum_converted(col, rates)
 
         # For summary, net = grand_total - credits_adjustments (if provided separately); we compute credits separately below
         # Credits/Adjustments within window (deductions)
@@ -1956,6 +2029,7 @@ def revenue_summary(request):
         )
         if region_filter:
             entries = entries.filter(order__region__isnull=False)
+        cred_dates, cred_mags = [], []
         for e in entries.iterator():
             if region_filter and not _region_ok(getattr(e.order, "region", None)):
                 continue
@@ -1963,12 +2037,12 @@ def revenue_summary(request):
             totals_usd["credits_adjustments"] += (
                 -amt if amt < 0 else amt
             )  # store as positive deduction magnitude
-            if include_cdf:
-                rate = FxRate.get_rate(e.created_at.date(), pair="USD/CDF")
-                if rate:
-                    totals_cdf["credits_adjustments"] += (
-                        abs(amt) * Decimal(rate)
-                    ).quantize(Decimal("0.01"))
+            cred_dates.append(e.created_at)
+            cred_mags.append(abs(amt))
+        if include_cdf:
+            totals_cdf["credits_adjustments"] += sum_converted(
+                cred_mags, fx.rates_for(cred_dates)
+            )
 
         totals_usd["net"] = (
             totals_usd["grand_total"] - totals_usd["credits_adjustments"]
@@ -1984,35 +2058,37 @@ def revenue_summary(request):
             created_at__date__lte=date_to,
             entry_type="payment",
         )
+        pay_dates, pay_amounts = [], []
         for e in pay_qs.iterator():
             if region_filter and not _region_ok(getattr(e.order, "region", None)):
                 continue
             amt = Decimal(e.amount_usd or 0)
             totals_usd["collected"] += amt if amt > 0 else Decimal("0.00")
-            if include_cdf:
-                rate = FxRate.get_rate(e.created_at.date(), pair="USD/CDF")
-                if rate:
-                    totals_cdf["collected"] += (
-                        max(amt, Decimal("0.00")) * Decimal(rate)
-                    ).quantize(Decimal("0.01"))
+            pay_dates.append(e.created_at)
+            pay_amounts.append(max(amt, Decimal("0.00")))
+        if include_cdf:
+            totals_cdf["collected"] += sum_converted(
+                pay_amounts, fx.rates_for(pay_dates)
+            )
         # Credits/Adjustments in collected perspective shown as separate
         cred_qs = AccountEntry.objects.select_related("order__region").filter(
             created_at__date__gte=date_from,
             created_at__date__lte=date_to,
             entry_type__in=("credit_note", "adjustment"),
         )
+        cred_dates, cred_mags = [], []
         for e in cred_qs.iterator():
             if region_filter and not _region_ok(getattr(e.order, "region", None)):
                 continue
             amt = Decimal(e.amount_usd or 0)
             # positive magnitude for presentation
             totals_usd["credits_adjustments"] += -amt if amt < 0 else amt
-            if include_cdf:
-                rate = FxRate.get_rate(e.created_at.date(), pair="USD/CDF")
-                if rate:
-                    totals_cdf["credits_adjustments"] += (
-                        abs(amt) * Decimal(rate)
-                    ).quantize(Decimal("0.01"))
+            cred_dates.append(e.created_at)
+            cred_mags.append(abs(amt))
+        if include_cdf:
+            totals_cdf["credits_adjustments"] += sum_converted(
+                cred_mags, fx.rates_for(cred_dates)
+            )
 
     payload = {
         "success": True,
@@ -2036,6 +2112,7 @@ def revenue_summary(request):
 
 @login_required
 @require_staff_role(["admin", "manager", "finance"])
+@reporting_db
 def revenue_table(request):
     """
     Grouped revenue table.
@@ -2143,20 +2220,6 @@ def revenue_table(request):
                 },
                 "cdf": None,
             }
-            if include_cdf and d:
-                rate = FxRate.get_rate(d, pair="USD/CDF")
-                if rate:
-                    r = Decimal(rate)
-                    evt["cdf"] = {
-                        "subtotal": (subtotal * r).quantize(Decimal("0.01")),
-                        "vat": (vat * r).quantize(Decimal("0.01")),
-                        "excise": (exc * r).quantize(Decimal("0.01")),
-                        "tax_total": (tax_total * r).quantize(Decimal("0.01")),
-                        "grand_total": (grand_total * r).quantize(Decimal("0.01")),
-                        "credits_adjustments": Decimal("0.00"),
-                        "collected": Decimal("0.00"),
-                        "net": (grand_total * r).quantize(Decimal("0.01")),
-                    }
             events.append(evt)
 
         # Credits/Adjustments: attach as separate events (negative net) for grouping math
@@ -2189,20 +2252,6 @@ def revenue_table(request):
                 },
                 "cdf": None,
             }
-            if include_cdf and d:
-                rate = FxRate.get_rate(d, pair="USD/CDF")
-                if rate:
-                    r = Decimal(rate)
-                    evt["cdf"] = {
-                        "subtotal": Decimal("0.00"),
-                        "vat": Decimal("0.00"),
-                        "excise": Decimal("0.00"),
-                        "tax_total": Decimal("0.00"),
-                        "grand_total": Decimal("0.00"),
-                        "credits_adjustments": (mag * r).quantize(Decimal("0.01")),
-                        "collected": Decimal("0.00"),
-                        "net": (-(mag) * r).quantize(Decimal("0.01")),
-                    }
             events.append(evt)
 
     else:  # collected
@@ -2236,20 +2285,6 @@ def revenue_table(request):
                 },
                 "cdf": None,
             }
-            if include_cdf and d:
-                rate = FxRate.get_rate(d, pair="USD/CDF")
-                if rate:
-                    r = Decimal(rate)
-                    evt["cdf"] = {
-                        "subtotal": Decimal("0.00"),
-                        "vat": Decimal("0.00"),
-                        "excise": Decimal("0.00"),
-                        "tax_total": Decimal("0.00"),
-                        "grand_total": Decimal("0.00"),
-                        "credits_adjustments": Decimal("0.00"),
-                        "collected": (amt * r).quantize(Decimal("0.01")),
-                        "net": (amt * r).quantize(Decimal("0.01")),
-                    }
             events.append(evt)
         # Credits/Adjustments as separate negative events for collected perspective too
         cred_qs = (
@@ -2281,22 +2316,20 @@ def revenue_table(request):
                 },
                 "cdf": None,
             }
-            if include_cdf and d:
-                rate = FxRate.get_rate(d, pair="USD/CDF")
-                if rate:
-                    r = Decimal(rate)
-                    evt["cdf"] = {
-                        "subtotal": Decimal("0.00"),
-                        "vat": Decimal("0.00"),
-                        "excise": Decimal("0.00"),
-                        "tax_total": Decimal("0.00"),
-                        "grand_total": Decimal("0.00"),
-                        "credits_adjustments": (mag * r).quantize(Decimal("0.01")),
-                        "collected": Decimal("0.00"),
-                        "net": (-(mag) * r).quantize(Decimal("0.01")),
-                    }
             events.append(evt)
 
+    # CDF: map every event date to its rate in one pass, then convert per metric
+    if include_cdf and events:
+        fx = FxWindow.load(date_from, date_to)
+        rates = fx.rates_for([evt["date"] for evt in events])
+        converted = {
+            k: convert_column([evt["usd"][k] for evt in events], rates)
+            for k in events[0]["usd"]
+        }
+        for i, (evt, rate) in enumerate(zip(events, rates)):
+            if rate is not None:
+                evt["cdf"] = {k: col[i] for k, col in converted.items()}
+
     # Group
     from collections import defaultdict
 
@@ -6,14 +6,13 @@ from decimal import ROUND_HALF_UP, Decimal
 from typing import Any, Optional
 from zoneinfo import ZoneInfo
 
-from timezonefinder import TimezoneFinder
-
 from django.contrib.gis.geos import Point
 from django.db import connection, models, transaction
 from django.db.models import Sum
 from django.utils import timezone
 
 from billing_management.billing_helpers import quantize_money
+from client_app.services.utils.timezone_utils import timezone_finder
 from geo_regions.models import Region
 from main.models import (
     AccountEntry,
@@ -31,7 +30,15 @@ logger = logging.getLogger(__name__)
 
 ZERO = Decimal("0.00")
 
-tf = TimezoneFinder()
+tf = None  # TimezoneFinder, see _timezone_finder()
+
+
+def _timezone_finder():
+    """Built on first use rather than at import: every process imports this."""
+    global tf
+    if tf is None:
+        tf = timezone_finder()
+    return tf
 
 
 def _qmoney(x: Decimal) -> Decimal:
@@ -417,7 +424,7 @@ def compute_local_expiry_from_coords(lat: float, lng: float, hours: int = 1):
     now_utc = timezone.now()
 
     try:
-        tz_name = tf.timezone_at(lng=lng, lat=lat)
+        tz_name = _timezone_finder().timezone_at(lng=lng, lat=lat)
     except Exception:
         tz_name = None
 
@@ -1,14 +1,20 @@
 from datetime import timedelta
+from functools import lru_cache
 from zoneinfo import ZoneInfo
 
-from timezonefinder import TimezoneFinder
-
 from django.utils import timezone
 
 
+@lru_cache(maxsize=1)
+def timezone_finder():
+    """Shared TimezoneFinder, built on first use (it loads the zone polygons)."""
+    from timezonefinder import TimezoneFinder
+
+    return TimezoneFinder()
+
+
 def get_expiry_time(lat, lng):
-    tf = TimezoneFinder()
-    tz_name = tf.timezone_at(lng=lng, lat=lat)
+    tz_name = timezone_finder().timezone_at(lng=lng, lat=lat)
     if tz_name:
         tz = ZoneInfo(tz_name)
         return timezone.localtime(timezone.now(), tz) + timedelta(hours=1)
@@ -22,7 +22,7 @@ def test_get_expiry_time_returns_future_datetime_for_valid_coords(monkeypatch):
     fixed_now = timezone.now()
 
     monkeypatch.setattr(
-        "client_app.services.utils.timezone_utils.TimezoneFinder",
+        "client_app.services.utils.timezone_utils.timezone_finder",
         lambda: DummyTF(),
     )
     monkeypatch.setattr(
@@ -52,7 +52,7 @@ def test_get_expiry_time_falls_back_when_timezone_not_found(monkeypatch):
     fixed_now = timezone.now()
 
     monkeypatch.setattr(
-        "client_app.services.utils.timezone_utils.TimezoneFinder",
+        "client_app.services.utils.timezone_utils.timezone_finder",
         lambda: DummyTF(),
     )
     monkeypatch.setattr(
@@ -1,4 +1,3 @@
-import glob
 import json
 import logging
 import os
@@ -6,28 +5,11 @@ from datetime import date, datetime, timedelta
 from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
 from io import BytesIO
 from os import environ
-from types import SimpleNamespace
-
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
-from reportlab.lib.units import mm
-from reportlab.platypus import (
-    Flowable,
-    Image,
-    Paragraph,
-    SimpleDocTemplate,
-    Spacer,
-    Table,
-    TableStyle,
-)
 
-from django.conf import settings as django_settings
 from django.contrib import messages
 from django.contrib.auth import logout, update_session_auth_hash
 from django.contrib.auth.decorators import login_required
 from django.contrib.gis.geos import Point
-from django.contrib.staticfiles import finders
 from django.core.cache import cache
 from django.core.exceptions import FieldError, PermissionDenied, ValidationError
 from django.core.files.storage import default_storage
@@ -67,7 +49,6 @@ from main.models import (
     BillingAccount,
     CompanyDocument,
     CompanyKYC,
-    CompanySettings,
     CouponRedemption,
     DiscountType,
     ExtraCharge,
@@ -86,15 +67,15 @@ from main.models import (
     StockLocation,
     Subscription,
     SubscriptionPlan,
-    TaxRate,
     Ticket,
     User,
-    UserPreferences,
 )
+from main.services import config_cache, pdf_assets, preferences
 from main.utilities.pricing_helpers import (
     DraftLine,
     apply_promotions_and_coupon_to_draft_lines,
 )
+from main.utilities.query_budget import budget_items, query_budget
 from main.utilities.taxing import compute_totals_from_lines
 from user.auth import customer_nonstaff_required, require_full_login
 from user.erase_account_data import erase_user_personal_data
@@ -567,8 +548,8 @@ def settings(request):
     # Use the authenticated user directly (no re-lookup by username)
     user: User = request.user
 
-    # Ensure preferences exist so template can read request.user.prefs.notify_*
-    prefs, created = UserPreferences.objects.get_or_create(user=user)
+    # Cached per user; created with defaults on first read
+    prefs = preferences.for_user(user)
 
     # ---- PROFILE payload expected by template ----
     #   - first_name, last_name, email, phone
@@ -578,9 +559,7 @@ def settings(request):
         "last_name": user.last_name or "",
         "email": (user.email or "").lower(),
         "phone": user.phone or "",
-        "avatar_url": (
-            prefs.avatar.url if prefs.avatar else "/static/icons/account_avatar.png"
-        ),
+        "avatar_url": user.avatar_url,
     }
 
     # ---- KYC (your helpers already return exactly what the template needs) ----
@@ -602,8 +581,7 @@ def settings(request):
     ctx = {
         # Profile panel
         "profile": profile,
-        # Notifications panel reads from request.user.prefs.* directly,
-        # but we also expose them in ctx if you ever want to render elsewhere.
+        # Notifications panel
         "notify_updates": prefs.notify_updates,
         "notify_billing": prefs.notify_billing,
         "notify_tickets": prefs.notify_tickets,
@@ -1680,11 +1658,7 @@ def _get_rate_pct(code: str) -> Decimal:
     Fetch a tax rate percentage (e.g., 16.00) from TaxRate.description.
     Returns Decimal('0.00') if not found.
     """
-    val = (
-        TaxRate.objects.filter(description=code)
-        .values_list("percentage", flat=True)
-        .first()
-    )
+    val = config_cache.tax_percentage(code)
     try:
         return (
             Decimal(val).quantize(Decimal("0.00"))
@@ -1872,6 +1846,9 @@ def release_reservation(
 # -------------------------------------------------------------------
 # The modified submit_order view
 # -------------------------------------------------------------------
+# One order (lines, taxes, invoice, reservation) per block: the total is
+# checked per block (budget_items), repeated shapes are expected.
+@query_budget(60, per_item=40, max_repeats=None)
 def submit_order(request: HttpRequest):
     """
     Public order submit:
@@ -1980,6 +1957,7 @@ def submit_order(request: HttpRequest):
     payment_method = _get_any("payment_method", default="cash") or "cash"
 
     n = max(len(lat_list), len(lng_list), len(kit_list), len(plan_list), 1)
+    budget_items(n)
     created_payloads = []
 
     CYCLE_MAP = {
@@ -1997,7 +1975,7 @@ def submit_order(request: HttpRequest):
         # Imports are assumed existing in your codebase
         # from .models import CompanySettings, Invoice, InvoiceLine, InvoiceOrder, OrderLine
         # from .billing import issue_invoice
-        cs = CompanySettings.get()
+        cs = config_cache.company_settings()
         # NOTE: If Invoice.user is non-nullable, ensure `order.user` exists; otherwise make field nullable or adapt assignment.
         inv = Invoice.objects.create(
             user=order.user,  # may be None if your model allows; else ensure authenticated user
@@ -2561,6 +2539,19 @@ def submit_order(request: HttpRequest):
 @require_full_login
 @customer_nonstaff_required
 def get_order_details_print(request, reference):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.lib.units import mm
+    from reportlab.platypus import (
+        Flowable,
+        Paragraph,
+        SimpleDocTemplate,
+        Spacer,
+        Table,
+        TableStyle,
+    )
+
     print("TEST INVOICE PDF")
     print(reference)
     """
@@ -2798,11 +2789,9 @@ def get_order_details_print(request, reference):
 
     # Header — LEFT ONLY
     left_block = []
-    logo_path = os.path.join(
-        django_settings.BASE_DIR, "static", "images", "logo", "logo.png"
-    )
-    if os.path.exists(logo_path):
-        left_block.append(Image(logo_path, width=42 * mm, height=12 * mm))
+    logo = pdf_assets.logo_image(width=42 * mm, height=12 * mm)
+    if logo is not None:
+        left_block.append(logo)
     else:
         left_block.append(Paragraph("<b>NEXUS TELECOMS SA</b>", styles["H_BIG"]))
     left_block.append(Spacer(1, 2))
@@ -3904,6 +3893,7 @@ def cancel_order(request, order_ref):
 # ---- view -----------------------------------------------------------------
 
 
+@query_budget(12)
 def billing_history(request):
     """
     Grouped billing history for the logged-in user.
@@ -4104,9 +4094,10 @@ def billing_history(request):
     balance = Decimal("0.00")
     credit = Decimal("0.00")
     if acct:
-        unpaid_due = acct.due_usd
+        # due/credit are derived from the balance: one ledger aggregate
         balance = acct.balance_usd
-        credit = acct.credit_usd
+        unpaid_due = balance if balance > 0 else Decimal("0.00")
+        credit = abs(balance) if balance < 0 else Decimal("0.00")
 
     unpaid_due_f = _to_float(unpaid_due)
     balance_f = _to_float(balance)
@@ -4121,11 +4112,6 @@ def billing_history(request):
 
     # Paid this month (successful payments only)
     paid_this_month = 0.0
-    now = timezone.localtime()
-    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    month_attempts = PaymentAttempt.objects.filter(
-        order__user=user, created_at__gte=month_start
-    ).only("status", "amount")
     now_local = timezone.localtime()
     month_start = now_local.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
     month_attempts = PaymentAttempt.objects.filter(
@@ -4487,6 +4473,18 @@ def report_invoice_pdf(request, order_id: int):
     and redirects to the unified invoice-by-number PDF under /billing/invoice/<id>/pdf/.
     If no Invoice exists yet, it falls back to legacy rendering below.
     """
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.lib.units import mm
+    from reportlab.platypus import (
+        Flowable,
+        Paragraph,
+        SimpleDocTemplate,
+        Spacer,
+        Table,
+        TableStyle,
+    )
 
     # Try to resolve an Invoice first and redirect to the new invoice-centric route
     try:
@@ -4751,36 +4749,11 @@ def report_invoice_pdf(request, order_id: int):
     elems.append(band)
     elems.append(Spacer(1, 10))
 
-    # ----- Resolve logo path safely (no reliance on "settings" name) ----------
-    LOGO_STATIC_PATH = "images/logo/logo.png"
-    logo_path = None
-
-    # 1) Try staticfiles finder (works with DEBUG and collectstatic)
-    try:
-        logo_path = finders.find(LOGO_STATIC_PATH)
-    except Exception:
-        logo_path = None
-
-    # 2) Try common filesystem fallbacks
-    if not logo_path and getattr(django_settings, "BASE_DIR", None):
-        p = os.path.join(django_settings.BASE_DIR, "static", LOGO_STATIC_PATH)
-        if os.path.exists(p):
-            logo_path = p
-    if not logo_path and getattr(django_settings, "STATIC_ROOT", None):
-        p = os.path.join(django_settings.STATIC_ROOT, LOGO_STATIC_PATH)
-        if os.path.exists(p):
-            logo_path = p
-    if not logo_path:
-        for d in getattr(django_settings, "STATICFILES_DIRS", []):
-            p = os.path.join(d, LOGO_STATIC_PATH)
-            if os.path.exists(p):
-                logo_path = p
-                break
-
     # Header — LEFT ONLY
     left_block = []
-    if logo_path and os.path.exists(logo_path):
-        left_block.append(Image(logo_path, width=42 * mm, height=12 * mm))
+    logo = pdf_assets.logo_image(width=42 * mm, height=12 * mm)
+    if logo is not None:
+        left_block.append(logo)
     else:
         left_block.append(Paragraph("<b>NEXUS TELECOMS SA</b>", styles["H_BIG"]))
     left_block.append(Spacer(1, 2))
@@ -4939,6 +4912,19 @@ def additional_billing_invoice_pdf(request, billing_id: int):
     """
     Generate a PDF invoice for additional equipment billing (post site-survey).
     """
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.lib.units import mm
+    from reportlab.platypus import (
+        Flowable,
+        Paragraph,
+        SimpleDocTemplate,
+        Spacer,
+        Table,
+        TableStyle,
+    )
+
     from site_survey.models import AdditionalBilling
 
     billing = get_object_or_404(
@@ -5324,73 +5310,6 @@ def additional_billing_invoice_pdf(request, billing_id: int):
 # ---------- tiny helpers ----------
 
 
-def _media_subdir(*parts) -> str:
-    """Ensure a subdir exists under MEDIA_ROOT and return its path."""
-    base = django_settings.MEDIA_ROOT
-    path = os.path.join(base, *parts)
-    os.makedirs(path, exist_ok=True)
-    return path
-
-
-def _avatar_disk_pattern(user: User) -> str:
-    return os.path.join(_media_subdir("avatars"), f"user_{user.pk}.*")
-
-
-def _avatar_disk_path(user: User, ext: str) -> str:
-    ext = (ext or "").lower().strip(".")
-    if ext not in {"jpg", "jpeg", "png", "webp"}:
-        ext = "jpg"
-    return os.path.join(_media_subdir("avatars"), f"user_{user.pk}.{ext}")
-
-
-def _avatar_url(user: User) -> str | None:
-    matches = glob.glob(_avatar_disk_pattern(user))
-    if not matches:
-        return None
-    # pick the newest saved file
-    latest = max(matches, key=os.path.getmtime)
-    rel = os.path.relpath(latest, django_settings.MEDIA_ROOT).replace("\\", "/")
-    return django_settings.MEDIA_URL.rstrip("/") + "/" + rel
-
-
-def _avatar_delete(user: User) -> None:
-    for p in glob.glob(_avatar_disk_pattern(user)):
-        try:
-            os.remove(p)
-        except OSError:
-            pass
-
-
-def _prefs_file(user: User) -> str:
-    return os.path.join(_media_subdir("user_prefs"), f"{user.pk}.json")
-
-
-DEFAULT_PREFS = {
-    "notify_updates": False,
-    "notify_billing": True,
-    "notify_tickets": True,
-    "twofa_enabled": False,
-}
-
-
-def _prefs_load(user: User) -> dict:
-    try:
-        with open(_prefs_file(user), "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return {**DEFAULT_PREFS, **(data or {})}
-    except FileNotFoundError:
-        return DEFAULT_PREFS.copy()
-    except Exception:
-        return DEFAULT_PREFS.copy()
-
-
-def _prefs_save(user: User, prefs: dict) -> dict:
-    full = {**DEFAULT_PREFS, **(prefs or {})}
-    with open(_prefs_file(user), "w", encoding="utf-8") as f:
-        json.dump(full, f)
-    return full
-
-
 def _kyc_for(user: User):
     """Prefer CompanyKYC when present, otherwise PersonalKYC; else None."""
     try:
@@ -5421,15 +5340,12 @@ def settings_sidebar_page(request: HttpRequest) -> HttpResponse:
         "last_name": user.last_name or "",
         "email": user.email or "",
         "phone": getattr(user, "phone", "") or "",
-        "avatar_url": _avatar_url(user) or "/static/icons/account_avatar.png",
+        "avatar_url": user.avatar_url,
     }
 
-    # Attach runtime prefs object so template can do `request.user.prefs.*`
-    prefs_dict = _prefs_load(user)
-    user.prefs = SimpleNamespace(**prefs_dict)  # exposed to template via RequestContext
-
     ctx = {
         "profile": profile,
+        "prefs": preferences.for_user(user),
         "kyc": _kyc_for(user),
         # Optional rejection extra context if you use these names in template
         "kyc_rejection_reason": getattr(
@@ -5453,6 +5369,17 @@ def settings_profile_update(request: HttpRequest) -> JsonResponse:
     user = request.user
     data = request.POST
 
+    # Avatar first, so an unreadable image leaves the profile untouched.
+    # Resized variants go through the storage backend; their URLs are saved
+    # on the user (main.services.preferences).
+    try:
+        if request.FILES.get("avatar"):
+            preferences.set_avatar(user, request.FILES["avatar"])
+        elif (data.get("remove_avatar") or "0") == "1":
+            preferences.clear_avatar(user)
+    except preferences.InvalidAvatar as exc:
+        return JsonResponse({"success": False, "message": str(exc)}, status=400)
+
     # Names & contact
     user.first_name = (data.get("first_name") or "").strip()
     user.last_name = (data.get("last_name") or "").strip()
@@ -5467,35 +5394,6 @@ def settings_profile_update(request: HttpRequest) -> JsonResponse:
         user.email = new_email
     user.save(update_fields=["first_name", "last_name", "phone", "email"])
 
-    # Ensure prefs exists
-    prefs, created = UserPreferences.objects.get_or_create(user=user)
-
-    # Avatar handling via ImageField storage
-    remove_avatar = (data.get("remove_avatar") or "0") == "1"
-    if remove_avatar and prefs.avatar:
-        prefs.avatar.delete(save=False)
-        prefs.avatar = None
-
-    f = request.FILES.get("avatar")
-    if f:
-        # Name file predictably (storage will place it under MEDIA_ROOT/avatars/)
-        ts = timezone.now().strftime("%Y%m%d_%H%M%S")
-        base, ext = (f.name.rsplit(".", 1) + [""])[:2]
-        filename = (
-            f"avatars/user_{user.pk}_{ts}.{ext.lower()}"
-            if ext
-            else f"avatars/user_{user.pk}_{ts}"
-        )
-        prefs.avatar.save(filename, f, save=False)
-
-    if remove_avatar or f:
-        prefs.save(update_fields=["avatar"])
-
-    # Build avatar URL (fallback to your static default)
-    avatar_url = (
-        prefs.avatar.url if prefs.avatar else "/static/icons/account_avatar.png"
-    )
-
     return JsonResponse(
         {
             "success": True,
@@ -5505,7 +5403,7 @@ def settings_profile_update(request: HttpRequest) -> JsonResponse:
                 "last_name": user.last_name,
                 "email": user.email,
                 "phone": user.phone,
-                "avatar_url": avatar_url,
+                "avatar_url": user.avatar_url,
             },
         }
     )
@@ -5545,13 +5443,12 @@ def settings_password_update(request: HttpRequest) -> JsonResponse:
 @login_required
 @require_POST
 def settings_notifications_update(request):
-    # DON'T use underscore for get_or_create's second return value
-    prefs, created = UserPreferences.objects.get_or_create(user=request.user)
-
-    prefs.notify_updates = "updates" in request.POST
-    prefs.notify_billing = "billing" in request.POST
-    prefs.notify_tickets = "tickets" in request.POST
-    prefs.save(update_fields=["notify_updates", "notify_billing", "notify_tickets"])
+    prefs = preferences.update(
+        request.user,
+        notify_updates="updates" in request.POST,
+        notify_billing="billing" in request.POST,
+        notify_tickets="tickets" in request.POST,
+    )
 
     return JsonResponse(
         {
@@ -5569,12 +5466,8 @@ def settings_notifications_update(request):
 @login_required
 @require_POST
 def settings_twofa_toggle(request: HttpRequest) -> JsonResponse:
-    user = request.user
-    prefs = _prefs_load(user)
-
     enabled = (request.POST.get("enabled") or "0") in {"1", "true", "True", "on"}
-    prefs["twofa_enabled"] = bool(enabled)
-    _prefs_save(user, prefs)
+    preferences.update(request.user, twofa_enabled=enabled)
 
     return JsonResponse(
         {
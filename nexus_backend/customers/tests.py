@@ -103,7 +103,7 @@ class CustomerActionsTestCase(TestCase):
         data = {"customer_id": self.customer.id_user}
 
         # Mock email sending to avoid actual emails in tests
-        with patch("customers.views.send_mail") as mock_send_mail:
+        with patch("customers.views.queue_email") as mock_send_mail:
             response = self.client.post(url, data, content_type="application/json")
             self.assertEqual(response.status_code, 200)
 
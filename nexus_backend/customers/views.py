@@ -1,14 +1,14 @@
 import json
 
 from django.contrib.auth.decorators import login_required
-from django.core.mail import send_mail
 from django.core.paginator import Paginator
-from django.db.models import Q
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, render
 from django.template.loader import render_to_string
 
 from main.models import User
+from main.services.outbox import queue_email
+from main.services.search import CUSTOMER_FIELDS, CUSTOMER_PHONE_FIELDS, apply_search
 from user.permissions import require_staff_role
 
 # Create your views here.
@@ -33,16 +33,18 @@ def get_customers(request):
     # Filter only non-staff users
     customers_qs = User.objects.filter(is_staff=False)
 
-    # Apply search
+    # Order by newest registered first; best matches first when searching
+    customers_qs = customers_qs.order_by("-date_joined")
     if search_query:
-        customers_qs = customers_qs.filter(
-            Q(full_name__icontains=search_query)
-            | Q(email__icontains=search_query)
-            | Q(phone__icontains=search_query)
+        customers_qs = apply_search(
+            customers_qs,
+            search_query,
+            CUSTOMER_FIELDS,
+            phone_fields=CUSTOMER_PHONE_FIELDS,
+            rank=True,
         )
-
-    # Order by newest registered first
-    customers_qs = customers_qs.order_by("-date_joined")
+        if "search_rank" in customers_qs.query.annotations:
+            customers_qs = customers_qs.order_by("-search_rank", "-date_joined")
 
     # Pagination
     paginator = Paginator(customers_qs, 10)  # 10 customers per page
@@ -262,12 +264,12 @@ def reset_customer_password(request):
                 "site_url": "https://nexustelecoms.com",  # Update with your actual domain
             }
             message = render_to_string("emails/password_reset.txt", context)
-            send_mail(
+            queue_email(
                 subject,
                 message,
-                None,  # Use DEFAULT_FROM_EMAIL from settings
                 [customer.email],
-                fail_silently=False,
+                category="password_reset",
+                sensitive=True,
             )
         except Exception as email_error:
             # Log the error but don't fail the password reset
@@ -3,9 +3,6 @@ from datetime import datetime
 from decimal import ROUND_HALF_UP, Decimal
 from io import BytesIO
 
-from openpyxl.utils import get_column_letter
-from openpyxl.workbook import Workbook
-
 from django.contrib.auth.decorators import login_required
 from django.db.models import Count, Q, Sum
 from django.db.models.functions import ExtractMonth
@@ -26,6 +23,8 @@ from main.models import (
     User,
     WalletTransaction,
 )
+from main.services.search import CUSTOMER_FIELDS, CUSTOMER_PHONE_FIELDS, apply_search
+from nexus_backend.db_router import reporting_db
 from user.permissions import require_staff_role
 
 
@@ -39,6 +38,7 @@ def dashboard_bi(request):
 
 @login_required(login_url="login_page")
 @require_staff_role(["admin", "manager", "finance"])
+@reporting_db
 def kpis_monthly(request):
     """
     Return JSON with:
@@ -119,6 +119,7 @@ def kpis_monthly(request):
 
 @login_required(login_url="login_page")
 @require_staff_role(["admin", "manager", "finance"])
+@reporting_db
 def kpis_annual(request):
     """
     Return current-year monthly revenue and subscription counts (new subs started).
@@ -204,6 +205,9 @@ def _xlsx_http_response(filename: str, headers: list[str], rows_iterable):
     - headers: list of column titles
     - rows_iterable: iterable of lists/tuples (each is a row)
     """
+    from openpyxl.utils import get_column_letter
+    from openpyxl.workbook import Workbook
+
     wb = Workbook()
     ws = wb.active
     ws.title = "Report"
@@ -246,6 +250,7 @@ def _xlsx_http_response(filename: str, headers: list[str], rows_iterable):
 
 @login_required(login_url="login_page")
 @require_staff_role(["admin", "manager", "finance"])
+@reporting_db
 def export_customers_csv(request):  # endpoint name preserved
     q = (request.GET.get("q") or "").strip()
     status = (request.GET.get("status") or "").strip()  # Optional: Active/Inactive
@@ -256,9 +261,7 @@ def export_customers_csv(request):  # endpoint name preserved
         .only("id_user", "full_name", "email", "phone", "is_active", "is_verified")
     )
     if q:
-        qs = qs.filter(
-            Q(full_name__icontains=q) | Q(email__icontains=q) | Q(phone__icontains=q)
-        )
+        qs = apply_search(qs, q, CUSTOMER_FIELDS, phone_fields=CUSTOMER_PHONE_FIELDS)
     if status in ("Active", "Inactive"):
         qs = qs.filter(is_active=(status == "Active"))
 
@@ -289,6 +292,7 @@ def export_customers_csv(request):  # endpoint name preserved
 
 @login_required(login_url="login_page")
 @require_staff_role(["admin", "manager", "finance"])
+@reporting_db
 def export_orders_csv(request):  # endpoint name preserved
     start = _parse_date(request.GET.get("start"))
     end = _parse_date(request.GET.get("end"))
@@ -334,6 +338,7 @@ def export_orders_csv(request):  # endpoint name preserved
 
 @login_required(login_url="login_page")
 @require_staff_role(["admin", "manager", "finance"])
+@reporting_db
 def export_subscriptions_csv(request):  # endpoint name preserved
     start = _parse_date(request.GET.get("start"))
     end = _parse_date(request.GET.get("end"))
@@ -382,6 +387,7 @@ def export_subscriptions_csv(request):  # endpoint name preserved
 
 @login_required(login_url="login_page")
 @require_staff_role(["admin", "manager", "finance"])
+@reporting_db
 def export_revenue_monthly_csv(request):  # endpoint name preserved
     """
     Sums AccountEntry by month for:
@@ -441,6 +447,7 @@ def export_revenue_monthly_csv(request):  # endpoint name preserved
 
 @login_required(login_url="login_page")
 @require_staff_role(["admin", "manager", "finance"])
+@reporting_db
 def export_tickets_csv(request):  # endpoint name preserved
     start = _parse_date(request.GET.get("start"))
     end = _parse_date(request.GET.get("end"))
@@ -485,6 +492,7 @@ def export_tickets_csv(request):  # endpoint name preserved
 
 @login_required(login_url="login_page")
 @require_staff_role(["admin", "manager", "finance"])
+@reporting_db
 def export_inventory_csv(request):  # endpoint name preserved
     qs = StarlinkKitInventory.objects.select_related("kit").order_by("kit_number")
 
@@ -521,6 +529,7 @@ def export_inventory_csv(request):  # endpoint name preserved
 
 @login_required(login_url="login_page")
 @require_staff_role(["admin", "manager", "finance"])
+@reporting_db
 def export_general_ledger_csv(request):  # URL name mirrors your pattern, returns XLSX
     """
     General Ledger export (XLSX) with running balance per BillingAccount.
@@ -743,6 +752,7 @@ def export_general_ledger_csv(request):  # URL name mirrors your pattern, return
 
 @login_required(login_url="login_page")
 @require_staff_role(["admin", "manager", "finance"])
+@reporting_db
 def export_trial_balance_csv(request):
     """
     Trial Balance: sums AccountEntry over the period by BillingAccount.
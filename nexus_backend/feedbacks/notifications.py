@@ -4,10 +4,11 @@ import logging
 from typing import Iterable
 
 from django.conf import settings
-from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.utils import timezone
 
+from main.services.outbox import queue_email
+
 from .models import Feedback
 
 logger = logging.getLogger(__name__)
@@ -33,8 +34,12 @@ def notify_feedback_submitted(feedback: Feedback) -> None:
             "site_url": settings.SITE_URL.rstrip("/"),
         }
         body = render_to_string("emails/feedback_submitted.txt", context)
-        send_mail(
-            subject, body, settings.DEFAULT_FROM_EMAIL, recipients, fail_silently=True
+        queue_email(
+            subject,
+            body,
+            recipients,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            category="feedback_submitted",
         )
     except Exception:
         logger.exception("Failed to send feedback submitted notification")
@@ -56,12 +61,12 @@ def notify_client_on_staff_reply(feedback: Feedback) -> None:
             "site_url": settings.SITE_URL.rstrip("/"),
         }
         body = render_to_string("emails/feedback_staff_reply.txt", context)
-        send_mail(
+        queue_email(
             subject,
             body,
-            settings.DEFAULT_FROM_EMAIL,
             [feedback.customer.email],
-            fail_silently=True,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            category="feedback_staff_reply",
         )
     except Exception:
         logger.exception("Failed to send feedback reply notification")
@@ -83,12 +88,12 @@ def notify_client_on_lock(feedback: Feedback) -> None:
     }
     body = render_to_string("emails/feedback_locked.txt", context)
     try:
-        send_mail(
+        queue_email(
             subject,
             body,
-            settings.DEFAULT_FROM_EMAIL,
             [feedback.customer.email],
-            fail_silently=True,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            category="feedback_locked",
         )
     except Exception:
         logger.exception("Failed to send feedback lock notification")
@@ -108,12 +113,12 @@ def send_feedback_reminder(installation) -> None:
     subject = "We would love to hear your feedback"
     body = render_to_string("emails/feedback_reminder.txt", context)
     try:
-        send_mail(
+        queue_email(
             subject,
             body,
-            settings.DEFAULT_FROM_EMAIL,
             [order.user.email],
-            fail_silently=True,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            category="feedback_reminder",
         )
     except Exception:
         logger.exception("Failed to send feedback reminder")
@@ -4,6 +4,8 @@ from rest_framework.permissions import BasePermission
 
 from django.utils.translation import gettext_lazy as _
 
+from user.permissions import compiled_roles
+
 STAFF_ROLES = {"support", "qa", "admin"}
 
 
@@ -12,8 +14,7 @@ def user_is_feedback_staff(user) -> bool:
         return False
     if user.is_superuser or user.is_staff:
         return True
-    user_roles = set(getattr(user, "roles", []) or [])
-    return bool(STAFF_ROLES & user_roles)
+    return bool(STAFF_ROLES & compiled_roles(user))
 
 
 class IsFeedbackOwner(BasePermission):
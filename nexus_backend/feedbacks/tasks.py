@@ -6,9 +6,12 @@ from datetime import timedelta
 from celery import shared_task
 
 from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 
 from main.models import InstallationActivity
+from main.services import job_runs
+from main.services.locks import job_lock
 
 from . import signals
 from .models import Feedback, FeedbackReminderLog
@@ -17,6 +20,9 @@ from .services import build_diff, log_feedback_action
 
 logger = logging.getLogger(__name__)
 
+LOCK_JOB = "feedbacks.lock_expired"
+REMINDER_JOB = "feedbacks.send_reminders"
+
 
 @shared_task(
     bind=True,
@@ -32,6 +38,19 @@ def lock_expired_feedbacks(self):
         edit_until__isnull=False,
         edit_until__lte=now,
     )
+    # Locked feedbacks leave the candidate set: nothing expired, nothing to do.
+    if not queryset.exists():
+        return {"locked": 0}
+    with job_lock(LOCK_JOB) as lock:
+        if not lock:
+            return {"locked": 0, "busy": True}
+        locked = _lock_feedbacks(queryset, now)
+        lock.run.rows_scanned = lock.run.rows_changed = locked
+    logger.info("Auto-locked %s feedback(s)", locked)
+    return {"locked": locked}
+
+
+def _lock_feedbacks(queryset, now) -> int:
     locked = 0
     for feedback in queryset:
         with transaction.atomic():
@@ -53,8 +72,7 @@ def lock_expired_feedbacks(self):
         signals.feedback_locked.send(sender=Feedback, feedback=feedback, user=None)
         notify_client_on_lock(feedback)
         locked += 1
-    logger.info("Auto-locked %s feedback(s)", locked)
-    return {"locked": locked}
+    return locked
 
 
 @shared_task(
@@ -65,6 +83,13 @@ def lock_expired_feedbacks(self):
     max_retries=3,
 )
 def send_feedback_reminders(self):
+    """
+    Remind clients about installations completed ``REMINDER_DAYS_AFTER_JOB``
+    days ago. Each run resumes after the ``completed_at`` watermark of the
+    last one, so an installation is considered once; failed sends move the
+    watermark back so they are retried. Installations passed over because
+    the client had no email are picked up again once one is added.
+    """
     from django.conf import settings
 
     cfg = getattr(settings, "FEEDBACK_SETTINGS", {})
@@ -74,28 +99,49 @@ def send_feedback_reminders(self):
 
     cutoff = timezone.now() - timedelta(days=days)
 
-    installations = (
-        InstallationActivity.objects.select_related("order", "order__user")
-        .filter(
-            completed_at__isnull=False,
-            completed_at__lte=cutoff,
-            feedback__isnull=True,
-        )
-        .exclude(feedback_reminder__isnull=False)
-    )
+    with job_lock(REMINDER_JOB) as lock:
+        if not lock:
+            return {"reminded": 0, "busy": True}
 
-    reminded = 0
-    for installation in installations:
-        order = installation.order
-        if not order or not order.user or not order.user.email:
-            continue
-        try:
-            send_feedback_reminder(installation)
-            FeedbackReminderLog.objects.create(installation=installation)
-            reminded += 1
-        except Exception:
-            logger.exception(
-                "Failed to send feedback reminder for job %s", installation.pk
+        installations = (
+            InstallationActivity.objects.select_related("order", "order__user")
+            .filter(
+                completed_at__isnull=False,
+                completed_at__lte=cutoff,
+                feedback__isnull=True,
+            )
+            .exclude(feedback_reminder__isnull=False)
+            .order_by("completed_at", "pk")
+        )
+        since = job_runs.watermark_datetime(REMINDER_JOB)
+        if since is not None:
+            # Older rows are still unreminded only because they were skipped
+            installations = installations.filter(
+                Q(completed_at__gt=since) | Q(order__user__email__gt="")
             )
+
+        reminded = scanned = 0
+        first_failure = None
+        for installation in installations.iterator(chunk_size=200):
+            scanned += 1
+            order = installation.order
+            if not order or not order.user or not order.user.email:
+                continue
+            try:
+                send_feedback_reminder(installation)
+                FeedbackReminderLog.objects.create(installation=installation)
+                reminded += 1
+            except Exception:
+                logger.exception(
+                    "Failed to send feedback reminder for job %s", installation.pk
+                )
+                if first_failure is None:
+                    first_failure = installation.completed_at
+
+        mark = cutoff
+        if first_failure is not None:
+            mark = first_failure - timedelta(microseconds=1)
+        lock.run.rows_scanned, lock.run.rows_changed = scanned, reminded
+        lock.run.watermark = job_runs.datetime_mark(mark)
     logger.info("Sent %s feedback reminder(s)", reminded)
     return {"reminded": reminded}
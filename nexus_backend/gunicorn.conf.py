@@ -0,0 +1,27 @@
+"""
+Gunicorn settings, read from the working directory on start-up.
+
+The Dockerfile command line sets bind/workers/threads/timeout; this file only
+adds the Prometheus multiprocess bookkeeping used by nexus_backend.metrics.
+"""
+
+import os
+import tempfile
+
+# Must be set before the workers import prometheus_client.
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(tempfile.gettempdir(), "prometheus-web"),
+)
+
+
+def on_starting(server):
+    from nexus_backend.metrics import reset_multiproc_dir
+
+    reset_multiproc_dir()
+
+
+def child_exit(server, worker):
+    from nexus_backend.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class KycManagementConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "kyc_management"
+
+    def ready(self):
+        # Queue preview rendering for new KYC uploads
+        from . import signals  # noqa: F401
@@ -0,0 +1,321 @@
+"""
+KYC document previews.
+
+Documents are rasterized once, in the background, when they are uploaded
+(``render_previews`` via ``kyc_management.tasks.render_kyc_previews``):
+every page up to ``MAX_PAGES``, at each size in ``PREVIEW_SIZES``, stored
+compressed (WebP, JPEG when Pillow lacks WebP) in private storage next to a
+small JSON manifest. Nothing stored here carries a watermark.
+
+Viewing a page (``watermarked_page``) reads one cached base image and
+composites the viewer's watermark over it in memory, so each reviewer gets
+their own attribution and no request rasterizes a PDF. Documents uploaded
+before the pipeline existed are rendered on first view.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import logging
+import mimetypes
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+# doc_kind -> (main model, file field)
+DOCUMENT_FIELDS = {
+    "personal-main": ("PersonalKYC", "document_file"),
+    "personal-visa": ("PersonalKYC", "visa_last_page"),
+    "company-rep": ("CompanyKYC", "representative_id_file"),
+    "company-main": ("CompanyKYC", "company_documents"),
+    "company-doc": ("CompanyDocument", "document"),
+}
+
+# Longest edge in pixels for each stored variant.
+PREVIEW_SIZES = {"screen": 1600, "thumb": 400}
+DEFAULT_SIZE = "screen"
+RENDER_DPI = 150
+MAX_PAGES = 10
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+MANIFEST_CACHE_SECONDS = 60 * 60
+
+PREVIEW_ROOT = "kyc_previews"
+
+
+def preview_storage():
+    """Same private storage as the KYC originals."""
+    if getattr(settings, "USE_SPACES", False):
+        from nexus_backend.storage_backend import PrivateMediaStorage
+
+        return PrivateMediaStorage()
+    return default_storage
+
+
+def get_document_file(doc_kind: str, pk: int):
+    """FieldFile for (doc_kind, pk); raises KeyError / DoesNotExist."""
+    model_name, field = DOCUMENT_FIELDS[doc_kind]
+    model = apps.get_model("main", model_name)
+    obj = model.objects.only("pk", field).get(pk=pk)
+    return getattr(obj, field)
+
+
+# ---------- Paths ----------
+def _base_dir(doc_kind: str, pk: int) -> str:
+    safe_kind = str(doc_kind).replace("/", "_")
+    return f"{PREVIEW_ROOT}/{safe_kind}/{pk}"
+
+
+def _manifest_path(doc_kind: str, pk: int) -> str:
+    return f"{_base_dir(doc_kind, pk)}/manifest.json"
+
+
+def _manifest_cache_key(doc_kind: str, pk: int) -> str:
+    return f"kyc:preview:manifest:{doc_kind}:{pk}"
+
+
+def _source_digest(name: str) -> str:
+    return hashlib.sha1((name or "").encode("utf-8")).hexdigest()[:16]
+
+
+def page_path(manifest: Dict[str, Any], page: int, size: str) -> str:
+    return (
+        f"{manifest['dir']}/{manifest['digest']}/"
+        f"p{page}_{size}.{manifest['ext']}"
+    )
+
+
+# ---------- Rasterizing ----------
+def _is_pdf(name: str) -> bool:
+    mime, _ = mimetypes.guess_type(name or "")
+    ext = os.path.splitext(name or "")[1].lower()
+    return mime == "application/pdf" or ext == ".pdf"
+
+
+def _read(file_field) -> Optional[bytes]:
+    try:
+        file_field.open("rb")
+        try:
+            return file_field.read()
+        finally:
+            file_field.close()
+    except Exception:
+        logger.warning("kyc preview: cannot read %s", getattr(file_field, "name", ""))
+        return None
+
+
+def _rasterize(data: bytes, is_pdf: bool) -> List[Any]:
+    """RGB page images of a PDF or image file (at most MAX_PAGES)."""
+    from PIL import Image, ImageOps, ImageSequence
+
+    if is_pdf:
+        from pdf2image import convert_from_bytes
+
+        pages = convert_from_bytes(data, dpi=RENDER_DPI, last_page=MAX_PAGES)
+        return [p.convert("RGB") for p in pages]
+
+    img = Image.open(io.BytesIO(data))
+    if getattr(img, "n_frames", 1) > 1:  # multi-page TIFF
+        return [
+            f.convert("RGB")
+            for i, f in enumerate(ImageSequence.Iterator(img))
+            if i < MAX_PAGES
+        ]
+    return [ImageOps.exif_transpose(img).convert("RGB")]
+
+
+def _placeholder():
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", (900, 600), color=(10, 10, 20))
+    ImageDraw.Draw(img).text((20, 20), "Preview unavailable", fill=(200, 200, 200))
+    return img
+
+
+@lru_cache(maxsize=1)
+def _encoding() -> Tuple[str, str, Dict[str, Any]]:
+    """(PIL format, extension, save kwargs) for stored base images."""
+    try:
+        from PIL import features
+
+        if features.check("webp"):
+            return "WEBP", "webp", {"quality": WEBP_QUALITY, "method": 4}
+    except Exception:
+        pass
+    return "JPEG", "jpg", {"quality": JPEG_QUALITY, "optimize": True}
+
+
+def render_previews(file_field, doc_kind: str, pk: int) -> Dict[str, Any]:
+    """
+    Rasterize every page of `file_field` at each PREVIEW_SIZES width, store
+    them and the manifest, and return the manifest. Unreadable documents get a
+    single placeholder page so views don't retry on every request.
+    """
+    name = getattr(file_field, "name", "") or ""
+    data = _read(file_field) if file_field else None
+
+    pages = []
+    if data:
+        try:
+            pages = _rasterize(data, _is_pdf(name))
+        except Exception:
+            logger.exception("kyc preview: rasterizing %s/%s failed", doc_kind, pk)
+            pages = []
+    placeholder = not pages
+    if placeholder:
+        pages = [_placeholder()]
+
+    fmt, ext, options = _encoding()
+    manifest = {
+        "source": name,
+        "dir": _base_dir(doc_kind, pk),
+        "digest": _source_digest(name),
+        "ext": ext,
+        "pages": len(pages),
+        "sizes": sorted(PREVIEW_SIZES),
+        "placeholder": placeholder,
+    }
+
+    storage = preview_storage()
+    for index, page in enumerate(pages, start=1):
+        for size, edge in PREVIEW_SIZES.items():
+            variant = page.copy()
+            variant.thumbnail((edge, edge))
+            buffer = io.BytesIO()
+            variant.save(buffer, format=fmt, **options)
+            path = page_path(manifest, index, size)
+            if storage.exists(path):
+                storage.delete(path)
+            storage.save(path, ContentFile(buffer.getvalue()))
+
+    path = _manifest_path(doc_kind, pk)
+    if storage.exists(path):
+        storage.delete(path)
+    storage.save(path, ContentFile(json.dumps(manifest).encode("utf-8")))
+    cache.set(_manifest_cache_key(doc_kind, pk), manifest, MANIFEST_CACHE_SECONDS)
+    return manifest
+
+
+def render_document(doc_kind: str, pk: int) -> Optional[Dict[str, Any]]:
+    """Background entry point: render the current file of (doc_kind, pk)."""
+    try:
+        file_field = get_document_file(doc_kind, pk)
+    except Exception:
+        return None
+    if not file_field:
+        return None
+    return render_previews(file_field, doc_kind, pk)
+
+
+def _stored_manifest(doc_kind: str, pk: int) -> Optional[Dict[str, Any]]:
+    key = _manifest_cache_key(doc_kind, pk)
+    manifest = cache.get(key)
+    if manifest is not None:
+        return manifest
+    try:
+        with preview_storage().open(_manifest_path(doc_kind, pk), "rb") as fh:
+            manifest = json.loads(fh.read())
+    except Exception:
+        return None
+    cache.set(key, manifest, MANIFEST_CACHE_SECONDS)
+    return manifest
+
+
+def get_manifest(file_field, doc_kind: str, pk: int) -> Dict[str, Any]:
+    """Manifest for the current file, rendering now if the pipeline hasn't."""
+    manifest = _stored_manifest(doc_kind, pk)
+    if manifest and manifest.get("source") == (getattr(file_field, "name", "") or ""):
+        return manifest
+    return render_previews(file_field, doc_kind, pk)
+
+
+# ---------- Per-viewer watermark ----------
+@lru_cache(maxsize=16)
+def _font(size: int):
+    from PIL import ImageFont
+
+    try:
+        return ImageFont.truetype("DejaVuSans.ttf", size=size)
+    except Exception:
+        return ImageFont.load_default()
+
+
+def composite_watermark(base: bytes, text: str) -> bytes:
+    """
+    JPEG of `base` with `text` drawn in the bottom-right corner and tiled
+    faintly across the page, so crops still carry the viewer's attribution.
+    """
+    from PIL import Image, ImageDraw
+
+    img = Image.open(io.BytesIO(base)).convert("RGBA")
+    w, h = img.size
+    font = _font(max(max(w, h) // 35, 12))
+    overlay = Image.new("RGBA", img.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+
+    # Faint diagonal tiles
+    left, top, right, bottom = draw.multiline_textbbox((0, 0), text, font=font)
+    tile = Image.new("RGBA", (right - left + 40, bottom - top + 40), (0, 0, 0, 0))
+    ImageDraw.Draw(tile).multiline_text(
+        (20 - left, 20 - top), text, font=font, fill=(120, 120, 120, 40)
+    )
+    tile = tile.rotate(30, expand=True)
+    for y in range(0, h, tile.height + tile.height // 2):
+        for x in range(0, w, tile.width + tile.width // 4):
+            overlay.alpha_composite(tile, (x, y))
+
+    # Legible corner label
+    margin = max(w, h) // 40 or 10
+    tw, th = right - left, bottom - top
+    x, y = max(w - tw - margin, 0), max(h - th - margin, 0)
+    draw.rectangle(
+        (x - 8, y - 8, x + tw + 8, y + th + 8), fill=(255, 255, 255, 170)
+    )
+    draw.multiline_text(
+        (x - left, y - top), text, font=font, fill=(40, 40, 40, 255), align="right"
+    )
+
+    out = io.BytesIO()
+    Image.alpha_composite(img, overlay).convert("RGB").save(
+        out, format="JPEG", quality=JPEG_QUALITY
+    )
+    return out.getvalue()
+
+
+def watermarked_page(
+    manifest: Dict[str, Any], page: int, size: str, text: str
+) -> Optional[bytes]:
+    """Per-viewer JPEG for one page, or None if the page doesn't exist."""
+    if size not in PREVIEW_SIZES:
+        size = DEFAULT_SIZE
+    if not 1 <= page <= int(manifest.get("pages") or 0):
+        return None
+    try:
+        with preview_storage().open(page_path(manifest, page, size), "rb") as fh:
+            base = fh.read()
+    except Exception:
+        return None
+    return composite_watermark(base, text)
+
+
+__all__ = [
+    "DOCUMENT_FIELDS",
+    "PREVIEW_SIZES",
+    "preview_storage",
+    "get_document_file",
+    "render_previews",
+    "render_document",
+    "get_manifest",
+    "composite_watermark",
+    "watermarked_page",
+]
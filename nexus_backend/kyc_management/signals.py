@@ -0,0 +1,82 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from main.models import CompanyDocument, CompanyKYC, PersonalKYC
+
+from .previews import DOCUMENT_FIELDS
+
+logger = logging.getLogger(__name__)
+
+
+def _enqueue(kind, pk):
+    from .tasks import render_kyc_previews
+
+    try:
+        render_kyc_previews.delay(kind, pk)
+    except Exception:
+        # Broker down: the preview is rendered on first view instead.
+        logger.warning("Could not queue KYC preview for %s #%s", kind, pk)
+
+
+def _kinds_for(sender):
+    return [
+        (kind, field)
+        for kind, (model_name, field) in DOCUMENT_FIELDS.items()
+        if model_name == sender.__name__
+    ]
+
+
+def _loaded_fields(sender, instance):
+    # Deferred fields are skipped: reading them would cost a query each.
+    return [
+        (kind, field)
+        for kind, field in _kinds_for(sender)
+        if field in instance.__dict__
+    ]
+
+
+def _file_name(instance, field):
+    f = getattr(instance, field, None)
+    return (f.name or "") if f else ""
+
+
+@receiver(post_init, sender=PersonalKYC)
+@receiver(post_init, sender=CompanyKYC)
+@receiver(post_init, sender=CompanyDocument)
+def remember_kyc_files(sender, instance, **kwargs):
+    instance._kyc_preview_sources = {
+        field: _file_name(instance, field)
+        for _, field in _loaded_fields(sender, instance)
+    }
+
+
+@receiver(pre_save, sender=PersonalKYC)
+@receiver(pre_save, sender=CompanyKYC)
+@receiver(pre_save, sender=CompanyDocument)
+def detect_new_kyc_uploads(sender, instance, **kwargs):
+    """Note which document fields got a new file (pending or already stored)."""
+    previous = getattr(instance, "_kyc_preview_sources", {})
+    kinds = []
+    for kind, field in _loaded_fields(sender, instance):
+        f = getattr(instance, field)
+        if f and (not f._committed or f.name != previous.get(field, f.name)):
+            kinds.append(kind)
+    instance._kyc_preview_kinds = kinds
+
+
+@receiver(post_save, sender=PersonalKYC)
+@receiver(post_save, sender=CompanyKYC)
+@receiver(post_save, sender=CompanyDocument)
+def queue_kyc_previews(sender, instance, **kwargs):
+    """Pre-render previews of newly uploaded documents once the save commits."""
+    remember_kyc_files(sender, instance)
+    kinds = getattr(instance, "_kyc_preview_kinds", None)
+    if not kinds:
+        return
+    instance._kyc_preview_kinds = []
+
+    for kind in kinds:
+        transaction.on_commit(lambda kind=kind, pk=instance.pk: _enqueue(kind, pk))
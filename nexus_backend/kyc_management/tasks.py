@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import logging
+
+from celery import shared_task
+
+from .previews import render_document
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(
+    bind=True,
+    ignore_result=True,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    max_retries=3,
+)
+def render_kyc_previews(self, doc_kind: str, pk: int):
+    """Rasterize a freshly uploaded KYC document into the preview store."""
+    manifest = render_document(doc_kind, pk)
+    if manifest:
+        logger.info(
+            "Rendered %s preview page(s) for %s #%s",
+            manifest["pages"],
+            doc_kind,
+            pk,
+        )
@@ -29,6 +29,11 @@ urlpatterns = [
         views.kyc_document_view,
         name="kyc_document_view",
     ),
+    path(
+        "document/page/<str:doc_kind>/<int:pk>/<int:page>/",
+        views.kyc_document_page,
+        name="kyc_document_page",
+    ),
     path(
         "update-status/user/<int:user_id>/",
         views.update_kyc_status,
@@ -67,168 +67,12 @@ def get_pending_kyc_count(request):
     return JsonResponse({"pending_count": count})
 
 
-def _preview_rel_path(doc_kind: str, object_id: int) -> str:
-    """
-    Compute a deterministic relative path (under MEDIA_ROOT) for a preview image.
-    We keep it simple: one PNG per (doc_kind, object_id).
-    """
-    safe_kind = str(doc_kind).replace("/", "_")
-    return f"kyc_previews/{safe_kind}/{object_id}_page1.png"
-
-
-def _ensure_preview_image(
-    file_field, doc_kind: str, object_id: int, viewer_label: str
-) -> str:
-    """
-    Ensure a PNG preview image exists for the given document.
-
-    Behaviour:
-      - If the document is a PDF and `pdf2image` is available, render the first
-        page to an image.
-      - If the document is an image (jpeg/png/...), load it via Pillow.
-      - In all cases, burn a textual watermark (viewer_label) into the image.
-      - If anything fails, fall back to a dark placeholder with the watermark.
-
-    Returns the storage URL to the preview image.
-    """
-    rel_path = _preview_rel_path(doc_kind, object_id)
-    if default_storage.exists(rel_path):
-        return default_storage.url(rel_path)
-
-    # Lazy import to avoid hard dependency at module import time
-    try:
-        from PIL import Image, ImageDraw
-    except Exception:
-        # In the unlikely event Pillow is missing, just create an empty file
-        default_storage.save(rel_path, ContentFile(b""))
-        return default_storage.url(rel_path)
-
-    base_image = None
-
-    # Try to read the original file bytes (works with local and remote storages)
-    file_bytes = None
-    try:
-        if file_field:
-            f = file_field
-            f.open("rb")
-            try:
-                file_bytes = f.read()
-            finally:
-                f.close()
-    except Exception:
-        file_bytes = None
-
-    # Decide whether it's a PDF or an image based on name/mime
-    is_pdf = False
-    try:
-        name = getattr(file_field, "name", "") or ""
-        mime, _ = mimetypes.guess_type(name)
-        ext = os.path.splitext(name)[1].lower()
-        is_pdf = (mime == "application/pdf") or ext == ".pdf"
-    except Exception:
-        is_pdf = False
-
-    if file_bytes:
-        try:
-            if is_pdf:
-                # Attempt real PDF rendering via pdf2image if installed
-                try:
-                    from pdf2image import convert_from_bytes
-                except Exception:
-                    base_image = None
-                else:
-                    try:
-                        pages = convert_from_bytes(
-                            file_bytes, dpi=150, first_page=1, last_page=1
-                        )
-                        if pages:
-                            base_image = pages[0].convert("RGB")
-                    except Exception:
-                        base_image = None
-            else:
-                # Assume it's an image Pillow can open
-                try:
-                    base_image = Image.open(io.BytesIO(file_bytes)).convert("RGB")
-                except Exception:
-                    base_image = None
-        except Exception:
-            base_image = None
-
-    # Fallback placeholder if we couldn't render the original
-    if base_image is None:
-        base_image = Image.new("RGB", (900, 600), color=(10, 10, 20))
-
-    # Burn watermark text into the image (visible mais dans un coin)
-    draw = ImageDraw.Draw(base_image)
-    text = f"KYC PREVIEW\n{viewer_label}"
-
-    # Police : taille raisonnable pour ne pas masquer les détails
-    font = None
-    try:
-        from PIL import ImageFont
-
-        w, h = base_image.size
-        # Taille plus petite qu'avant, proportionnelle à l'image
-        size = max(w, h) // 35 or 12
-        # DejaVuSans est généralement disponible avec Pillow, sinon exception
-        font = ImageFont.truetype("DejaVuSans.ttf", size=size)
-    except Exception:
-        font = None
-
-    try:
-        # Calculer la bbox pour placer le texte dans un coin (bas droite)
-        if font is not None and hasattr(draw, "multiline_textbbox"):
-            bbox = draw.multiline_textbbox((0, 0), text, font=font, spacing=8)
-            text_w = bbox[2] - bbox[0]
-            text_h = bbox[3] - bbox[1]
-            img_w, img_h = base_image.size
-            margin = max(img_w, img_h) // 40 or 10
-            x = img_w - text_w - margin
-            y = img_h - text_h - margin
-            draw.multiline_text(
-                (x, y),
-                text,
-                fill=(40, 40, 40),  # gris foncé, lisible même sur fond clair
-                font=font,
-                spacing=8,
-                align="right",
-            )
-        else:
-            # Fallback : ancien comportement mais couleur plus foncée
-            draw.multiline_text(
-                (20, 20),
-                text,
-                fill=(40, 40, 40),
-                spacing=8,
-            )
-    except Exception:
-        # En cas de problème, ne pas casser le rendu : texte simple en haut à gauche
-        draw.multiline_text(
-            (20, 20),
-            text,
-            fill=(40, 40, 40),
-            spacing=8,
-        )
-
-    buffer = io.BytesIO()
-    base_image.save(buffer, format="PNG")
-    buffer.seek(0)
-    default_storage.save(rel_path, ContentFile(buffer.read()))
-    return default_storage.url(rel_path)
-
-
 import datetime as dt
-import io
 import json
 import mimetypes
-import os
 from datetime import timedelta
 
-from twilio.rest import Client
-
 from django.contrib.auth.decorators import login_required
-from django.core.files.base import ContentFile
-from django.core.files.storage import default_storage
 from django.core.paginator import EmptyPage, Paginator
 from django.db.models import Q
 from django.http import HttpResponse, JsonResponse
@@ -240,6 +84,8 @@ from django.views.decorators.http import require_POST
 
 from main.models import BaseKYC, CompanyDocument, CompanyKYC, PersonalKYC, User
 from kyc_management.models import KycDocumentAccessLog
+from kyc_management.previews import get_manifest, watermarked_page
+from main.services.outbox import queue_email, queue_sms
 from user.permissions import require_staff_role
 
 
@@ -296,63 +142,66 @@ def kyc_management(request):
     return render(request, template, context)
 
 
-@login_required(login_url="login_page")
-@require_staff_role(["admin", "compliance"])
-@require_GET
-def kyc_document_view(request, doc_kind, pk):
+def _resolve_kyc_document(kind: str, pk: int):
     """
-    Secure, view-only endpoint for KYC documents.
+    (file_field, kyc_type, kyc_id, document_label) for a document kind:
 
-    It never streams the raw PDF to the browser. Instead, it serves a simple
-    HTML snippet containing a PNG preview stored under MEDIA_ROOT.
-
-    doc_kind:
         - personal-main  -> PersonalKYC.document_file
         - personal-visa  -> PersonalKYC.visa_last_page
         - company-rep    -> CompanyKYC.representative_id_file
         - company-main   -> CompanyKYC.company_documents
         - company-doc    -> CompanyDocument.document (pk = CompanyDocument.id)
-    """
-    kind = (doc_kind or "").lower()
-    file_field = None
-    kyc_type = ""
-    kyc_id = None
-    document_label = kind
 
+    Returns None for unknown kinds; 404s for unknown objects.
+    """
     if kind == "personal-main":
         kyc = get_object_or_404(PersonalKYC, pk=pk)
-        file_field = kyc.document_file
-        kyc_type = "personal"
-        kyc_id = kyc.id
-    elif kind == "personal-visa":
+        return kyc.document_file, "personal", kyc.id, kind
+    if kind == "personal-visa":
         kyc = get_object_or_404(PersonalKYC, pk=pk)
-        file_field = kyc.visa_last_page
-        kyc_type = "personal"
-        kyc_id = kyc.id
-    elif kind == "company-rep":
+        return kyc.visa_last_page, "personal", kyc.id, kind
+    if kind == "company-rep":
         company = get_object_or_404(CompanyKYC, pk=pk)
-        file_field = company.representative_id_file
-        kyc_type = "company"
-        kyc_id = company.id
-    elif kind == "company-main":
+        return company.representative_id_file, "company", company.id, kind
+    if kind == "company-main":
         company = get_object_or_404(CompanyKYC, pk=pk)
-        file_field = company.company_documents
-        kyc_type = "company"
-        kyc_id = company.id
-    elif kind == "company-doc":
+        return company.company_documents, "company", company.id, kind
+    if kind == "company-doc":
         doc = get_object_or_404(CompanyDocument, pk=pk)
-        file_field = doc.document
-        kyc_type = "company"
-        kyc_id = doc.company_kyc_id
-        document_label = doc.document_name or document_label
-    else:
+        return doc.document, "company", doc.company_kyc_id, doc.document_name or kind
+    return None
+
+
+def _viewer_watermark(request, kyc_type, kyc_id, document_label) -> str:
+    viewer = getattr(request.user, "email", "") or getattr(request.user, "username", "")
+    stamp = localtime(now()).strftime("%Y-%m-%d %H:%M")
+    return (
+        f"KYC PREVIEW\n{kyc_type} #{kyc_id} / {document_label}\n"
+        f"Viewer: {viewer} {stamp}"
+    )
+
+
+@login_required(login_url="login_page")
+@require_staff_role(["admin", "compliance"])
+@require_GET
+def kyc_document_view(request, doc_kind, pk):
+    """
+    Secure, view-only endpoint for KYC documents.
+
+    It never streams the raw file to the browser. It serves an HTML snippet
+    with one image per page; each image comes from `kyc_document_page`, which
+    watermarks the pre-rendered preview for the current viewer.
+    """
+    kind = (doc_kind or "").lower()
+    resolved = _resolve_kyc_document(kind, pk)
+    if resolved is None:
         return HttpResponse(status=404)
+    file_field, kyc_type, kyc_id, document_label = resolved
 
     if not file_field:
         return HttpResponse("Document not available", status=404)
 
-    viewer_label = f"{kyc_type} #{kyc_id} / {document_label}\nViewer: {getattr(request.user, 'email', '') or getattr(request.user, 'username', '')}"
-    preview_url = _ensure_preview_image(file_field, kind, pk, viewer_label)
+    manifest = get_manifest(file_field, kind, pk)
 
     # Log access for audit/compliance
     if kyc_type and kyc_id is not None:
@@ -363,13 +212,18 @@ def kyc_document_view(request, doc_kind, pk):
             document_label=document_label,
         )
 
+    images = "".join(
+        f"""
+        <img src="{reverse("kyc_document_page", args=[kind, pk, page])}"
+             class="max-h-[80vh] w-auto mx-auto mb-4 select-none"
+             alt="KYC preview page {page}" loading="lazy"
+             style="-webkit-user-drag:none;user-select:none;pointer-events:none;">"""
+        for page in range(1, int(manifest["pages"]) + 1)
+    )
     html = f"""
     <div class="relative w-full h-full flex flex-col">
-      <div class="flex-1 p-4 bg-black flex items-center justify-center" oncontextmenu="return false;">
-        <img src="{preview_url}"
-             class="max-h-[80vh] w-auto mx-auto select-none"
-             alt="KYC preview"
-             style="-webkit-user-drag:none;user-select:none;pointer-events:none;">
+      <div class="flex-1 p-4 bg-black flex flex-col items-center justify-center" oncontextmenu="return false;">
+        {images}
       </div>
       <div class="p-3 bg-gray-900 text-center">
         <button type="button"
@@ -384,6 +238,35 @@ def kyc_document_view(request, doc_kind, pk):
     return HttpResponse(html)
 
 
+@login_required(login_url="login_page")
+@require_staff_role(["admin", "compliance"])
+@require_GET
+def kyc_document_page(request, doc_kind, pk, page):
+    """
+    One page of a KYC document as a JPEG watermarked for the current viewer.
+    `?size=thumb` serves the small variant. Never cached by the browser.
+    """
+    kind = (doc_kind or "").lower()
+    resolved = _resolve_kyc_document(kind, pk)
+    if resolved is None or not resolved[0]:
+        return HttpResponse(status=404)
+    file_field, kyc_type, kyc_id, document_label = resolved
+
+    manifest = get_manifest(file_field, kind, pk)
+    body = watermarked_page(
+        manifest,
+        page,
+        request.GET.get("size", ""),
+        _viewer_watermark(request, kyc_type, kyc_id, document_label),
+    )
+    if body is None:
+        return HttpResponse(status=404)
+
+    response = HttpResponse(body, content_type="image/jpeg")
+    response["Cache-Control"] = "private, no-store"
+    return response
+
+
 def _file_url_or_none(request, f):
     """
     Safely build an absolute URL to a FileField (supports private storages exposing .url).
@@ -1109,37 +992,8 @@ def _send_kyc_rejection_notification(user, kyc, rejection_category, rejection_re
         # SMS content (keep it short)
         sms_body = f"Hi {full_name}, your {kyc_type.lower()} KYC application was rejected. Reason: {rejection_display}. Please check your email for details."
 
-        # Send email (if email is available)
-        if user.email:
-            try:
-                # For now, just print the email content (you can integrate with your email service)
-                print(f"EMAIL TO: {user.email}")
-                print(f"SUBJECT: {email_subject}")
-                print(f"BODY: {email_body}")
-                print("--- Email notification prepared ---")
-            except Exception as e:
-                print(f"Email sending failed: {str(e)}")
-
-        # Send SMS (if phone is available)
-        if user.phone:
-            try:
-                # Get Twilio credentials from environment
-                twilio_sid = os.environ.get("TWILIO_ACCOUNT_SID")
-                twilio_token = os.environ.get("TWILIO_AUTH_TOKEN")
-                twilio_phone = os.environ.get("TWILIO_PHONE_NUMBER")
-
-                if twilio_sid and twilio_token and twilio_phone:
-                    twilio_client = Client(twilio_sid, twilio_token)
-                    message = twilio_client.messages.create(
-                        body=sms_body, from_=twilio_phone, to=user.phone
-                    )
-                    print(f"SMS sent to {user.phone}: {message.sid}")
-                else:
-                    print(f"SMS TO: {user.phone}")
-                    print(f"BODY: {sms_body}")
-                    print("--- SMS notification prepared (Twilio not configured) ---")
-            except Exception as e:
-                print(f"SMS sending failed: {str(e)}")
+        queue_email(email_subject, email_body, [user.email], category="kyc_rejected")
+        queue_sms(user.phone, sms_body, category="kyc_rejected")
 
     except Exception as e:
         print(f"KYC rejection notification failed: {str(e)}")
@@ -9,8 +9,11 @@ from .models import (
     CompanyKYC,
     InstallationActivity,
     InstallationPhoto,
+    JobRun,
     Order,
+    OTPAudit,
     OTPVerification,
+    OutboundMessage,
     PaymentAttempt,
     PersonalKYC,
     RegionSalesDefault,
@@ -52,6 +55,32 @@ class OTPVerificationAdmin(admin.ModelAdmin):
     search_fields = ("user__email", "user__full_name", "token")
 
 
+@admin.register(OTPAudit)
+class OTPAuditAdmin(admin.ModelAdmin):
+    """Read-only OTP challenge history (main.services.otp)."""
+
+    list_display = (
+        "user",
+        "purpose",
+        "status",
+        "sends",
+        "attempts",
+        "ip",
+        "created_at",
+        "resolved_at",
+    )
+    list_filter = ("purpose", "status")
+    search_fields = ("user__email", "user__phone", "ip", "challenge")
+    date_hierarchy = "created_at"
+    raw_id_fields = ("user",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(PersonalKYC)
 class PersonalKYCAdmin(admin.ModelAdmin):
     search_fields = ("user__email", "full_name", "document_number")
@@ -413,3 +442,54 @@ class InstallationActivityAdmin(admin.ModelAdmin):
     )
 
     inlines = [InstallationPhotoInline]
+
+
+@admin.register(OutboundMessage)
+class OutboundMessageAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "channel",
+        "category",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "created_at",
+        "sent_at",
+    )
+    list_filter = ("status", "channel", "category", "created_at")
+    search_fields = ("recipients", "subject", "provider_id")
+    readonly_fields = ("created_at", "sent_at", "claimed_at", "provider_id")
+    ordering = ("-created_at",)
+    actions = ["requeue_dead_letters"]
+
+    @admin.action(description="Requeue selected dead letters")
+    def requeue_dead_letters(self, request, queryset):
+        from main.services.outbox import requeue
+
+        count = requeue(queryset)
+        self.message_user(request, f"{count} message(s) requeued.")
+
+
+@admin.register(JobRun)
+class JobRunAdmin(admin.ModelAdmin):
+    """Read-only history of periodic job runs (main.services.job_runs)."""
+
+    list_display = (
+        "job",
+        "status",
+        "started_at",
+        "duration",
+        "rows_scanned",
+        "rows_changed",
+        "watermark",
+        "fencing_token",
+    )
+    list_filter = ("status", "job")
+    search_fields = ("job", "owner", "error")
+    date_hierarchy = "started_at"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class MainConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "main"
+
+    def ready(self):
+        # Register config-cache / PDF asset / preferences invalidation receivers
+        from .services import config_cache, pdf_assets, preferences  # noqa: F401
+
+        # Outbound HTTP timings (FlexPay, Twilio) and DB connections for
+        # Prometheus
+        from nexus_backend import db_pool, metrics
+
+        if metrics.enabled():
+            metrics.instrument_requests()
+            db_pool.install()
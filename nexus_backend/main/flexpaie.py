@@ -1,9 +1,11 @@
 # payments/utils.py (or wherever your helper lives)
+import asyncio
 import json
 import logging
 from decimal import Decimal, InvalidOperation
 
 import requests
+from asgiref.sync import sync_to_async
 
 from django.contrib.auth.decorators import login_required
 from django.db import transaction
@@ -12,12 +14,18 @@ from django.utils import timezone
 from django.views.decorators.http import require_POST
 
 import nexus_backend.settings
+from main.services import flexpay_http
 from nexus_backend.celery_tasks.tasks import cancel_expired_orders
 
-from .models import Order, OrderEvent, PaymentAttempt
+from .models import Order, OrderEvent, PaymentAttempt, PaymentProbeLog
 
 logger = logging.getLogger(__name__)
 FLEXPAY_CHECK_URL = nexus_backend.settings.FLEXPAY_CHECK_URL  # ensure this exists
+FLEXPAY_CHECK_TIMEOUT = 15
+# Async (probe) checks: gateway calls in flight per call, and attempts
+# checked per call (most recent first).
+FLEXPAY_ASYNC_CONCURRENCY = 5
+FLEXPAY_ASYNC_MAX_ATTEMPTS = 20
 
 
 def _parse_flexpay_datetime(s):
@@ -36,18 +44,7 @@ def record_coupon_redemption_if_any(order):
     pass
 
 
-def check_flexpay_transactions(
-    order_number: str | None = None,
-    trans_id: str | None = None,
-    order_reference: str | None = None,
-):
-    """
-    Poll FlexPay for PaymentAttempts that are not completed.
-    If order_number/trans_id/order_reference provided, limit to those attempts.
-    Mark ONLY the order linked to the current PaymentAttempt (same order_number) as paid
-    when BOTH: response code == "0" AND transaction.status == "0".
-    Also record coupon redemption (if any) once the order is paid.
-    """
+def _pending_attempts(order_number, trans_id, order_reference, created_after):
     qs = PaymentAttempt.objects.select_related("order").exclude(
         status__in=["completed", "succeeded", "paid"]
     )
@@ -59,344 +56,398 @@ def check_flexpay_transactions(
         qs = qs.filter(reference=str(trans_id).strip())
     elif order_reference:
         qs = qs.filter(order__order_reference=str(order_reference).strip())
+    if created_after is not None:
+        qs = qs.filter(created_at__gt=created_after)
+
+    attempts = []
+    for pa in qs.order_by("-created_at"):
+        if pa.order_number:
+            attempts.append(pa)
+        else:
+            logger.warning("PaymentAttempt %s has no order_number. Skipping.", pa.id)
+    return attempts
 
-    attempts = qs.order_by("-created_at")
 
-    checked = 0
-    updated_attempts = 0
-    updated_orders = 0
-    per_attempt = []  # optional: for frontend debugging/info
+def _check_request(order_number):
+    """URL and headers of the FlexPay status check for ``order_number``."""
+    url = f"{FLEXPAY_CHECK_URL.rstrip('/')}/{order_number}"
+    headers = {
+        "Authorization": f"Bearer {nexus_backend.settings.FLEXPAY_API_KEY}",
+        "Content-Type": "application/json",
+    }
+    return url, headers
+
+
+class _CheckTally:
+    def __init__(self):
+        self.checked = 0
+        self.updated_attempts = 0
+        self.updated_orders = 0
+        self.per_attempt = []  # optional: for frontend debugging/info
+
+    def add(self, pa, success, **fields):
+        self.per_attempt.append(
+            {
+                "attempt_id": pa.id,
+                "order_number": pa.order_number,
+                "success": success,
+                **fields,
+            }
+        )
 
-    for pa in attempts:
-        current_order_number = pa.order_number
-        if not current_order_number:
-            logger.warning("PaymentAttempt %s has no order_number. Skipping.", pa.id)
-            continue
+    def result(self):
+        logger.info(
+            "FlexPay checks done. checked=%s, attempts_updated=%s, orders_updated=%s",
+            self.checked,
+            self.updated_attempts,
+            self.updated_orders,
+        )
+        return {
+            "checked": self.checked,
+            "attempts_updated": self.updated_attempts,
+            "orders_updated": self.updated_orders,
+            "attempts": self.per_attempt,
+        }
 
+
+def _apply_check_response(tally, pa, resp):
+    """Record one FlexPay status response (``requests`` or gateway response)."""
+    current_order_number = pa.order_number
+    if resp.status_code != 200:
+        logger.error(
+            "FlexPay check HTTP %s for orderNumber=%s",
+            resp.status_code,
+            current_order_number,
+        )
+        tally.add(pa, False, reason=f"http_{resp.status_code}")
+        return
+
+    data = resp.json() if resp.content else {}
+    code = str(data.get("code", "")).strip()
+
+    if code == "0":
+        tx = data.get("transaction") or {}
+        tx_status = str(tx.get("status", "")).strip()
+        tx_reference = (tx.get("reference") or "").strip()
+
+        # Optional matching
+        expected_refs = set()
+        if pa.reference:
+            expected_refs.add(str(pa.reference).strip())
+        if pa.order and getattr(pa.order, "order_reference", None):
+            expected_refs.add(str(pa.order.order_reference).strip())
+        if tx_reference and expected_refs and tx_reference not in expected_refs:
+            logger.warning(
+                "FlexPay reference mismatch for attempt %s: got '%s', expected one of %s. Skipping.",
+                pa.id,
+                tx_reference,
+                list(expected_refs),
+            )
+            tally.add(pa, False, reason="ref_mismatch")
+            return
+
+        amount = pa.amount
+        amount_customer = pa.amount_customer
         try:
-            headers = {
-                "Authorization": f"Bearer {nexus_backend.settings.FLEXPAY_API_KEY}",
-                "Content-Type": "application/json",
-            }
+            if tx.get("amount") is not None:
+                amount = Decimal(str(tx.get("amount")))
+        except (InvalidOperation, TypeError):
+            logger.warning(
+                "Invalid amount in FlexPay tx for attempt %s: %s",
+                pa.id,
+                tx.get("amount"),
+            )
+        try:
+            if tx.get("amountCustomer") is not None:
+                amount_customer = Decimal(str(tx.get("amountCustomer")))
+        except (InvalidOperation, TypeError):
+            logger.warning(
+                "Invalid amountCustomer in FlexPay tx for attempt %s: %s",
+                pa.id,
+                tx.get("amountCustomer"),
+            )
 
-            resp = requests.get(
-                f"{FLEXPAY_CHECK_URL.rstrip('/')}/{current_order_number}",
-                headers=headers,
-                timeout=15,
+        # Map FlexPay transaction.status → our domain status
+        # FlexPay semantics (based on samples):
+        #   "0" => succeeded (paid)
+        #   "1" => failed
+        #   "2" => pending / waiting for payment
+        # Anything else or blank => treat as pending
+        if tx_status == "0":
+            new_status = "paid"
+        elif tx_status == "1":
+            new_status = "failed"
+        elif tx_status == "2":
+            new_status = "pending"
+        else:
+            new_status = "pending"
+
+        with transaction.atomic():
+            pa.code = code
+            if tx_reference:
+                pa.reference = tx_reference
+            pa.amount = amount
+            pa.amount_customer = amount_customer
+            if tx.get("currency"):
+                pa.currency = tx.get("currency")
+            pa.transaction_time = _parse_flexpay_datetime(tx.get("createdAt"))
+            pa.raw_payload = data
+            pa.status = new_status
+            pa.save(
+                update_fields=[
+                    "code",
+                    "reference",
+                    "amount",
+                    "amount_customer",
+                    "currency",
+                    "transaction_time",
+                    "raw_payload",
+                    "status",
+                ]
             )
-            checked += 1
+            tally.updated_attempts += 1
 
-            if resp.status_code != 200:
-                logger.error(
-                    "FlexPay check HTTP %s for orderNumber=%s",
-                    resp.status_code,
-                    current_order_number,
-                )
-                per_attempt.append(
-                    {
-                        "attempt_id": pa.id,
-                        "order_number": current_order_number,
-                        "success": False,
-                        "reason": f"http_{resp.status_code}",
-                    }
-                )
-                continue
-
-            data = resp.json() if resp.content else {}
-            code = str(data.get("code", "")).strip()
-
-            if code == "0":
-                tx = data.get("transaction") or {}
-                tx_status = str(tx.get("status", "")).strip()
-                tx_reference = (tx.get("reference") or "").strip()
-
-                print("TRANSACTION TEST")
-                print(tx_status)
-                print(tx_reference)
-
-                # Optional matching
-                expected_refs = set()
-                if pa.reference:
-                    expected_refs.add(str(pa.reference).strip())
-                if pa.order and getattr(pa.order, "order_reference", None):
-                    expected_refs.add(str(pa.order.order_reference).strip())
-                if tx_reference and expected_refs and tx_reference not in expected_refs:
-                    logger.warning(
-                        "FlexPay reference mismatch for attempt %s: got '%s', expected one of %s. Skipping.",
-                        pa.id,
-                        tx_reference,
-                        list(expected_refs),
-                    )
-                    per_attempt.append(
-                        {
-                            "attempt_id": pa.id,
-                            "order_number": current_order_number,
-                            "success": False,
-                            "reason": "ref_mismatch",
-                        }
-                    )
-                    continue
-
-                amount = pa.amount
-                amount_customer = pa.amount_customer
-                try:
-                    if tx.get("amount") is not None:
-                        amount = Decimal(str(tx.get("amount")))
-                except (InvalidOperation, TypeError):
-                    logger.warning(
-                        "Invalid amount in FlexPay tx for attempt %s: %s",
-                        pa.id,
-                        tx.get("amount"),
-                    )
-                try:
-                    if tx.get("amountCustomer") is not None:
-                        amount_customer = Decimal(str(tx.get("amountCustomer")))
-                except (InvalidOperation, TypeError):
-                    logger.warning(
-                        "Invalid amountCustomer in FlexPay tx for attempt %s: %s",
-                        pa.id,
-                        tx.get("amountCustomer"),
-                    )
-
-                # Map FlexPay transaction.status → our domain status
-                # FlexPay semantics (based on samples):
-                #   "0" => succeeded (paid)
-                #   "1" => failed
-                #   "2" => pending / waiting for payment
-                # Anything else or blank => treat as pending
-                if tx_status == "0":
-                    new_status = "paid"
-                elif tx_status == "1":
-                    new_status = "failed"
-                elif tx_status == "2":
-                    new_status = "pending"
-                else:
-                    new_status = "pending"
-
-                with transaction.atomic():
-                    pa.code = code
-                    if tx_reference:
-                        pa.reference = tx_reference
-                    pa.amount = amount
-                    pa.amount_customer = amount_customer
-                    if tx.get("currency"):
-                        pa.currency = tx.get("currency")
-                    pa.transaction_time = _parse_flexpay_datetime(tx.get("createdAt"))
-                    pa.raw_payload = data
-                    pa.status = new_status
-                    pa.save(
-                        update_fields=[
-                            "code",
-                            "reference",
-                            "amount",
-                            "amount_customer",
-                            "currency",
-                            "transaction_time",
-                            "raw_payload",
-                            "status",
-                        ]
-                    )
-                    updated_attempts += 1
-
-                    # Only mark THIS order as paid when BOTH are "0"
-                    if tx_status == "0" and pa.order:
-                        order = pa.order
-                        if order.payment_status != "paid":
-                            order.payment_status = "paid"
-                            order.status = "fulfilled"
-                            order.save(update_fields=["payment_status", "status"])
-                            updated_orders += 1
-                            record_coupon_redemption_if_any(order)
-
-                logger.info(
-                    "FlexPay OK -> Completed orderNumber=%s (attempt %s)",
-                    current_order_number,
-                    pa.id,
-                )
-                per_attempt.append(
-                    {
-                        "attempt_id": pa.id,
-                        "order_number": current_order_number,
-                        "success": True,
-                        "final_status": new_status,
-                    }
-                )
+            # Only mark THIS order as paid when BOTH are "0"
+            if tx_status == "0" and pa.order:
+                order = pa.order
+                if order.payment_status != "paid":
+                    order.payment_status = "paid"
+                    order.status = "fulfilled"
+                    order.save(update_fields=["payment_status", "status"])
+                    tally.updated_orders += 1
+                    record_coupon_redemption_if_any(order)
+
+        logger.info(
+            "FlexPay OK -> Completed orderNumber=%s (attempt %s)",
+            current_order_number,
+            pa.id,
+        )
+        tally.add(pa, True, final_status=new_status)
 
-            elif code == "1":
-                logger.info(
-                    "FlexPay: no transaction yet for orderNumber=%s (attempt %s)",
-                    current_order_number,
-                    pa.id,
-                )
-                per_attempt.append(
-                    {
-                        "attempt_id": pa.id,
-                        "order_number": current_order_number,
-                        "success": True,
-                        "final_status": "pending",
-                    }
-                )
-            else:
-                logger.warning(
-                    "FlexPay unexpected response for %s: %s", current_order_number, data
-                )
-                per_attempt.append(
-                    {
-                        "attempt_id": pa.id,
-                        "order_number": current_order_number,
-                        "success": False,
-                        "reason": "unexpected_code",
-                    }
-                )
+    elif code == "1":
+        logger.info(
+            "FlexPay: no transaction yet for orderNumber=%s (attempt %s)",
+            current_order_number,
+            pa.id,
+        )
+        tally.add(pa, True, final_status="pending")
+    else:
+        logger.warning(
+            "FlexPay unexpected response for %s: %s", current_order_number, data
+        )
+        tally.add(pa, False, reason="unexpected_code")
 
-        except requests.Timeout:
-            logger.exception("FlexPay timeout for orderNumber=%s", current_order_number)
-            per_attempt.append(
-                {
-                    "attempt_id": pa.id,
-                    "order_number": current_order_number,
-                    "success": False,
-                    "reason": "timeout",
-                }
-            )
+
+def _record_check(tally, pa, resp):
+    """Apply one check outcome: a response, or the exception the call raised."""
+    try:
+        if isinstance(resp, BaseException):
+            raise resp
+        tally.checked += 1
+        _apply_check_response(tally, pa, resp)
+    except (requests.Timeout, flexpay_http.GatewayTimeout):
+        logger.exception("FlexPay timeout for orderNumber=%s", pa.order_number)
+        tally.add(pa, False, reason="timeout")
+    except Exception as e:
+        logger.exception(
+            "FlexPay check error for orderNumber=%s: %s", pa.order_number, e
+        )
+        tally.add(pa, False, reason="exception")
+
+
+def check_flexpay_transactions(
+    order_number: str | None = None,
+    trans_id: str | None = None,
+    order_reference: str | None = None,
+    created_after=None,
+):
+    """
+    Poll FlexPay for PaymentAttempts that are not completed.
+    If order_number/trans_id/order_reference provided, limit to those attempts.
+    If created_after is provided, only attempts created after it are polled.
+    Mark ONLY the order linked to the current PaymentAttempt (same order_number) as paid
+    when BOTH: response code == "0" AND transaction.status == "0".
+    Also record coupon redemption (if any) once the order is paid.
+    """
+    tally = _CheckTally()
+    for pa in _pending_attempts(order_number, trans_id, order_reference, created_after):
+        url, headers = _check_request(pa.order_number)
+        try:
+            resp = requests.get(url, headers=headers, timeout=FLEXPAY_CHECK_TIMEOUT)
         except Exception as e:
-            logger.exception(
-                "FlexPay check error for orderNumber=%s: %s", current_order_number, e
+            resp = e
+        _record_check(tally, pa, resp)
+    return tally.result()
+
+
+async def acheck_flexpay_transactions(
+    order_number: str | None = None,
+    trans_id: str | None = None,
+    order_reference: str | None = None,
+    created_after=None,
+):
+    """
+    ``check_flexpay_transactions`` for async views: the attempts are checked
+    concurrently (``main.services.flexpay_http``) and the results recorded in
+    a thread, in the same order as the sync version.
+
+    Targeted only: one of order_number/trans_id/order_reference is required
+    (``ValueError`` otherwise), at most ``FLEXPAY_ASYNC_MAX_ATTEMPTS``
+    attempts are checked, ``FLEXPAY_ASYNC_CONCURRENCY`` calls at a time.
+    """
+    if not (order_number or trans_id or order_reference):
+        raise ValueError("order_number, trans_id or order_reference is required")
+    attempts = await sync_to_async(_pending_attempts)(
+        order_number, trans_id, order_reference, created_after
+    )
+    attempts = attempts[:FLEXPAY_ASYNC_MAX_ATTEMPTS]
+    in_flight = asyncio.Semaphore(FLEXPAY_ASYNC_CONCURRENCY)
+
+    async def check(pa):
+        url, headers = _check_request(pa.order_number)
+        async with in_flight:
+            return await flexpay_http.get(
+                url, headers=headers, timeout=FLEXPAY_CHECK_TIMEOUT
             )
-            per_attempt.append(
-                {
-                    "attempt_id": pa.id,
-                    "order_number": current_order_number,
-                    "success": False,
-                    "reason": "exception",
-                }
+
+    responses = await asyncio.gather(
+        *(check(pa) for pa in attempts), return_exceptions=True
+    )
+
+    def record():
+        tally = _CheckTally()
+        for pa, resp in zip(attempts, responses):
+            _record_check(tally, pa, resp)
+        return tally.result()
+
+    return await sync_to_async(record)()
+
+
+# ---------- Probe views ----------
+def _probe_status(result):
+    """'paid' | 'failed' | 'pending' for the outcome of a targeted check."""
+    if int(result.get("orders_updated") or 0) > 0:
+        return "paid"
+    # Look for explicit failure markers
+    any_failed = any(
+        (
+            isinstance(a, dict)
+            and str(a.get("final_status", "")).lower()
+            in {"failed", "declined", "cancelled"}
+        )
+        or (
+            isinstance(a, dict)
+            and str(a.get("reason", "")).lower() in {"ref_mismatch"}
+        )
+        for a in result.get("attempts") or []
+    )
+    return "failed" if any_failed else "pending"
+
+
+def _record_probe(user, result, order_number, trans_id, order_ref, status=None):
+    """
+    Audit a probe: mark the attempts as probed by ``user``, and write a
+    PaymentProbeLog and a ``payment_probe`` OrderEvent per attempt. The event
+    message carries ``status`` when given, else the attempt's own outcome.
+    """
+    orders_updated = int(result.get("orders_updated") or 0)
+    attempts = [
+        a
+        for a in result.get("attempts") or []
+        if isinstance(a, dict) and a.get("attempt_id")
+    ]
+    if not attempts:
+        return
+    ids = [a["attempt_id"] for a in attempts]
+    PaymentAttempt.objects.filter(id__in=ids).update(
+        last_probed_at=timezone.now(),
+        last_probed_by=user,
+        processed_by=user,
+    )
+    by_id = PaymentAttempt.objects.select_related("order").in_bulk(ids)
+    logs = []
+    for a in attempts:
+        aid = a["attempt_id"]
+        outcome = str(a.get("final_status") or a.get("reason") or "").lower()
+        try:
+            logs.append(
+                PaymentProbeLog(
+                    attempt_id=aid,
+                    user=user if user.is_authenticated else None,
+                    order_number=order_number or (a.get("order_number") or ""),
+                    trans_id=trans_id or "",
+                    order_reference=order_ref or "",
+                    outcome_status=outcome,
+                    orders_updated=orders_updated,
+                    raw_gateway_code=str(result.get("code") or ""),
+                )
             )
+            # Order-level audit event
+            pa = by_id.get(aid)
+            if pa is not None and pa.order_id:
+                payload = {"orders_updated": orders_updated}
+                if status is not None:
+                    payload["outcome"] = outcome
+                OrderEvent.objects.create(
+                    order=pa.order,
+                    event_type="payment_probe",
+                    message=f"Probe result: {status or outcome}",
+                    attempt=pa,
+                    payload=payload,
+                )
+        except Exception:
+            # Don't fail the endpoint on log issues
+            pass
+    if logs:
+        PaymentProbeLog.objects.bulk_create(logs, ignore_conflicts=True)
+
+
+def _probe_identifiers(request):
+    data = json.loads(request.body or "{}")
+    return (
+        (data.get("order_number") or "").strip() or None,
+        (data.get("trans_id") or "").strip() or None,
+        (data.get("order_reference") or "").strip() or None,
+    )
 
-    logger.info(
-        "FlexPay checks done. checked=%s, attempts_updated=%s, orders_updated=%s",
-        checked,
-        updated_attempts,
-        updated_orders,
+
+def _missing_identifier():
+    return JsonResponse(
+        {
+            "success": False,
+            "status": "pending",
+            "message": "order_number, trans_id or order_reference is required",
+        },
+        status=400,
     )
-    return {
-        "checked": checked,
-        "attempts_updated": updated_attempts,
-        "orders_updated": updated_orders,
-        "attempts": per_attempt,
-    }
 
 
 @login_required(login_url="login_page")
 @require_POST
-def probe_payment_status(request):
+async def probe_payment_status(request):
     """
     Trigger a targeted FlexPay status probe from the browser.
-    Accepts: order_number (preferred), or trans_id, or order_reference.
+    Accepts: order_number (preferred), or trans_id, or order_reference; one
+    of them is required (400 otherwise).
     Persists the same data as check_flexpay, plus audit who/when probed.
     Returns a compact JSON with a top-level `status`: 'paid' | 'failed' | 'pending'.
+    Async: the gateway round trip does not hold a web worker (see flexpay_http).
     """
     try:
-        data = json.loads(request.body or "{}")
-        order_number = (data.get("order_number") or "").strip() or None
-        trans_id = (data.get("trans_id") or "").strip() or None
-        order_ref = (data.get("order_reference") or "").strip() or None
+        order_number, trans_id, order_ref = _probe_identifiers(request)
+        if not (order_number or trans_id or order_ref):
+            return _missing_identifier()
 
-        result = check_flexpay_transactions(
+        result = await acheck_flexpay_transactions(
             order_number=order_number, trans_id=trans_id, order_reference=order_ref
         )
+        status = _probe_status(result)
 
-        # Derive a consolidated status like mobile_probe
-        orders_updated = int(result.get("orders_updated") or 0)
-        attempts_list = result.get("attempts") or []
-        status = "pending"
-        if orders_updated > 0:
-            status = "paid"
-        else:
-            # Look for explicit failure markers
-            any_failed = any(
-                (
-                    isinstance(a, dict)
-                    and str(a.get("final_status", "")).lower()
-                    in {"failed", "declined", "cancelled"}
-                )
-                or (
-                    isinstance(a, dict)
-                    and str(a.get("reason", "")).lower() in {"ref_mismatch"}
-                )
-                for a in attempts_list
-            )
-            status = "failed" if any_failed else "pending"
-
-        # --- Audit: mark attempts as probed and create probe logs + order events ---
         try:
-            from .models import (
-                OrderEvent,
-                PaymentProbeLog,
-            )  # local import to avoid cycles
-
-            attempts = attempts_list
-            ids = [
-                a.get("attempt_id")
-                for a in attempts
-                if isinstance(a, dict) and a.get("attempt_id")
-            ]
-            now_ts = timezone.now()
-            if ids:
-                PaymentAttempt.objects.filter(id__in=ids).update(
-                    last_probed_at=now_ts,
-                    last_probed_by=request.user,
-                    processed_by=request.user,
-                )
-                # Create per-attempt logs and order events
-                logs = []
-                for a in attempts:
-                    if not isinstance(a, dict):
-                        continue
-                    aid = a.get("attempt_id")
-                    if not aid:
-                        continue
-                    outcome = a.get("final_status") or a.get("reason") or ""
-                    try:
-                        logs.append(
-                            PaymentProbeLog(
-                                attempt_id=aid,
-                                user=request.user
-                                if request.user.is_authenticated
-                                else None,
-                                order_number=order_number
-                                or (a.get("order_number") or ""),
-                                trans_id=trans_id or "",
-                                order_reference=order_ref or "",
-                                outcome_status=str(outcome).lower(),
-                                orders_updated=orders_updated,
-                                raw_gateway_code=str(result.get("code") or ""),
-                            )
-                        )
-                        # Order-level audit event
-                        try:
-                            pa = (
-                                PaymentAttempt.objects.select_related("order")
-                                .only("order_id")
-                                .get(id=aid)
-                            )
-                            if pa.order_id:
-                                OrderEvent.objects.create(
-                                    order=pa.order,
-                                    event_type="payment_probe",
-                                    message=f"Probe result: {status}",
-                                    attempt=pa,
-                                    payload={
-                                        "orders_updated": orders_updated,
-                                        "outcome": str(outcome).lower(),
-                                    },
-                                )
-                        except Exception:
-                            pass
-                    except Exception:
-                        # Don't fail the endpoint on log issues
-                        pass
-                if logs:
-                    PaymentProbeLog.objects.bulk_create(logs, ignore_conflicts=True)
+            user = await request.auser()
+            await sync_to_async(_record_probe)(
+                user, result, order_number, trans_id, order_ref, status=status
+            )
         except Exception:
             logger.exception("probe_payment_status: auditing failed")
 
@@ -524,142 +575,49 @@ def cancel_order_now(request):
 
 @login_required(login_url="login_page")
 @require_POST
-def mobile_probe(request):
+async def mobile_probe(request):
     """
     Single-shot verification for MOBILE MONEY payments initiated via FlexPay.
-    Caller provides whatever identifiers it has; we run a focused check and
-    respond with a concise outcome for the UI.
+    Caller provides whatever identifiers it has (at least one, else 400); we
+    run a focused check and respond with a concise outcome for the UI.
     Persists the same data as check_flexpay, plus audit who/when probed.
     Response contract:
       { success: bool, status: 'paid'|'failed'|'pending', orders_updated?: int }
+    Async, like probe_payment_status.
     """
     try:
-        data = json.loads(request.body or "{}")
-        order_number = (data.get("order_number") or "").strip() or None
-        trans_id = (data.get("trans_id") or "").strip() or None
-        order_ref = (data.get("order_reference") or "").strip() or None
+        order_number, trans_id, order_ref = _probe_identifiers(request)
+        if not (order_number or trans_id or order_ref):
+            return _missing_identifier()
 
-        result = check_flexpay_transactions(
+        result = await acheck_flexpay_transactions(
             order_number=order_number,
             trans_id=trans_id,
             order_reference=order_ref,
         )
 
-        # --- Audit: mark attempts as probed and create probe logs + order events ---
         try:
-            from .models import (
-                OrderEvent,
-                PaymentProbeLog,
-            )  # local import to avoid cycles
-
-            attempts = result.get("attempts") or []
-            ids = [
-                a.get("attempt_id")
-                for a in attempts
-                if isinstance(a, dict) and a.get("attempt_id")
-            ]
-            now_ts = timezone.now()
-            if ids:
-                PaymentAttempt.objects.filter(id__in=ids).update(
-                    last_probed_at=now_ts,
-                    last_probed_by=request.user,
-                    processed_by=request.user,
-                )
-                logs = []
-                # outcome for mobile is summarized below, but we still log per-attempt info
-                for a in attempts:
-                    if not isinstance(a, dict):
-                        continue
-                    aid = a.get("attempt_id")
-                    if not aid:
-                        continue
-                    outcome = a.get("final_status") or a.get("reason") or ""
-                    try:
-                        logs.append(
-                            PaymentProbeLog(
-                                attempt_id=aid,
-                                user=request.user
-                                if request.user.is_authenticated
-                                else None,
-                                order_number=order_number
-                                or (a.get("order_number") or ""),
-                                trans_id=trans_id or "",
-                                order_reference=order_ref or "",
-                                outcome_status=str(outcome).lower(),
-                                orders_updated=int(result.get("orders_updated") or 0),
-                                raw_gateway_code=str(result.get("code") or ""),
-                            )
-                        )
-                        # Order-level audit event
-                        try:
-                            pa = (
-                                PaymentAttempt.objects.select_related("order")
-                                .only("order_id")
-                                .get(id=aid)
-                            )
-                            if pa.order_id:
-                                OrderEvent.objects.create(
-                                    order=pa.order,
-                                    event_type="payment_probe",
-                                    message=f"Probe result: {str(outcome).lower()}",
-                                    attempt=pa,
-                                    payload={
-                                        "orders_updated": int(
-                                            result.get("orders_updated") or 0
-                                        )
-                                    },
-                                )
-                        except Exception:
-                            pass
-                    except Exception:
-                        pass
-                if logs:
-                    PaymentProbeLog.objects.bulk_create(logs, ignore_conflicts=True)
+            user = await request.auser()
+            await sync_to_async(_record_probe)(
+                user, result, order_number, trans_id, order_ref
+            )
         except Exception:
             logger.exception("mobile_probe: auditing failed")
 
-        # Heuristic outcome mapping
         orders_updated = int(result.get("orders_updated") or 0)
-        attempts = result.get("attempts") or []
-
-        status = "pending"
-        success = False
-
-        if orders_updated > 0:
-            status = "paid"
-            success = True
-        else:
-            # Inspect attempts for explicit failure markers if available
-            any_failed = any(
-                (
-                    isinstance(a, dict)
-                    and str(a.get("final_status", "")).lower()
-                    in {"failed", "declined", "cancelled"}
-                )
-                or (
-                    isinstance(a, dict)
-                    and str(a.get("reason", "")).lower() in {"ref_mismatch"}
-                )
-                for a in attempts
-            )
-            if any_failed:
-                status = "failed"
-                success = False
-            else:
-                status = "pending"
-                success = False
+        status = _probe_status(result)
 
         # Trigger cancellation sweep when failure is detected
         if status == "failed":
             try:
-                cancel_expired_orders.delay()
+                await sync_to_async(cancel_expired_orders.delay)()
             except Exception:
                 logger.exception(
                     "Failed to enqueue cancel_expired_orders on failed probe"
                 )
 
         payload = {
-            "success": success,
+            "success": status == "paid",
             "status": status,
             "orders_updated": orders_updated,
         }
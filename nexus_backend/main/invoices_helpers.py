@@ -1,12 +1,6 @@
 import re
 from decimal import Decimal
 
-from reportlab.graphics.barcode import qr
-from reportlab.graphics.shapes import Drawing, Group, Rect, String
-from reportlab.lib import colors
-from reportlab.lib.units import mm
-from reportlab.platypus import Table, TableStyle
-
 from django.db import transaction
 from django.utils import timezone
 
@@ -23,6 +17,7 @@ from main.models import (
     OrderLine,
     _qmoney,
 )
+from main.services import config_cache
 
 
 def _safe(x) -> str:
@@ -38,6 +33,8 @@ def _money(x) -> str:
 
 # Center any flowable with a specific (narrower) width
 def center_flow(flowable, width):
+    from reportlab.platypus import Table, TableStyle
+
     t = Table([[flowable]], colWidths=[width], hAlign="CENTER")
     t.setStyle(
         TableStyle(
@@ -59,6 +56,11 @@ def make_qr_card(
       - centered QR code
       - optional centered caption
     """
+    from reportlab.graphics.barcode import qr
+    from reportlab.graphics.shapes import Drawing, Group, Rect, String
+    from reportlab.lib import colors
+    from reportlab.lib.units import mm
+
     size = size_mm * mm
     padding = 4 * mm  # inner padding around the QR
     cap_height = (6 * mm) if caption else 0
@@ -124,7 +126,7 @@ def issue_invoice(inv) -> "Invoice":
       - Otherwise compute VAT/Excise from TaxRate, honoring user tax-exempt flag
       - Set status=issued and create a ledger AccountEntry (+ charge)
     """
-    from main.models import CompanySettings, Invoice, TaxRate  # adjust imports
+    from main.models import CompanySettings, Invoice  # adjust imports
 
     if not inv or inv.status != Invoice.Status.DRAFT:
         return inv
@@ -182,19 +184,15 @@ def issue_invoice(inv) -> "Invoice":
         vat_rate_pct = Decimal("0.00")
         excise_rate_pct = Decimal("0.00")
         try:
-            vat_rec = (
-                TaxRate.objects.filter(description="VAT").only("percentage").first()
-            )
-            if vat_rec and vat_rec.percentage is not None:
-                vat_rate_pct = Decimal(vat_rec.percentage)
+            vat_pct = config_cache.tax_percentage("VAT")
+            if vat_pct is not None:
+                vat_rate_pct = vat_pct
         except Exception:
             pass
         try:
-            excise_rec = (
-                TaxRate.objects.filter(description="EXCISE").only("percentage").first()
-            )
-            if excise_rec and excise_rec.percentage is not None:
-                excise_rate_pct = Decimal(excise_rec.percentage)
+            excise_pct = config_cache.tax_percentage("EXCISE")
+            if excise_pct is not None:
+                excise_rate_pct = excise_pct
         except Exception:
             pass
         if is_exempt:
@@ -320,6 +318,11 @@ def issue_invoice(inv) -> "Invoice":
             description=f"Invoice {inv.number}",
         )
 
+        # Render the (immutable) PDF once, after commit
+        from billing_management.services.invoice_pdf import queue_invoice_pdf
+
+        queue_invoice_pdf(inv)
+
     return inv
 
 
@@ -451,7 +454,7 @@ def create_consolidated_invoice(
             )
 
     # Create a DRAFT invoice which will hold all lines
-    cs = CompanySettings.get()
+    cs = config_cache.company_settings()
     inv = Invoice.objects.using(using).create(
         user=user,
         currency=cs.default_currency or "USD",
@@ -519,4 +522,8 @@ def create_consolidated_invoice(
     inv.consolidated_of = cons
     inv.save(update_fields=["consolidated_of"])
 
+    from billing_management.services.invoice_pdf import queue_invoice_pdf
+
+    queue_invoice_pdf(cons)
+
     return inv, cons
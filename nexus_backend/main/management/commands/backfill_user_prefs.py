@@ -0,0 +1,69 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main.models import User, UserPreferences
+from main.services import preferences
+
+
+class Command(BaseCommand):
+    help = (
+        "Move what the settings pages used to keep on local disk into the "
+        "database: the 2FA flag from MEDIA_ROOT/user_prefs/<user>.json, and "
+        "resized variants (and User.avatar_urls) for avatars uploaded before "
+        "variants existed. Idempotent; run once per web node with the old "
+        "files."
+    )
+
+    def handle(self, *args, **options):
+        imported = self._import_json_prefs()
+        resized, failed = self._resize_avatars()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {imported} preference file(s); resized {resized} "
+                f"avatar(s), {failed} unreadable."
+            )
+        )
+
+    def _import_json_prefs(self) -> int:
+        folder = os.path.join(settings.MEDIA_ROOT, "user_prefs")
+        if not os.path.isdir(folder):
+            return 0
+        imported = 0
+        for entry in os.scandir(folder):
+            user_id, ext = os.path.splitext(entry.name)
+            if ext != ".json" or not user_id.isdigit():
+                continue
+            try:
+                with open(entry.path, "r", encoding="utf-8") as f:
+                    data = json.load(f) or {}
+            except (OSError, ValueError):
+                continue
+            user = User.objects.filter(pk=int(user_id)).first()
+            if user is None or "twofa_enabled" not in data:
+                continue
+            # Notification toggles were already saved on the model.
+            preferences.update(user, twofa_enabled=bool(data["twofa_enabled"]))
+            imported += 1
+        return imported
+
+    def _resize_avatars(self):
+        resized = failed = 0
+        pending = (
+            UserPreferences.objects.select_related("user")
+            .exclude(avatar="")
+            .exclude(avatar=None)
+            .filter(avatar_variants={})
+        )
+        for prefs in pending.iterator():
+            try:
+                with prefs.avatar.open("rb") as f:
+                    preferences.set_avatar(prefs.user, f)
+            except (OSError, preferences.InvalidAvatar) as exc:
+                failed += 1
+                self.stderr.write(f"user {prefs.user_id}: {exc}")
+                continue
+            resized += 1
+        return resized, failed
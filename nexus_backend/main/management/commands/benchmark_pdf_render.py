@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import statistics
+import time
+from io import BytesIO
+from typing import Callable, List, Optional
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.models import Invoice
+from main.services import config_cache, pdf_assets
+
+
+def _timed(fn: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) * 1000
+
+
+def _reportlab_document(number: str) -> bytes:
+    """Header logo + QR card + a paragraph: what the reportlab builders share."""
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import mm
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+    from main.invoices_helpers import make_qr_card
+
+    styles = getSampleStyleSheet()
+    elems = []
+    logo = pdf_assets.logo_image(width=42 * mm, height=12 * mm)
+    if logo is not None:
+        elems.append(logo)
+    elems += [
+        Spacer(1, 6),
+        Paragraph(f"Invoice {number}", styles["Title"]),
+        make_qr_card(data=number, size_mm=44),
+    ]
+    buf = BytesIO()
+    SimpleDocTemplate(buf).build(elems)
+    return buf.getvalue()
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark of per-document PDF render time, cold (asset caches "
+        "cleared) vs warm, for the xhtml2pdf invoice and a reportlab document."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--invoice",
+            type=str,
+            help="Invoice number to render (default: latest issued invoice).",
+        )
+        parser.add_argument(
+            "--runs",
+            type=int,
+            default=20,
+            help="Warm renders per document type (default 20).",
+        )
+
+    def handle(self, *args, **options):
+        from billing_management.services import invoice_pdf
+
+        runs: int = max(options["runs"], 1)
+        number: Optional[str] = options.get("invoice")
+        qs = Invoice.objects.exclude(status=Invoice.Status.DRAFT)
+        inv = (
+            qs.filter(number=number).first()
+            if number
+            else qs.order_by("-issued_at", "-id").first()
+        )
+        if inv is None:
+            raise CommandError("No issued invoice to render.")
+        inv = invoice_pdf.load_invoice(inv.pk)
+
+        cases = [
+            ("xhtml2pdf invoice", lambda: invoice_pdf.render_pdf(inv)),
+            ("reportlab document", lambda: _reportlab_document(inv.number)),
+        ]
+        self.stdout.write(
+            f"{'document':<20} {'cold ms':>9} {'warm p50':>9} {'warm p95':>9}"
+        )
+        for label, render in cases:
+            pdf_assets.clear()
+            config_cache.clear_local()
+            cold = _timed(render)
+            warm: List[float] = sorted(_timed(render) for _ in range(runs))
+            p95 = warm[min(len(warm) - 1, int(len(warm) * 0.95))]
+            self.stdout.write(
+                f"{label:<20} {cold:>9.1f} "
+                f"{statistics.median(warm):>9.1f} {p95:>9.1f}"
+            )
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from dataclasses import fields, replace
+from datetime import datetime, time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from main.services import synthetic_data
+from main.services.synthetic_data import Scale
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a seeded, production-shaped dataset (users, orders, "
+        "subscriptions, payment attempts, ledger entries, kits, movements, "
+        "regions) with COPY in parallel chunks. --scale 1 is production "
+        "volume (200k users, 500k orders, 5M ledger entries...)."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--scale",
+            type=float,
+            default=1.0,
+            help="Multiplier of the production profile (e.g. 0.01 for a laptop).",
+        )
+        for f in fields(Scale):
+            parser.add_argument(
+                f"--{f.name.replace('_', '-')}",
+                dest=f.name,
+                type=int,
+                help=f"Exact row target for {f.name} (overrides --scale).",
+            )
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--as-of",
+            type=str,
+            help="Reference date YYYY-MM-DD (default: now); fix it to get "
+            "identical data across runs.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=synthetic_data.default_workers(),
+            help="Parallel writer processes (default: one per core).",
+        )
+        parser.add_argument("--chunk-size", type=int, default=10_000)
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Allow running with DEBUG off.",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options["force"]:
+            raise CommandError(
+                "Refusing to write synthetic data with DEBUG off (use --force)."
+            )
+        if synthetic_data.existing_rows():
+            raise CommandError(
+                "This database already holds a synthetic dataset; "
+                "generate into a fresh database."
+            )
+
+        scale = Scale().scaled(options["scale"])
+        overrides = {
+            f.name: options[f.name]
+            for f in fields(Scale)
+            if options.get(f.name) is not None
+        }
+        scale = replace(scale, **overrides)
+
+        as_of = None
+        if options.get("as_of"):
+            try:
+                day = datetime.strptime(options["as_of"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--as-of must be YYYY-MM-DD.")
+            as_of = timezone.make_aware(datetime.combine(day, time(12)))
+
+        try:
+            layout = synthetic_data.build_layout(scale, options["seed"], as_of)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(
+            f"Generating {scale} (seed {layout.seed}, as of {layout.as_of:%Y-%m-%d}, "
+            f"{options['workers']} worker(s))"
+        )
+
+        def progress(phase, written, seconds):
+            rows = ", ".join(f"{n:,} {label}" for label, n in sorted(written.items()))
+            self.stdout.write(f"  {phase:<10} {seconds:>8.1f}s  {rows}")
+
+        totals = synthetic_data.generate(
+            layout,
+            workers=max(options["workers"], 1),
+            chunk_size=max(options["chunk_size"], 100),
+            progress=progress,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Done: {sum(totals.values()):,} rows written.")
+        )
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from nexus_backend import startup
+
+
+class Command(BaseCommand):
+    help = (
+        "Boot a web or Celery process in a fresh interpreter under "
+        "python -X importtime, list the slowest module imports and check the "
+        "boot against COLD_START_BUDGET_MS and the deferred PDF/XLSX/SMS "
+        "libraries."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--target",
+            action="append",
+            choices=sorted(startup.BOOT_CODE),
+            help="Process to boot (repeatable; default: all).",
+        )
+        parser.add_argument(
+            "--top", type=int, default=25, help="Modules listed (default 25)."
+        )
+        parser.add_argument(
+            "--sort",
+            choices=("cumulative", "self"),
+            default="cumulative",
+            help="Rank modules by import time with or without their imports.",
+        )
+        parser.add_argument(
+            "--budget-ms",
+            type=float,
+            help="Import time allowed (default: COLD_START_BUDGET_MS[target]).",
+        )
+        parser.add_argument(
+            "--fail-over-budget",
+            action="store_true",
+            help="Exit with an error when over budget or a deferred module "
+            "is imported at boot.",
+        )
+
+    def handle(self, *args, **options):
+        budgets = getattr(settings, "COLD_START_BUDGET_MS", {})
+        problems = []
+        for target in options["target"] or sorted(startup.BOOT_CODE):
+            try:
+                report = startup.profile(target)
+            except RuntimeError as exc:
+                raise CommandError(str(exc))
+
+            self.stdout.write(
+                f"\n{target}: {report.import_ms:.0f} ms importing, "
+                f"{report.wall_ms:.0f} ms wall, {len(report.modules)} modules"
+            )
+            self.stdout.write(f"{'module':<60} {'self ms':>9} {'cumul. ms':>10}")
+            for module in report.slowest(options["top"], by=options["sort"]):
+                name = "  " * module.depth + module.name
+                self.stdout.write(
+                    f"{name[:60]:<60} {module.self_us / 1000:>9.1f} "
+                    f"{module.cumulative_us / 1000:>10.1f}"
+                )
+
+            budget = options["budget_ms"] or budgets.get(target)
+            if budget and report.import_ms > budget:
+                problems.append(f"{target} over budget ({budget:.0f} ms)")
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"{target}: {report.import_ms:.0f} ms > {budget:.0f} ms budget"
+                    )
+                )
+            elif budget:
+                self.stdout.write(
+                    self.style.SUCCESS(f"{target}: within {budget:.0f} ms budget")
+                )
+            deferred = report.deferred_loaded()
+            if deferred:
+                problems.append(f"{target} imports {', '.join(deferred)}")
+            for name in deferred:
+                chain = " <- ".join(report.import_chain(name))
+                self.stdout.write(
+                    self.style.ERROR(f"{target}: {name} imported at boot: {chain}")
+                )
+
+        if problems and options["fail_over_budget"]:
+            raise CommandError("; ".join(problems))
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from importlib import import_module
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import harness
+from main.services import synthetic_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the billing/checkout benchmark suite (benchmarks.cases) against "
+        "the configured database, normally one filled by "
+        "generate_synthetic_dataset. Save a run as a baseline and compare "
+        "later runs against it."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--only",
+            action="append",
+            default=[],
+            help="Case or group to run (repeatable; default: all).",
+        )
+        parser.add_argument(
+            "--rounds", type=int, help="Rounds per case (default: per case)."
+        )
+        parser.add_argument(
+            "--save", metavar="NAME", help="Store this run as .benchmarks/NAME.json."
+        )
+        parser.add_argument(
+            "--compare",
+            metavar="NAME",
+            help="Baseline to compare with (a name under .benchmarks/ or a path).",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=harness.DEFAULT_THRESHOLD,
+            help="Relative median change reported as faster/slower (default 0.10).",
+        )
+        parser.add_argument(
+            "--fail-on-regression",
+            action="store_true",
+            help="Exit with an error when a case is slower than the baseline.",
+        )
+
+    def _selected(self, only):
+        import_module("benchmarks.cases")  # registers the cases
+
+        if not only:
+            return None
+        names = [
+            c.name
+            for c in harness.CASES.values()
+            if c.name in only or c.group in only
+        ]
+        unknown = set(only) - {c.name for c in harness.CASES.values()} - {
+            c.group for c in harness.CASES.values()
+        }
+        if unknown:
+            raise CommandError(f"Unknown case(s): {', '.join(sorted(unknown))}")
+        return names
+
+    def handle(self, *args, **options):
+        names = self._selected(options["only"])
+        baseline = None
+        if options["compare"]:
+            try:
+                baseline = harness.load(options["compare"])
+            except FileNotFoundError:
+                raise CommandError(f"No baseline {options['compare']!r}.")
+
+        self.stdout.write(
+            f"{'case':<34} {'rounds':>6} {'median ms':>10} {'p95 ms':>9} "
+            f"{'stddev ms':>9}"
+        )
+
+        def progress(case, stats, skipped):
+            if stats is None:
+                self.stdout.write(f"{case.name:<34} skipped: {skipped}")
+                return
+            self.stdout.write(
+                f"{case.name:<34} {stats.rounds:>6} {stats.median * 1000:>10.1f} "
+                f"{stats.p95 * 1000:>9.1f} {stats.stddev * 1000:>9.1f}"
+            )
+
+        report = harness.run(
+            names,
+            rounds=options["rounds"],
+            dataset={"synthetic_users": synthetic_data.existing_rows()},
+            on_result=progress,
+        )
+
+        if options["save"]:
+            path = harness.save(report, options["save"])
+            self.stdout.write(f"Saved {path}")
+
+        if baseline is None:
+            return
+        rows = harness.compare(report, baseline, threshold=options["threshold"])
+        self.stdout.write(f"\nAgainst {options['compare']} ({baseline.commit}):")
+        for row in rows:
+            line = (
+                f"{row.name:<34} {row.baseline * 1000:>10.1f} -> "
+                f"{row.current * 1000:>10.1f} ms  {row.change:+.1%}  {row.verdict}"
+            )
+            if row.verdict == "slower":
+                line = self.style.ERROR(line)
+            elif row.verdict == "faster":
+                line = self.style.SUCCESS(line)
+            self.stdout.write(line)
+        slower = [row.name for row in rows if row.verdict == "slower"]
+        if slower and options["fail_on_regression"]:
+            raise CommandError(f"Slower than {options['compare']}: {', '.join(slower)}")
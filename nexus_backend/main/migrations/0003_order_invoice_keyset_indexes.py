@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:00
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0002_coupon_min_cart_total_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                F("created_at").desc(nulls_last=True),
+                F("id").desc(),
+                name="order_created_keyset_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="invoice",
+            index=models.Index(
+                F("issued_at").desc(nulls_last=True),
+                F("id").desc(),
+                name="invoice_issued_keyset_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:00
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0003_order_invoice_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="subscription",
+            index=models.Index(
+                F("started_at").desc(nulls_last=True),
+                F("id").desc(),
+                name="subscr_started_keyset_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:00
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+from django.db.models.functions import Upper
+
+import main.services.search
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0004_subscr_started_keyset_idx"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="user",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    Upper("full_name"), name="gin_trgm_ops"
+                ),
+                name="user_full_name_trgm",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    Upper("email"), name="gin_trgm_ops"
+                ),
+                name="user_email_trgm",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    main.services.search.DigitsOnly("phone"), name="gin_trgm_ops"
+                ),
+                name="user_phone_digits_trgm",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    Upper("order_reference"), name="gin_trgm_ops"
+                ),
+                name="order_reference_trgm",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="invoice",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    Upper("number"), name="gin_trgm_ops"
+                ),
+                name="invoice_number_trgm",
+            ),
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0006_installationphoto_variants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboundMessage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "channel",
+                    models.CharField(
+                        choices=[("email", "Email"), ("sms", "SMS")], max_length=10
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("sending", "Sending"),
+                            ("sent", "Sent"),
+                            ("dead", "Dead letter"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "category",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        help_text="e.g. otp, survey_rejected",
+                        max_length=50,
+                    ),
+                ),
+                ("recipients", models.JSONField(default=list)),
+                ("sender", models.CharField(blank=True, default="", max_length=255)),
+                (
+                    "fallback_sender",
+                    models.CharField(blank=True, default="", max_length=255),
+                ),
+                ("subject", models.CharField(blank=True, default="", max_length=255)),
+                ("body", models.TextField(blank=True, default="")),
+                ("html_body", models.TextField(blank=True, default="")),
+                (
+                    "sensitive",
+                    models.BooleanField(
+                        default=False,
+                        help_text="Body is erased once delivered or dead-lettered",
+                    ),
+                ),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("max_attempts", models.PositiveSmallIntegerField(default=5)),
+                (
+                    "next_attempt_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("claimed_at", models.DateTimeField(blank=True, null=True)),
+                ("last_error", models.TextField(blank=True, default="")),
+                (
+                    "provider_id",
+                    models.CharField(blank=True, default="", max_length=100),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("sent_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("status", "pending")),
+                        fields=["next_attempt_at", "id"],
+                        name="outbox_pending_due_idx",
+                    ),
+                    models.Index(
+                        fields=["status", "-created_at"],
+                        name="outbox_status_created_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
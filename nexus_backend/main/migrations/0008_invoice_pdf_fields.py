@@ -0,0 +1,47 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0007_outboundmessage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="consolidatedinvoice",
+            name="pdf_file",
+            field=models.FileField(
+                blank=True, default="", max_length=255, upload_to=""
+            ),
+        ),
+        migrations.AddField(
+            model_name="consolidatedinvoice",
+            name="pdf_sha256",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.AddField(
+            model_name="consolidatedinvoice",
+            name="pdf_fingerprint",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.AddField(
+            model_name="invoice",
+            name="pdf_file",
+            field=models.FileField(
+                blank=True, default="", max_length=255, upload_to=""
+            ),
+        ),
+        migrations.AddField(
+            model_name="invoice",
+            name="pdf_sha256",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.AddField(
+            model_name="invoice",
+            name="pdf_fingerprint",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0010_jobrun"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="jobrun",
+            name="rows_scanned",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="jobrun",
+            name="rows_changed",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="jobrun",
+            name="watermark",
+            field=models.JSONField(
+                blank=True,
+                help_text="Where the next run of the job resumes",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0012_otpaudit"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="avatar_urls",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text="Avatar URL per size, set on upload "
+                "(main.services.preferences)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="userpreferences",
+            name="avatar_variants",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text="Storage names of the smaller avatar sizes",
+            ),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:00
+
+import json
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+import main.models
+
+
+def parse_roles(value):
+    """Frozen copy of main.services.roles.parse_roles as of this migration."""
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+        except ValueError:
+            parsed = None
+        value = parsed if isinstance(parsed, list) else value.split(",")
+    if not isinstance(value, (list, tuple, set, frozenset)):
+        return []
+    names = (str(r).strip().lower() for r in value if r)
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def normalize_roles(apps, schema_editor):
+    User = apps.get_model("main", "User")
+    changed = []
+    for user in User.objects.only("pk", "roles").iterator(chunk_size=2000):
+        roles = parse_roles(user.roles)
+        if roles != user.roles:
+            user.roles = roles
+            changed.append(user)
+    User.objects.bulk_update(changed, ["roles"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0013_avatar_variants"),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name="user",
+            managers=[
+                ("objects", main.models.UserManager()),
+            ],
+        ),
+        migrations.RunPython(normalize_roles, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="user",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["roles"], name="user_roles_gin"
+            ),
+        ),
+    ]
@@ -8,6 +8,7 @@ from decimal import ROUND_HALF_UP, Decimal
 
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser, Group, Permission
+from django.contrib.auth.models import UserManager as DjangoUserManager
 from django.contrib.postgres.indexes import GinIndex
 from django.core.exceptions import ValidationError
 
@@ -22,7 +23,10 @@ from django.utils import timezone
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 
-from nexus_backend.storage_backend import PrivateMediaStorage
+from main.services.photos import PhotoVariantsMixin
+from main.services.roles import parse_roles
+from main.services.search import phone_digits_index, upper_trigram_index
+from nexus_backend.storage_backend import PrivateMediaStorage, PublicMediaStorage
 
 try:
     import openlocationcode as olc
@@ -183,11 +187,27 @@ class UserRole(models.TextChoices):
     FINANCE = "finance", ("Finance")
 
 
+DEFAULT_AVATAR_URL = "/static/icons/account_avatar.png"
+
+
 class UserPreferences(models.Model):
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="prefs"
     )
-    avatar = models.ImageField(upload_to="avatars/", blank=True, null=True)
+    # Largest avatar size; the smaller ones are in avatar_variants
+    # (main.services.preferences). Public storage: the URLs saved on the
+    # user must not expire.
+    avatar = models.ImageField(
+        upload_to="avatars/",
+        storage=(
+            PublicMediaStorage() if getattr(settings, "USE_SPACES", False) else None
+        ),
+        blank=True,
+        null=True,
+    )
+    avatar_variants = models.JSONField(
+        default=dict, blank=True, help_text="Storage names of the smaller avatar sizes"
+    )
     twofa_enabled = models.BooleanField(default=False)
 
     # Notification toggles
@@ -196,12 +216,25 @@ class UserPreferences(models.Model):
     notify_tickets = models.BooleanField(default=True)
 
     def avatar_url(self):
-        return self.avatar.url if self.avatar else "/static/icons/account_avatar.png"
+        return self.avatar.url if self.avatar else DEFAULT_AVATAR_URL
 
     def __str__(self):
         return f"Prefs({self.user_id})"
 
 
+class UserQuerySet(models.QuerySet):
+    def with_role(self, *roles):
+        """Users holding any of ``roles`` (jsonb ``@>``, served by a GIN index)."""
+        match = Q()
+        for role in parse_roles(list(roles)):
+            match |= Q(roles__contains=[role])
+        return self.filter(match) if match else self.none()
+
+
+class UserManager(DjangoUserManager.from_queryset(UserQuerySet)):
+    pass
+
+
 class User(AbstractUser):
     id_user = models.AutoField(primary_key=True)
     full_name = models.CharField(max_length=50)
@@ -213,21 +246,42 @@ class User(AbstractUser):
         Permission, related_name="customuser_permissions", blank=True
     )
     is_tax_exempt = models.BooleanField(default=False)
+    avatar_urls = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Avatar URL per size, set on upload (main.services.preferences)",
+    )
 
     # ✅ Add this field for multi-role support
     roles = models.JSONField(
         default=list, blank=True, help_text="List of user roles (multi-role support)"
     )
 
+    objects = UserManager()
+
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = [
         "full_name",
         "username",
     ]  # 'username' is required for compatibility
 
+    class Meta:
+        indexes = [
+            # Role lookups (User.objects.with_role)
+            GinIndex(fields=["roles"], name="user_roles_gin"),
+            # Staff search (main.services.search)
+            upper_trigram_index("full_name", "user_full_name_trgm"),
+            upper_trigram_index("email", "user_email_trgm"),
+            phone_digits_index("phone", "user_phone_digits_trgm"),
+        ]
+
     def __str__(self):
         return self.full_name or self.email or self.username
 
+    @property
+    def avatar_url(self):
+        return (self.avatar_urls or {}).get("medium") or DEFAULT_AVATAR_URL
+
     def get_kyc_status(self):
         if hasattr(self, "personnal_kyc") and self.personnal_kyc:
             return self.personnal_kyc.status
@@ -235,22 +289,35 @@ class User(AbstractUser):
             return self.company_kyc.status
         return "not_submitted"
 
+    @property
+    def role_set(self) -> frozenset:
+        """``roles`` parsed (main.services.roles), cached until ``roles`` changes."""
+        raw = self.roles
+        key = tuple(raw) if isinstance(raw, list) else raw
+        cached = self.__dict__.get("_role_set")
+        if cached is None or cached[0] != key:
+            cached = (key, frozenset(parse_roles(raw)))
+            self.__dict__["_role_set"] = cached
+        return cached[1]
+
     def has_role(self, role):
-        return role in self.roles
+        return str(role).strip().lower() in self.role_set
 
     def add_role(self, role):
-        if role not in self.roles:
-            self.roles.append(role)
+        if not self.has_role(role):
+            self.roles = parse_roles(self.roles) + [str(role).strip().lower()]
             self.save()
 
     def remove_role(self, role):
-        if role in self.roles:
-            self.roles.remove(role)
+        if self.has_role(role):
+            role = str(role).strip().lower()
+            self.roles = [r for r in parse_roles(self.roles) if r != role]
             self.save()
 
     def save(self, *args, **kwargs):
         if self.email:
             self.email = self.email.strip().lower()
+        self.roles = parse_roles(self.roles)
         super().save(*args, **kwargs)
 
     # Backwards-compat alias for code that expects a field named `id`
@@ -301,6 +368,45 @@ class OTPVerification(models.Model):
         return f"OTP for {self.user.username} (Expires at {self.expires_at})"
 
 
+class OTPAudit(models.Model):
+    """
+    One OTP challenge issued by ``main.services.otp``. The code, its attempt
+    counter and the rate limits live in the cache; this row only records who
+    was challenged, from where, and how the challenge ended.
+    """
+
+    class Purpose(models.TextChoices):
+        SIGNUP = "signup", "Signup verification"
+        LOGIN = "login", "Login 2FA"
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"  # stays so if the code expires unused
+        VERIFIED = "verified", "Verified"
+        LOCKED = "locked", "Locked (too many attempts)"
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="otp_audits")
+    purpose = models.CharField(max_length=10, choices=Purpose.choices)
+    challenge = models.CharField(max_length=32)
+    ip = models.GenericIPAddressField(null=True, blank=True)
+    sends = models.PositiveSmallIntegerField(default=1)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "-created_at"]),
+            models.Index(fields=["created_at"]),
+        ]
+
+    def __str__(self):
+        return f"OTPAudit({self.purpose} for user {self.user_id}, {self.status})"
+
+
 class BaseKYC(models.Model):
     class Status(models.TextChoices):
         PENDING = "pending", ("Pending")
@@ -1110,6 +1216,17 @@ class Order(models.Model):
         ExtraCharge, blank=True, help_text="Extra charges selected for this order"
     )
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the admin order list (newest first)
+            models.Index(
+                F("created_at").desc(nulls_last=True),
+                F("id").desc(),
+                name="order_created_keyset_idx",
+            ),
+            upper_trigram_index("order_reference", "order_reference_trgm"),
+        ]
+
     def __str__(self):
         name = None
         if self.user:
@@ -1787,6 +1904,16 @@ class Subscription(models.Model):
         help_text="Has the user requested activation for this subscription?",
     )
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the staff subscription list (newest first)
+            models.Index(
+                F("started_at").desc(nulls_last=True),
+                F("id").desc(),
+                name="subscr_started_keyset_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.plan.name} for {self.user.full_name} – {self.status}"
 
@@ -2381,7 +2508,7 @@ class InstallationActivity(models.Model):
         return False
 
 
-class InstallationPhoto(models.Model):
+class InstallationPhoto(PhotoVariantsMixin, models.Model):
     PHOTO_TYPE_CHOICES = [
         ("before", "Before"),
         ("after", "After"),
@@ -2407,6 +2534,25 @@ class InstallationPhoto(models.Model):
     )
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    # Filled by main.services.photos at ingest
+    content_hash = models.CharField(max_length=64, blank=True, default="")
+    variants = models.JSONField(default=dict, blank=True)
+    taken_at = models.DateTimeField(null=True, blank=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+
+    image_field_name = "image"
+    parent_field_name = "installation_activity"
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=["installation_activity", "content_hash"],
+                condition=~Q(content_hash=""),
+                name="install_photo_hash_uniq",
+            ),
+        ]
+
     def __str__(self):
         return f"Photo for {self.installation_activity.order.order_reference} uploaded at {self.uploaded_at}"
 
@@ -3355,6 +3501,16 @@ class FxRate(models.Model):
 
     @classmethod
     def get_rate(cls, when_date, pair: str = "USD/CDF"):
+        # Served from the in-memory date series (see main.services.config_cache)
+        from main.services.config_cache import fx_rate
+
+        try:
+            return fx_rate(when_date, pair=pair)
+        except Exception:
+            return None
+
+    @classmethod
+    def get_rate_uncached(cls, when_date, pair: str = "USD/CDF"):
         try:
             obj = (
                 cls.objects.filter(pair=pair, date__lte=when_date)
@@ -3577,6 +3733,19 @@ class ConsolidatedInvoice(models.Model):
     due_date = models.DateTimeField(null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS, default="issued")
 
+    # Pre-rendered PDF (billing_management.services.invoice_pdf), stored under
+    # its content hash; the fingerprint says which invoice state/template it is.
+    pdf_file = models.FileField(
+        storage=(
+            PrivateMediaStorage() if getattr(settings, "USE_SPACES", False) else None
+        ),
+        max_length=255,
+        blank=True,
+        default="",
+    )
+    pdf_sha256 = models.CharField(max_length=64, blank=True, default="")
+    pdf_fingerprint = models.CharField(max_length=64, blank=True, default="")
+
     class Meta:
         ordering = ["-issued_at"]
         indexes = [
@@ -3655,9 +3824,30 @@ class Invoice(models.Model):
         related_name="child_invoices",
     )
 
+    # Pre-rendered PDF (billing_management.services.invoice_pdf), stored under
+    # its content hash; the fingerprint says which invoice state/template it is.
+    pdf_file = models.FileField(
+        storage=(
+            PrivateMediaStorage() if getattr(settings, "USE_SPACES", False) else None
+        ),
+        max_length=255,
+        blank=True,
+        default="",
+    )
+    pdf_sha256 = models.CharField(max_length=64, blank=True, default="")
+    pdf_fingerprint = models.CharField(max_length=64, blank=True, default="")
+
     class Meta:
         ordering = ["-issued_at", "-id"]
-        indexes = [models.Index(fields=["user", "status", "-issued_at"])]
+        indexes = [
+            models.Index(fields=["user", "status", "-issued_at"]),
+            models.Index(
+                F("issued_at").desc(nulls_last=True),
+                F("id").desc(),
+                name="invoice_issued_keyset_idx",
+            ),
+            upper_trigram_index("number", "invoice_number_trgm"),
+        ]
         constraints = [
             UniqueConstraint(
                 fields=["number"],
@@ -3818,3 +4008,184 @@ class OrderEvent(models.Model):
 
     def __str__(self):
         return f"OrderEvent({self.order_id}, {self.event_type}) @ {self.created_at:%Y-%m-%d %H:%M:%S}"
+
+
+class OutboundMessage(models.Model):
+    """
+    Transactional outbox for customer/staff email and SMS.
+
+    Rows are written in the same transaction as the business change
+    (main.services.outbox.queue_email / queue_sms) and delivered in batches
+    by the drain_notification_outbox Celery task. Failed deliveries are
+    retried with backoff; after `max_attempts` the row is dead-lettered.
+    """
+
+    class Channel(models.TextChoices):
+        EMAIL = "email", "Email"
+        SMS = "sms", "SMS"
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        SENDING = "sending", "Sending"
+        SENT = "sent", "Sent"
+        DEAD = "dead", "Dead letter"
+
+    channel = models.CharField(max_length=10, choices=Channel.choices)
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    category = models.CharField(
+        max_length=50, blank=True, default="", help_text="e.g. otp, survey_rejected"
+    )
+    recipients = models.JSONField(default=list)
+    sender = models.CharField(max_length=255, blank=True, default="")
+    fallback_sender = models.CharField(max_length=255, blank=True, default="")
+    subject = models.CharField(max_length=255, blank=True, default="")
+    body = models.TextField(blank=True, default="")
+    html_body = models.TextField(blank=True, default="")
+    sensitive = models.BooleanField(
+        default=False, help_text="Body is erased once delivered or dead-lettered"
+    )
+
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+    provider_id = models.CharField(max_length=100, blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            # Drain query: due pending rows, oldest first
+            models.Index(
+                fields=["next_attempt_at", "id"],
+                condition=Q(status="pending"),
+                name="outbox_pending_due_idx",
+            ),
+            models.Index(
+                fields=["status", "-created_at"], name="outbox_status_created_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"OutboundMessage({self.id}, {self.channel}, {self.status})"
+
+
+class InvoiceExport(models.Model):
+    """
+    Bulk invoice PDF pack for finance: every invoice issued in
+    [period_start, period_end] (optionally filtered), zipped into private
+    storage by billing_management.tasks.export_invoices. The job reports its
+    progress on this row.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="invoice_exports",
+    )
+    period_start = models.DateField()
+    period_end = models.DateField()
+    filters = models.JSONField(
+        default=dict, blank=True, help_text='e.g. {"status": "paid", "user_id": 12}'
+    )
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    reused = models.PositiveIntegerField(default=0)
+    rendered = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+
+    archive = models.FileField(
+        storage=(
+            PrivateMediaStorage() if getattr(settings, "USE_SPACES", False) else None
+        ),
+        max_length=255,
+        blank=True,
+        default="",
+    )
+    error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"InvoiceExport({self.id}, {self.period_start}..{self.period_end})"
+
+    @property
+    def progress(self) -> int:
+        """Percentage of invoices processed."""
+        if not self.total:
+            return 100 if self.status == self.Status.DONE else 0
+        return int(self.processed * 100 / self.total)
+
+
+class JobRun(models.Model):
+    """
+    One run of a locked periodic job (``main.services.locks.job_lock``).
+
+    ``fencing_token`` is the lock generation the run held: tokens only grow,
+    so a run that sees a larger token for its job has lost the lock and must
+    stop writing. ``watermark`` is where the next run resumes (e.g. the last
+    processed ``created_at``); see ``main.services.job_runs``.
+    """
+
+    class Status(models.TextChoices):
+        RUNNING = "running", "Running"
+        SUCCEEDED = "succeeded", "Succeeded"
+        FAILED = "failed", "Failed"
+        LOST = "lost", "Lock lost"
+
+    job = models.CharField(max_length=100)
+    owner = models.CharField(
+        max_length=150, help_text="host:pid:token of the lock holder"
+    )
+    fencing_token = models.PositiveBigIntegerField()
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.RUNNING
+    )
+    error = models.TextField(blank=True, default="")
+    rows_scanned = models.PositiveIntegerField(default=0)
+    rows_changed = models.PositiveIntegerField(default=0)
+    watermark = models.JSONField(
+        null=True, blank=True, help_text="Where the next run of the job resumes"
+    )
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-started_at"]
+        indexes = [models.Index(fields=["job", "-started_at"])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["job", "fencing_token"], name="uniq_jobrun_job_fence"
+            )
+        ]
+
+    def __str__(self):
+        return f"JobRun({self.job} #{self.fencing_token}, {self.status})"
+
+    @property
+    def duration(self):
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
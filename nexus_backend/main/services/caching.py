@@ -0,0 +1,285 @@
+"""
+Two-tier cache for hot computed values: a per-process L1 in front of the
+shared Valkey cache (``CACHES["default"]``).
+
+``get_or_compute(key, compute, ttl=...)`` is the entry point:
+
+  - L1 (opt-in, ``l1=True``): a small bounded dict in worker memory, kept at
+    most ``CACHE_L1_SECONDS``. For keys read many times per second where a
+    few seconds of staleness is fine;
+  - shared: the value is stored with the time it expires and how long it took
+    to compute. Readers refresh it *before* it expires with a probability
+    that grows as expiry approaches and with the compute cost ("XFetch",
+    ``beta`` tunes it), so a hot key is usually recomputed by one reader
+    ahead of time instead of by every reader at once after it expired;
+  - single flight: on a miss only the process holding ``<key>:lock``
+    (``cache.add``) computes. Others serve the stale value they already have
+    (early refresh) or poll for the new one up to ``wait`` seconds, then
+    compute themselves rather than fail.
+
+Keys can live in a namespace: ``get_or_compute(key, ..., namespace="orders")``
+stores under ``orders:<version>:<key>`` and ``invalidate_namespace("orders")``
+moves every key of the namespace out of reach at once by bumping the version
+(published on commit, like ``config_cache.invalidate``). Workers re-read a
+namespace version at most every ``CACHE_L1_SECONDS``.
+
+The shared cache is best effort: if Valkey is unreachable the value is
+computed and returned uncached. L1 hands out the cached object itself, so
+callers must treat values as read-only.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from nexus_backend import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BETA = 1.0
+LOCK_SECONDS = 30
+WAIT_SECONDS = 5.0
+POLL_SECONDS = 0.05
+
+_NAMESPACE_KEY = "cache:ns:{name}"
+_MISSING = object()
+
+_lock = threading.Lock()
+# key -> (expires_at monotonic, value); oldest first
+_l1: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+# namespace -> (version, checked_at monotonic)
+_namespaces: Dict[str, Tuple[str, float]] = {}
+
+
+def _l1_seconds() -> float:
+    return float(getattr(settings, "CACHE_L1_SECONDS", 5))
+
+
+def _l1_max_entries() -> int:
+    return int(getattr(settings, "CACHE_L1_MAX_ENTRIES", 1000))
+
+
+def _observe(tier: str, result: str) -> None:
+    if metrics.enabled():
+        metrics.CACHE_LOOKUPS.labels(tier, result).inc()
+
+
+# ---------- L1 ----------
+def _l1_get(key: str):
+    now = time.monotonic()
+    with _lock:
+        entry = _l1.get(key)
+        if entry is None:
+            return _MISSING
+        if entry[0] <= now:
+            del _l1[key]
+            return _MISSING
+        _l1.move_to_end(key)
+        return entry[1]
+
+
+def _l1_set(key: str, value, seconds: float) -> None:
+    if seconds <= 0:
+        return
+    with _lock:
+        _l1[key] = (time.monotonic() + seconds, value)
+        _l1.move_to_end(key)
+        while len(_l1) > _l1_max_entries():
+            _l1.popitem(last=False)
+
+
+def clear_local() -> None:
+    """Forget L1 values and namespace versions (tests, management commands)."""
+    with _lock:
+        _l1.clear()
+        _namespaces.clear()
+
+
+# ---------- Namespaces ----------
+def _namespace_version(name: str) -> str:
+    now = time.monotonic()
+    entry = _namespaces.get(name)
+    if entry is not None and now - entry[1] < _l1_seconds():
+        return entry[0]
+    key = _NAMESPACE_KEY.format(name=name)
+    try:
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, uuid.uuid4().hex[:8], None)
+            version = cache.get(key)
+    except Exception:
+        version = None
+    if version is None:
+        # Shared cache unavailable: a throwaway version, so nothing is reused.
+        return uuid.uuid4().hex[:8]
+    with _lock:
+        _namespaces[name] = (version, now)
+    return version
+
+
+def make_key(key: str, namespace: Optional[str] = None) -> str:
+    """Shared-cache key of ``key``, in the current version of ``namespace``."""
+    if not namespace:
+        return key
+    return f"{namespace}:{_namespace_version(namespace)}:{key}"
+
+
+def _publish_namespace(name: str) -> None:
+    with _lock:
+        _namespaces.pop(name, None)
+    try:
+        cache.set(_NAMESPACE_KEY.format(name=name), uuid.uuid4().hex[:8], None)
+    except Exception:
+        logger.warning("cache: could not bump namespace %s", name, exc_info=True)
+
+
+def invalidate_namespace(name: str) -> None:
+    """
+    Drop every key of ``name``: this worker stops using them now, other
+    workers within ``CACHE_L1_SECONDS`` of the commit.
+    """
+    with _lock:
+        _namespaces.pop(name, None)
+    transaction.on_commit(lambda: _publish_namespace(name))
+
+
+def delete(key: str, namespace: Optional[str] = None) -> None:
+    full_key = make_key(key, namespace)
+    with _lock:
+        _l1.pop(full_key, None)
+    try:
+        cache.delete(full_key)
+    except Exception:
+        logger.warning("cache: delete %s failed", full_key, exc_info=True)
+
+
+# ---------- Shared tier ----------
+def _shared_get(key: str):
+    try:
+        return cache.get(key)
+    except Exception:
+        logger.warning("cache: get %s failed", key, exc_info=True)
+        _observe("shared", "error")
+        return None
+
+
+def _should_refresh(expires_at: float, delta: float, beta: float) -> bool:
+    """XFetch: refresh early with a probability rising towards expiry."""
+    if beta <= 0:
+        return time.time() >= expires_at
+    return time.time() - delta * beta * math.log(1.0 - random.random()) >= expires_at
+
+
+def _compute_and_store(key: str, compute: Callable[[], Any], ttl: int):
+    started = time.monotonic()
+    value = compute()
+    delta = time.monotonic() - started
+    try:
+        cache.set(key, (value, time.time() + ttl, delta), ttl)
+    except Exception:
+        logger.warning("cache: set %s failed", key, exc_info=True)
+        _observe("shared", "error")
+    return value
+
+
+def _acquire(lock_key: str, token: str, seconds: int) -> Optional[bool]:
+    """True if acquired, False if held elsewhere, None if the cache is down."""
+    try:
+        return bool(cache.add(lock_key, token, seconds))
+    except Exception:
+        logger.warning("cache: lock %s failed", lock_key, exc_info=True)
+        return None
+
+
+def _release(lock_key: str, token: str) -> None:
+    try:
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+    except Exception:
+        pass
+
+
+def get_or_compute(
+    key: str,
+    compute: Callable[[], Any],
+    *,
+    ttl: int,
+    namespace: Optional[str] = None,
+    l1: bool = False,
+    beta: float = DEFAULT_BETA,
+    lock_seconds: int = LOCK_SECONDS,
+    wait: float = WAIT_SECONDS,
+):
+    """
+    Cached ``compute()`` under ``key`` for ``ttl`` seconds (see module doc).
+
+    ``lock_seconds`` should exceed the worst compute time; ``wait`` bounds how
+    long a reader without a value waits for another process's computation.
+    """
+    full_key = make_key(key, namespace)
+    l1_seconds = min(_l1_seconds(), ttl) if l1 else 0
+
+    if l1:
+        value = _l1_get(full_key)
+        if value is not _MISSING:
+            _observe("l1", "hit")
+            return value
+
+    stale = _MISSING
+    entry = _shared_get(full_key)
+    if entry is not None:
+        value, expires_at, delta = entry
+        if not _should_refresh(expires_at, delta, beta):
+            _observe("shared", "hit")
+            _l1_set(full_key, value, l1_seconds)
+            return value
+        stale = value
+        _observe("shared", "early")
+    else:
+        _observe("shared", "miss")
+
+    lock_key = f"{full_key}:lock"
+    token = uuid.uuid4().hex
+    acquired = _acquire(lock_key, token, lock_seconds)
+    if acquired is None:  # shared cache down: compute uncached
+        return compute()
+    if acquired:
+        try:
+            value = _compute_and_store(full_key, compute, ttl)
+        finally:
+            _release(lock_key, token)
+        _l1_set(full_key, value, l1_seconds)
+        return value
+
+    if stale is not _MISSING:  # someone else is refreshing it
+        return stale
+
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(POLL_SECONDS)
+        entry = _shared_get(full_key)
+        if entry is not None:
+            _l1_set(full_key, entry[0], l1_seconds)
+            return entry[0]
+    logger.warning("cache: gave up waiting for %s, computing", full_key)
+    return _compute_and_store(full_key, compute, ttl)
+
+
+__all__ = [
+    "get_or_compute",
+    "make_key",
+    "delete",
+    "invalidate_namespace",
+    "clear_local",
+]
@@ -0,0 +1,308 @@
+"""
+Process-local cache for configuration singletons, tax rates and FX rates.
+
+``BillingConfig``, ``CompanySettings``, ``TaxRate`` and ``FxRate`` change a few
+times a year but are read on almost every billing/invoice code path, often
+inside per-row loops. This module keeps them in worker memory and only goes
+back to the database when a version stamp in the shared cache changes.
+
+Invalidation:
+  - every save/delete of one of these models writes a fresh stamp to the
+    shared cache (``cfgcache:v:<name>``) and drops the local copy;
+  - other processes notice the new stamp on their next re-check (at most
+    every ``CONFIG_CACHE_RECHECK_SECONDS``) and reload once;
+  - inside the transaction that made the change, reads are cached for that
+    thread only, and only while the change's on-commit hook is still queued:
+    a rollback (or a rolled-back savepoint) never leaves an uncommitted value
+    in the shared local copy.
+
+Values handed out are shallow copies, so callers may read attributes freely
+but must never ``save()`` them. Code that mutates a singleton (e.g. invoice
+numbering) must keep using ``select_for_update()`` on the model itself.
+
+Note: ``QuerySet.update()`` / ``bulk_create()`` bypass signals; call
+``invalidate(<name>)`` after such writes.
+"""
+
+from __future__ import annotations
+
+import copy
+import threading
+import time
+import uuid
+from bisect import bisect_right
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from main.models import BillingConfig, CompanySettings, FxRate, TaxRate
+
+BILLING_CONFIG = "billing_config"
+COMPANY_SETTINGS = "company_settings"
+TAX_RATES = "tax_rates"
+FX_RATES = "fx_rates"
+
+_VERSION_KEY = "cfgcache:v:{name}"
+
+_lock = threading.Lock()
+# name -> (stamp, value, checked_at)
+_local: Dict[str, Tuple[str, object, float]] = {}
+# Per thread, names invalidated in the open transaction:
+# pending[name] -> on-commit hooks, values[name] -> (hook, value)
+_txn = threading.local()
+
+
+def _recheck_seconds() -> float:
+    return float(getattr(settings, "CONFIG_CACHE_RECHECK_SECONDS", 5))
+
+
+def _current_stamp(name: str) -> str:
+    """Return the shared version stamp for ``name``, creating one if missing."""
+    key = _VERSION_KEY.format(name=name)
+    try:
+        stamp = cache.get(key)
+        if stamp is None:
+            cache.add(key, uuid.uuid4().hex, None)
+            stamp = cache.get(key)
+    except Exception:
+        stamp = None
+    # Shared cache unavailable: behave as if every re-check saw a new version.
+    return stamp or uuid.uuid4().hex
+
+
+def _txn_state() -> Tuple[Dict[str, list], Dict[str, tuple]]:
+    if not hasattr(_txn, "pending"):
+        _txn.pending, _txn.values = {}, {}
+    return _txn.pending, _txn.values
+
+
+def _queued_hooks() -> List[Callable]:
+    conn = transaction.get_connection()
+    if not conn.in_atomic_block:
+        return []
+    return [hook for _, hook, *_ in conn.run_on_commit]
+
+
+def _get_uncommitted(name: str, loader: Callable[[], object]):
+    """
+    ``(True, value)`` while this thread's transaction has an unpublished
+    change to ``name``; ``(False, None)`` otherwise.
+    """
+    pending, values = _txn_state()
+    hooks = pending.get(name)
+    if not hooks:
+        return False, None
+    queued = _queued_hooks()
+    live = [hook for hook in hooks if any(hook is q for q in queued)]
+    if not live:  # rolled back
+        pending.pop(name, None)
+        values.pop(name, None)
+        return False, None
+    pending[name] = live
+    cached = values.get(name)
+    if cached is not None and cached[0] is live[-1]:
+        return True, cached[1]
+    value = loader()
+    values[name] = (live[-1], value)
+    return True, value
+
+
+def _get(name: str, loader: Callable[[], object]):
+    uncommitted, value = _get_uncommitted(name, loader)
+    if uncommitted:
+        return value
+
+    now = time.monotonic()
+    entry = _local.get(name)
+    if entry is not None and now - entry[2] < _recheck_seconds():
+        return entry[1]
+
+    stamp = _current_stamp(name)
+    if entry is not None and entry[0] == stamp:
+        with _lock:
+            _local[name] = (stamp, entry[1], now)
+        return entry[1]
+
+    value = loader()
+    with _lock:
+        _local[name] = (stamp, value, now)
+    return value
+
+
+def _drop_local(name: str) -> None:
+    with _lock:
+        _local.pop(name, None)
+
+
+def _publish(name: str) -> None:
+    pending, values = _txn_state()
+    pending.pop(name, None)
+    values.pop(name, None)
+    _drop_local(name)
+    try:
+        cache.set(_VERSION_KEY.format(name=name), uuid.uuid4().hex, None)
+    except Exception:
+        pass
+
+
+def invalidate(name: str) -> None:
+    """
+    Drop the local copy now and publish a new version once the surrounding
+    transaction commits (immediately in autocommit mode), so other workers
+    never reload uncommitted or rolled-back values.
+    """
+    _drop_local(name)
+
+    def hook():
+        _publish(name)
+
+    if transaction.get_connection().in_atomic_block:
+        pending, values = _txn_state()
+        pending.setdefault(name, []).append(hook)
+        values.pop(name, None)
+    transaction.on_commit(hook)
+
+
+def clear_local() -> None:
+    """Forget every locally cached value (tests, management commands)."""
+    with _lock:
+        _local.clear()
+    _txn.pending, _txn.values = {}, {}
+
+
+# ---------- Singletons ----------
+def _load_billing_config() -> BillingConfig:
+    return BillingConfig.get()
+
+
+def _load_company_settings() -> CompanySettings:
+    return CompanySettings.get()
+
+
+def billing_config() -> BillingConfig:
+    """Read-only copy of ``BillingConfig.get()``."""
+    return copy.copy(_get(BILLING_CONFIG, _load_billing_config))
+
+
+def company_settings() -> CompanySettings:
+    """Read-only copy of ``CompanySettings.get()``."""
+    return copy.copy(_get(COMPANY_SETTINGS, _load_company_settings))
+
+
+# ---------- Tax rates ----------
+def _load_tax_rates() -> Dict[str, List[Decimal]]:
+    rates: Dict[str, List[Decimal]] = {}
+    for code, pct in TaxRate.objects.order_by("id").values_list(
+        "description", "percentage"
+    ):
+        rates.setdefault((code or "").upper(), []).append(
+            Decimal(pct) if pct is not None else None
+        )
+    return rates
+
+
+def tax_percentage(code: str, *, latest: bool = False) -> Optional[Decimal]:
+    """
+    Percentage configured for a tax code (e.g. Decimal("16.00") for VAT), or None.
+
+    Mirrors the two lookups used across the codebase:
+      - ``latest=False``: ``TaxRate.objects.filter(description=code).first()``
+      - ``latest=True``:  ``TaxRate.objects.filter(description=code).latest("id")``
+    """
+    values = _get(TAX_RATES, _load_tax_rates).get((code or "").upper())
+    if not values:
+        return None
+    return values[-1] if latest else values[0]
+
+
+def tax_percentages() -> List[Decimal]:
+    """All configured percentages in id order (e.g. for cumulative tax totals)."""
+    rates = _get(TAX_RATES, _load_tax_rates)
+    return [p for values in rates.values() for p in values if p is not None]
+
+
+# ---------- FX rates ----------
+class FxSeries:
+    """Sorted (date, rate) series answering "latest rate on or before date"."""
+
+    __slots__ = ("dates", "rates")
+
+    def __init__(self, rows):
+        self.dates: List[date] = []
+        self.rates: List[Decimal] = []
+        for d, r in rows:
+            self.dates.append(d)
+            self.rates.append(Decimal(r))
+
+    def rate_on(self, when) -> Optional[Decimal]:
+        if when is None:
+            return None
+        if isinstance(when, datetime):
+            when = when.date()
+        i = bisect_right(self.dates, when)
+        return self.rates[i - 1] if i else None
+
+    def __len__(self):
+        return len(self.dates)
+
+
+def _load_fx_rates() -> Dict[str, FxSeries]:
+    rows: Dict[str, list] = {}
+    for pair, d, r in FxRate.objects.order_by("pair", "date").values_list(
+        "pair", "date", "rate"
+    ):
+        rows.setdefault(pair, []).append((d, r))
+    return {pair: FxSeries(values) for pair, values in rows.items()}
+
+
+def fx_series(pair: str = "USD/CDF") -> FxSeries:
+    return _get(FX_RATES, _load_fx_rates).get(pair) or FxSeries(())
+
+
+def fx_rate(when_date, pair: str = "USD/CDF") -> Optional[Decimal]:
+    """Latest rate on or before ``when_date`` (same contract as ``FxRate.get_rate``)."""
+    return fx_series(pair).rate_on(when_date)
+
+
+# ---------- Invalidation hooks ----------
+_MODEL_NAMES = {
+    BillingConfig: BILLING_CONFIG,
+    CompanySettings: COMPANY_SETTINGS,
+    TaxRate: TAX_RATES,
+    FxRate: FX_RATES,
+}
+
+
+def _invalidate_on_change(sender, **kwargs):
+    invalidate(_MODEL_NAMES[sender])
+
+
+for _model in _MODEL_NAMES:
+    post_save.connect(
+        _invalidate_on_change,
+        sender=_model,
+        dispatch_uid=f"config_cache_save_{_model.__name__}",
+    )
+    post_delete.connect(
+        _invalidate_on_change,
+        sender=_model,
+        dispatch_uid=f"config_cache_delete_{_model.__name__}",
+    )
+
+
+__all__ = [
+    "billing_config",
+    "company_settings",
+    "tax_percentage",
+    "tax_percentages",
+    "fx_series",
+    "fx_rate",
+    "FxSeries",
+    "invalidate",
+    "clear_local",
+]
@@ -0,0 +1,182 @@
+"""
+Async HTTP for the FlexPay calls a customer waits on (payment status probes,
+payment initiation), so gateway latency holds a coroutine on the ASGI event
+loop instead of a web worker thread.
+
+Under ASGI (``nexus_backend.asgi``) each web process opens one ``aiohttp``
+session at lifespan startup (``open_pool``) and every request shares it: its
+connector keeps up to ``FLEXPAY_HTTP_POOL_SIZE`` keep-alive connections to
+the gateway, so in-flight probes scale with connections, not processes.
+Anywhere else (an async view adapted by the WSGI handler, tests, the shell)
+a call opens a short-lived session on the running event loop.
+
+Sync fallback: with ``FLEXPAY_ASYNC_HTTP=0``, or if aiohttp cannot be
+imported, calls go through ``requests`` in a worker thread. Celery tasks
+keep calling ``requests`` directly (``main.flexpaie``).
+
+Errors are raised as ``GatewayTimeout`` / ``GatewayError`` whichever client
+made the call; any HTTP status is a response, not an error.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+
+from nexus_backend import metrics
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[Tuple[asyncio.AbstractEventLoop, Any]] = None  # (loop, session)
+
+
+class GatewayError(Exception):
+    """The gateway could not be reached or the exchange failed."""
+
+
+class GatewayTimeout(GatewayError):
+    pass
+
+
+@dataclass(frozen=True)
+class GatewayResponse:
+    status_code: int
+    text: str = ""
+
+    @property
+    def content(self) -> bytes:
+        return self.text.encode()
+
+    def json(self) -> Any:
+        """Parsed body; ``ValueError`` if it is not JSON (like ``requests``)."""
+        return json.loads(self.text)
+
+
+def _aiohttp():
+    if not getattr(settings, "FLEXPAY_ASYNC_HTTP", True):
+        return None
+    try:
+        import aiohttp
+    except ImportError:  # pragma: no cover - aiohttp is in requirements.txt
+        return None
+    return aiohttp
+
+
+def _timeout(timeout: Optional[float]) -> float:
+    return float(timeout or getattr(settings, "FLEXPAY_HTTP_TIMEOUT", 15.0))
+
+
+# ---------- Shared session ----------
+async def open_pool() -> None:
+    """Open this process's shared session on the running loop (ASGI startup)."""
+    global _pool
+    aiohttp = _aiohttp()
+    if aiohttp is None or _pool is not None:
+        return
+    connector = aiohttp.TCPConnector(
+        limit=getattr(settings, "FLEXPAY_HTTP_POOL_SIZE", 100), ttl_dns_cache=300
+    )
+    _pool = (asyncio.get_running_loop(), aiohttp.ClientSession(connector=connector))
+
+
+async def close_pool() -> None:
+    """Close the shared session (ASGI shutdown)."""
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        await pool[1].close()
+
+
+def _shared_session():
+    """The shared session if it belongs to the running loop."""
+    pool = _pool
+    if pool is not None and pool[0] is asyncio.get_running_loop():
+        return pool[1]
+    return None
+
+
+# ---------- Calls ----------
+async def _aiohttp_request(aiohttp, method, url, *, timeout, **kwargs):
+    session = _shared_session()
+    own = session is None
+    if own:
+        session = aiohttp.ClientSession()
+    service = metrics.service_for_url(url)
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        async with session.request(
+            method, url, timeout=aiohttp.ClientTimeout(total=timeout), **kwargs
+        ) as resp:
+            response = GatewayResponse(resp.status, await resp.text())
+        outcome = metrics.status_class(response.status_code)
+        return response
+    except asyncio.TimeoutError as exc:
+        raise GatewayTimeout(f"{method} {url} timed out after {timeout}s") from exc
+    except aiohttp.ClientError as exc:
+        raise GatewayError(f"{method} {url}: {exc}") from exc
+    finally:
+        # requests calls are timed by metrics.instrument_requests.
+        if metrics.enabled():
+            metrics.EXTERNAL_CALL_LATENCY.labels(service, outcome).observe(
+                time.perf_counter() - started
+            )
+        if own:
+            await session.close()
+
+
+def _requests_request(method, url, *, timeout, **kwargs) -> GatewayResponse:
+    try:
+        resp = requests.request(method, url, timeout=timeout, **kwargs)
+    except requests.Timeout as exc:
+        raise GatewayTimeout(f"{method} {url} timed out after {timeout}s") from exc
+    except requests.RequestException as exc:
+        raise GatewayError(f"{method} {url}: {exc}") from exc
+    return GatewayResponse(resp.status_code, resp.text)
+
+
+async def request(
+    method: str,
+    url: str,
+    *,
+    json: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+) -> GatewayResponse:
+    """One gateway call; see the module doc for which client makes it."""
+    kwargs = {"json": json, "headers": headers, "timeout": _timeout(timeout)}
+    aiohttp = _aiohttp()
+    if aiohttp is None:
+        return await sync_to_async(_requests_request, thread_sensitive=False)(
+            method, url, **kwargs
+        )
+    return await _aiohttp_request(aiohttp, method, url, **kwargs)
+
+
+async def get(url: str, **kwargs) -> GatewayResponse:
+    return await request("GET", url, **kwargs)
+
+
+async def post(url: str, **kwargs) -> GatewayResponse:
+    return await request("POST", url, **kwargs)
+
+
+__all__ = [
+    "GatewayError",
+    "GatewayTimeout",
+    "GatewayResponse",
+    "open_pool",
+    "close_pool",
+    "request",
+    "get",
+    "post",
+]
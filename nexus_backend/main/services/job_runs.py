@@ -0,0 +1,94 @@
+"""
+Ledger of periodic job runs (``JobRun``), so beat tasks do work proportional
+to new data instead of rescanning their whole candidate set every tick.
+
+``job_lock`` (``main.services.locks``) records each run; the task sets what
+it did on ``lock.run``::
+
+    with job_lock("feedbacks.send_reminders") as lock:
+        since = job_runs.watermark_datetime("feedbacks.send_reminders")
+        rows = Model.objects.filter(created_at__gt=since) if since else ...
+        ...
+        lock.run.rows_scanned, lock.run.rows_changed = scanned, changed
+        lock.run.watermark = job_runs.datetime_mark(last_created_at)
+
+The next run resumes from the watermark of the last *successful* run, so a
+failed or lost run is simply redone. Tasks whose candidate set shrinks as it
+is processed (expired orders, feedbacks past their edit window) skip with a
+cheap ``exists()`` before taking the lock instead, and daily jobs use
+``ran_since`` to run at most once a day whatever beat or retries do.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from main.models import JobRun
+
+
+def last_success(job: str) -> Optional[JobRun]:
+    return (
+        JobRun.objects.filter(job=job, status=JobRun.Status.SUCCEEDED)
+        .order_by("-started_at")
+        .first()
+    )
+
+
+def watermark(job: str, default: Any = None) -> Any:
+    """Watermark left by the last successful run of ``job``."""
+    value = (
+        JobRun.objects.filter(job=job, status=JobRun.Status.SUCCEEDED)
+        .exclude(watermark=None)
+        .order_by("-started_at")
+        .values_list("watermark", flat=True)
+        .first()
+    )
+    return default if value is None else value
+
+
+def datetime_mark(value: datetime) -> dict:
+    """JSON watermark for a timestamp (``watermark_datetime`` reads it back)."""
+    return {"at": value.isoformat()}
+
+
+def watermark_datetime(job: str) -> Optional[datetime]:
+    value = watermark(job)
+    if not isinstance(value, dict) or not value.get("at"):
+        return None
+    return parse_datetime(value["at"])
+
+
+def ran_since(job: str, since: datetime) -> bool:
+    """Whether ``job`` already completed successfully at or after ``since``."""
+    return JobRun.objects.filter(
+        job=job, status=JobRun.Status.SUCCEEDED, started_at__gte=since
+    ).exists()
+
+
+def prune(days: Optional[int] = None) -> int:
+    """
+    Delete runs older than ``days`` (``JOB_RUN_RETENTION_DAYS``), keeping the
+    last successful run of every job so watermarks survive.
+    """
+    if days is None:
+        days = getattr(settings, "JOB_RUN_RETENTION_DAYS", 30)
+    old = JobRun.objects.filter(started_at__lt=timezone.now() - timedelta(days=days))
+    jobs = old.order_by().values_list("job", flat=True).distinct()
+    keep = [run.pk for run in map(last_success, list(jobs)) if run is not None]
+    deleted, _ = old.exclude(pk__in=keep).delete()
+    return deleted
+
+
+__all__ = [
+    "last_success",
+    "watermark",
+    "datetime_mark",
+    "watermark_datetime",
+    "ran_since",
+    "prune",
+]
@@ -0,0 +1,330 @@
+"""
+Distributed locks on Valkey with owner tokens, lease renewal and fencing.
+
+A ``DistributedLock`` is a key ``lock:<name>`` holding the owner's token
+(``host:pid:random``) with a TTL:
+
+  - acquire: ``SET NX PX`` and, in the same Lua script, ``INCR`` of
+    ``lock:<name>:fence``. The counter only grows, so the returned value is
+    a fencing token: a later holder always has a larger one;
+  - release / renew: Lua compare-and-delete / compare-and-pexpire, so a run
+    that outlived its lease never deletes or extends someone else's lock;
+  - heartbeat: while held, a daemon thread renews the lease every ``ttl/3``.
+    If a renewal finds the lock gone the lock is marked lost and
+    ``ensure_held()`` raises ``LockLost``: long jobs call it between
+    partitions and stop before writing with a stale lease.
+
+``job_lock(job)`` is what Celery tasks use: it acquires the lock and records
+the run (``JobRun``: owner, fencing token, outcome, and the rows and
+watermark the task sets on ``lock.run``). Wait and hold times and
+lost leases are exported (``nexus_lock_*`` in ``nexus_backend.metrics``).
+
+Without a redis-protocol cache (LocMemCache in tests and local dev) locks
+fall back to the Django cache and are only exclusive within one process
+(``main.services.valkey``).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from main.models import JobRun
+from main.services import valkey
+from nexus_backend import metrics
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "lock:"
+DEFAULT_TTL = 60
+POLL_SECONDS = 0.1
+
+_ACQUIRE = """
+if redis.call('set', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return redis.call('incr', KEYS[2])
+end
+return 0
+"""
+_RELEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+_RENEW = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class LockLost(RuntimeError):
+    """The lease expired or was taken over while the job was still running."""
+
+
+# ---------- Backends ----------
+class _ValkeyBackend(valkey.ScriptBackend):
+    SCRIPTS = {"_acquire": _ACQUIRE, "_release": _RELEASE, "_renew": _RENEW}
+
+    def acquire(self, key: str, token: str, ttl: float) -> int:
+        return int(
+            self._acquire(keys=[key, f"{key}:fence"], args=[token, int(ttl * 1000)])
+        )
+
+    def release(self, key: str, token: str) -> bool:
+        return bool(self._release(keys=[key], args=[token]))
+
+    def renew(self, key: str, token: str, ttl: float) -> bool:
+        return bool(self._renew(keys=[key], args=[token, int(ttl * 1000)]))
+
+    def held(self) -> List[Dict]:
+        rows = []
+        for raw in self.client.scan_iter(match=f"{KEY_PREFIX}*", count=500):
+            key = valkey.text(raw)
+            if key.endswith(":fence"):
+                continue
+            pipe = self.client.pipeline()
+            pipe.get(key)
+            pipe.pttl(key)
+            owner, pttl = pipe.execute()
+            if owner is None:
+                continue
+            rows.append(
+                {
+                    "name": key[len(KEY_PREFIX) :],
+                    "owner": valkey.text(owner),
+                    "expires_in": max(pttl, 0) / 1000,
+                }
+            )
+        return rows
+
+
+class _CacheBackend:
+    """Django-cache fallback; atomic within this process only."""
+
+    _mutex = threading.Lock()
+
+    def acquire(self, key: str, token: str, ttl: float) -> int:
+        with self._mutex:
+            if not cache.add(key, token, ttl):
+                return 0
+            cache.add(f"{key}:fence", 0, None)
+            return cache.incr(f"{key}:fence")
+
+    def release(self, key: str, token: str) -> bool:
+        with self._mutex:
+            if cache.get(key) != token:
+                return False
+            cache.delete(key)
+            return True
+
+    def renew(self, key: str, token: str, ttl: float) -> bool:
+        with self._mutex:
+            if cache.get(key) != token:
+                return False
+            return bool(cache.touch(key, ttl))
+
+    def held(self) -> List[Dict]:
+        return []  # the cache API cannot list keys
+
+
+_backend = valkey.LazyBackend(_ValkeyBackend, _CacheBackend)
+
+
+def _get_backend():
+    return _backend.get()
+
+
+def held_locks() -> List[Dict]:
+    """Locks currently held: name, owner (host:pid:token) and seconds left."""
+    return _get_backend().held()
+
+
+# ---------- Lock ----------
+def _owner_token() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:12]}"
+
+
+class DistributedLock:
+    """
+    Lease on ``name``; true once acquired. ``label`` names it in metrics
+    (keep it low-cardinality: the job, not a per-day key).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float = DEFAULT_TTL,
+        *,
+        heartbeat: bool = True,
+        label: Optional[str] = None,
+    ):
+        self.name = name
+        self.key = f"{KEY_PREFIX}{name}"
+        self.ttl = ttl
+        self.label = label or name
+        self.token = _owner_token()
+        self.fencing_token: Optional[int] = None
+        self.run: Optional[JobRun] = None  # set by job_lock
+        self._heartbeat = heartbeat
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lost = threading.Event()
+        self._acquired_at: Optional[float] = None
+
+    def __bool__(self) -> bool:
+        return self.fencing_token is not None
+
+    @property
+    def lost(self) -> bool:
+        return self._lost.is_set()
+
+    def acquire(self, wait: float = 0) -> bool:
+        """Try for up to ``wait`` seconds; False if another owner holds it."""
+        started = time.monotonic()
+        deadline = started + wait
+        backend = _get_backend()
+        while True:
+            fence = backend.acquire(self.key, self.token, self.ttl)
+            if fence or time.monotonic() >= deadline:
+                break
+            time.sleep(POLL_SECONDS)
+        waited = time.monotonic() - started
+        if metrics.enabled():
+            outcome = "acquired" if fence else "busy"
+            metrics.LOCK_WAIT.labels(self.label, outcome).observe(waited)
+        if not fence:
+            return False
+        self.fencing_token = fence
+        self._acquired_at = time.monotonic()
+        if self._heartbeat:
+            self._thread = threading.Thread(
+                target=self._beat, name=f"lock-heartbeat:{self.name}", daemon=True
+            )
+            self._thread.start()
+        return True
+
+    def renew(self) -> bool:
+        """Extend the lease by ``ttl``; False (and lost) if no longer ours."""
+        if _get_backend().renew(self.key, self.token, self.ttl):
+            return True
+        self._mark_lost()
+        return False
+
+    def _beat(self):
+        last_ok = time.monotonic()
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                if not self.renew():
+                    return
+                last_ok = time.monotonic()
+            except Exception:
+                # Transient (Valkey restart, network): the lease may still hold.
+                logger.warning("lock %s: renewal failed", self.name, exc_info=True)
+                if time.monotonic() - last_ok >= self.ttl:
+                    self._mark_lost()
+                    return
+
+    def _mark_lost(self):
+        if self._lost.is_set():
+            return
+        self._lost.set()
+        logger.error("lock %s (fence %s) was lost", self.name, self.fencing_token)
+        if metrics.enabled():
+            metrics.LOCKS_LOST.labels(self.label).inc()
+
+    def ensure_held(self) -> None:
+        """Raise ``LockLost`` if the lease is gone; call between partitions."""
+        if self.lost:
+            raise LockLost(f"lock {self.name} (fence {self.fencing_token}) was lost")
+
+    def release(self) -> None:
+        if not self:
+            return
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        try:
+            if not _get_backend().release(self.key, self.token):
+                self._mark_lost()
+        except Exception:
+            logger.warning("lock %s: release failed", self.name, exc_info=True)
+        if metrics.enabled() and self._acquired_at is not None:
+            held = time.monotonic() - self._acquired_at
+            metrics.LOCK_HOLD.labels(self.label).observe(held)
+        self._acquired_at = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+
+@contextmanager
+def job_lock(job: str, ttl: float = DEFAULT_TTL, *, wait: float = 0):
+    """
+    Run ``job`` exclusively and record it as a ``JobRun``. Yields the lock,
+    false when another worker holds it (nothing is recorded then)::
+
+        with job_lock("billing.cutoff") as lock:
+            if not lock:
+                return "Skip: lock held"
+            for chunk in ...:
+                lock.ensure_held()
+                ...
+            lock.run.rows_scanned, lock.run.rows_changed = scanned, changed
+    """
+    lock = DistributedLock(job, ttl, label=job)
+    if not lock.acquire(wait=wait):
+        yield lock
+        return
+    run = JobRun.objects.create(
+        job=job, owner=lock.token, fencing_token=lock.fencing_token
+    )
+    lock.run = run
+    try:
+        yield lock
+    except LockLost as exc:
+        run.status, run.error = JobRun.Status.LOST, str(exc)
+        raise
+    except BaseException as exc:
+        run.status, run.error = JobRun.Status.FAILED, repr(exc)[:2000]
+        raise
+    else:
+        run.status = JobRun.Status.SUCCEEDED
+    finally:
+        lock.release()  # marks the lock lost if the lease had already expired
+        if run.status == JobRun.Status.SUCCEEDED and lock.lost:
+            run.status = JobRun.Status.LOST
+        run.finished_at = timezone.now()
+        run.save(
+            update_fields=[
+                "status",
+                "error",
+                "rows_scanned",
+                "rows_changed",
+                "watermark",
+                "finished_at",
+            ]
+        )
+
+
+__all__ = [
+    "DistributedLock",
+    "LockLost",
+    "job_lock",
+    "held_locks",
+]
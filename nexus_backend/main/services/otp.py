@@ -0,0 +1,429 @@
+"""
+One-time codes (signup verification, login 2FA) on the shared cache, so a
+login spike or an SMS-bombing attempt costs Valkey round-trips instead of
+database writes and duplicate Twilio sends.
+
+A challenge is a hash ``otp:ch:<id>`` holding the user, the purpose, an HMAC
+of the code (never the code itself), the attempt count and the id of its
+``OTPAudit`` row. It expires after ``OTP["TTL_SECONDS"]``; the user's current
+challenge is found through ``otp:cur:<purpose>:<user>``.
+
+  - issue: at most one send per user and purpose per
+    ``RESEND_COOLDOWN_SECONDS`` (``SET NX PX``), and sends are counted in
+    sliding windows per user, phone and client IP (``SEND_LIMITS``, one Lua
+    script: all windows admit the send or none records it). A login retried
+    inside the cooldown gets its live challenge back without a new code;
+  - resend: a new code under the same challenge id, or ``OTPThrottled``
+    inside the cooldown;
+  - verify: one Lua script checks the code, counts the attempt and deletes
+    the challenge on success or at ``MAX_ATTEMPTS``, so parallel guesses
+    cannot go past the limit. Verifications are windowed per IP too
+    (``VERIFY_LIMITS``).
+
+The database only gets the ``OTPAudit`` row: created on the first send,
+updated on resends and when the challenge is verified or locked. Events are
+counted in ``nexus_otp_events`` (``nexus_backend.metrics``).
+
+Without a redis-protocol cache (LocMemCache in tests and local dev) the same
+logic runs on the Django cache under a process mutex, like
+``main.services.locks`` (``main.services.valkey``).
+"""
+
+from __future__ import annotations
+
+import math
+import secrets
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+
+from main.models import OTPAudit, OTPVerification
+from main.services import valkey
+from nexus_backend import metrics
+
+KEY_PREFIX = "otp:"
+CODE_DIGITS = 6
+
+DEFAULTS = {
+    "TTL_SECONDS": 300,
+    "MAX_ATTEMPTS": 5,
+    "RESEND_COOLDOWN_SECONDS": 60,
+    # scope -> (sends, window seconds)
+    "SEND_LIMITS": {"user": (5, 3600), "phone": (5, 3600), "ip": (20, 3600)},
+    "VERIFY_LIMITS": {"ip": (30, 600)},
+    "AUDIT_RETENTION_DAYS": 90,
+}
+
+SIGNUP = OTPAudit.Purpose.SIGNUP
+LOGIN = OTPAudit.Purpose.LOGIN
+
+VERIFIED = "verified"
+INVALID = "invalid"
+LOCKED = "locked"
+EXPIRED = "expired"
+
+_HIT = """
+local now = tonumber(ARGV[1])
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[2 * i + 1])
+    local window = tonumber(ARGV[2 * i + 2])
+    redis.call('zremrangebyscore', key, '-inf', now - window)
+    if redis.call('zcard', key) >= limit then
+        local oldest = redis.call('zrange', key, 0, 0, 'WITHSCORES')
+        wait = math.max(wait, tonumber(oldest[2]) + window - now)
+    end
+end
+if wait > 0 then
+    return wait
+end
+for i, key in ipairs(KEYS) do
+    redis.call('zadd', key, now, ARGV[2])
+    redis.call('pexpire', key, ARGV[2 * i + 2])
+end
+return 0
+"""
+_COOLDOWN = """
+if redis.call('set', KEYS[1], '1', 'NX', 'PX', ARGV[1]) then
+    return 0
+end
+return redis.call('pttl', KEYS[1])
+"""
+_CHECK = """
+local stored = redis.call('hmget', KEYS[1], 'user', 'purpose', 'digest', 'audit')
+if not stored[1] or stored[1] ~= ARGV[1] or stored[2] ~= ARGV[2] then
+    return {'expired', 0, ''}
+end
+local attempts = redis.call('hincrby', KEYS[1], 'attempts', 1)
+if stored[3] == ARGV[3] then
+    redis.call('del', KEYS[1])
+    return {'verified', attempts, stored[4]}
+end
+if attempts >= tonumber(ARGV[4]) then
+    redis.call('del', KEYS[1])
+    return {'locked', attempts, stored[4]}
+end
+return {'invalid', attempts, stored[4]}
+"""
+
+Limit = Tuple[str, int, float]  # key, max hits, window seconds
+
+
+class OTPThrottled(Exception):
+    """Too many sends or verifications; retry after ``retry_after`` seconds."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(
+            f"Too many requests. Try again in {self.retry_after} seconds."
+        )
+
+
+@dataclass(frozen=True)
+class Issued:
+    challenge_id: str
+    code: Optional[str]  # None: the live challenge was reused, send nothing
+
+
+@dataclass(frozen=True)
+class Verification:
+    status: str
+    attempts: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.status == VERIFIED
+
+
+def _config(key: str):
+    return getattr(settings, "OTP", {}).get(key, DEFAULTS[key])
+
+
+# ---------- Backends ----------
+class _ValkeyBackend(valkey.ScriptBackend):
+    SCRIPTS = {"_hit": _HIT, "_cooldown": _COOLDOWN, "_check": _CHECK}
+
+    def hit(self, limits: Sequence[Limit]) -> float:
+        args: List = [int(time.time() * 1000), uuid.uuid4().hex]
+        for _, limit, window in limits:
+            args += [limit, int(window * 1000)]
+        return int(self._hit(keys=[key for key, _, _ in limits], args=args)) / 1000
+
+    def cooldown(self, key: str, seconds: float) -> float:
+        left = int(self._cooldown(keys=[key], args=[int(seconds * 1000)]))
+        return max(left, 0) / 1000
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(key)
+        return None if value is None else valkey.text(value)
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        self.client.set(key, value, px=int(ttl * 1000))
+
+    def delete(self, *keys: str) -> None:
+        self.client.delete(*keys)
+
+    def load(self, key: str) -> Optional[Dict[str, str]]:
+        fields = self.client.hgetall(key)
+        return {valkey.text(k): valkey.text(v) for k, v in fields.items()} or None
+
+    def store(self, key: str, fields: Dict[str, str], ttl: float) -> None:
+        pipe = self.client.pipeline()
+        pipe.delete(key)
+        pipe.hset(key, mapping=fields)
+        pipe.pexpire(key, int(ttl * 1000))
+        pipe.execute()
+
+    def check(
+        self, key: str, user: str, purpose: str, digest: str, max_attempts: int
+    ) -> Tuple[str, int, str]:
+        status, attempts, audit = self._check(
+            keys=[key], args=[user, purpose, digest, max_attempts]
+        )
+        return valkey.text(status), int(attempts), valkey.text(audit)
+
+
+class _CacheBackend:
+    """Django-cache fallback; atomic within this process only."""
+
+    _mutex = threading.Lock()
+
+    def hit(self, limits: Sequence[Limit]) -> float:
+        now = time.time()
+        with self._mutex:
+            windows, wait = [], 0.0
+            for key, limit, window in limits:
+                hits = [t for t in cache.get(key, []) if t > now - window]
+                if len(hits) >= limit:
+                    wait = max(wait, hits[0] + window - now)
+                windows.append((key, hits, window))
+            if wait:
+                return wait
+            for key, hits, window in windows:
+                cache.set(key, hits + [now], window)
+            return 0.0
+
+    def cooldown(self, key: str, seconds: float) -> float:
+        now = time.time()
+        with self._mutex:
+            until = cache.get(key)
+            if until is not None and until > now:
+                return until - now
+            cache.set(key, now + seconds, seconds)
+            return 0.0
+
+    def get(self, key: str) -> Optional[str]:
+        return cache.get(key)
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        cache.set(key, value, ttl)
+
+    def delete(self, *keys: str) -> None:
+        cache.delete_many(keys)
+
+    def load(self, key: str) -> Optional[Dict[str, str]]:
+        entry = cache.get(key)
+        return dict(entry["fields"]) if entry else None
+
+    def store(self, key: str, fields: Dict[str, str], ttl: float) -> None:
+        fields = {k: str(v) for k, v in fields.items()}
+        cache.set(key, {"fields": fields, "expires": time.time() + ttl}, ttl)
+
+    def check(
+        self, key: str, user: str, purpose: str, digest: str, max_attempts: int
+    ) -> Tuple[str, int, str]:
+        with self._mutex:
+            entry = cache.get(key)
+            fields = entry["fields"] if entry else {}
+            if fields.get("user") != user or fields.get("purpose") != purpose:
+                return EXPIRED, 0, ""
+            attempts = int(fields["attempts"]) + 1
+            fields["attempts"] = str(attempts)
+            if fields["digest"] == digest:
+                status = VERIFIED
+            elif attempts >= max_attempts:
+                status = LOCKED
+            else:
+                left = entry["expires"] - time.time()
+                cache.set(key, entry, max(left, 1))
+                return INVALID, attempts, fields["audit"]
+            cache.delete(key)
+            return status, attempts, fields["audit"]
+
+
+_backend = valkey.LazyBackend(_ValkeyBackend, _CacheBackend)
+
+
+def _get_backend():
+    return _backend.get()
+
+
+# ---------- Helpers ----------
+def _key(*parts) -> str:
+    return KEY_PREFIX + ":".join(str(p) for p in parts)
+
+
+def _digest(challenge_id: str, code: str) -> str:
+    return salted_hmac(
+        "main.services.otp", f"{challenge_id}:{code}", algorithm="sha256"
+    ).hexdigest()
+
+
+def _new_code() -> str:
+    return f"{secrets.randbelow(10 ** CODE_DIGITS):0{CODE_DIGITS}d}"
+
+
+def _count(purpose: str, event: str) -> None:
+    if metrics.enabled():
+        metrics.OTP_EVENTS.labels(purpose, event).inc()
+
+
+def _limits(setting: str, scopes: Dict[str, object]) -> List[Limit]:
+    limits = []
+    for scope, (limit, window) in _config(setting).items():
+        value = scopes.get(scope)
+        if value:
+            limits.append((_key("rl", setting.lower(), scope, value), limit, window))
+    return limits
+
+
+# ---------- Challenges ----------
+def issue(user, purpose: str, *, phone: str = "", ip: Optional[str] = None) -> Issued:
+    """
+    Start a challenge and return its code to send. Inside the cooldown the
+    live challenge is returned with ``code=None`` (nothing to send).
+    """
+    return _issue(user, purpose, phone, ip, reuse=True)
+
+
+def resend(user, purpose: str, *, phone: str = "", ip: Optional[str] = None) -> Issued:
+    """A new code for the live challenge (or a new challenge if it expired)."""
+    return _issue(user, purpose, phone, ip, reuse=False)
+
+
+def _issue(user, purpose, phone, ip, *, reuse) -> Issued:
+    backend = _get_backend()
+    ttl = _config("TTL_SECONDS")
+    pointer = _key("cur", purpose, user.pk)
+    challenge_id = backend.get(pointer)
+    live = backend.load(_key("ch", challenge_id)) if challenge_id else None
+
+    cooldown = _config("RESEND_COOLDOWN_SECONDS")
+    wait = backend.cooldown(_key("cd", purpose, user.pk), cooldown) if cooldown else 0
+    if wait and reuse and live:
+        _count(purpose, "reused")
+        return Issued(challenge_id, None)
+    if not wait:
+        scopes = {"user": user.pk, "phone": phone, "ip": ip}
+        wait = backend.hit(_limits("SEND_LIMITS", scopes))
+    if wait:
+        _count(purpose, "throttled")
+        raise OTPThrottled(wait)
+
+    if live:
+        audit_id = live["audit"]
+        OTPAudit.objects.filter(pk=audit_id).update(sends=F("sends") + 1)
+    else:
+        challenge_id = uuid.uuid4().hex
+        audit_id = OTPAudit.objects.create(
+            user=user, purpose=purpose, challenge=challenge_id, ip=ip or None
+        ).pk
+    code = _new_code()
+    fields = {
+        "user": str(user.pk),
+        "purpose": purpose,
+        "digest": _digest(challenge_id, code),
+        "attempts": "0",
+        "audit": str(audit_id),
+    }
+    backend.store(_key("ch", challenge_id), fields, ttl)
+    backend.set(pointer, challenge_id, ttl)
+    _count(purpose, "sent")
+    return Issued(challenge_id, code)
+
+
+def verify(
+    user,
+    purpose: str,
+    code: str,
+    *,
+    challenge_id: Optional[str] = None,
+    ip: Optional[str] = None,
+) -> Verification:
+    """
+    Check ``code`` against ``challenge_id`` (default: the user's current
+    challenge). A verified or locked challenge is gone; ``EXPIRED`` means
+    there is nothing left to verify against.
+    """
+    backend = _get_backend()
+    limits = _limits("VERIFY_LIMITS", {"ip": ip})
+    wait = backend.hit(limits) if limits else 0
+    if wait:
+        _count(purpose, "throttled")
+        raise OTPThrottled(wait)
+
+    pointer = _key("cur", purpose, user.pk)
+    challenge_id = challenge_id or backend.get(pointer)
+    if not challenge_id:
+        _count(purpose, EXPIRED)
+        return Verification(EXPIRED)
+    status, attempts, audit_id = backend.check(
+        _key("ch", challenge_id),
+        str(user.pk),
+        purpose,
+        _digest(challenge_id, code),
+        _config("MAX_ATTEMPTS"),
+    )
+    if status in (VERIFIED, LOCKED) and audit_id:
+        OTPAudit.objects.filter(pk=audit_id).update(
+            status=status, attempts=attempts, resolved_at=timezone.now()
+        )
+    if status == VERIFIED:
+        # The next login may send a code right away.
+        backend.delete(pointer, _key("cd", purpose, user.pk))
+    _count(purpose, status)
+    return Verification(status, attempts)
+
+
+# ---------- Retention ----------
+def prune(days: Optional[int] = None) -> int:
+    """
+    Delete ``OTPAudit`` rows older than ``days`` (``AUDIT_RETENTION_DAYS``)
+    and legacy ``OTPVerification`` rows past their expiry.
+    """
+    if days is None:
+        days = _config("AUDIT_RETENTION_DAYS")
+    now = timezone.now()
+    audits, _ = OTPAudit.objects.filter(
+        created_at__lt=now - timedelta(days=days)
+    ).delete()
+    legacy, _ = OTPVerification.objects.filter(
+        created_at__lt=now - timedelta(seconds=_config("TTL_SECONDS"))
+    ).delete()
+    return audits + legacy
+
+
+__all__ = [
+    "SIGNUP",
+    "LOGIN",
+    "VERIFIED",
+    "INVALID",
+    "LOCKED",
+    "EXPIRED",
+    "OTPThrottled",
+    "Issued",
+    "Verification",
+    "issue",
+    "resend",
+    "verify",
+    "prune",
+]
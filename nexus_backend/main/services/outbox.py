@@ -0,0 +1,361 @@
+"""
+Notification outbox for transactional email and SMS.
+
+Request handlers never talk to SMTP or Twilio. They call ``queue_email`` /
+``queue_sms``, which insert an ``OutboundMessage`` row in the caller's
+transaction: a rolled-back change sends nothing, and a committed one can't
+lose its message. Once the transaction commits the drain task is nudged; beat
+also runs it every few seconds as a sweeper.
+
+``drain`` claims due rows with ``SELECT ... FOR UPDATE SKIP LOCKED`` (so
+several workers can drain at once) and delivers each batch over a single SMTP
+connection and a single, process-wide Twilio client, paced per channel by
+``NOTIFICATION_OUTBOX["RATE_LIMITS"]``. Failures are retried with exponential
+backoff; permanent errors (refused recipient, Twilio 4xx) and messages out of
+attempts are dead-lettered and can be requeued from the admin. Bodies of
+``sensitive`` messages (OTPs, passwords) are erased once they leave the queue.
+"""
+
+from __future__ import annotations
+
+import logging
+import smtplib
+import time
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Union
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from main.models import OutboundMessage
+from nexus_backend import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "BATCH_SIZE": 100,
+    "RATE_LIMITS": {"email": 10.0, "sms": 5.0},
+    "MAX_ATTEMPTS": 5,
+    "SMS_SENDER": "NEXUS",
+}
+# A worker that died mid-batch leaves rows in "sending"; reclaim them after this.
+CLAIM_TIMEOUT = timedelta(minutes=10)
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 60 * 60
+ERROR_MAX_LENGTH = 2000
+
+Status = OutboundMessage.Status
+Channel = OutboundMessage.Channel
+
+
+def _config(key: str):
+    return getattr(settings, "NOTIFICATION_OUTBOX", {}).get(key, DEFAULTS[key])
+
+
+# ---------- Queueing ----------
+def _nudge():
+    """Ask a worker to drain now (beat picks the rows up if the broker is down)."""
+    from main.tasks import drain_notification_outbox
+
+    try:
+        drain_notification_outbox.delay()
+    except Exception:
+        logger.warning("Outbox drain could not be queued; beat will pick it up")
+
+
+def _enqueue(**fields) -> OutboundMessage:
+    fields.setdefault("max_attempts", _config("MAX_ATTEMPTS"))
+    message = OutboundMessage.objects.create(**fields)
+    transaction.on_commit(_nudge)
+    return message
+
+
+def queue_email(
+    subject: str,
+    body: str,
+    recipients: Union[str, Iterable[str]],
+    *,
+    from_email: Optional[str] = None,
+    html_body: str = "",
+    category: str = "",
+    sensitive: bool = False,
+) -> Optional[OutboundMessage]:
+    """Queue one email (all recipients on the same message). None if no recipient."""
+    if isinstance(recipients, str):
+        recipients = [recipients]
+    recipients = [r for r in recipients if r]
+    if not recipients:
+        return None
+    return _enqueue(
+        channel=Channel.EMAIL,
+        category=category,
+        recipients=recipients,
+        sender=from_email or "",
+        subject=subject,
+        body=body or "",
+        html_body=html_body or "",
+        sensitive=sensitive,
+    )
+
+
+def queue_sms(
+    to: str,
+    body: str,
+    *,
+    sender: Optional[str] = None,
+    fallback_sender: Optional[str] = None,
+    category: str = "",
+    sensitive: bool = False,
+) -> Optional[OutboundMessage]:
+    """
+    Queue one SMS. ``sender`` defaults to the alphanumeric sender ID; delivery
+    falls back to ``fallback_sender`` (default: TWILIO_PHONE_NUMBER) where the
+    destination rejects alphanumeric senders.
+    """
+    to = (to or "").strip()
+    if not to:
+        return None
+    if not to.startswith("+"):
+        to = f"+{to}"
+    return _enqueue(
+        channel=Channel.SMS,
+        category=category,
+        recipients=[to],
+        sender=sender or _config("SMS_SENDER") or "",
+        fallback_sender=(
+            fallback_sender or getattr(settings, "TWILIO_PHONE_NUMBER", "") or ""
+        ),
+        body=body,
+        sensitive=sensitive,
+    )
+
+
+# ---------- Providers ----------
+_twilio_clients: Dict[tuple, object] = {}
+
+
+def twilio_client():
+    """One Twilio client (and HTTP session) per process and credential pair."""
+    sid = getattr(settings, "TWILIO_ACCOUNT_SID", "")
+    token = getattr(settings, "TWILIO_AUTH_TOKEN", "")
+    if not (sid and token):
+        raise RuntimeError("Twilio credentials are not configured")
+    client = _twilio_clients.get((sid, token))
+    if client is None:
+        from twilio.rest import Client
+
+        client = _twilio_clients[(sid, token)] = Client(sid, token)
+    return client
+
+
+def _send_sms(client, message: OutboundMessage) -> str:
+    senders = [s for s in (message.sender, message.fallback_sender) if s]
+    if not senders:
+        raise RuntimeError("No SMS sender configured")
+    error = None
+    for from_ in dict.fromkeys(senders):
+        try:
+            sent = client.messages.create(
+                body=message.body, from_=from_, to=message.recipients[0]
+            )
+        except Exception as exc:
+            error = exc
+            continue
+        if getattr(sent, "sid", None):
+            return sent.sid
+        error = RuntimeError("Twilio returned no message SID")
+    raise error
+
+
+def _send_email(connection, message: OutboundMessage) -> str:
+    email = EmailMultiAlternatives(
+        message.subject,
+        message.body,
+        message.sender or settings.DEFAULT_FROM_EMAIL,
+        list(message.recipients),
+        connection=connection,
+    )
+    if message.html_body:
+        email.attach_alternative(message.html_body, "text/html")
+    with metrics.external_call("smtp"):
+        email.send()
+    return ""
+
+
+def _is_permanent(exc: Exception) -> bool:
+    """Errors retrying can't fix: refused recipients, Twilio 4xx (bar 429)."""
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return True
+    status = getattr(exc, "status", None)
+    return isinstance(status, int) and 400 <= status < 500 and status != 429
+
+
+class _Pacer:
+    """Spaces sends to at most ``per_second`` (0 or None: unlimited)."""
+
+    def __init__(self, per_second: Optional[float]):
+        self.interval = 1.0 / per_second if per_second else 0.0
+        self.next_at = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if now < self.next_at:
+            time.sleep(self.next_at - now)
+        self.next_at = max(now, self.next_at) + self.interval
+
+
+# ---------- Draining ----------
+def backoff(attempts: int) -> timedelta:
+    seconds = BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, BACKOFF_MAX_SECONDS))
+
+
+def claim(batch_size: int) -> List[OutboundMessage]:
+    """Lock, mark as sending and return up to ``batch_size`` due messages."""
+    now = timezone.now()
+    due = Q(status=Status.PENDING, next_attempt_at__lte=now) | Q(
+        status=Status.SENDING, claimed_at__lt=now - CLAIM_TIMEOUT
+    )
+    with transaction.atomic():
+        ids = list(
+            OutboundMessage.objects.select_for_update(skip_locked=True)
+            .filter(due)
+            .order_by("next_attempt_at", "id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        OutboundMessage.objects.filter(id__in=ids).update(
+            status=Status.SENDING, claimed_at=now, attempts=F("attempts") + 1
+        )
+    return list(OutboundMessage.objects.filter(id__in=ids).order_by("id"))
+
+
+def _settle(message: OutboundMessage, error: Optional[Exception], stats: dict):
+    now = timezone.now()
+    message.claimed_at = None
+    if error is None:
+        message.status = Status.SENT
+        message.sent_at = now
+        message.last_error = ""
+        stats["sent"] += 1
+    else:
+        message.last_error = f"{type(error).__name__}: {error}"[:ERROR_MAX_LENGTH]
+        if _is_permanent(error) or message.attempts >= message.max_attempts:
+            message.status = Status.DEAD
+            stats["dead"] += 1
+            logger.error(
+                "Outbox message %s dead-lettered after %s attempt(s): %s",
+                message.pk,
+                message.attempts,
+                message.last_error,
+            )
+        else:
+            message.status = Status.PENDING
+            message.next_attempt_at = now + backoff(message.attempts)
+            stats["retried"] += 1
+    if message.sensitive and message.status in (Status.SENT, Status.DEAD):
+        message.body = message.html_body = ""
+
+
+def _deliver_emails(messages: List[OutboundMessage], stats: dict):
+    pacer = _Pacer(_config("RATE_LIMITS").get(Channel.EMAIL))
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as exc:
+        for message in messages:
+            _settle(message, exc, stats)
+        return
+    try:
+        for message in messages:
+            pacer.wait()
+            try:
+                message.provider_id = _send_email(connection, message)
+            except Exception as exc:
+                _settle(message, exc, stats)
+                # The session may be unusable after an SMTP error; start afresh.
+                try:
+                    connection.close()
+                    connection.open()
+                except Exception:
+                    pass
+            else:
+                _settle(message, None, stats)
+    finally:
+        connection.close()
+
+
+def _deliver_sms(messages: List[OutboundMessage], stats: dict):
+    pacer = _Pacer(_config("RATE_LIMITS").get(Channel.SMS))
+    try:
+        client = twilio_client()
+    except Exception as exc:
+        for message in messages:
+            _settle(message, exc, stats)
+        return
+    for message in messages:
+        pacer.wait()
+        try:
+            message.provider_id = _send_sms(client, message)
+        except Exception as exc:
+            _settle(message, exc, stats)
+        else:
+            _settle(message, None, stats)
+
+
+DELIVERERS = {Channel.EMAIL: _deliver_emails, Channel.SMS: _deliver_sms}
+SETTLED_FIELDS = [
+    "status",
+    "claimed_at",
+    "sent_at",
+    "next_attempt_at",
+    "last_error",
+    "provider_id",
+    "body",
+    "html_body",
+]
+
+
+def drain(batch_size: Optional[int] = None) -> Dict[str, int]:
+    """Claim and deliver one batch. Returns counts of sent/retried/dead."""
+    stats = {"claimed": 0, "sent": 0, "retried": 0, "dead": 0}
+    batch = claim(batch_size or _config("BATCH_SIZE"))
+    stats["claimed"] = len(batch)
+    for channel, deliver in DELIVERERS.items():
+        messages = [m for m in batch if m.channel == channel]
+        if messages:
+            deliver(messages, stats)
+    if batch:
+        OutboundMessage.objects.bulk_update(batch, SETTLED_FIELDS)
+    return stats
+
+
+def requeue(queryset) -> int:
+    """
+    Put dead-lettered messages back in the queue with fresh attempts. Sensitive
+    messages whose body was already erased are left alone.
+    """
+    dead = queryset.filter(status=Status.DEAD).exclude(sensitive=True, body="")
+    return dead.update(
+        status=Status.PENDING,
+        attempts=0,
+        next_attempt_at=timezone.now(),
+        last_error="",
+    )
+
+
+__all__ = [
+    "queue_email",
+    "queue_sms",
+    "twilio_client",
+    "backoff",
+    "claim",
+    "drain",
+    "requeue",
+]
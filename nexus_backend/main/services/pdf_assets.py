@@ -0,0 +1,326 @@
+"""
+Process-local cache of the static inputs shared by every PDF render.
+
+The xhtml2pdf documents (invoices, ledgers, statements) and the reportlab
+builders (order invoices, installation reports, QR cards) embed the same few
+assets: the static logo, the logo/signature/stamp uploaded in
+``CompanySettings`` and the standard Helvetica faces. Looking them up,
+reading and decoding them for every document used to cost more than laying
+out a one-page invoice: the static logo alone is a ~4000 px PNG.
+
+Each asset is now resolved once per process and, for raster images, replaced
+by a print-sized copy (``PRINT_MAX_PX`` on the longest side) kept in a
+per-process temporary directory:
+
+  - ``resolve_uri``: xhtml2pdf ``link_callback`` with memoized static lookups;
+  - ``logo_image(width, height)``: reportlab ``Image`` flowable of the logo;
+  - ``company_asset(cs, field)``: local copy of a ``CompanySettings`` image, so
+    xhtml2pdf never fetches from object storage;
+  - ``warm_up()``: load all of the above, font metrics and templates up front
+    (Celery workers call it at process start).
+
+Company images are keyed by file name and ``CompanySettings.updated_at``.
+Settings come from ``config_cache``, so other processes pick up a new logo
+on their next re-check; the saving process drops its copies immediately.
+"""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from io import BytesIO
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.db.models.signals import post_delete, post_save
+from django.test.signals import setting_changed
+
+from main.models import CompanySettings
+
+logger = logging.getLogger(__name__)
+
+LOGO_STATIC_PATH = "images/logo/logo.png"
+PRINT_MAX_PX = 1200
+COMPANY_IMAGE_FIELDS = ("logo", "signature", "stamp")
+BASE_FONTS = (
+    "Helvetica",
+    "Helvetica-Bold",
+    "Helvetica-Oblique",
+    "Helvetica-BoldOblique",
+)
+
+_RASTER_EXTENSIONS = (".png", ".jpg", ".jpeg")
+_PATH_SETTINGS = {
+    "STATIC_ROOT",
+    "STATIC_URL",
+    "STATICFILES_DIRS",
+    "MEDIA_ROOT",
+    "MEDIA_URL",
+}
+
+_lock = threading.Lock()
+_statics: Dict[str, Optional[str]] = {}  # static relpath -> source path
+_prints: Dict[str, str] = {}  # source path -> print-sized copy
+_uris: Dict[str, str] = {}  # static URI -> path handed to xhtml2pdf
+_logo: Dict[str, Optional[bytes]] = {}
+_company: Dict[str, Tuple[tuple, str]] = {}  # field -> (key, local path)
+_workdir: Optional[str] = None
+
+
+class LocalAsset(NamedTuple):
+    """A prepared image on local disk; ``url`` is what templates put in src."""
+
+    path: str
+
+    @property
+    def url(self) -> str:
+        return self.path
+
+
+def _asset_dir() -> str:
+    global _workdir
+    with _lock:
+        if _workdir is None or not os.path.isdir(_workdir):
+            _workdir = tempfile.mkdtemp(prefix="pdf-assets-")
+            atexit.register(shutil.rmtree, _workdir, True)
+        return _workdir
+
+
+# ---------- Raster images ----------
+def _print_copy(source: str) -> str:
+    """Print-sized copy of ``source``, or ``source`` if already small enough."""
+    cached = _prints.get(source)
+    if cached is not None and os.path.exists(cached):
+        return cached
+
+    path = source
+    try:
+        from PIL import Image as PILImage
+
+        with PILImage.open(source) as img:
+            if max(img.size) > PRINT_MAX_PX:
+                img.thumbnail((PRINT_MAX_PX, PRINT_MAX_PX))
+                is_png = source.lower().endswith(".png")
+                digest = hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+                path = os.path.join(
+                    _asset_dir(), f"{digest}.{'png' if is_png else 'jpg'}"
+                )
+                if is_png:
+                    img.save(path, "PNG", optimize=True)
+                else:
+                    img.convert("RGB").save(path, "JPEG", quality=90)
+    except Exception:
+        logger.warning("Could not prepare %s for PDFs; using the original", source)
+        path = source
+
+    with _lock:
+        _prints[source] = path
+    return path
+
+
+# ---------- Static files ----------
+def static_path(relpath: str) -> Optional[str]:
+    """Filesystem path of a static file (STATIC_ROOT, finders, BASE_DIR/static)."""
+    if relpath in _statics:
+        return _statics[relpath]
+
+    found = None
+    if getattr(settings, "STATIC_ROOT", None):
+        candidate = os.path.join(settings.STATIC_ROOT, relpath)
+        if os.path.exists(candidate):
+            found = candidate
+    if found is None:
+        try:
+            found = finders.find(relpath)
+        except Exception:
+            found = None
+    if found is None and getattr(settings, "BASE_DIR", None):
+        candidate = os.path.join(settings.BASE_DIR, "static", relpath)
+        if os.path.exists(candidate):
+            found = candidate
+
+    with _lock:
+        _statics[relpath] = found
+    return found
+
+
+def resolve_uri(uri, rel=None):
+    """Convert HTML URIs (media/static) to absolute system paths for xhtml2pdf."""
+    # If it's already an absolute file path, return as is
+    if uri.startswith("file://"):
+        return uri.replace("file://", "")
+    cached = _uris.get(uri)
+    if cached is not None and os.path.exists(cached):
+        return cached
+    # Media
+    media_url = getattr(settings, "MEDIA_URL", "/media/")
+    media_root = getattr(settings, "MEDIA_ROOT", "")
+    if media_url and uri.startswith(media_url):
+        return os.path.join(media_root, uri.replace(media_url, ""))
+    # Static (never changes within a process: memoized, images print-sized)
+    static_url = getattr(settings, "STATIC_URL", "/static/")
+    if static_url and uri.startswith(static_url):
+        found = static_path(uri.replace(static_url, ""))
+        if found:
+            if found.lower().endswith(_RASTER_EXTENSIONS):
+                found = _print_copy(found)
+            with _lock:
+                _uris[uri] = found
+            return found
+    # Absolute URL (http/https) — xhtml2pdf may not fetch; return as-is
+    return uri
+
+
+# ---------- Logo (reportlab) ----------
+def logo_bytes() -> Optional[bytes]:
+    """Print-sized static logo, read once per process."""
+    if LOGO_STATIC_PATH not in _logo:
+        data = None
+        source = static_path(LOGO_STATIC_PATH)
+        if source:
+            try:
+                with open(_print_copy(source), "rb") as fh:
+                    data = fh.read()
+            except OSError:
+                logger.warning("Could not read logo %s", source)
+        with _lock:
+            _logo[LOGO_STATIC_PATH] = data
+    return _logo[LOGO_STATIC_PATH]
+
+
+def logo_image(width: float, height: float):
+    """reportlab ``Image`` flowable of the static logo, or None if missing."""
+    data = logo_bytes()
+    if not data:
+        return None
+    from reportlab.platypus import Image
+
+    return Image(BytesIO(data), width=width, height=height)
+
+
+# ---------- Company images ----------
+def _local_copy(field_file) -> str:
+    try:
+        source = field_file.path  # local storage
+    except NotImplementedError:
+        source = None
+    if not source or not os.path.exists(source):
+        ext = os.path.splitext(field_file.name)[1].lower() or ".png"
+        digest = hashlib.sha1(field_file.name.encode("utf-8")).hexdigest()[:16]
+        source = os.path.join(_asset_dir(), f"src-{digest}{ext}")
+        with field_file.storage.open(field_file.name, "rb") as src, open(
+            source, "wb"
+        ) as dst:
+            shutil.copyfileobj(src, dst)
+    with _lock:
+        _prints.pop(source, None)  # same name, new content
+    return _print_copy(source)
+
+
+def company_asset(cs, field: str):
+    """
+    Local, print-sized copy of ``cs.<field>`` (logo, signature, stamp) as a
+    ``LocalAsset``; None when unset. Falls back to the field file itself if
+    it cannot be read, so templates keep their previous behaviour.
+    """
+    field_file = getattr(cs, field, None)
+    if not field_file or not getattr(field_file, "name", ""):
+        return None
+
+    key = (field_file.name, getattr(cs, "updated_at", None))
+    entry = _company.get(field)
+    if entry is not None and entry[0] == key and os.path.exists(entry[1]):
+        return LocalAsset(entry[1])
+    try:
+        path = _local_copy(field_file)
+    except Exception:
+        logger.warning("Could not load company %s %s", field, field_file.name)
+        return field_file
+    with _lock:
+        _company[field] = (key, path)
+    return LocalAsset(path)
+
+
+# ---------- Warm-up ----------
+def warm_up(templates: Iterable[str] = ()) -> None:
+    """
+    Load fonts, images and ``templates`` now, so the first document a worker
+    renders only pays for layout.
+    """
+    from django.template.loader import get_template
+    from reportlab.graphics.barcode import qr
+    from reportlab.pdfbase import pdfmetrics
+
+    from main.services import config_cache
+
+    for name in BASE_FONTS:
+        pdfmetrics.getFont(name)
+    qr.QrCodeWidget("warm-up").getBounds()
+    resolve_uri(f"{settings.STATIC_URL}{LOGO_STATIC_PATH}")
+    logo_bytes()
+    try:
+        cs = config_cache.company_settings()
+        for field in COMPANY_IMAGE_FIELDS:
+            company_asset(cs, field)
+    except Exception:
+        logger.warning("PDF warm-up could not load company settings")
+    for name in templates:
+        get_template(name)
+
+
+def clear() -> None:
+    """Forget every prepared asset (tests, settings changes)."""
+    with _lock:
+        _statics.clear()
+        _uris.clear()
+        _prints.clear()
+        _logo.clear()
+        _company.clear()
+
+
+def clear_company_assets() -> None:
+    with _lock:
+        _company.clear()
+
+
+# ---------- Invalidation hooks ----------
+def _on_company_settings_change(sender, **kwargs):
+    clear_company_assets()
+
+
+def _on_setting_changed(setting, **kwargs):
+    if setting in _PATH_SETTINGS:
+        clear()
+
+
+post_save.connect(
+    _on_company_settings_change,
+    sender=CompanySettings,
+    dispatch_uid="pdf_assets_company_save",
+)
+post_delete.connect(
+    _on_company_settings_change,
+    sender=CompanySettings,
+    dispatch_uid="pdf_assets_company_delete",
+)
+setting_changed.connect(_on_setting_changed, dispatch_uid="pdf_assets_settings")
+
+
+__all__ = [
+    "LOGO_STATIC_PATH",
+    "LocalAsset",
+    "static_path",
+    "resolve_uri",
+    "logo_bytes",
+    "logo_image",
+    "company_asset",
+    "warm_up",
+    "clear",
+    "clear_company_assets",
+]
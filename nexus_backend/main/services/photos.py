@@ -0,0 +1,371 @@
+"""
+Photo ingestion for technician uploads (site surveys, installations).
+
+Views stage the uploaded files untouched and hand them to the
+``main.tasks.ingest_photos`` worker (``queue_photo_ingest``). For each file
+the worker:
+
+- hashes the bytes (SHA-256) and skips files already stored for the same
+  survey / installation, or repeated within the batch;
+- copies the EXIF capture time and GPS position into the photo row (client
+  supplied coordinates win);
+- applies the EXIF orientation and re-encodes metadata-free JPEG variants:
+  ``print`` (stored in the model's image field), ``screen`` and ``thumb``
+  (storage names in ``variants``);
+- bulk-inserts the rows; a partial unique constraint on
+  (parent, content_hash) makes concurrent duplicates a no-op, and the
+  variants written for a row that lost that race are deleted.
+
+If storing a variant fails, the variants already written for that file are
+deleted and its staged upload is kept: it is returned under ``retry`` for
+the worker to try again.
+
+Pages and PDFs pick the right size through ``PhotoVariantsMixin`` instead of
+downloading the phone original.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import logging
+import os
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels; "print" is the stored master.
+VARIANT_SIZES = {"print": 2048, "screen": 1280, "thumb": 320}
+MASTER_VARIANT = "print"
+JPEG_QUALITY = 82
+STAGING_DIR = "photo_uploads/staging"
+
+# EXIF tags
+_EXIF_IFD = 0x8769
+_GPS_IFD = 0x8825
+_DATETIME = 306
+_DATETIME_ORIGINAL = 36867
+
+
+class PhotoVariantsMixin:
+    """
+    Sized variants for a photo model. Subclasses set ``image_field_name``
+    (the master image), ``parent_field_name`` (the survey / installation FK)
+    and define ``variants`` (JSONField) and ``content_hash``.
+    """
+
+    image_field_name = "image"
+    parent_field_name = ""
+
+    def _master(self):
+        return getattr(self, self.image_field_name)
+
+    def variant_name(self, size: str) -> str:
+        """Storage name of a variant; falls back to the master image."""
+        name = (getattr(self, "variants", None) or {}).get(size)
+        master = self._master()
+        return name or (master.name if master else "")
+
+    def variant_url(self, size: str) -> str:
+        name = self.variant_name(size)
+        if not name:
+            return ""
+        try:
+            return self._master().storage.url(name)
+        except Exception:
+            return ""
+
+    def open_variant(self, size: str):
+        """Binary file object for a variant (caller closes it)."""
+        return self._master().storage.open(self.variant_name(size), "rb")
+
+    @property
+    def thumb_url(self) -> str:
+        return self.variant_url("thumb")
+
+    @property
+    def screen_url(self) -> str:
+        return self.variant_url("screen")
+
+    def delete_files(self):
+        """Delete the master image and every variant from storage."""
+        master = self._master()
+        if not master:
+            return
+        storage = master.storage
+        for name in set((getattr(self, "variants", None) or {}).values()):
+            try:
+                storage.delete(name)
+            except Exception:
+                logger.warning("Could not delete photo variant %s", name)
+        master.delete(save=False)
+
+
+# ---------- Image processing ----------
+@dataclass
+class ProcessedPhoto:
+    content_hash: str
+    variants: Dict[str, bytes] = field(default_factory=dict)
+    taken_at: Optional[datetime] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _ratio(value) -> float:
+    try:
+        return float(value)
+    except TypeError:
+        num, den = value
+        return float(num) / float(den) if den else 0.0
+
+
+def _gps_coordinate(dms, ref) -> Optional[float]:
+    try:
+        deg, minutes, seconds = (_ratio(v) for v in dms)
+    except Exception:
+        return None
+    value = deg + minutes / 60.0 + seconds / 3600.0
+    if str(ref or "").upper() in ("S", "W"):
+        value = -value
+    return round(value, 7)
+
+
+def _exif_datetime(raw) -> Optional[datetime]:
+    try:
+        parsed = datetime.strptime(str(raw).strip("\x00 "), "%Y:%m:%d %H:%M:%S")
+    except (TypeError, ValueError):
+        return None
+    # Phones record local wall-clock time without an offset.
+    return timezone.make_aware(parsed, timezone.get_current_timezone())
+
+
+def extract_exif(img) -> Tuple[Optional[datetime], Optional[float], Optional[float]]:
+    """(taken_at, latitude, longitude) from a PIL image's EXIF, if present."""
+    try:
+        exif = img.getexif()
+    except Exception:
+        return None, None, None
+    if not exif:
+        return None, None, None
+
+    taken_at = _exif_datetime(
+        exif.get_ifd(_EXIF_IFD).get(_DATETIME_ORIGINAL) or exif.get(_DATETIME)
+    )
+    gps = exif.get_ifd(_GPS_IFD)
+    lat = lng = None
+    if gps and 2 in gps and 4 in gps:
+        lat = _gps_coordinate(gps[2], gps.get(1))
+        lng = _gps_coordinate(gps[4], gps.get(3))
+    return taken_at, lat, lng
+
+
+def process_image(data: bytes) -> ProcessedPhoto:
+    """
+    Decode, orient and resize one upload. Raises for files Pillow can't read.
+    Variants are encoded from largest to smallest, each from the previous one.
+    """
+    from PIL import Image, ImageOps
+
+    img = Image.open(io.BytesIO(data))
+    # Let the JPEG decoder downscale while decoding (much cheaper for 12MP+).
+    edge = VARIANT_SIZES[MASTER_VARIANT]
+    img.draft("RGB", (edge, edge))
+    taken_at, lat, lng = extract_exif(img)
+
+    img = ImageOps.exif_transpose(img)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+
+    result = ProcessedPhoto(
+        content_hash=content_hash(data), taken_at=taken_at, latitude=lat, longitude=lng
+    )
+    for size, edge in sorted(VARIANT_SIZES.items(), key=lambda kv: -kv[1]):
+        img.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        # No exif/icc arguments: the variants carry no metadata.
+        img.save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+        result.variants[size] = buffer.getvalue()
+    return result
+
+
+# ---------- Staging & queueing ----------
+def _image_field(model):
+    return model._meta.get_field(model.image_field_name)
+
+
+def stage_uploads(model, files: Iterable) -> List[str]:
+    """Store raw uploads (in the photo field's storage) for the worker."""
+    storage = _image_field(model).storage
+    staged = []
+    for f in files:
+        ext = os.path.splitext(getattr(f, "name", "") or "")[1].lower()[:10]
+        name = f"{STAGING_DIR}/{uuid.uuid4().hex}{ext}"
+        staged.append(storage.save(name, f))
+    return staged
+
+
+def queue_photo_ingest(model, parent, items: List[Dict[str, Any]]):
+    """
+    Hand staged uploads to the worker. ``items`` are dicts with ``staged``
+    (from ``stage_uploads``) and ``fields`` (extra column values such as
+    ``photo_type``). Falls back to processing inline if the broker is down.
+    """
+    from main.tasks import ingest_photos
+
+    label = model._meta.label
+    try:
+        ingest_photos.delay(label, parent.pk, items)
+    except Exception:
+        logger.warning("Photo queue unavailable; ingesting %s inline", label)
+        ingest(label, parent.pk, items)
+
+
+# ---------- Worker ----------
+def _variant_names(model, instance, parent_id, digest: str) -> Dict[str, str]:
+    image_field = _image_field(model)
+    folder = os.path.dirname(image_field.generate_filename(instance, "photo.jpg"))
+    stem = f"{parent_id}-{digest[:32]}"
+    stem = f"{folder}/{stem}" if folder else stem
+    return {
+        size: f"{stem}.jpg" if size == MASTER_VARIANT else f"{stem}_{size}.jpg"
+        for size in VARIANT_SIZES
+    }
+
+
+def _delete_names(storage, names: Iterable[str]) -> None:
+    for name in names:
+        try:
+            storage.delete(name)
+        except Exception:
+            logger.warning("Could not delete photo file %s", name)
+
+
+def _store_variants(storage, names: Dict[str, str], variants: Dict[str, bytes]):
+    """Save every variant, or none: files written before a failure are deleted."""
+    written: Dict[str, str] = {}
+    try:
+        for size, body in variants.items():
+            written[size] = storage.save(names[size], ContentFile(body))
+    except Exception:
+        _delete_names(storage, written.values())
+        raise
+    return written
+
+
+def _discard_skipped(model, storage, parent_field, parent, rows) -> int:
+    """
+    Count the rows ``bulk_create(ignore_conflicts=True)`` actually inserted
+    and delete the variants of those it dropped (a concurrent ingest stored
+    the same content first).
+    """
+    image_field = model.image_field_name
+    stored = {
+        digest: {name, *(variants or {}).values()}
+        for digest, name, variants in model._default_manager.filter(
+            **{parent_field.name: parent},
+            content_hash__in=[row.content_hash for row in rows],
+        ).values_list("content_hash", image_field, "variants")
+    }
+    created = 0
+    for row in rows:
+        mine = {getattr(row, image_field).name, *row.variants.values()}
+        kept = stored.get(row.content_hash, set())
+        if getattr(row, image_field).name in kept:
+            created += 1
+        else:
+            _delete_names(storage, mine - kept)
+    return created
+
+
+def ingest(model_label: str, parent_id: int, items: List[Dict[str, Any]]) -> dict:
+    """
+    Process staged uploads and bulk-insert the photo rows. Items whose
+    variants could not be stored are returned under ``retry``, staged files
+    intact.
+    """
+    model = apps.get_model(model_label)
+    parent_field = model._meta.get_field(model.parent_field_name)
+    parent = parent_field.related_model._default_manager.get(pk=parent_id)
+    storage = _image_field(model).storage
+
+    seen = set(
+        model._default_manager.filter(**{parent_field.name: parent})
+        .exclude(content_hash="")
+        .values_list("content_hash", flat=True)
+    )
+    rows, duplicates, failed, retry = [], 0, 0, []
+    for item in items:
+        staged = item["staged"]
+        try:
+            with storage.open(staged, "rb") as fh:
+                data = fh.read()
+        except Exception:
+            logger.exception("Photo ingest could not read %s", staged)
+            failed += 1
+            continue
+        if content_hash(data) in seen:
+            duplicates += 1
+            _delete_names(storage, [staged])
+            continue
+        try:
+            photo = process_image(data)
+        except Exception:
+            logger.exception("Photo ingest failed for %s", staged)
+            failed += 1
+            _delete_names(storage, [staged])
+            continue
+
+        fields = dict(item.get("fields") or {})
+        if not (fields.get("latitude") and fields.get("longitude")):
+            fields["latitude"], fields["longitude"] = photo.latitude, photo.longitude
+        instance = model(**{parent_field.name: parent}, **fields)
+        names = _variant_names(model, instance, parent.pk, photo.content_hash)
+        try:
+            names = _store_variants(storage, names, photo.variants)
+        except Exception:
+            logger.exception("Photo ingest could not store variants of %s", staged)
+            retry.append(item)
+            continue
+        _delete_names(storage, [staged])
+        seen.add(photo.content_hash)
+
+        setattr(instance, model.image_field_name, names.pop(MASTER_VARIANT))
+        instance.variants = names
+        instance.content_hash = photo.content_hash
+        instance.taken_at = photo.taken_at
+        rows.append(instance)
+
+    created = 0
+    if rows:
+        model._default_manager.bulk_create(rows, ignore_conflicts=True)
+        created = _discard_skipped(model, storage, parent_field, parent, rows)
+    return {
+        "created": created,
+        "duplicates": duplicates + len(rows) - created,
+        "failed": failed,
+        "retry": retry,
+    }
+
+
+__all__ = [
+    "VARIANT_SIZES",
+    "PhotoVariantsMixin",
+    "ProcessedPhoto",
+    "content_hash",
+    "extract_exif",
+    "process_image",
+    "stage_uploads",
+    "queue_photo_ingest",
+    "ingest",
+]
@@ -0,0 +1,207 @@
+"""
+Customer preferences and avatars, served without touching the filesystem.
+
+Preferences: ``UserPreferences`` (notification toggles, 2FA flag) is read
+through ``for_user(user)``, a snapshot cached per user in the shared cache
+(``main.services.caching``) for ``USER_PREFS_CACHE_SECONDS``. ``update``
+writes the row and drops the cached copy; so does any other save or delete
+of the row (admin, signals), once the transaction commits.
+
+Avatars: ``set_avatar`` decodes the upload once, crops it square and stores
+metadata-free JPEG variants (``AVATAR_SIZES``) through the avatar field's
+storage: with ``USE_SPACES`` that is ``PublicMediaStorage`` (public-read,
+unsigned URLs), so every web node serves the same files and the saved URLs
+never expire; local development uses ``MEDIA_ROOT``. The largest is
+``UserPreferences.avatar``, the others are in ``avatar_variants``, and the
+public URL of every size is persisted on the user (``User.avatar_urls``):
+pages render ``user.avatar_url`` from the row already loaded for the
+request. Replaced files are deleted after the transaction commits.
+"""
+
+from __future__ import annotations
+
+import io
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from main.models import UserPreferences
+from main.services import caching
+from main.services.photos import JPEG_QUALITY, content_hash
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = "user_prefs:{user_id}"
+DEFAULT_CACHE_SECONDS = 600
+
+# Square edge in pixels, largest first; "large" is the stored master.
+AVATAR_SIZES = {"large": 512, "medium": 160, "small": 48}
+MASTER_SIZE = "large"
+AVATAR_MAX_BYTES = 5 * 1024 * 1024
+
+
+class InvalidAvatar(ValueError):
+    """The upload is too large or not an image Pillow can read."""
+
+
+@dataclass(frozen=True)
+class Preferences:
+    notify_updates: bool = True
+    notify_billing: bool = True
+    notify_tickets: bool = True
+    twofa_enabled: bool = False
+
+
+FIELDS = tuple(Preferences.__dataclass_fields__)
+
+
+# ---------- Preferences ----------
+def _cache_key(user_id) -> str:
+    return CACHE_KEY.format(user_id=user_id)
+
+
+def _load(user) -> Preferences:
+    prefs, _ = UserPreferences.objects.get_or_create(user=user)
+    return Preferences(**{name: getattr(prefs, name) for name in FIELDS})
+
+
+def for_user(user) -> Preferences:
+    """The user's preferences (created with defaults on first read)."""
+    return caching.get_or_compute(
+        _cache_key(user.pk),
+        lambda: _load(user),
+        ttl=getattr(settings, "USER_PREFS_CACHE_SECONDS", DEFAULT_CACHE_SECONDS),
+    )
+
+
+def invalidate(user_id) -> None:
+    """Drop the cached copy now and again once the transaction commits."""
+    key = _cache_key(user_id)
+    caching.delete(key)
+    transaction.on_commit(lambda: caching.delete(key))
+
+
+def update(user, **values) -> Preferences:
+    """Set preference fields (``Preferences`` names) and return the result."""
+    unknown = set(values) - set(FIELDS)
+    if unknown:
+        raise TypeError(f"Unknown preference(s): {', '.join(sorted(unknown))}")
+    prefs, _ = UserPreferences.objects.get_or_create(user=user)
+    for name, value in values.items():
+        setattr(prefs, name, bool(value))
+    prefs.save(update_fields=list(values))  # invalidates via post_save
+    return Preferences(**{name: getattr(prefs, name) for name in FIELDS})
+
+
+def _invalidate_on_change(sender, instance, **kwargs):
+    invalidate(instance.user_id)
+
+
+post_save.connect(
+    _invalidate_on_change, sender=UserPreferences, dispatch_uid="user_prefs_save"
+)
+post_delete.connect(
+    _invalidate_on_change, sender=UserPreferences, dispatch_uid="user_prefs_delete"
+)
+
+
+# ---------- Avatars ----------
+def _storage():
+    return UserPreferences._meta.get_field("avatar").storage
+
+
+def process_avatar(data: bytes) -> Dict[str, bytes]:
+    """Square JPEG variants of an upload, largest first."""
+    from PIL import Image, ImageOps
+
+    if len(data) > AVATAR_MAX_BYTES:
+        raise InvalidAvatar("Avatar images must be 5 MB or smaller.")
+    try:
+        img = Image.open(io.BytesIO(data))
+        edge = AVATAR_SIZES[MASTER_SIZE]
+        img.draft("RGB", (edge, edge))
+        img = ImageOps.exif_transpose(img)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+    except Exception as exc:
+        raise InvalidAvatar("The avatar is not a readable image.") from exc
+
+    variants = {}
+    for size, edge in sorted(AVATAR_SIZES.items(), key=lambda kv: -kv[1]):
+        img = ImageOps.fit(img, (edge, edge), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        # No exif/icc arguments: the variants carry no metadata.
+        img.save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+        variants[size] = buffer.getvalue()
+    return variants
+
+
+def _stored_names(prefs) -> Iterable[str]:
+    names = set((prefs.avatar_variants or {}).values())
+    if prefs.avatar:
+        names.add(prefs.avatar.name)
+    return names
+
+
+def _delete_files(names: Iterable[str]) -> None:
+    storage = _storage()
+    for name in names:
+        try:
+            storage.delete(name)
+        except Exception:
+            logger.warning("Could not delete avatar file %s", name)
+
+
+def _replace(user, prefs, names: Dict[str, str]) -> None:
+    old = _stored_names(prefs) - set(names.values())
+    storage = _storage()
+    user.avatar_urls = {size: storage.url(name) for size, name in names.items()}
+    user.save(update_fields=["avatar_urls"])
+
+    variants = dict(names)
+    prefs.avatar = variants.pop(MASTER_SIZE, None)
+    prefs.avatar_variants = variants
+    prefs.save(update_fields=["avatar", "avatar_variants"])
+    if old:
+        transaction.on_commit(lambda: _delete_files(old))
+
+
+def set_avatar(user, upload) -> str:
+    """
+    Store the resized variants of ``upload`` as the user's avatar and return
+    the URL pages show (``User.avatar_url``). Raises ``InvalidAvatar``.
+    """
+    data = upload.read()
+    variants = process_avatar(data)
+    storage = _storage()
+    stem = f"avatars/{user.pk}/{content_hash(data)[:16]}"
+    names = {
+        size: storage.save(f"{stem}_{size}.jpg", ContentFile(body))
+        for size, body in variants.items()
+    }
+    prefs, _ = UserPreferences.objects.get_or_create(user=user)
+    _replace(user, prefs, names)
+    return user.avatar_url
+
+
+def clear_avatar(user) -> None:
+    prefs, _ = UserPreferences.objects.get_or_create(user=user)
+    _replace(user, prefs, {})
+
+
+__all__ = [
+    "AVATAR_SIZES",
+    "InvalidAvatar",
+    "Preferences",
+    "for_user",
+    "update",
+    "invalidate",
+    "process_avatar",
+    "set_avatar",
+    "clear_avatar",
+]
@@ -0,0 +1,80 @@
+"""
+Process pools for CPU-bound batch jobs (bulk invoice rendering, synthetic
+data generation).
+
+Workers are spawned, not forked, so they never share the parent's database
+connections or client sockets. A spawned worker starts from a fresh
+interpreter and has to unpickle its initializer, and then each task
+function, by importing the modules that define them. Importing a module
+that imports models at top level before ``django.setup()`` raises
+AppRegistryNotReady and breaks the whole pool. That's why both entry points
+live here, and this module imports no models:
+
+- ``setup_worker`` (the initializer) sets Django up. It then points each
+  database alias and ``MEDIA_ROOT`` at what the parent uses, because the
+  parent may have changed them after settings were imported (test runners
+  rename the databases). Last, it runs an optional warm-up.
+- ``call`` runs a task given by dotted path, so its module is only imported
+  once Django is ready.
+
+Usage:
+    with spawn_pool(4, warm_up="app.module.warm_up") as executor:
+        for result in map_path(executor, "app.module.render_one", pks):
+            ...
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, Iterable, Iterator, Optional
+
+from django.conf import settings
+from django.db import connections
+from django.utils.module_loading import import_string
+
+
+def _parent_state() -> Dict:
+    return {
+        "databases": {
+            alias: connections[alias].settings_dict["NAME"] for alias in connections
+        },
+        "media_root": settings.MEDIA_ROOT,
+    }
+
+
+def setup_worker(state: Dict, warm_up: Optional[str] = None) -> None:
+    import django
+
+    django.setup()
+    for alias, name in state["databases"].items():
+        connections[alias].settings_dict["NAME"] = name
+    settings.MEDIA_ROOT = state["media_root"]
+    if warm_up:
+        import_string(warm_up)()
+
+
+def call(target: str, *args):
+    """Run the function at dotted path ``target`` (in a worker)."""
+    return import_string(target)(*args)
+
+
+def spawn_pool(max_workers: int, warm_up: Optional[str] = None):
+    """A spawn-context ``ProcessPoolExecutor`` whose workers run Django."""
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=setup_worker,
+        initargs=(_parent_state(), warm_up),
+    )
+
+
+def map_path(
+    executor, target: str, iterable: Iterable, chunksize: int = 1
+) -> Iterator:
+    """``executor.map`` over the function at dotted path ``target``."""
+    return executor.map(partial(call, target), iterable, chunksize=chunksize)
+
+
+__all__ = ["call", "map_path", "setup_worker", "spawn_pool"]
@@ -0,0 +1,37 @@
+"""
+Staff roles, parsed once.
+
+``User.roles`` is a JSON list of role names. Older rows and some callers set
+it to a JSON-encoded string or a comma-separated string instead, in any
+case. ``parse_roles`` turns any of those into a list of distinct lowercase
+names; ``User.save`` stores that form, so the column can be queried with
+``roles__contains=[role]`` (jsonb ``@>``), which the ``user_roles_gin``
+index serves. Use ``User.objects.with_role(...)`` for "all technicians"
+style queries.
+
+``User.role_set`` keeps the parsed set on the instance, so permission checks
+(``user.permissions``) and template filters parse ``roles`` once per request
+rather than once per check.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import List
+
+
+def parse_roles(value) -> List[str]:
+    """Distinct lowercase role names, in first-seen order; [] for junk."""
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+        except ValueError:
+            parsed = None
+        value = parsed if isinstance(parsed, list) else value.split(",")
+    if not isinstance(value, (list, tuple, set, frozenset)):
+        return []
+    names = (str(r).strip().lower() for r in value if r)
+    return list(dict.fromkeys(name for name in names if name))
+
+
+__all__ = ["parse_roles"]
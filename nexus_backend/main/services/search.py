@@ -0,0 +1,180 @@
+"""
+Staff search over customers, orders and subscriptions.
+
+Every searchable column has a ``pg_trgm`` GIN index on ``UPPER(column)``
+(see ``trigram_index``), which is exactly the expression Django emits for
+``icontains`` on PostgreSQL, so partial matches are served by the index
+instead of a sequential scan. Phone numbers are also indexed as their digits
+only (``DigitsOnly``), so "+243 81 234", "081234" and "81234" all match the
+same customer.
+
+Use ``apply_search`` in views instead of hand-written ``Q(...icontains...)``
+chains; pass ``rank=True`` where results are ordered by relevance rather than
+by an index key.
+
+Note: trigram indexes only help for terms of 3+ characters; shorter terms
+still work but fall back to a scan.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connections
+from django.db.models import CharField, F, FloatField, Func, Q, QuerySet, Value
+from django.db.models.functions import Coalesce, Greatest, Upper
+
+MIN_PHONE_DIGITS = 3
+
+_NON_DIGITS = re.compile(r"\D+")
+
+
+class DigitsOnly(Func):
+    """``regexp_replace(col, '\\D', '', 'g')`` — the digits of a phone number."""
+
+    function = "REGEXP_REPLACE"
+    template = "%(function)s(%(expressions)s, '\\D', '', 'g')"
+    output_field = CharField()
+
+
+def trigram_index(expression, name: str) -> GinIndex:
+    """GIN trigram index matching the SQL emitted by ``icontains``."""
+    return GinIndex(OpClass(expression, name="gin_trgm_ops"), name=name)
+
+
+def upper_trigram_index(field: str, name: str) -> GinIndex:
+    return trigram_index(Upper(field), name)
+
+
+def phone_digits_index(field: str, name: str) -> GinIndex:
+    return trigram_index(DigitsOnly(field), name)
+
+
+def normalize_term(term: str) -> str:
+    return " ".join((term or "").split())
+
+
+def phone_digits(term: str) -> str:
+    """
+    Digits to look for in phone columns. The national trunk prefix is
+    dropped so "0812345678" matches "+243812345678".
+    """
+    digits = _NON_DIGITS.sub("", term or "")
+    return digits.lstrip("0")
+
+
+def _alias_name(field: str) -> str:
+    return "_search_digits_" + field.replace("__", "_")
+
+
+def _related_model(model, path: str):
+    for part in path.split("__"):
+        model = model._meta.get_field(part).related_model
+    return model
+
+
+def _search_condition(model, term: str, fields, phone_fields, digits: str):
+    """
+    (Q, aliases) matching ``term`` on ``model``. Columns behind a relation
+    (``user__email``) are matched with ``user__in=<subquery on User>`` so
+    each table is filtered through its own trigram indexes instead of an OR
+    across a join, which PostgreSQL can only evaluate with a scan.
+    """
+    cond = Q()
+    aliases = {}
+    related: Dict[str, Tuple[List[str], List[str]]] = {}
+
+    for field in fields:
+        rel, _, name = field.rpartition("__")
+        if rel:
+            related.setdefault(rel, ([], []))[0].append(name)
+        else:
+            cond |= Q(**{f"{name}__icontains": term})
+
+    if digits:
+        for field in phone_fields:
+            rel, _, name = field.rpartition("__")
+            if rel:
+                related.setdefault(rel, ([], []))[1].append(name)
+            else:
+                alias = _alias_name(name)
+                aliases[alias] = DigitsOnly(name)
+                cond |= Q(**{f"{alias}__contains": digits})
+
+    for rel, (rel_fields, rel_phones) in related.items():
+        rel_model = _related_model(model, rel)
+        sub_cond, sub_aliases = _search_condition(
+            rel_model, term, rel_fields, rel_phones, digits
+        )
+        sub = rel_model._default_manager.alias(**sub_aliases).filter(sub_cond)
+        cond |= Q(**{f"{rel}__in": sub.values("pk")})
+
+    return cond, aliases
+
+
+def apply_search(
+    qs: QuerySet,
+    term: str,
+    fields: Sequence[str],
+    *,
+    phone_fields: Iterable[str] = (),
+    rank: bool = False,
+) -> QuerySet:
+    """
+    Filter ``qs`` to rows where any of ``fields`` contains ``term``
+    (case-insensitive) or any of ``phone_fields`` contains its digits.
+    Fields may follow relations (``user__email``).
+
+    With ``rank=True`` the queryset is annotated with ``search_rank``
+    (best trigram word similarity across ``fields``) and ordered by it; the
+    caller may append tie-breakers with ``order_by("-search_rank", ...)``.
+    Returns ``qs`` unchanged for an empty term.
+    """
+    term = normalize_term(term)
+    if not term:
+        return qs
+
+    digits = phone_digits(term)
+    if len(digits) < MIN_PHONE_DIGITS:
+        digits = ""
+    cond, aliases = _search_condition(qs.model, term, fields, phone_fields, digits)
+    qs = qs.alias(**aliases).filter(cond)
+
+    if rank and fields and connections[qs.db].vendor == "postgresql":
+        scores = [TrigramWordSimilarity(Value(term), F(f)) for f in fields]
+        score = scores[0] if len(scores) == 1 else Greatest(*scores)
+        qs = qs.annotate(
+            search_rank=Coalesce(score, Value(0.0), output_field=FloatField())
+        ).order_by("-search_rank")
+    return qs
+
+
+# ---------- Search profiles used by the staff views ----------
+CUSTOMER_FIELDS = ("full_name", "email")
+CUSTOMER_PHONE_FIELDS = ("phone",)
+
+ORDER_FIELDS = ("order_reference", "user__full_name", "user__email")
+CONSOLIDATED_INVOICE_FIELDS = ("number", "user__full_name", "user__email")
+
+SUBSCRIPTION_FIELDS = ("user__full_name", "user__email", "plan__name")
+SUBSCRIPTION_PHONE_FIELDS = ("user__phone",)
+
+
+__all__ = [
+    "DigitsOnly",
+    "trigram_index",
+    "upper_trigram_index",
+    "phone_digits_index",
+    "normalize_term",
+    "phone_digits",
+    "apply_search",
+    "CUSTOMER_FIELDS",
+    "CUSTOMER_PHONE_FIELDS",
+    "ORDER_FIELDS",
+    "CONSOLIDATED_INVOICE_FIELDS",
+    "SUBSCRIPTION_FIELDS",
+    "SUBSCRIPTION_PHONE_FIELDS",
+]
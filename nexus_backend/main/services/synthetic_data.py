@@ -0,0 +1,813 @@
+"""
+Seeded, production-shaped dataset for performance work.
+
+``generate_synthetic_dataset`` fills a database with users, orders,
+subscriptions, payment attempts in every status, ledger entries, kit
+inventory and movements, spread over jittered region polygons, at
+production volumes (``Scale``; ``Scale().scaled(0.01)`` for a laptop).
+
+How it stays fast:
+
+  - primary keys are assigned up front from per-table bases (``Layout``), so
+    every foreign key is computed, never looked up, and each chunk of rows
+    can be generated independently;
+  - chunks of a phase run in a process pool (``main.services.process_pool``),
+    each in its own transaction, and are written with ``COPY ... FROM STDIN``
+    on PostgreSQL (``bulk_create`` elsewhere). ``save()`` and signals are
+    bypassed, so the rows they would create (billing accounts, wallets,
+    preferences) are generated explicitly;
+  - every chunk draws from its own ``Random(seed, table, chunk start)``: the
+    same seed, scale and ``as_of`` give the same data whatever the worker
+    count.
+
+Synthetic rows are recognisable: ``@synthetic.nexus.test`` e-mails, ``SYN``
+prefixes on references, kit numbers, plans and regions.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, fields
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, models, transaction
+from django.db.models import Max
+from django.db.models.fields import AutoFieldMixin
+from django.utils import timezone
+
+from geo_regions.models import Region
+from main.models import (
+    AccountEntry,
+    BillingAccount,
+    Order,
+    PaymentAttempt,
+    StarlinkKit,
+    StarlinkKitInventory,
+    StarlinkKitMovement,
+    Subscription,
+    SubscriptionPlan,
+    User,
+    UserPreferences,
+    Wallet,
+)
+from main.services import process_pool
+
+EMAIL_DOMAIN = "synthetic.nexus.test"
+PREFIX = "SYN"
+
+# Democratic Republic of the Congo, roughly: (min lng, min lat, max lng, max lat)
+BOUNDS = (12.2, -13.5, 31.3, 5.4)
+HISTORY_DAYS = 3 * 365
+MAX_HISTORY_MONTHS = 60
+
+# fmt: off
+FIRST_NAMES = (
+    "Jean", "Marie", "Patrick", "Grace", "Joseph", "Esther", "Didier", "Sarah",
+    "Christian", "Ruth", "Olivier", "Chantal", "Emmanuel", "Aline", "Blaise",
+    "Nadine", "Fiston", "Deborah", "Cedric", "Josephine", "Herve", "Mireille",
+)
+LAST_NAMES = (
+    "Mukendi", "Kabila", "Ilunga", "Tshisekedi", "Mbuyi", "Kasongo", "Lukusa",
+    "Banza", "Ngoy", "Kalala", "Mwamba", "Kazadi", "Mutombo", "Nsimba",
+    "Lumbala", "Kapinga", "Makiese", "Mpiana", "Bokamba", "Tshibanda",
+)
+# fmt: on
+LOCATIONS = (
+    "Warehouse Kinshasa",
+    "Warehouse Lubumbashi",
+    "Warehouse Goma",
+    "Van Kinshasa 1",
+    "Van Kinshasa 2",
+    "Technician bag",
+    "RMA",
+)
+
+# (value, weight) tables
+ORDER_OUTCOMES = (  # (status, payment_status), weight
+    (("pending_payment", "unpaid"), 30),
+    (("awaiting_confirmation", "awaiting_confirmation"), 8),
+    (("cancelled", "cancelled"), 30),
+    (("failed", "unpaid"), 10),
+    (("fulfilled", "paid"), 22),
+)
+PAYMENT_STATUSES = (
+    ("completed", 55),
+    ("pending", 10),
+    ("failed", 18),
+    ("cancelled", 10),
+    ("paid", 5),
+    ("success", 2),
+)
+SUBSCRIPTION_STATUSES = (("active", 80), ("suspended", 10), ("cancelled", 10))
+BILLING_CYCLES = (("monthly", 85), ("quarterly", 10), ("yearly", 5))
+CYCLE_MONTHS = {"monthly": 1, "quarterly": 3, "yearly": 12}
+PAYMENT_METHODS = (("mobile", 70), ("bank_transfer", 20), ("book_my_kit", 10))
+PAYMENT_TYPES = (("mobile", 75), ("card", 15), ("cash", 7), ("terminal", 3))
+
+SYNTHETIC_PLANS = (  # name, plan type, monthly price, GB
+    ("Standard 100 GB", "limited_standard", "45.00", 100),
+    ("Standard Unlimited", "unlimited_standard", "80.00", None),
+    ("Priority Unlimited", "unlimited_with_priority", "150.00", None),
+    ("Smart Education", "smart_education", "35.00", 200),
+)
+SYNTHETIC_KITS = (  # name, kit type, price, share of inventory
+    ("Kit Standard", "standard", "599.00", 80),
+    ("Kit Mini", "mini", "399.00", 20),
+)
+
+
+# ---------- Configuration ----------
+@dataclass(frozen=True)
+class Scale:
+    """Row targets; entries and movements are approximate (seeded draws)."""
+
+    users: int = 200_000
+    orders: int = 500_000
+    subscriptions: int = 150_000
+    kits: int = 300_000
+    kit_movements: int = 1_000_000
+    payment_attempts: int = 750_000
+    account_entries: int = 5_000_000
+    regions: int = 26
+
+    def scaled(self, factor: float) -> "Scale":
+        return Scale(
+            **{
+                f.name: max(1, int(round(getattr(self, f.name) * factor)))
+                for f in fields(self)
+                if f.name != "regions"
+            },
+            regions=self.regions,
+        )
+
+    def validate(self) -> None:
+        if self.users < 1 or self.orders < 1 or self.regions < 1:
+            raise ValueError("users, orders and regions must be positive.")
+        if self.subscriptions > min(self.orders, self.kits):
+            raise ValueError("subscriptions cannot exceed orders or kits.")
+
+
+@dataclass(frozen=True)
+class Layout:
+    """Everything a worker needs to generate any chunk; picklable."""
+
+    seed: int
+    scale: Scale
+    as_of: datetime
+    password: str
+    # first primary key of each table with assigned ids
+    user_base: int
+    account_base: int
+    kit_base: int
+    order_base: int
+    subscription_base: int
+    # reference data
+    region_ids: Tuple[int, ...]
+    region_names: Tuple[str, ...]
+    grid_cols: int
+    plans: Tuple[Tuple[int, Decimal], ...]
+    kit_models: Tuple[Tuple[int, str, Decimal], ...]
+
+    @property
+    def cycles(self) -> int:
+        """Average billed cycles per subscription, to approach the entry target."""
+        per_sub = self.scale.account_entries / max(self.scale.subscriptions, 1)
+        return max(1, int(per_sub / 2))
+
+
+def _rng(seed: int, table: str, start: int) -> random.Random:
+    return random.Random(f"{seed}:{table}:{start}")
+
+
+def _weighted(rng: random.Random, table):
+    values, weights = zip(*table)
+    return rng.choices(values, weights)[0]
+
+
+def _owner(order_index: int, users: int) -> int:
+    """User index of an order: every user gets one, the rest are scattered."""
+    if order_index < users:
+        return order_index
+    return (order_index * 2654435761 + 97) % users
+
+
+def _add_months(d: date, months: int) -> date:
+    y, m = divmod(d.month - 1 + months, 12)
+    return date(d.year + y, m + 1, min(d.day, 28))
+
+
+def _money(value) -> Decimal:
+    return Decimal(value).quantize(Decimal("0.01"))
+
+
+# ---------- Region polygons ----------
+def _grid_shape(regions: int) -> Tuple[int, int]:
+    min_lng, min_lat, max_lng, max_lat = BOUNDS
+    aspect = (max_lng - min_lng) / (max_lat - min_lat)
+    cols = max(1, round(math.sqrt(regions * aspect)))
+    return cols, math.ceil(regions / cols)
+
+
+def _cell_size(cols: int, rows: int) -> Tuple[float, float]:
+    min_lng, min_lat, max_lng, max_lat = BOUNDS
+    return (max_lng - min_lng) / cols, (max_lat - min_lat) / rows
+
+
+def region_polygons(regions: int, seed: int) -> List:
+    """
+    ``regions`` polygons tiling ``BOUNDS``: a grid whose shared corners and
+    edge midpoints are jittered consistently, so neighbours never overlap.
+    """
+    from django.contrib.gis.geos import Polygon
+
+    cols, rows = _grid_shape(regions)
+    dx, dy = _cell_size(cols, rows)
+    rng = _rng(seed, "regions", 0)
+    min_lng, min_lat = BOUNDS[0], BOUNDS[1]
+
+    corners = {}
+    for cx in range(cols + 1):
+        for cy in range(rows + 1):
+            inner_x, inner_y = 0 < cx < cols, 0 < cy < rows
+            jx = rng.uniform(-0.15, 0.15) * dx if inner_x else 0.0
+            jy = rng.uniform(-0.15, 0.15) * dy if inner_y else 0.0
+            corners[cx, cy] = (min_lng + cx * dx + jx, min_lat + cy * dy + jy)
+
+    midpoints = {}
+
+    def midpoint(a, b):
+        key = (min(a, b), max(a, b))
+        if key not in midpoints:
+            (x1, y1), (x2, y2) = corners[a], corners[b]
+            border = (a[0] == b[0] and a[0] in (0, cols)) or (
+                a[1] == b[1] and a[1] in (0, rows)
+            )
+            off = 0.0 if border else rng.uniform(-0.1, 0.1)
+            # perpendicular offset: vertical edges move in x, horizontal in y
+            midpoints[key] = (
+                (x1 + x2) / 2 + (off * dx if a[0] == b[0] else 0.0),
+                (y1 + y2) / 2 + (off * dy if a[1] == b[1] else 0.0),
+            )
+        return midpoints[key]
+
+    polygons = []
+    for index in range(regions):
+        cx, cy = index % cols, index // cols
+        ring = [(cx, cy), (cx + 1, cy), (cx + 1, cy + 1), (cx, cy + 1)]
+        points = []
+        for a, b in zip(ring, ring[1:] + ring[:1]):
+            points += [corners[a], midpoint(a, b)]
+        points.append(points[0])
+        polygons.append(Polygon(points, srid=4326))
+    return polygons
+
+
+def _point_in_cell(rng: random.Random, cell: int, cols: int, regions: int):
+    """(lat, lng) well inside grid cell ``cell``, clear of the jittered edges."""
+    rows = math.ceil(regions / cols)
+    dx, dy = _cell_size(cols, rows)
+    cx, cy = cell % cols, cell // cols
+    lng = BOUNDS[0] + (cx + rng.uniform(0.35, 0.65)) * dx
+    lat = BOUNDS[1] + (cy + rng.uniform(0.35, 0.65)) * dy
+    return round(lat, 6), round(lng, 6)
+
+
+# ---------- Writing ----------
+def _copy_text(value) -> str:
+    """One value in PostgreSQL COPY text format."""
+    if value is None:
+        return r"\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        value = json.dumps(value)
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class TableWriter:
+    """
+    Buffers rows of one model and writes them in one COPY (or bulk_create).
+    Columns not given to ``add`` take the field default; ``auto_now`` fields
+    default to the layout's ``as_of``.
+    """
+
+    def __init__(self, model, now: datetime, explicit_pk: bool = False):
+        self.model = model
+        pk = model._meta.pk
+        self.fields = [
+            f
+            for f in model._meta.concrete_fields
+            if explicit_pk or f is not pk or not isinstance(f, AutoFieldMixin)
+        ]
+        self.defaults = {}
+        for f in self.fields:
+            if getattr(f, "auto_now", False) or getattr(f, "auto_now_add", False):
+                self.defaults[f.attname] = now
+            else:
+                self.defaults[f.attname] = f.get_default()
+        self.rows: List[tuple] = []
+
+    def add(self, **values) -> None:
+        row = dict(self.defaults, **values)
+        self.rows.append(tuple(row[f.attname] for f in self.fields))
+
+    def flush(self) -> int:
+        rows, self.rows = self.rows, []
+        if not rows:
+            return 0
+        with connection.cursor() as cursor:
+            raw = getattr(cursor, "cursor", None)
+            if connection.vendor == "postgresql" and hasattr(raw, "copy_expert"):
+                buf = StringIO()
+                for row in rows:
+                    buf.write("\t".join(_copy_text(v) for v in row))
+                    buf.write("\n")
+                buf.seek(0)
+                qn = connection.ops.quote_name
+                columns = ", ".join(qn(f.column) for f in self.fields)
+                raw.copy_expert(
+                    f"COPY {qn(self.model._meta.db_table)} ({columns}) "
+                    "FROM STDIN WITH (FORMAT text)",
+                    buf,
+                )
+                return len(rows)
+        names = [f.attname for f in self.fields]
+        self.model.objects.bulk_create(
+            [self.model(**dict(zip(names, row))) for row in rows], batch_size=2000
+        )
+        return len(rows)
+
+
+def _flush_all(*writers: TableWriter) -> Counter:
+    written = Counter()
+    for writer in writers:
+        written[writer.model._meta.label] += writer.flush()
+    return written
+
+
+# ---------- Phases ----------
+def _users_chunk(layout: Layout, start: int, stop: int) -> Counter:
+    rng = _rng(layout.seed, "users", start)
+    now = layout.as_of
+    users = TableWriter(User, now, explicit_pk=True)
+    accounts = TableWriter(BillingAccount, now, explicit_pk=True)
+    wallets = TableWriter(Wallet, now)
+    prefs = TableWriter(UserPreferences, now)
+    for i in range(start, stop):
+        uid = layout.user_base + i
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        joined = now - timedelta(seconds=rng.randrange(HISTORY_DAYS * 86400))
+        users.add(
+            id_user=uid,
+            username=f"syn{i}",
+            email=f"syn{i}@{EMAIL_DOMAIN}",
+            phone=f"+999{i:09d}",
+            first_name=first,
+            last_name=last,
+            full_name=f"{first} {last}",
+            password=layout.password,
+            is_active=rng.random() > 0.02,
+            is_verified=rng.random() < 0.85,
+            is_tax_exempt=rng.random() < 0.02,
+            date_joined=joined,
+            roles=["customer"],
+        )
+        accounts.add(id=layout.account_base + i, user_id=uid, created_at=joined)
+        wallets.add(
+            user_id=uid,
+            balance=_money(rng.choice((0, 0, 0, 5, 20, 50)) * rng.random()),
+            created_at=joined,
+            updated_at=joined,
+        )
+        prefs.add(user_id=uid, notify_updates=rng.random() < 0.7)
+    return _flush_all(users, accounts, wallets, prefs)
+
+
+def _kits_chunk(layout: Layout, start: int, stop: int) -> Counter:
+    rng = _rng(layout.seed, "kits", start)
+    kits = TableWriter(StarlinkKitInventory, layout.as_of, explicit_pk=True)
+    subs = layout.scale.subscriptions
+    for k in range(start, stop):
+        kit_id, kit_type, _ = rng.choices(
+            layout.kit_models, [share for _, _, share in SYNTHETIC_KITS]
+        )[0]
+        assigned = k < subs  # kit k ships with order k (see _orders_chunk)
+        status = "assigned" if assigned else "available"
+        if not assigned and rng.random() < 0.03:
+            status = "scrapped"
+        kits.add(
+            id=layout.kit_base + k,
+            kit_number=f"{PREFIX}-K{k:08d}",
+            serial_number=f"{PREFIX}-SN{k:09d}",
+            model=kit_type.capitalize(),
+            firmware_version=rng.choice(("2023.48.0", "2024.05.0", "2024.20.1")),
+            kit_id=kit_id,
+            is_assigned=assigned,
+            current_region_name=rng.choice(layout.region_names),
+            condition="scrapped" if status == "scrapped" else "new",
+            status=status,
+        )
+    return _flush_all(kits)
+
+
+def _orders_chunk(layout: Layout, start: int, stop: int) -> Counter:
+    """
+    Orders [start, stop) with their subscription (the first ``subscriptions``
+    orders), payment attempts and ledger entries.
+    """
+    rng = _rng(layout.seed, "orders", start)
+    sc = layout.scale
+    now = layout.as_of
+    orders = TableWriter(Order, now, explicit_pk=True)
+    subscriptions = TableWriter(Subscription, now, explicit_pk=True)
+    attempts = TableWriter(PaymentAttempt, now)
+    entries = TableWriter(AccountEntry, now)
+    attempts_per_order = sc.payment_attempts / sc.orders
+    cycles = layout.cycles
+
+    for o in range(start, stop):
+        oid = layout.order_base + o
+        u = _owner(o, sc.users)
+        uid, account_id = layout.user_base + u, layout.account_base + u
+        plan_id, monthly = rng.choice(layout.plans)
+        _, _, kit_price = rng.choice(layout.kit_models)
+        cell = rng.randrange(sc.regions)
+        lat, lng = _point_in_cell(rng, cell, layout.grid_cols, sc.regions)
+        region_id = layout.region_ids[cell] if rng.random() > 0.05 else None
+        is_sub = o < sc.subscriptions
+
+        if is_sub:
+            status, payment_status = "fulfilled", "paid"
+            cycle = _weighted(rng, BILLING_CYCLES)
+            step = CYCLE_MONTHS[cycle]
+            billed = max(1, int(cycles * rng.uniform(0.5, 1.5) / step))
+            billed = min(billed, max(MAX_HISTORY_MONTHS // step, 1))
+            months = billed * step
+            started = _add_months(now.date(), -months) - timedelta(
+                days=rng.randrange(28)
+            )
+            created = timezone.make_aware(
+                datetime.combine(started, datetime.min.time())
+            ) + timedelta(seconds=rng.randrange(86400))
+        else:
+            status, payment_status = _weighted(rng, ORDER_OUTCOMES)
+            created = now - timedelta(seconds=rng.randrange(HISTORY_DAYS * 86400))
+        total = _money(kit_price + monthly)
+
+        orders.add(
+            id=oid,
+            user_id=uid,
+            kit_inventory_id=layout.kit_base + o if is_sub else None,
+            plan_id=plan_id,
+            region_id=region_id,
+            latitude=lat,
+            longitude=lng,
+            total_price=total,
+            payment_method=_weighted(rng, PAYMENT_METHODS),
+            payment_status=payment_status,
+            status=status,
+            created_at=created,
+            expires_at=created + timedelta(days=1),
+            cancelled_reason="expired" if status == "cancelled" else "",
+            order_reference=f"{PREFIX}-{o:010d}",
+            is_installed=is_sub,
+            installation_date=created + timedelta(days=7) if is_sub else None,
+        )
+
+        # Payment attempts: paid orders end with a completed one.
+        n_attempts = int(attempts_per_order) + (
+            rng.random() < attempts_per_order % 1
+        )
+        if payment_status == "paid":
+            n_attempts = max(n_attempts, 1)
+        for j in range(n_attempts):
+            last = j == n_attempts - 1
+            pa_status = (
+                "completed"
+                if payment_status == "paid" and last
+                else _weighted(rng, PAYMENT_STATUSES)
+            )
+            at = created + timedelta(minutes=5 + j * rng.randrange(1, 600))
+            attempts.add(
+                order_id=oid,
+                reference=f"{PREFIX}-{o:010d}-{j}",
+                order_number=f"{PREFIX}-PA-{o:010d}-{j}",
+                code="0" if pa_status in ("completed", "paid", "success") else "1",
+                amount=total,
+                amount_customer=total,
+                currency=rng.choice(("USD", "USD", "USD", "CDF")),
+                status=pa_status,
+                payment_type=_weighted(rng, PAYMENT_TYPES),
+                payment_for="hardware",
+                transaction_time=at,
+                created_at=at,
+            )
+
+        # Ledger: hardware invoice (+ payment), then one invoice per cycle.
+        if payment_status in ("paid", "awaiting_confirmation", "unpaid"):
+            entries.add(
+                account_id=account_id,
+                entry_type="invoice",
+                amount_usd=total,
+                description=f"Order {PREFIX}-{o:010d}",
+                order_id=oid,
+                region_snapshot_id=region_id,
+                snapshot_source="synthetic",
+                created_at=created,
+            )
+        if payment_status == "paid":
+            entries.add(
+                account_id=account_id,
+                entry_type="payment",
+                amount_usd=-total,
+                description="Payment",
+                order_id=oid,
+                region_snapshot_id=region_id,
+                snapshot_source="synthetic",
+                created_at=created + timedelta(minutes=10),
+            )
+        if not is_sub:
+            continue
+
+        sub_id = layout.subscription_base + o
+        sub_status = _weighted(rng, SUBSCRIPTION_STATUSES)
+        period_start = started
+        for n in range(billed):
+            period_end = _add_months(period_start, step)
+            amount = _money(monthly * step)
+            issued = timezone.make_aware(
+                datetime.combine(period_start, datetime.min.time())
+            ) - timedelta(days=5)
+            common = dict(
+                account_id=account_id,
+                order_id=oid,
+                subscription_id=sub_id,
+                region_snapshot_id=region_id,
+                snapshot_source="synthetic",
+            )
+            entries.add(
+                entry_type="invoice",
+                amount_usd=amount,
+                description=f"Subscription {period_start:%Y-%m}",
+                period_start=period_start,
+                period_end=period_end,
+                created_at=issued,
+                **common,
+            )
+            # the latest cycle of non-active subscriptions stays unpaid
+            unpaid = n == billed - 1 and sub_status != "active"
+            if not unpaid and rng.random() < 0.95:
+                entries.add(
+                    entry_type="payment",
+                    amount_usd=-amount,
+                    description="Subscription payment",
+                    created_at=issued + timedelta(days=rng.randrange(1, 10)),
+                    **common,
+                )
+            if rng.random() < 0.02:
+                entries.add(
+                    entry_type="adjustment",
+                    amount_usd=-_money(amount * Decimal("0.1")),
+                    description="Goodwill credit",
+                    created_at=issued + timedelta(days=12),
+                    **common,
+                )
+            period_start = period_end
+        subscriptions.add(
+            id=sub_id,
+            user_id=uid,
+            plan_id=plan_id,
+            region_id=region_id,
+            status=sub_status,
+            billing_cycle=cycle,
+            started_at=started,
+            next_billing_date=period_start,
+            last_billed_at=_add_months(period_start, -step),
+            ended_at=now.date() if sub_status == "cancelled" else None,
+            order_id=oid,
+        )
+
+    written = _flush_all(orders, subscriptions, attempts, entries)
+    # Kits of this chunk's subscription orders point back at their order.
+    assigned = range(start, min(stop, sc.subscriptions))
+    if assigned:
+        StarlinkKitInventory.objects.filter(
+            pk__gte=layout.kit_base + assigned.start,
+            pk__lt=layout.kit_base + assigned.stop,
+        ).update(
+            assigned_to_order_id=models.F("id") - layout.kit_base + layout.order_base
+        )
+    return written
+
+
+def _movements_chunk(layout: Layout, start: int, stop: int) -> Counter:
+    rng = _rng(layout.seed, "movements", start)
+    sc = layout.scale
+    now = layout.as_of
+    movements = TableWriter(StarlinkKitMovement, now)
+    # "received" and, for shipped kits, "assigned" are always there
+    extra = max(sc.kit_movements / sc.kits - 1 - sc.subscriptions / sc.kits, 0)
+    for k in range(start, stop):
+        kit_pk = layout.kit_base + k
+        at = now - timedelta(seconds=rng.randrange(HISTORY_DAYS * 86400))
+        movements.add(
+            inventory_item_id=kit_pk,
+            movement_type="received",
+            timestamp=at,
+            location=LOCATIONS[0],
+            note="Synthetic stock",
+        )
+        for _ in range(int(extra) + (rng.random() < extra % 1)):
+            at += timedelta(hours=rng.randrange(1, 24 * 30))
+            movements.add(
+                inventory_item_id=kit_pk,
+                movement_type=rng.choice(("transferred", "transferred", "adjusted")),
+                timestamp=min(at, now),
+                location=rng.choice(LOCATIONS),
+            )
+        if k < sc.subscriptions:
+            movements.add(
+                inventory_item_id=kit_pk,
+                movement_type="assigned",
+                timestamp=min(at + timedelta(days=1), now),
+                location="Customer",
+                order_id=layout.order_base + k,
+            )
+    return _flush_all(movements)
+
+
+PHASES: Sequence[Tuple[str, Callable[[Layout, int, int], Counter], str]] = (
+    ("users", _users_chunk, "users"),
+    ("kits", _kits_chunk, "kits"),
+    ("orders", _orders_chunk, "orders"),
+    ("movements", _movements_chunk, "kits"),
+)
+_PHASE_FUNCS = {name: func for name, func, _ in PHASES}
+# tables whose ids are assigned here: their sequences are moved past them
+ASSIGNED_PK_MODELS = (User, BillingAccount, StarlinkKitInventory, Order, Subscription)
+
+
+def _run_chunk(args) -> Counter:
+    layout, phase, start, stop = args
+    with transaction.atomic():
+        return _PHASE_FUNCS[phase](layout, start, stop)
+
+
+# ---------- Setup ----------
+def existing_rows() -> int:
+    return User.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").count()
+
+
+def _next_pk(model) -> int:
+    return (model.objects.aggregate(m=Max("pk"))["m"] or 0) + 1
+
+
+def _reference_data(scale: Scale, seed: int):
+    """Regions, kits and plans (ORM: a handful of rows)."""
+    names = [f"{PREFIX} Region {i + 1:02d}" for i in range(scale.regions)]
+    existing = dict(Region.objects.filter(name__in=names).values_list("name", "id"))
+    missing = [
+        Region(name=name, fence=fence)
+        for name, fence in zip(names, region_polygons(scale.regions, seed))
+        if name not in existing
+    ]
+    for region in missing:
+        region.save()
+        existing[region.name] = region.id
+    region_ids = tuple(existing[name] for name in names)
+
+    kit_models = []
+    for name, kit_type, price, _ in SYNTHETIC_KITS:
+        kit, _ = StarlinkKit.objects.get_or_create(
+            name=f"{PREFIX} {name}",
+            defaults={"kit_type": kit_type, "base_price_usd": Decimal(price)},
+        )
+        kit_models.append((kit.id, kit.kit_type, kit.base_price_usd))
+
+    plans = []
+    for order, (name, plan_type, price, gb) in enumerate(SYNTHETIC_PLANS):
+        plan, _ = SubscriptionPlan.objects.get_or_create(
+            name=f"{PREFIX} {name}",
+            defaults={
+                "plan_type": plan_type,
+                "site_type": "fixed",
+                "monthly_price_usd": Decimal(price),
+                "standard_data_gb": gb,
+                "display_order": 100 + order,
+            },
+        )
+        plans.append((plan.id, plan.monthly_price_usd))
+    return region_ids, tuple(names), tuple(kit_models), tuple(plans)
+
+
+def build_layout(
+    scale: Scale, seed: int = 42, as_of: Optional[datetime] = None
+) -> Layout:
+    scale.validate()
+    region_ids, region_names, kit_models, plans = _reference_data(scale, seed)
+    return Layout(
+        seed=seed,
+        scale=scale,
+        as_of=(as_of or timezone.now()).replace(microsecond=0),
+        password=make_password("synthetic"),
+        user_base=_next_pk(User),
+        account_base=_next_pk(BillingAccount),
+        kit_base=_next_pk(StarlinkKitInventory),
+        order_base=_next_pk(Order),
+        subscription_base=_next_pk(Subscription),
+        region_ids=region_ids,
+        region_names=region_names,
+        grid_cols=_grid_shape(scale.regions)[0],
+        plans=plans,
+        kit_models=kit_models,
+    )
+
+
+def _finish(tables) -> None:
+    """Move sequences past the assigned ids and refresh planner statistics."""
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), ASSIGNED_PK_MODELS):
+            cursor.execute(sql)
+        if connection.vendor == "postgresql":
+            for table in tables:
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(table)}")
+
+
+# ---------- Entry point ----------
+def generate(
+    layout: Layout,
+    workers: int = 1,
+    chunk_size: int = 10_000,
+    progress: Optional[Callable[[str, Counter, float], None]] = None,
+) -> Counter:
+    """
+    Generate the dataset described by ``layout``; returns rows written per
+    model label. ``progress(phase, rows, seconds)`` is called after each
+    phase.
+    """
+    totals = Counter()
+    for phase, _, size_attr in PHASES:
+        started = time.perf_counter()
+        size = getattr(layout.scale, size_attr)
+        jobs = [
+            (layout, phase, start, min(start + chunk_size, size))
+            for start in range(0, size, chunk_size)
+        ]
+        written = Counter()
+        if workers > 1 and len(jobs) > 1:
+            with process_pool.spawn_pool(min(workers, len(jobs))) as executor:
+                target = f"{__name__}._run_chunk"
+                for result in process_pool.map_path(executor, target, jobs):
+                    written.update(result)
+        else:
+            for job in jobs:
+                written.update(_run_chunk(job))
+        totals.update(written)
+        if progress:
+            progress(phase, written, time.perf_counter() - started)
+    _finish(
+        sorted(
+            {m._meta.db_table for m in ASSIGNED_PK_MODELS}
+            | {
+                AccountEntry._meta.db_table,
+                PaymentAttempt._meta.db_table,
+                StarlinkKitMovement._meta.db_table,
+            }
+        )
+    )
+    return totals
+
+
+def default_workers() -> int:
+    return max(os.cpu_count() or 1, 1)
+
+
+__all__ = [
+    "EMAIL_DOMAIN",
+    "Layout",
+    "Scale",
+    "TableWriter",
+    "build_layout",
+    "default_workers",
+    "existing_rows",
+    "generate",
+    "region_polygons",
+]
@@ -0,0 +1,90 @@
+"""
+Valkey plumbing shared by the services that need more than the Django cache
+API (Lua scripts, pipelines, SCAN): ``main.services.locks`` and
+``main.services.otp``.
+
+Each of them has two backends with the same methods: one on a Valkey client
+(subclass of ``ScriptBackend``, its Lua scripts registered once) and a
+Django-cache fallback, atomic within one process only. ``LazyBackend`` picks
+between them on first use: the Valkey one when ``CACHES["default"]`` is a
+redis-protocol cache (its ``LOCATION`` and ``OPTIONS`` are reused), else the
+fallback (LocMemCache in tests and local dev). The client is shared by every
+service in the process.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+
+REDIS_CACHE_BACKEND = "django.core.cache.backends.redis.RedisCache"
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def client():
+    """This process's client for the default cache, or None if it is not Valkey."""
+    global _client
+    config = settings.CACHES.get("default", {})
+    if config.get("BACKEND") != REDIS_CACHE_BACKEND:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import redis
+
+                _client = redis.Redis.from_url(
+                    config["LOCATION"], **config.get("OPTIONS", {})
+                )
+    return _client
+
+
+class ScriptBackend:
+    """Base of the Valkey backends: ``SCRIPTS`` maps attribute names to Lua."""
+
+    SCRIPTS: Dict[str, str] = {}
+
+    def __init__(self, client):
+        self.client = client
+        for name, source in self.SCRIPTS.items():
+            setattr(self, name, client.register_script(source))
+
+
+class LazyBackend:
+    """A service's backend, chosen and built on first use."""
+
+    def __init__(
+        self,
+        valkey: Callable[[object], object],
+        fallback: Callable[[], object],
+    ):
+        self._valkey = valkey
+        self._fallback = fallback
+        self._backend: Optional[object] = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    shared = client()
+                    self._backend = (
+                        self._fallback() if shared is None else self._valkey(shared)
+                    )
+        return self._backend
+
+
+__all__ = [
+    "REDIS_CACHE_BACKEND",
+    "text",
+    "client",
+    "ScriptBackend",
+    "LazyBackend",
+]
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import logging
+
+from celery import shared_task
+
+from main.services import job_runs, otp, outbox, photos
+from main.services.locks import DistributedLock
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_LOCK_NAME = "outbox.drain"
+OUTBOX_LOCK_SECONDS = 60  # lease, renewed while a drain runs
+
+
+@shared_task(bind=True, ignore_result=True, acks_late=True, max_retries=5)
+def ingest_photos(self, model_label: str, parent_id: int, items: list):
+    """Resize, strip and bulk-insert staged technician photos."""
+    stats = photos.ingest(model_label, parent_id, items)
+    retry = stats.pop("retry")
+    logger.info(
+        "Ingested photos for %s #%s: %s, %s to retry",
+        model_label,
+        parent_id,
+        stats,
+        len(retry),
+    )
+    if retry:
+        # Storage errors: the staged uploads were kept for another attempt.
+        raise self.retry(
+            args=(model_label, parent_id, retry),
+            countdown=60 * 2**self.request.retries,
+        )
+    return stats
+
+
+@shared_task(bind=True, ignore_result=True)
+def drain_notification_outbox(self, max_batches: int = 10):
+    """
+    Deliver queued email/SMS. Nudged after every commit that queues a message
+    and run by beat as a sweeper; overlapping runs on a worker exit early.
+    """
+    lock = DistributedLock(OUTBOX_LOCK_NAME, OUTBOX_LOCK_SECONDS)
+    if not lock.acquire():
+        return
+    try:
+        for _ in range(max_batches):
+            lock.ensure_held()
+            stats = outbox.drain()
+            if stats["claimed"]:
+                logger.info("Notification outbox: %s", stats)
+            if stats["claimed"] < outbox._config("BATCH_SIZE"):
+                break
+    finally:
+        lock.release()
+
+
+@shared_task(bind=True, ignore_result=True)
+def prune_job_runs(self):
+    """Drop JobRun history older than ``JOB_RUN_RETENTION_DAYS``."""
+    deleted = job_runs.prune()
+    if deleted:
+        logger.info("Pruned %s job run(s)", deleted)
+
+
+@shared_task(bind=True, ignore_result=True)
+def prune_otp_audit(self):
+    """
+    Drop OTPAudit rows older than ``OTP["AUDIT_RETENTION_DAYS"]`` and legacy
+    OTPVerification rows, which are no longer written.
+    """
+    deleted = otp.prune()
+    if deleted:
+        logger.info("Pruned %s OTP record(s)", deleted)
@@ -0,0 +1,103 @@
+"""
+Unit tests for main.services.caching
+
+- Values are computed once and served from the shared cache, then from L1
+- While another process holds the lock, readers get the stale value or wait
+- Keys expiring soon are refreshed early; bumping a namespace drops its keys
+- An unreachable shared cache degrades to computing uncached
+"""
+
+import time
+from unittest import mock
+
+import pytest
+
+from django.core.cache import cache
+
+from main.services import caching
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    cache.clear()
+    caching.clear_local()
+    yield
+    caching.clear_local()
+
+
+class Counter:
+    def __init__(self, value="v"):
+        self.calls = 0
+        self.value = value
+
+    def __call__(self):
+        self.calls += 1
+        return f"{self.value}{self.calls}"
+
+
+def test_computes_once_then_hits():
+    compute = Counter()
+    assert caching.get_or_compute("k", compute, ttl=60) == "v1"
+    assert caching.get_or_compute("k", compute, ttl=60) == "v1"
+    assert compute.calls == 1
+    assert cache.get("k:lock") is None  # released
+
+
+def test_l1_serves_without_the_shared_cache():
+    compute = Counter()
+    caching.get_or_compute("k", compute, ttl=60, l1=True)
+    with mock.patch.object(caching.cache, "get", side_effect=AssertionError):
+        assert caching.get_or_compute("k", compute, ttl=60, l1=True) == "v1"
+
+
+def test_reader_returns_stale_value_while_another_refreshes():
+    caching.get_or_compute("k", Counter("old"), ttl=60)
+    cache.add("k:lock", "someone-else", 30)
+    with mock.patch.object(caching, "_should_refresh", return_value=True):
+        assert caching.get_or_compute("k", Counter("new"), ttl=60) == "old1"
+
+
+def test_reader_waits_for_the_lock_holder(monkeypatch):
+    cache.add("k:lock", "someone-else", 30)
+
+    def other_process_finishes(seconds):
+        cache.set("k", ("theirs", time.time() + 60, 0.0))
+
+    monkeypatch.setattr(caching.time, "sleep", other_process_finishes)
+    compute = Counter()
+    assert caching.get_or_compute("k", compute, ttl=60) == "theirs"
+    assert compute.calls == 0
+
+
+def test_reader_computes_after_waiting_too_long():
+    cache.add("k:lock", "someone-else", 30)
+    compute = Counter()
+    assert caching.get_or_compute("k", compute, ttl=60, wait=0.1) == "v1"
+
+
+def test_early_refresh_probability():
+    now = time.time()
+    assert not caching._should_refresh(now + 3600, 0.01, 1.0)
+    assert caching._should_refresh(now - 1, 0.01, 1.0)
+    # An expensive value close to expiry is (almost always) refreshed early.
+    refreshed = sum(caching._should_refresh(now + 1, 20.0, 1.0) for _ in range(200))
+    assert refreshed > 150
+
+
+@pytest.mark.django_db(transaction=True)
+def test_invalidate_namespace_drops_its_keys():
+    compute = Counter()
+    caching.get_or_compute("k", compute, ttl=60, namespace="orders")
+    caching.get_or_compute("k", compute, ttl=60, namespace="other")
+    caching.invalidate_namespace("orders")
+
+    assert caching.get_or_compute("k", compute, ttl=60, namespace="orders") == "v3"
+    assert caching.get_or_compute("k", compute, ttl=60, namespace="other") == "v2"
+
+
+def test_unreachable_cache_computes_uncached():
+    compute = Counter()
+    with mock.patch.object(caching.cache, "get", side_effect=ConnectionError):
+        with mock.patch.object(caching.cache, "add", side_effect=ConnectionError):
+            assert caching.get_or_compute("k", compute, ttl=60) == "v1"
+            assert caching.get_or_compute("k", compute, ttl=60) == "v2"
@@ -0,0 +1,97 @@
+"""
+Unit tests for main.services.config_cache
+
+- Singletons / tax rates are served from memory after the first load
+- Saves and deletes invalidate the cached values
+- Values read inside a rolled-back transaction are not served afterwards
+- FX lookups return the latest rate on or before a date
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from main.models import BillingConfig, FxRate, TaxRate
+from main.services import config_cache
+
+
+@pytest.fixture(autouse=True)
+def _fresh_config_cache():
+    config_cache.clear_local()
+    yield
+    config_cache.clear_local()
+
+
+@pytest.mark.django_db
+class TestSingletons:
+    def test_billing_config_is_queried_once(self):
+        config_cache.billing_config()
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(20):
+                config_cache.billing_config()
+        assert len(ctx.captured_queries) == 0
+
+    def test_save_invalidates_billing_config(self):
+        assert config_cache.billing_config().anchor_day == 20
+        cfg = BillingConfig.get()
+        cfg.anchor_day = 5
+        cfg.save()
+        assert config_cache.billing_config().anchor_day == 5
+
+    def test_rolled_back_values_are_not_cached(self):
+        assert config_cache.billing_config().anchor_day == 20
+        with pytest.raises(RuntimeError), transaction.atomic():
+            cfg = BillingConfig.get()
+            cfg.anchor_day = 5
+            cfg.save()
+            assert config_cache.billing_config().anchor_day == 5
+            raise RuntimeError("rollback")
+        assert config_cache.billing_config().anchor_day == 20
+
+    def test_returned_instances_are_copies(self):
+        cfg = config_cache.billing_config()
+        cfg.anchor_day = 3
+        assert config_cache.billing_config().anchor_day == 20
+
+
+@pytest.mark.django_db
+class TestTaxRates:
+    def test_tax_percentage_first_and_latest(self):
+        TaxRate.objects.create(description="VAT", percentage=Decimal("16.00"))
+        TaxRate.objects.create(description="VAT", percentage=Decimal("18.00"))
+        assert config_cache.tax_percentage("VAT") == Decimal("16.00")
+        assert config_cache.tax_percentage("vat", latest=True) == Decimal("18.00")
+        assert config_cache.tax_percentage("EXCISE") is None
+
+    def test_delete_invalidates_tax_rates(self):
+        TaxRate.objects.create(description="EXCISE", percentage=Decimal("10.00"))
+        assert config_cache.tax_percentage("EXCISE") == Decimal("10.00")
+        TaxRate.objects.all().delete()
+        assert config_cache.tax_percentage("EXCISE") is None
+        assert config_cache.tax_percentages() == []
+
+
+@pytest.mark.django_db
+class TestFxRates:
+    def test_latest_rate_on_or_before(self):
+        FxRate.objects.create(date=date(2025, 1, 1), rate=Decimal("2800.0000"))
+        FxRate.objects.create(date=date(2025, 1, 10), rate=Decimal("2850.0000"))
+
+        assert FxRate.get_rate(date(2024, 12, 31)) is None
+        assert FxRate.get_rate(date(2025, 1, 1)) == Decimal("2800.0000")
+        assert FxRate.get_rate(date(2025, 1, 9)) == Decimal("2800.0000")
+        assert FxRate.get_rate(date(2025, 2, 1)) == Decimal("2850.0000")
+        assert FxRate.get_rate(date(2025, 2, 1), pair="EUR/CDF") is None
+
+    def test_series_lookups_do_not_query(self):
+        FxRate.objects.create(date=date(2025, 1, 1), rate=Decimal("2800.0000"))
+        series = config_cache.fx_series()
+        with CaptureQueriesContext(connection) as ctx:
+            for day in range(1, 29):
+                config_cache.fx_rate(date(2025, 2, day))
+        assert len(ctx.captured_queries) == 0
+        assert len(series) == 1
@@ -3,19 +3,22 @@ Tests for FlexPay payment integration.
 
 This module tests the FlexPay payment processing functions including:
 - check_flexpay_transactions: Polling FlexPay API for payment status
-- probe_payment_status: Browser-triggered payment status checks
-- mobile_probe: Mobile money payment verification
+- acheck_flexpay_transactions: The same poll, with concurrent async calls
+- probe_payment_status: Browser-triggered payment status checks (async view)
+- mobile_probe: Mobile money payment verification (async view)
 - cancel_order_now: Order cancellation
 
 All tests use mocks to avoid real API calls.
 """
 
+import asyncio
 import json
 from datetime import datetime
 from decimal import Decimal
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
+from asgiref.sync import async_to_sync
 
 from django.contrib.auth import get_user_model
 from django.test import RequestFactory
@@ -24,16 +27,29 @@ from django.utils import timezone
 from main.factories import OrderFactory, UserFactory
 from main.flexpaie import (
     _parse_flexpay_datetime,
+    acheck_flexpay_transactions,
     cancel_order_now,
     check_flexpay_transactions,
     mobile_probe,
     probe_payment_status,
 )
 from main.models import PaymentAttempt
+from main.services import flexpay_http
 
 User = get_user_model()
 
 
+def _call(view, request, user):
+    """Run an async view the way the ASGI handler does, as ``user``."""
+    request.user = user
+
+    async def auser():
+        return user
+
+    request.auser = auser
+    return async_to_sync(view)(request)
+
+
 class TestParseFlexpayDatetime:
     """Tests for FlexPay datetime parsing utility."""
 
@@ -367,6 +383,85 @@ class TestCheckFlexpayTransactions:
         assert result["checked"] == 0
 
 
+@pytest.mark.django_db
+class TestAsyncCheckFlexpayTransactions:
+    """Tests for acheck_flexpay_transactions (gateway calls via flexpay_http)."""
+
+    @patch("main.services.flexpay_http.get", new_callable=AsyncMock)
+    def test_checks_attempts_concurrently_and_records_each(self, mock_get):
+        """Each attempt gets its own outcome, including a timed-out call."""
+        order = OrderFactory(user=UserFactory(), payment_status="pending")
+        for number in ("ASYNC1", "ASYNC2"):
+            PaymentAttempt.objects.create(
+                order=order,
+                order_number=number,
+                reference=order.order_reference,
+                amount=Decimal("10.00"),
+                status="pending",
+            )
+        paid = {"code": "0", "transaction": {"status": "0"}}
+
+        def answer(url, **kwargs):
+            if url.endswith("/ASYNC2"):
+                raise flexpay_http.GatewayTimeout("timed out")
+            return flexpay_http.GatewayResponse(200, json.dumps(paid))
+
+        mock_get.side_effect = answer
+
+        result = async_to_sync(acheck_flexpay_transactions)(
+            order_reference=order.order_reference
+        )
+
+        assert mock_get.call_count == 2
+        assert (result["checked"], result["orders_updated"]) == (1, 1)
+        outcomes = {
+            a["order_number"]: a.get("final_status") or a.get("reason")
+            for a in result["attempts"]
+        }
+        assert outcomes == {"ASYNC1": "paid", "ASYNC2": "timeout"}
+        order.refresh_from_db()
+        assert order.payment_status == "paid"
+
+    @patch("main.services.flexpay_http.get", new_callable=AsyncMock)
+    def test_requires_an_identifier(self, mock_get):
+        """Never polls every pending attempt."""
+        with pytest.raises(ValueError):
+            async_to_sync(acheck_flexpay_transactions)()
+        mock_get.assert_not_called()
+
+    @patch("main.flexpaie.FLEXPAY_ASYNC_MAX_ATTEMPTS", 4)
+    @patch("main.flexpaie.FLEXPAY_ASYNC_CONCURRENCY", 2)
+    @patch("main.services.flexpay_http.get", new_callable=AsyncMock)
+    def test_limits_attempts_and_calls_in_flight(self, mock_get):
+        order = OrderFactory(user=UserFactory(), payment_status="pending")
+        for i in range(6):
+            PaymentAttempt.objects.create(
+                order=order,
+                order_number=f"LIMIT{i}",
+                reference=order.order_reference,
+                amount=Decimal("10.00"),
+                status="pending",
+            )
+        in_flight, peak = 0, 0
+
+        async def answer(url, **kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return flexpay_http.GatewayResponse(200, json.dumps({"code": "1"}))
+
+        mock_get.side_effect = answer
+
+        async_to_sync(acheck_flexpay_transactions)(
+            order_reference=order.order_reference
+        )
+
+        assert mock_get.call_count == 4
+        assert peak == 2
+
+
 @pytest.mark.django_db
 class TestProbePaymentStatus:
     """Tests for probe_payment_status view."""
@@ -376,7 +471,7 @@ class TestProbePaymentStatus:
         self.factory = RequestFactory()
         self.user = UserFactory()
 
-    @patch("main.flexpaie.check_flexpay_transactions")
+    @patch("main.flexpaie.acheck_flexpay_transactions", new_callable=AsyncMock)
     def test_successful_probe_with_order_number(self, mock_check):
         """Test successful payment probe with order number."""
         mock_check.return_value = {
@@ -391,16 +486,14 @@ class TestProbePaymentStatus:
             data=json.dumps({"order_number": "TEST123"}),
             content_type="application/json",
         )
-        request.user = self.user
-
-        response = probe_payment_status(request)
+        response = _call(probe_payment_status, request, self.user)
 
         assert response.status_code == 200
         data = json.loads(response.content)
         assert data["success"] is True
         assert data["checked"] == 1
 
-    @patch("main.flexpaie.check_flexpay_transactions")
+    @patch("main.flexpaie.acheck_flexpay_transactions", new_callable=AsyncMock)
     def test_probe_with_trans_id(self, mock_check):
         """Test probe with transaction ID."""
         mock_check.return_value = {
@@ -415,15 +508,23 @@ class TestProbePaymentStatus:
             data=json.dumps({"trans_id": "FP123"}),
             content_type="application/json",
         )
-        request.user = self.user
-
-        response = probe_payment_status(request)
+        response = _call(probe_payment_status, request, self.user)
 
         assert response.status_code == 200
         mock_check.assert_called_once_with(
             order_number=None, trans_id="FP123", order_reference=None
         )
 
+    @patch("main.flexpaie.acheck_flexpay_transactions", new_callable=AsyncMock)
+    def test_probe_without_identifier_is_rejected(self, mock_check):
+        request = self.factory.post(
+            "/probe/", data=json.dumps({}), content_type="application/json"
+        )
+        response = _call(probe_payment_status, request, self.user)
+
+        assert response.status_code == 400
+        mock_check.assert_not_called()
+
     def test_probe_handles_exceptions(self):
         """Test that probe handles exceptions gracefully."""
         request = self.factory.post(
@@ -431,9 +532,7 @@ class TestProbePaymentStatus:
             data="invalid json",
             content_type="application/json",
         )
-        request.user = self.user
-
-        response = probe_payment_status(request)
+        response = _call(probe_payment_status, request, self.user)
 
         assert response.status_code == 500
         data = json.loads(response.content)
@@ -451,7 +550,7 @@ class TestMobileProbe:
         self.user = UserFactory()
 
     @patch("main.flexpaie.cancel_expired_orders.delay")
-    @patch("main.flexpaie.check_flexpay_transactions")
+    @patch("main.flexpaie.acheck_flexpay_transactions", new_callable=AsyncMock)
     def test_successful_payment_probe(self, mock_check, mock_cancel):
         """Test successful mobile payment probe."""
         mock_check.return_value = {
@@ -464,9 +563,7 @@ class TestMobileProbe:
             data=json.dumps({"order_number": "MOB123"}),
             content_type="application/json",
         )
-        request.user = self.user
-
-        response = mobile_probe(request)
+        response = _call(mobile_probe, request, self.user)
 
         assert response.status_code == 200
         data = json.loads(response.content)
@@ -475,7 +572,7 @@ class TestMobileProbe:
         assert data["orders_updated"] == 1
 
     @patch("main.flexpaie.cancel_expired_orders.delay")
-    @patch("main.flexpaie.check_flexpay_transactions")
+    @patch("main.flexpaie.acheck_flexpay_transactions", new_callable=AsyncMock)
     def test_failed_payment_triggers_cancellation(self, mock_check, mock_cancel):
         """Test that failed payment triggers order cancellation."""
         mock_check.return_value = {
@@ -488,9 +585,7 @@ class TestMobileProbe:
             data=json.dumps({"order_number": "MOB456"}),
             content_type="application/json",
         )
-        request.user = self.user
-
-        response = mobile_probe(request)
+        response = _call(mobile_probe, request, self.user)
 
         assert response.status_code == 200
         data = json.loads(response.content)
@@ -500,7 +595,7 @@ class TestMobileProbe:
         # Should trigger cancellation
         mock_cancel.assert_called_once()
 
-    @patch("main.flexpaie.check_flexpay_transactions")
+    @patch("main.flexpaie.acheck_flexpay_transactions", new_callable=AsyncMock)
     def test_pending_payment_status(self, mock_check):
         """Test pending payment status."""
         mock_check.return_value = {
@@ -513,14 +608,24 @@ class TestMobileProbe:
             data=json.dumps({"order_number": "MOB789"}),
             content_type="application/json",
         )
-        request.user = self.user
-
-        response = mobile_probe(request)
+        response = _call(mobile_probe, request, self.user)
 
         data = json.loads(response.content)
         assert data["status"] == "pending"
         assert data["success"] is False
 
+    @patch("main.flexpaie.acheck_flexpay_transactions", new_callable=AsyncMock)
+    def test_probe_without_identifier_is_rejected(self, mock_check):
+        request = self.factory.post(
+            "/mobile-probe/",
+            data=json.dumps({"order_number": "  "}),
+            content_type="application/json",
+        )
+        response = _call(mobile_probe, request, self.user)
+
+        assert response.status_code == 400
+        mock_check.assert_not_called()
+
     def test_exception_handling_returns_pending(self):
         """Test that exceptions return pending status."""
         request = self.factory.post(
@@ -528,9 +633,7 @@ class TestMobileProbe:
             data="invalid json",
             content_type="application/json",
         )
-        request.user = self.user
-
-        response = mobile_probe(request)
+        response = _call(mobile_probe, request, self.user)
 
         assert response.status_code == 200  # Still 200 on error
         data = json.loads(response.content)
@@ -0,0 +1,71 @@
+"""
+Unit tests for main.services.flexpay_http
+
+- With FLEXPAY_ASYNC_HTTP off, calls fall back to requests in a thread
+- Client errors surface as GatewayTimeout / GatewayError, HTTP errors do not
+- The shared session is opened and closed by the ASGI lifespan events
+"""
+
+from unittest import mock
+
+import pytest
+import requests
+from asgiref.sync import async_to_sync
+
+from main.services import flexpay_http
+from nexus_backend import asgi
+
+
+@pytest.fixture
+def sync_fallback(settings):
+    settings.FLEXPAY_ASYNC_HTTP = False
+    settings.FLEXPAY_HTTP_TIMEOUT = 7
+    with mock.patch.object(flexpay_http.requests, "request") as request:
+        yield request
+
+
+def test_sync_fallback_uses_requests(sync_fallback):
+    sync_fallback.return_value = mock.Mock(status_code=502, text='{"code": "1"}')
+
+    resp = async_to_sync(flexpay_http.post)("https://flexpay.test/pay", json={"a": 1})
+
+    assert (resp.status_code, resp.json()) == (502, {"code": "1"})
+    sync_fallback.assert_called_once_with(
+        "POST", "https://flexpay.test/pay", json={"a": 1}, headers=None, timeout=7.0
+    )
+
+
+@pytest.mark.parametrize(
+    "error, expected",
+    [
+        (requests.Timeout("slow"), flexpay_http.GatewayTimeout),
+        (requests.ConnectionError("down"), flexpay_http.GatewayError),
+    ],
+)
+def test_client_errors_are_gateway_errors(sync_fallback, error, expected):
+    sync_fallback.side_effect = error
+    with pytest.raises(expected):
+        async_to_sync(flexpay_http.get)("https://flexpay.test/check/1")
+
+
+def test_lifespan_opens_and_closes_the_shared_session():
+    messages = iter([{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}])
+    sent = []
+
+    async def receive():
+        message = next(messages)
+        if message["type"] == "lifespan.shutdown":
+            sent.append(flexpay_http._shared_session() is not None)
+        return message
+
+    async def send(message):
+        sent.append(message["type"])
+
+    async_to_sync(asgi.application)({"type": "lifespan"}, receive, send)
+
+    assert sent == [
+        "lifespan.startup.complete",
+        True,  # the session was shared while the server ran
+        "lifespan.shutdown.complete",
+    ]
+    assert flexpay_http._pool is None
@@ -0,0 +1,113 @@
+"""
+Unit tests for main.services.job_runs
+
+- Watermarks come from the last successful run; failed runs are redone
+- Pruning keeps each job's last successful run
+- Periodic tasks skip without a run when there is no new work
+- Feedback reminders resume after the watermark of the previous run, and
+  come back to installations skipped for lack of an email
+- FlexPay attempts that age out of the poll window unsettled are counted
+"""
+
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+
+from django.utils import timezone
+
+from feedbacks import tasks as feedback_tasks
+from main.factories import InstallationActivityFactory, OrderFactory
+from main.models import JobRun, PaymentAttempt
+from main.services import job_runs
+from main.services.locks import job_lock
+from nexus_backend.celery_tasks import tasks
+
+
+@pytest.mark.django_db
+def test_watermark_comes_from_the_last_successful_run():
+    assert job_runs.watermark("job", default={"id": 0}) == {"id": 0}
+    with job_lock("job") as lock:
+        lock.run.rows_scanned, lock.run.watermark = 10, {"id": 10}
+    with pytest.raises(RuntimeError):
+        with job_lock("job") as lock:
+            lock.run.watermark = {"id": 20}
+            raise RuntimeError("boom")
+
+    assert job_runs.watermark("job") == {"id": 10}
+    assert job_runs.last_success("job").rows_scanned == 10
+    assert job_runs.ran_since("job", timezone.now() - timedelta(minutes=1))
+
+
+@pytest.mark.django_db
+def test_prune_keeps_the_last_successful_run():
+    for _ in range(3):
+        with job_lock("job") as lock:
+            lock.run.watermark = {"id": lock.fencing_token}
+    latest = job_runs.last_success("job")
+    JobRun.objects.update(started_at=timezone.now() - timedelta(days=90))
+
+    assert job_runs.prune(days=30) == 2
+    assert list(JobRun.objects.values_list("pk", flat=True)) == [latest.pk]
+    assert job_runs.watermark("job") == latest.watermark
+
+
+@pytest.mark.django_db
+def test_idle_ticks_do_not_record_runs():
+    assert tasks.cancel_expired_orders()["cancelled"] == 0
+    assert feedback_tasks.lock_expired_feedbacks() == {"locked": 0}
+    assert not JobRun.objects.exists()
+
+
+@pytest.mark.django_db
+def test_feedback_reminders_resume_after_the_watermark():
+    # completed before the default 3-day reminder delay
+    InstallationActivityFactory(completed_at=timezone.now() - timedelta(days=5))
+
+    with mock.patch.object(feedback_tasks, "send_feedback_reminder") as send:
+        assert feedback_tasks.send_feedback_reminders() == {"reminded": 1}
+        assert feedback_tasks.send_feedback_reminders() == {"reminded": 0}
+    assert send.call_count == 1
+
+    first, second = JobRun.objects.filter(
+        job=feedback_tasks.REMINDER_JOB
+    ).order_by("started_at")
+    assert (first.rows_scanned, first.rows_changed) == (1, 1)
+    assert second.rows_scanned == 0
+    assert job_runs.watermark_datetime(feedback_tasks.REMINDER_JOB) is not None
+
+
+@pytest.mark.django_db
+def test_feedback_reminders_revisit_installations_without_email():
+    job = InstallationActivityFactory(completed_at=timezone.now() - timedelta(days=5))
+    user = job.order.user
+    user.email = ""
+    user.save(update_fields=["email"])
+
+    with mock.patch.object(feedback_tasks, "send_feedback_reminder") as send:
+        assert feedback_tasks.send_feedback_reminders() == {"reminded": 0}
+        user.email = "client@example.com"
+        user.save(update_fields=["email"])
+        assert feedback_tasks.send_feedback_reminders() == {"reminded": 1}
+    send.assert_called_once_with(job)
+
+
+@pytest.mark.django_db
+def test_flexpay_poll_counts_attempts_leaving_the_window(settings):
+    attempt = PaymentAttempt.objects.create(
+        order=OrderFactory(), order_number="OLD1", status="pending"
+    )
+    PaymentAttempt.objects.filter(pk=attempt.pk).update(
+        created_at=timezone.now() - timedelta(hours=30)
+    )
+    polled = {"checked": 1, "attempts_updated": 0}
+
+    with mock.patch(
+        "main.flexpaie.check_flexpay_transactions", return_value=dict(polled)
+    ):
+        settings.FLEXPAY_POLL_LOOKBACK_HOURS = 48
+        assert tasks.check_flexpay_transactions()["expired"] == 0
+        # The window moves past the attempt while it is still unsettled
+        settings.FLEXPAY_POLL_LOOKBACK_HOURS = 24
+        assert tasks.check_flexpay_transactions()["expired"] == 1
+        assert tasks.check_flexpay_transactions() == {"checked": 0}
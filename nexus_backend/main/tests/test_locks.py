@@ -0,0 +1,85 @@
+"""
+Unit tests for main.services.locks
+
+- A held lock is exclusive; every acquisition gets a larger fencing token
+- A stale owner can neither release nor renew a lock taken over by another
+- job_lock records the run (owner, fencing token, outcome) on JobRun
+"""
+
+from datetime import date
+
+import pytest
+
+from django.core.cache import cache
+
+from main.models import JobRun
+from main.services.locks import DistributedLock, LockLost, job_lock
+from nexus_backend.celery_tasks import tasks
+
+
+def test_lock_is_exclusive_and_fencing_tokens_grow():
+    first = DistributedLock("job", 30, heartbeat=False)
+    assert first.acquire()
+    assert not DistributedLock("job", 30, heartbeat=False).acquire()
+    first.release()
+
+    second = DistributedLock("job", 30, heartbeat=False)
+    assert second.acquire()
+    assert second.fencing_token > first.fencing_token
+    second.release()
+
+
+def test_stale_owner_cannot_release_or_renew():
+    stale = DistributedLock("job", 30, heartbeat=False)
+    stale.acquire()
+    cache.delete(stale.key)  # lease expired
+    current = DistributedLock("job", 30, heartbeat=False)
+    assert current.acquire()
+
+    assert not stale.renew()
+    with pytest.raises(LockLost):
+        stale.ensure_held()
+    stale.release()
+    assert cache.get(current.key) == current.token
+    current.ensure_held()
+    current.release()
+
+
+@pytest.mark.django_db
+def test_job_lock_records_the_run():
+    with job_lock("billing.test") as lock:
+        assert lock
+        with job_lock("billing.test") as busy:
+            assert not busy
+
+    run = JobRun.objects.get(job="billing.test")
+    assert run.status == JobRun.Status.SUCCEEDED
+    assert run.fencing_token == lock.fencing_token
+    assert run.owner == lock.token and run.finished_at is not None
+
+
+@pytest.mark.django_db
+def test_job_lock_records_failures_and_releases():
+    with pytest.raises(ValueError):
+        with job_lock("billing.test"):
+            raise ValueError("boom")
+
+    run = JobRun.objects.get(job="billing.test")
+    assert run.status == JobRun.Status.FAILED and "boom" in run.error
+    with job_lock("billing.test") as lock:
+        assert lock
+
+
+@pytest.mark.django_db
+def test_cutoff_enforcement_skips_while_another_worker_runs(monkeypatch):
+    # anchor 2026-01-20, cutoff the day before
+    monkeypatch.setattr(tasks.timezone, "localdate", lambda: date(2026, 1, 19))
+    cfg = tasks.config_cache.billing_config()
+    cfg.anchor_day = 20
+    cfg.cutoff_days_before_anchor = 1
+    cfg.auto_suspend_on_cutoff = True
+    monkeypatch.setattr(tasks.config_cache, "billing_config", lambda: cfg)
+
+    with job_lock("billing.cutoff_enforcement"):
+        assert tasks.run_cutoff_enforcement() == "Skip: lock held"
+    assert tasks.run_cutoff_enforcement() == "suspended=0"
@@ -0,0 +1,157 @@
+"""
+Unit tests for main.services.otp
+
+- Codes are checked against a cached HMAC; attempts lock the challenge
+- Logins inside the resend cooldown reuse the live challenge, resends throttle
+- Sends are limited per phone across users; only OTPAudit rows hit the DB
+- prune drops old audit rows and legacy OTPVerification rows
+- A resend that cannot be delivered (no phone) reports an error
+- Per-IP limits key on the address the trusted proxy saw, not a spoofed hop,
+  and are skipped when no proxy count is configured
+"""
+
+import logging
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+
+from django.urls import reverse
+from django.utils import timezone
+
+from main.factories import UserFactory
+from main.models import OTPAudit, OTPVerification
+from main.services import otp
+from main.tasks import prune_otp_audit
+from user.views import _client_ip
+
+pytestmark = pytest.mark.django_db
+
+
+def _wrong(code: str) -> str:
+    return f"{(int(code) + 1) % 10**6:06d}"
+
+
+def test_verify_checks_the_hashed_code():
+    user = UserFactory()
+    issued = otp.issue(user, otp.LOGIN, phone=user.phone, ip="10.0.0.1")
+    stored = otp._get_backend().load(otp._key("ch", issued.challenge_id))
+    assert issued.code not in stored.values()
+
+    wrong = otp.verify(user, otp.LOGIN, _wrong(issued.code))
+    assert (wrong.status, wrong.attempts) == (otp.INVALID, 1)
+    assert otp.verify(UserFactory(), otp.LOGIN, issued.code).status == otp.EXPIRED
+    assert otp.verify(user, otp.SIGNUP, issued.code).status == otp.EXPIRED
+
+    result = otp.verify(user, otp.LOGIN, issued.code, challenge_id=issued.challenge_id)
+    assert result.ok and result.attempts == 2
+    assert otp.verify(user, otp.LOGIN, issued.code).status == otp.EXPIRED
+
+    audit = OTPAudit.objects.get(user=user)
+    assert (audit.status, audit.attempts, audit.ip) == ("verified", 2, "10.0.0.1")
+    assert audit.resolved_at is not None
+
+
+def test_too_many_attempts_lock_the_challenge(settings):
+    settings.OTP = {"MAX_ATTEMPTS": 3}
+    user = UserFactory()
+    issued = otp.issue(user, otp.SIGNUP, phone=user.phone)
+
+    statuses = [
+        otp.verify(user, otp.SIGNUP, _wrong(issued.code)).status for _ in range(3)
+    ]
+    assert statuses == [otp.INVALID, otp.INVALID, otp.LOCKED]
+    assert otp.verify(user, otp.SIGNUP, issued.code).status == otp.EXPIRED
+    assert OTPAudit.objects.get(user=user).status == OTPAudit.Status.LOCKED
+
+
+def test_login_inside_cooldown_reuses_the_challenge():
+    user = UserFactory()
+    first = otp.issue(user, otp.LOGIN, phone=user.phone)
+    again = otp.issue(user, otp.LOGIN, phone=user.phone)
+    assert again == otp.Issued(first.challenge_id, None)
+
+    with pytest.raises(otp.OTPThrottled) as exc:
+        otp.resend(user, otp.LOGIN, phone=user.phone)
+    assert 0 < exc.value.retry_after <= 60
+    assert OTPAudit.objects.filter(user=user).count() == 1
+
+
+def test_resend_rotates_the_code_under_the_same_challenge(settings):
+    settings.OTP = {"RESEND_COOLDOWN_SECONDS": 0}
+    user = UserFactory()
+    with patch.object(otp, "_new_code", side_effect=["111111", "222222"]):
+        first = otp.issue(user, otp.LOGIN, phone=user.phone)
+        second = otp.resend(user, otp.LOGIN, phone=user.phone)
+    assert second == otp.Issued(first.challenge_id, "222222")
+
+    assert otp.verify(user, otp.LOGIN, first.code).status == otp.INVALID
+    assert otp.verify(user, otp.LOGIN, second.code).ok
+    assert OTPAudit.objects.get(user=user).sends == 2
+
+
+def test_sends_are_limited_per_phone(settings):
+    settings.OTP = {"RESEND_COOLDOWN_SECONDS": 0, "SEND_LIMITS": {"phone": (2, 3600)}}
+    users = UserFactory.create_batch(3)
+    for user in users[:2]:
+        otp.issue(user, otp.SIGNUP, phone="+243990000000")
+
+    with pytest.raises(otp.OTPThrottled):
+        otp.issue(users[2], otp.SIGNUP, phone="+243990000000")
+    otp.issue(users[2], otp.SIGNUP, phone="+243990000001")
+    assert OTPAudit.objects.count() == 3
+
+
+def test_prune_drops_old_audits_and_legacy_rows():
+    user = UserFactory()
+    otp.issue(user, otp.LOGIN, phone=user.phone)
+    old = timezone.now() - timedelta(days=91)
+    OTPAudit.objects.update(created_at=old)
+    otp.issue(UserFactory(), otp.LOGIN)
+    OTPVerification.objects.create(user=user)
+    OTPVerification.objects.update(created_at=old)
+
+    prune_otp_audit()
+
+    assert OTPAudit.objects.count() == 1
+    assert not OTPVerification.objects.exists()
+
+
+def test_client_ip_ignores_client_supplied_forwarded_hops(settings, rf):
+    spoofed = {"HTTP_X_FORWARDED_FOR": "1.2.3.4, 198.51.100.7"}
+    request = rf.get("/", REMOTE_ADDR="10.0.0.2", **spoofed)
+
+    settings.TRUSTED_PROXY_COUNT = 0
+    assert _client_ip(request) == "10.0.0.2"
+    settings.TRUSTED_PROXY_COUNT = 1
+    assert _client_ip(request) == "198.51.100.7"
+    settings.TRUSTED_PROXY_COUNT = 3  # fewer hops than proxies
+    assert _client_ip(request) == "10.0.0.2"
+
+
+def test_per_ip_limits_are_skipped_without_a_proxy_count(settings, rf):
+    # Default configuration: REMOTE_ADDR is the platform proxy, shared by all.
+    settings.TRUSTED_PROXY_COUNT = None
+    settings.OTP = {"SEND_LIMITS": {"ip": (1, 3600)}}
+    request = rf.get("/", REMOTE_ADDR="10.0.0.2")
+    assert _client_ip(request) is None
+
+    for user in UserFactory.create_batch(3):
+        ip = _client_ip(request)
+        assert otp.issue(user, otp.LOGIN, phone=user.phone, ip=ip).code
+
+
+def test_resend_without_phone_fails_and_never_logs_the_code(client, caplog):
+    user = UserFactory(phone=None)
+    session = client.session
+    session["uid"] = user.pk
+    session.save()
+
+    with caplog.at_level(logging.INFO), patch.object(
+        otp, "_new_code", return_value="424242"
+    ):
+        resp = client.post(reverse("resend_otp"))
+
+    assert resp.status_code == 400
+    assert resp.json()["success"] is False
+    assert "424242" not in caplog.text
@@ -0,0 +1,109 @@
+"""
+Unit tests for main.services.outbox
+
+- Messages are rows in the caller's transaction (rollback sends nothing)
+- A drain delivers queued email over the configured backend
+- SMS falls back to the numeric sender; failures back off, then dead-letter
+- Sensitive bodies are erased once a message leaves the queue
+"""
+
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from django.core import mail
+from django.db import transaction
+from django.utils import timezone
+
+from main.models import OutboundMessage
+from main.services import outbox
+
+
+@pytest.fixture(autouse=True)
+def outbox_settings(settings):
+    settings.EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+    settings.NOTIFICATION_OUTBOX = {"RATE_LIMITS": {}, "SMS_SENDER": "NEXUS"}
+    settings.TWILIO_PHONE_NUMBER = "+15550001111"
+
+
+class FakeMessages:
+    def __init__(self, fail_from=()):
+        self.fail_from = set(fail_from)
+        self.sent = []
+
+    def create(self, body, from_, to):
+        if from_ in self.fail_from:
+            raise RuntimeError(f"sender {from_} rejected")
+        self.sent.append((from_, to, body))
+        return SimpleNamespace(sid=f"SM{len(self.sent)}")
+
+
+@pytest.fixture
+def sms(monkeypatch):
+    messages = FakeMessages()
+    monkeypatch.setattr(
+        outbox, "twilio_client", lambda: SimpleNamespace(messages=messages)
+    )
+    return messages
+
+
+@pytest.mark.django_db
+def test_rolled_back_transaction_queues_nothing():
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            outbox.queue_email("Hi", "body", ["a@example.com"])
+            raise RuntimeError("business change failed")
+
+    assert not OutboundMessage.objects.exists()
+
+
+@pytest.mark.django_db
+def test_drain_delivers_email_batch():
+    outbox.queue_email("One", "text", ["a@example.com"], html_body="<p>html</p>")
+    outbox.queue_email("Two", "text", "b@example.com", from_email="ops@example.com")
+
+    stats = outbox.drain()
+
+    assert stats == {"claimed": 2, "sent": 2, "retried": 0, "dead": 0}
+    assert sorted(m.subject for m in mail.outbox) == ["One", "Two"]
+    first = next(m for m in mail.outbox if m.subject == "One")
+    assert first.alternatives[0][0] == "<p>html</p>"
+    assert set(OutboundMessage.objects.values_list("status", flat=True)) == {"sent"}
+
+
+@pytest.mark.django_db
+def test_sms_falls_back_to_numeric_sender(sms):
+    sms.fail_from = {"NEXUS"}
+    message = outbox.queue_sms("243812345678", "hello", category="test")
+
+    outbox.drain()
+
+    message.refresh_from_db()
+    assert message.status == OutboundMessage.Status.SENT
+    assert message.provider_id == "SM1"
+    assert sms.sent == [("+15550001111", "+243812345678", "hello")]
+
+
+@pytest.mark.django_db
+def test_failures_back_off_then_dead_letter_and_erase_sensitive_body(sms):
+    sms.fail_from = {"NEXUS", "+15550001111"}
+    message = outbox.queue_sms("+243812345678", "OTP 123456", sensitive=True)
+    OutboundMessage.objects.filter(pk=message.pk).update(max_attempts=2)
+
+    assert outbox.drain()["retried"] == 1
+    message.refresh_from_db()
+    assert message.status == OutboundMessage.Status.PENDING
+    assert message.next_attempt_at > timezone.now()
+    assert message.body == "OTP 123456"
+    assert outbox.drain()["claimed"] == 0  # not due yet
+
+    OutboundMessage.objects.filter(pk=message.pk).update(
+        next_attempt_at=timezone.now() - timedelta(seconds=1)
+    )
+    assert outbox.drain()["dead"] == 1
+    message.refresh_from_db()
+    assert message.status == OutboundMessage.Status.DEAD
+    assert message.attempts == 2
+    assert message.body == ""
+    assert "rejected" in message.last_error
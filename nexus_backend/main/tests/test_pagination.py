@@ -0,0 +1,86 @@
+"""
+Unit tests for main.utilities.pagination
+
+- Cursors round-trip typed sort keys and reject garbage
+- Walking a list with cursors yields every row once, in order (NULLs last)
+- Page sizes are clamped server-side
+"""
+
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from django.test import RequestFactory
+
+from main.factories import SubscriptionFactory
+from main.models import Subscription
+from main.utilities.pagination import (
+    MAX_PAGE_SIZE,
+    InvalidCursor,
+    approximate_count,
+    decode_cursor,
+    encode_cursor,
+    keyset_page,
+    order_by_keys,
+    page_size,
+)
+
+
+def test_cursor_round_trips_typed_values():
+    values = [
+        datetime(2025, 3, 1, 12, 30, tzinfo=timezone.utc),
+        date(2025, 3, 1),
+        Decimal("12.50"),
+        None,
+        42,
+    ]
+    assert decode_cursor(encode_cursor(values)) == values
+
+
+@pytest.mark.parametrize("token", ["", "not-base64!", encode_cursor([])[:-1] + "x"])
+def test_decode_cursor_rejects_garbage(token):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token)
+
+
+def test_page_size_is_clamped():
+    rf = RequestFactory()
+    assert page_size(rf.get("/", {"per_page": "5000"})) == MAX_PAGE_SIZE
+    assert page_size(rf.get("/", {"per_page": "0"})) == 1
+    assert page_size(rf.get("/", {"per_page": "abc"}), default=7) == 7
+
+
+@pytest.mark.django_db
+def test_cursor_walk_visits_every_row_once_with_nulls_last():
+    for started in [date(2025, 1, 1), date(2025, 1, 1), None, date(2025, 2, 1), None]:
+        SubscriptionFactory(started_at=started)
+
+    ordering = ("-started_at", "-id")
+    qs = Subscription.objects.values("id", "started_at")
+    expected = [r["id"] for r in order_by_keys(qs, ordering)]
+
+    seen, cursor = [], None
+    while True:
+        page = keyset_page(qs, ordering, cursor=cursor, size=2)
+        seen.extend(r["id"] for r in page.items)
+        if not page.has_more:
+            break
+        cursor = page.next_cursor
+
+    assert seen == expected
+    assert [r["started_at"] for r in order_by_keys(qs, ordering)][-2:] == [None, None]
+
+
+@pytest.mark.django_db
+def test_offset_page_and_approximate_count():
+    subs = [SubscriptionFactory(started_at=date(2025, 1, d)) for d in range(1, 6)]
+    qs = Subscription.objects.filter(status="active")
+
+    page = keyset_page(
+        qs.only("id", "started_at"), ("-started_at", "-id"), page=2, size=2
+    )
+
+    assert [s.id for s in page.items] == [subs[2].id, subs[1].id]
+    assert page.number == 2 and page.has_more
+    assert approximate_count(qs) == 5
@@ -0,0 +1,70 @@
+"""
+Unit tests for main.services.pdf_assets
+
+- Static images are resolved once and handed out print-sized
+- Company images are copied locally once and refreshed when settings change
+"""
+
+import os
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from main.models import CompanySettings
+from main.services import pdf_assets
+
+
+def _png(size):
+    buf = BytesIO()
+    Image.new("RGB", size, "navy").save(buf, "PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture(autouse=True)
+def fresh_assets():
+    pdf_assets.clear()
+    yield
+    pdf_assets.clear()
+
+
+def test_static_logo_is_resolved_once_and_print_sized(settings, monkeypatch):
+    lookups = []
+    real_find = pdf_assets.finders.find
+    monkeypatch.setattr(
+        pdf_assets.finders, "find", lambda p: lookups.append(p) or real_find(p)
+    )
+    uri = f"{settings.STATIC_URL}{pdf_assets.LOGO_STATIC_PATH}"
+
+    first = pdf_assets.resolve_uri(uri)
+    again = pdf_assets.resolve_uri(uri)
+
+    assert first == again and os.path.exists(first)
+    assert len(lookups) <= 1
+    with Image.open(first) as img:
+        assert max(img.size) <= pdf_assets.PRINT_MAX_PX
+    with open(first, "rb") as fh:
+        assert pdf_assets.logo_bytes() == fh.read()
+
+
+@pytest.mark.django_db
+def test_company_asset_follows_settings_changes(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    cs = CompanySettings.get()
+    cs.signature = SimpleUploadedFile("sig.png", _png((2400, 800)))
+    cs.save()
+
+    asset = pdf_assets.company_asset(cs, "signature")
+    assert asset.url == asset.path and os.path.exists(asset.path)
+    with Image.open(asset.path) as img:
+        assert img.size == (pdf_assets.PRINT_MAX_PX, 400)
+    assert pdf_assets.company_asset(cs, "signature") == asset
+    assert pdf_assets.company_asset(cs, "stamp") is None
+
+    cs.signature = SimpleUploadedFile("sig2.png", _png((300, 100)))
+    cs.save()
+    refreshed = pdf_assets.company_asset(cs, "signature")
+    with Image.open(refreshed.path) as img:
+        assert img.size == (300, 100)
@@ -0,0 +1,114 @@
+"""
+Unit tests for main.services.photos
+
+- Variants are oriented, resized and carry no EXIF
+- Capture time and GPS position are read from EXIF
+- Ingest bulk-inserts rows and skips duplicate content
+- A storage failure keeps the staged upload and leaves no variant behind
+"""
+
+from io import BytesIO
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from main.factories import InstallationActivityFactory
+from main.models import InstallationPhoto
+from main.services import photos
+
+
+def _jpeg(color="red", size=(400, 200), exif=None):
+    img = Image.new("RGB", size, color)
+    buffer = BytesIO()
+    img.save(buffer, format="JPEG", **({"exif": exif} if exif is not None else {}))
+    return buffer.getvalue()
+
+
+def _phone_exif():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotated 90° clockwise
+    exif[0x8769] = {36867: "2025:03:01 10:30:00"}
+    exif[0x8825] = {
+        1: "S",
+        2: (4.0, 19.0, 12.0),
+        3: "E",
+        4: (15.0, 18.0, 0.0),
+    }
+    return exif
+
+
+def test_process_image_orients_resizes_and_strips_metadata():
+    result = photos.process_image(_jpeg(exif=_phone_exif()))
+
+    assert set(result.variants) == set(photos.VARIANT_SIZES)
+    thumb = Image.open(BytesIO(result.variants["thumb"]))
+    assert thumb.size == (160, 320)  # portrait after orientation
+    for body in result.variants.values():
+        assert not Image.open(BytesIO(body)).getexif()
+
+    assert result.taken_at is not None
+    assert (result.taken_at.year, result.taken_at.hour) == (2025, 10)
+    assert result.latitude == pytest.approx(-4.32)
+    assert result.longitude == pytest.approx(15.3)
+
+
+@pytest.mark.django_db
+def test_ingest_bulk_inserts_and_skips_duplicates(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    activity = InstallationActivityFactory()
+    red, blue = _jpeg("red"), _jpeg("blue")
+
+    def queue(*bodies):
+        files = [
+            SimpleUploadedFile(f"p{i}.jpg", b, content_type="image/jpeg")
+            for i, b in enumerate(bodies)
+        ]
+        items = [
+            {"staged": name, "fields": {"photo_type": "after"}}
+            for name in photos.stage_uploads(InstallationPhoto, files)
+        ]
+        return photos.ingest(InstallationPhoto._meta.label, activity.pk, items)
+
+    assert queue(red, red, blue) == {
+        "created": 2,
+        "duplicates": 1,
+        "failed": 0,
+        "retry": [],
+    }
+    assert queue(blue) == {"created": 0, "duplicates": 1, "failed": 0, "retry": []}
+
+    stored = list(InstallationPhoto.objects.filter(installation_activity=activity))
+    assert len(stored) == 2
+    for photo in stored:
+        assert photo.photo_type == "after"
+        assert set(photo.variants) == {"screen", "thumb"}
+        assert photo.thumb_url != photo.screen_url
+    assert not list((tmp_path / photos.STAGING_DIR).iterdir())
+
+
+@pytest.mark.django_db
+def test_storage_failure_keeps_the_staged_upload(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    activity = InstallationActivityFactory()
+    upload = SimpleUploadedFile("p.jpg", _jpeg("green"), content_type="image/jpeg")
+    staged = photos.stage_uploads(InstallationPhoto, [upload])
+    items = [{"staged": name} for name in staged]
+    storage = photos._image_field(InstallationPhoto).storage
+    real_save, calls = storage.save, []
+
+    def flaky_save(name, content, **kwargs):
+        calls.append(name)
+        if len(calls) == 2:
+            raise OSError("bucket unavailable")
+        return real_save(name, content, **kwargs)
+
+    with patch.object(storage, "save", flaky_save):
+        stats = photos.ingest(InstallationPhoto._meta.label, activity.pk, items)
+
+    assert stats == {"created": 0, "duplicates": 0, "failed": 0, "retry": items}
+    assert storage.exists(items[0]["staged"])
+    assert not storage.exists(calls[0])
+    assert not InstallationPhoto.objects.filter(installation_activity=activity).exists()
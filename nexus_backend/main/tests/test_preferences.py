@@ -0,0 +1,102 @@
+"""
+Unit tests for main.services.preferences
+
+- Preferences are cached per user and dropped from the cache on every save
+- Avatar uploads become square JPEG variants whose URLs are saved on the user
+- Replaced avatar files are deleted once the transaction commits
+- On Spaces, avatars go to public storage whose URLs do not expire
+"""
+
+import io
+
+import pytest
+from PIL import Image
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from main.factories import UserFactory
+from main.models import UserPreferences
+from main.services import preferences
+from nexus_backend.storage_backend import PublicMediaStorage
+
+pytestmark = pytest.mark.django_db
+
+
+def _upload(size=(900, 600), fmt="PNG"):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(buffer, format=fmt)
+    return SimpleUploadedFile(f"me.{fmt.lower()}", buffer.getvalue())
+
+
+def test_preferences_are_cached_until_saved(django_assert_num_queries):
+    user = UserFactory()
+    assert preferences.for_user(user).notify_updates is True
+    with django_assert_num_queries(0):
+        preferences.for_user(user)
+
+    preferences.update(user, notify_updates=False, twofa_enabled=True)
+    assert preferences.for_user(user) == preferences.Preferences(
+        notify_updates=False, twofa_enabled=True
+    )
+
+    UserPreferences.objects.get(user=user).delete()  # admin or cascade
+    assert preferences.for_user(user).notify_updates is True
+
+
+def test_update_rejects_unknown_fields():
+    with pytest.raises(TypeError):
+        preferences.update(UserFactory(), avatar="x.jpg")
+
+
+def test_avatar_variants_are_square_and_their_urls_saved(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    user = UserFactory()
+
+    url = preferences.set_avatar(user, _upload())
+
+    user.refresh_from_db()
+    assert url == user.avatar_url == user.avatar_urls["medium"]
+    assert set(user.avatar_urls) == set(preferences.AVATAR_SIZES)
+    prefs = UserPreferences.objects.get(user=user)
+    with prefs.avatar.open("rb") as f:
+        assert Image.open(f).size == (512, 512)
+    assert set(prefs.avatar_variants) == {"medium", "small"}
+
+
+def test_replaced_avatar_files_are_deleted_on_commit(
+    settings, tmp_path, django_capture_on_commit_callbacks
+):
+    settings.MEDIA_ROOT = str(tmp_path)
+    user = UserFactory()
+    preferences.set_avatar(user, _upload())
+    storage = UserPreferences._meta.get_field("avatar").storage
+    old = [UserPreferences.objects.get(user=user).avatar.name]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        preferences.set_avatar(user, _upload((300, 300), "JPEG"))
+    assert not any(storage.exists(name) for name in old)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        preferences.clear_avatar(user)
+    user.refresh_from_db()
+    assert user.avatar_urls == {}
+    assert user.avatar_url == "/static/icons/account_avatar.png"
+    assert not list(tmp_path.rglob("*.jpg"))
+
+
+def test_unreadable_avatar_is_rejected(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    with pytest.raises(preferences.InvalidAvatar):
+        preferences.set_avatar(
+            UserFactory(), SimpleUploadedFile("me.png", b"not an image")
+        )
+    assert not list(tmp_path.rglob("*"))
+
+
+def test_public_avatar_urls_are_unsigned():
+    storage = PublicMediaStorage(
+        bucket_name="nexus", custom_domain="cdn.example", access_key="k", secret_key="s"
+    )
+    url = storage.url("avatars/1/abc_large.jpg")
+    assert url == "https://cdn.example/public/avatars/1/abc_large.jpg"
+    assert storage.default_acl == "public-read"
@@ -0,0 +1,86 @@
+"""
+Unit tests for main.utilities.query_budget
+
+- Query shapes collapse literals and IN lists
+- Repeated shapes and totals over budget are reported
+- Decorated calls raise in "raise" mode and pass through when "off"
+- Per-item budgets are checked against the item count the call reports
+"""
+
+import pytest
+
+from main.factories import UserFactory
+from main.models import User
+from main.utilities.query_budget import (
+    QueryBudget,
+    QueryBudgetExceeded,
+    budget_items,
+    budget_of,
+    query_budget,
+    query_shape,
+    record_queries,
+)
+
+
+def test_query_shape_collapses_literals_and_lists():
+    a = query_shape("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x'")
+    b = query_shape("SELECT  *  FROM t WHERE id IN (%s) AND name = 'y''s'")
+    assert a == b == "SELECT * FROM t WHERE id IN (...) AND name = ?"
+    assert query_shape("SELECT 1 FROM t LIMIT 21") == "SELECT ? FROM t LIMIT ?"
+
+
+@pytest.mark.django_db
+def test_budget_reports_repeated_shapes_and_totals():
+    users = UserFactory.create_batch(3)
+    with record_queries() as recorder:
+        for u in users:
+            User.objects.filter(pk=u.pk).exists()
+
+    assert recorder.count == 3
+    assert len(recorder.repeated(2)) == 1
+    QueryBudget(3, max_repeats=3).check(recorder)
+    assert QueryBudget(10, max_repeats=2).violations(recorder)
+    assert not QueryBudget(1, per_item=1).violations(recorder, items=3)
+    with pytest.raises(QueryBudgetExceeded, match="3 queries for 1 item"):
+        QueryBudget(1, max_repeats=None).check(recorder, items=1)
+
+
+@pytest.mark.django_db
+def test_decorated_call_raises_only_when_enabled(settings):
+    UserFactory.create_batch(3)
+
+    @query_budget(2)
+    def n_plus_one():
+        return [User.objects.filter(pk=u.pk).count() for u in User.objects.all()]
+
+    assert budget_of(n_plus_one) == QueryBudget(2)
+
+    settings.QUERY_BUDGET_MODE = "off"
+    assert n_plus_one() == [1, 1, 1]
+
+    settings.QUERY_BUDGET_MODE = "raise"
+    with pytest.raises(QueryBudgetExceeded, match="n_plus_one"):
+        n_plus_one()
+
+
+@pytest.mark.django_db
+def test_per_item_budget_uses_the_reported_item_count(settings):
+    settings.QUERY_BUDGET_MODE = "raise"
+    users = UserFactory.create_batch(3)
+
+    @query_budget(1, per_item=1, max_repeats=None)
+    def touch(items, extra=0, report=True):
+        if report:
+            budget_items(items)
+        for u in users[:items]:
+            User.objects.filter(pk=u.pk).exists()
+        for _ in range(extra):
+            User.objects.exists()
+
+    touch(3)  # budget 1 + 2 * 1
+    touch(1, extra=5, report=False)  # no count: only shapes are checked
+    with pytest.raises(QueryBudgetExceeded, match="4 queries for 3 item"):
+        touch(3, extra=1)
+    with pytest.raises(QueryBudgetExceeded, match="3 queries for 1 item"):
+        touch(1, extra=2)
+    budget_items(5)  # outside a budgeted call: ignored
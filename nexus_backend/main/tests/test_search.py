@@ -0,0 +1,82 @@
+"""
+Unit tests for main.services.search
+
+- Phone terms are reduced to digits without the trunk prefix
+- Customers match on name/email (case-insensitive) and phone digits
+- Related fields (order -> user) are matched through a subquery
+"""
+
+import pytest
+
+from main.factories import OrderFactory, UserFactory
+from main.models import Order, User
+from main.services.search import (
+    CUSTOMER_FIELDS,
+    CUSTOMER_PHONE_FIELDS,
+    ORDER_FIELDS,
+    apply_search,
+    phone_digits,
+)
+
+
+@pytest.mark.parametrize(
+    "term, expected",
+    [
+        ("+243 81 234 5678", "243812345678"),
+        ("081-234", "81234"),
+        ("john", ""),
+    ],
+)
+def test_phone_digits(term, expected):
+    assert phone_digits(term) == expected
+
+
+def _customers(term, **kwargs):
+    qs = apply_search(
+        User.objects.all(),
+        term,
+        CUSTOMER_FIELDS,
+        phone_fields=CUSTOMER_PHONE_FIELDS,
+        **kwargs,
+    )
+    return set(qs.values_list("full_name", flat=True))
+
+
+@pytest.mark.django_db
+def test_customer_search_matches_name_email_and_phone_digits():
+    UserFactory(full_name="Amani Kabila", email="amani@x.com", phone="+243812345678")
+    UserFactory(full_name="Grace Mbuyi", email="grace@x.com", phone="+243990000001")
+
+    assert _customers("kabila") == {"Amani Kabila"}
+    assert _customers("GRACE@") == {"Grace Mbuyi"}
+    assert _customers("0812 345") == {"Amani Kabila"}
+    assert _customers("  ") == {"Amani Kabila", "Grace Mbuyi"}
+
+
+@pytest.mark.django_db
+def test_ranked_customer_search_puts_best_match_first():
+    UserFactory(full_name="Mukendia Grace")
+    UserFactory(full_name="Jean Mukendi")
+
+    qs = apply_search(User.objects.all(), "mukendi", CUSTOMER_FIELDS, rank=True)
+
+    assert [u.full_name for u in qs] == ["Jean Mukendi", "Mukendia Grace"]
+
+
+@pytest.mark.django_db
+def test_order_search_follows_user_relation():
+    match = OrderFactory(user=UserFactory(full_name="Patrice Lumumba"))
+    OrderFactory(user=UserFactory(full_name="Someone Else"))
+
+    ids = list(
+        apply_search(Order.objects.all(), "lumumba", ORDER_FIELDS).values_list(
+            "id", flat=True
+        )
+    )
+    ref_ids = list(
+        apply_search(Order.objects.all(), match.order_reference, ORDER_FIELDS)
+        .values_list("id", flat=True)
+    )
+
+    assert ids == [match.id]
+    assert ref_ids == [match.id]
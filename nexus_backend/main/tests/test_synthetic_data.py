@@ -0,0 +1,103 @@
+"""
+Unit tests for main.services.synthetic_data
+
+- A small dataset is written in several chunks with consistent foreign keys
+- Orders sit inside the region polygon they are assigned to
+- Sequences continue after the assigned ids
+"""
+
+from datetime import datetime
+
+import pytest
+
+from django.db.models import Max
+from django.utils import timezone
+
+from main.factories import OrderFactory
+from main.models import (
+    AccountEntry,
+    Order,
+    PaymentAttempt,
+    StarlinkKitInventory,
+    StarlinkKitMovement,
+    Subscription,
+    User,
+)
+from main.services import synthetic_data
+from main.services.region_resolver import resolve_region_from_coords
+
+SMALL = synthetic_data.Scale(
+    users=20,
+    orders=40,
+    subscriptions=10,
+    kits=15,
+    kit_movements=40,
+    payment_attempts=60,
+    account_entries=200,
+    regions=4,
+)
+
+
+@pytest.fixture
+def dataset(db):
+    layout = synthetic_data.build_layout(
+        SMALL, seed=7, as_of=timezone.make_aware(datetime(2026, 6, 15, 12))
+    )
+    totals = synthetic_data.generate(layout, workers=1, chunk_size=7)
+    return layout, totals
+
+
+def test_small_dataset_is_consistent(dataset):
+    layout, totals = dataset
+    synthetic = User.objects.filter(email__endswith=synthetic_data.EMAIL_DOMAIN)
+    assert synthetic.count() == SMALL.users == synthetic_data.existing_rows()
+    assert totals["main.Order"] == Order.objects.count() == SMALL.orders
+    assert Subscription.objects.count() == SMALL.subscriptions
+    assert StarlinkKitInventory.objects.count() == SMALL.kits
+    assert PaymentAttempt.objects.exists() and AccountEntry.objects.exists()
+    received = StarlinkKitMovement.objects.filter(movement_type="received")
+    assert received.count() == SMALL.kits
+
+    for user in synthetic[:3]:  # rows normally created by post_save signals
+        assert user.billing_account and user.wallet and user.prefs
+
+    for sub in Subscription.objects.select_related("order__kit_inventory"):
+        assert sub.order.status == "fulfilled"
+        kit = sub.order.kit_inventory
+        assert kit.is_assigned and kit.assigned_to_order_id == sub.order_id
+        periods = list(
+            sub.billing_entries.filter(entry_type="invoice").values_list(
+                "period_start", "period_end"
+            )
+        )
+        assert periods and len(set(periods)) == len(periods)
+
+
+def test_orders_fall_inside_their_region(dataset):
+    for order in Order.objects.exclude(region=None)[:20]:
+        region, tag = resolve_region_from_coords(order.latitude, order.longitude)
+        assert (region.pk, tag) == (order.region_id, "auto")
+
+
+def test_sequences_continue_after_assigned_ids(dataset):
+    last_order = Order.objects.filter(order_reference__startswith="SYN-").aggregate(
+        m=Max("pk")
+    )["m"]
+    last_user = User.objects.aggregate(m=Max("id_user"))["m"]
+
+    order = OrderFactory()  # also creates a user
+    assert order.pk > last_order and order.user_id > last_user
+
+
+def test_chunks_run_in_a_process_pool(transactional_db):
+    # transactional_db: pool workers commit through their own connections.
+    layout = synthetic_data.build_layout(
+        SMALL, seed=7, as_of=timezone.make_aware(datetime(2026, 6, 15, 12))
+    )
+    totals = synthetic_data.generate(layout, workers=2, chunk_size=7)
+
+    assert totals["main.Order"] == Order.objects.count() == SMALL.orders
+    assert synthetic_data.existing_rows() == SMALL.users
+    assert Subscription.objects.count() == SMALL.subscriptions
+    received = StarlinkKitMovement.objects.filter(movement_type="received")
+    assert received.count() == SMALL.kits
@@ -1,8 +1,6 @@
 from os import environ
 from typing import Optional, Tuple
 
-from twilio.rest import Client
-
 
 def send_otp_sms(
     full_name: str,
@@ -36,6 +34,8 @@ def send_otp_sms(
           This function tries `alpha_sender` first, then falls back to your
           numeric Twilio number if provided.
     """
+    from twilio.rest import Client
+
     sid = sid or environ.get("TWILIO_ACCOUNT_SID")
     token = token or environ.get("TWILIO_AUTH_TOKEN")
     fallback_number = fallback_number or environ.get("TWILIO_PHONE_NUMBER")
@@ -0,0 +1,297 @@
+"""
+Cursor (keyset) pagination and projection helpers for staff JSON lists.
+
+Usage in a view:
+
+    size = page_size(request, default=25)
+    page = keyset_page(
+        qs.values("id", "status", "user__full_name", "created_at"),
+        ordering=("-created_at", "-id"),
+        cursor=request.GET.get("cursor"),
+        page=request.GET.get("page"),
+        size=size,
+    )
+    return JsonResponse({"items": page.items, **page.meta()})
+
+- Cursors are opaque tokens encoding the sort-key values of the last row of
+  the previous page; the next page is read with a range condition on those
+  keys, so its cost does not depend on how deep the client has scrolled.
+- ``ordering`` must end with a unique column (normally ``id``/``-id``) and
+  should match an index. NULL sort keys are ordered last in both directions.
+- Without a cursor the page number is used as an offset (first page, jumps).
+- Page sizes are clamped server-side (``MAX_PAGE_SIZE``).
+- ``approximate_count`` gives a cheap total for toolbars: the planner's row
+  estimate for unfiltered tables, otherwise an exact count cached briefly.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from django.db import connections
+from django.db.models import F, Q, QuerySet
+from django.utils.dateparse import parse_date, parse_datetime
+
+from main.services import caching
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+# Below this estimated size an exact COUNT(*) is cheap enough.
+EXACT_COUNT_THRESHOLD = 10_000
+COUNT_CACHE_SECONDS = 60
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token cannot be decoded."""
+
+
+# ---------- Request parsing ----------
+def page_size(
+    request, default: int = DEFAULT_PAGE_SIZE, maximum: int = MAX_PAGE_SIZE
+) -> int:
+    """`per_page` (or `page_size`) query param clamped to [1, maximum]."""
+    raw = request.GET.get("per_page") or request.GET.get("page_size")
+    try:
+        size = int(raw) if raw not in (None, "") else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, maximum))
+
+
+def page_number(raw) -> int:
+    try:
+        return max(int(raw or 1), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+# ---------- Cursor encoding ----------
+def _dump(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"n": str(value)}
+    return value
+
+
+def _load(value):
+    if isinstance(value, dict):
+        if "dt" in value:
+            parsed = parse_datetime(value["dt"])
+        elif "d" in value:
+            parsed = parse_date(value["d"])
+        elif "n" in value:
+            parsed = Decimal(value["n"])
+        else:
+            parsed = None
+        if parsed is None:
+            raise InvalidCursor("bad cursor value")
+        return parsed
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Opaque, URL-safe token for a tuple of sort-key values."""
+    raw = json.dumps([_dump(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> List[Any]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception as exc:
+        raise InvalidCursor("malformed cursor") from exc
+    if not isinstance(values, list) or not values:
+        raise InvalidCursor("malformed cursor")
+    return [_load(v) for v in values]
+
+
+# ---------- Keyset filtering ----------
+def _parse_ordering(ordering: Sequence[str]) -> List[Tuple[str, bool]]:
+    return [(o.lstrip("-"), o.startswith("-")) for o in ordering]
+
+
+def order_by_keys(qs: QuerySet, ordering: Sequence[str]) -> QuerySet:
+    """Apply `ordering` with NULLs last, matching `after_cursor`."""
+    exprs = []
+    for name, desc in _parse_ordering(ordering):
+        exprs.append(
+            F(name).desc(nulls_last=True) if desc else F(name).asc(nulls_last=True)
+        )
+    return qs.order_by(*exprs)
+
+
+def after_cursor(ordering: Sequence[str], values: Sequence[Any]) -> Q:
+    """
+    Rows strictly after `values` in `ordering` (NULLs last):
+
+        (k1 after v1) OR (k1 = v1 AND k2 after v2) OR ...
+
+    The first key is additionally bounded on its own so the index range scan
+    starts at the cursor instead of the top of the index.
+    """
+    keys = _parse_ordering(ordering)
+    if len(values) != len(keys):
+        raise InvalidCursor("cursor does not match ordering")
+
+    clause = Q(pk__in=[])
+    equal = Q()
+    for (name, desc), value in zip(keys, values):
+        if value is None:
+            # Every NULL compares equal and sorts last: nothing is strictly after.
+            step, same = Q(pk__in=[]), Q(**{f"{name}__isnull": True})
+        else:
+            op = "lt" if desc else "gt"
+            step = Q(**{f"{name}__{op}": value}) | Q(**{f"{name}__isnull": True})
+            same = Q(**{name: value})
+        clause |= equal & step
+        equal &= same
+
+    first_name, first_desc = keys[0]
+    first_value = values[0]
+    if first_value is not None:
+        bound = Q(**{f"{first_name}__{'lte' if first_desc else 'gte'}": first_value})
+        clause &= bound | Q(**{f"{first_name}__isnull": True})
+    return clause
+
+
+def _row_value(row, name: str):
+    if isinstance(row, dict):
+        return row[name]
+    obj = row
+    for part in name.split("__"):
+        obj = getattr(obj, part, None)
+        if obj is None:
+            return None
+    return obj
+
+
+# ---------- Pages ----------
+@dataclass
+class Page:
+    items: List[Any]
+    next_cursor: Optional[str]
+    has_more: bool
+    size: int
+    number: Optional[int] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    def meta(self) -> Dict[str, Any]:
+        data = {
+            "next_cursor": self.next_cursor,
+            "has_more": self.has_more,
+            "per_page": self.size,
+        }
+        if self.number is not None:
+            data["page"] = self.number
+        data.update(self.extra)
+        return data
+
+
+def keyset_page(
+    qs: QuerySet,
+    ordering: Sequence[str],
+    *,
+    cursor: Optional[str] = None,
+    page=None,
+    size: int = DEFAULT_PAGE_SIZE,
+) -> Page:
+    """
+    One page of `qs` ordered by `ordering`.
+
+    `qs` may be a `.values()` queryset (rows are dicts; every ordering key must
+    be among the selected fields) or a model queryset (use `.only()` to keep
+    instances light). With `cursor` the page starts after that cursor;
+    otherwise `page` (1-based) is used as an offset.
+
+    Raises InvalidCursor for tokens that cannot be decoded.
+    """
+    size = max(1, min(int(size), MAX_PAGE_SIZE))
+    number = None
+    qs = order_by_keys(qs, ordering)
+    if cursor:
+        qs = qs.filter(after_cursor(ordering, decode_cursor(cursor)))
+        rows = list(qs[: size + 1])
+    else:
+        number = page_number(page)
+        offset = (number - 1) * size
+        rows = list(qs[offset : offset + size + 1])
+
+    has_more = len(rows) > size
+    rows = rows[:size]
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            [_row_value(last, name) for name, _ in _parse_ordering(ordering)]
+        )
+    return Page(
+        items=rows, next_cursor=next_cursor, has_more=has_more, size=size, number=number
+    )
+
+
+# ---------- Totals ----------
+def _planner_estimate(qs: QuerySet) -> Optional[int]:
+    """pg_class.reltuples for the queryset's table (PostgreSQL only)."""
+    conn = connections[qs.db]
+    if conn.vendor != "postgresql":
+        return None
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [qs.model._meta.db_table],
+        )
+        row = cur.fetchone()
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def approximate_count(qs: QuerySet, ttl: int = COUNT_CACHE_SECONDS) -> int:
+    """
+    Cheap total for list toolbars. Unfiltered querysets on large tables use
+    the planner's estimate; everything else is an exact count cached for
+    `ttl` seconds per SQL statement.
+    """
+    qs = qs.order_by()
+    if not qs.query.where:
+        try:
+            estimate = _planner_estimate(qs)
+        except Exception:
+            estimate = None
+        if estimate is not None and estimate >= EXACT_COUNT_THRESHOLD:
+            return estimate
+
+    try:
+        sql, params = qs.query.sql_with_params()
+        digest = hashlib.md5(f"{qs.db}:{sql}:{params!r}".encode("utf-8")).hexdigest()
+    except Exception:
+        return qs.count()
+    key = f"pagination:count:{digest}"
+    return caching.get_or_compute(key, qs.count, ttl=ttl)
+
+
+__all__ = [
+    "DEFAULT_PAGE_SIZE",
+    "MAX_PAGE_SIZE",
+    "InvalidCursor",
+    "Page",
+    "page_size",
+    "page_number",
+    "encode_cursor",
+    "decode_cursor",
+    "order_by_keys",
+    "after_cursor",
+    "keyset_page",
+    "approximate_count",
+]
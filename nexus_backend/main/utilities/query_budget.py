@@ -0,0 +1,231 @@
+"""
+Query budgets: how many SQL queries a view or task may run, and N+1 detection.
+
+Declare a budget on the function itself (innermost decorator, so
+``login_required`` & co. keep the attribute through ``functools.wraps``):
+
+    @login_required
+    @query_budget(12)
+    def billing_history(request): ...
+
+    @shared_task(...)
+    @query_budget(10, per_item=3, max_repeats=None)
+    def run_prebill_and_collect(self):
+        ...
+        budget_items(created)
+
+- ``max_queries`` is the budget with one item (one order, one subscription);
+  ``per_item`` is what each additional item may add (writes in batch tasks).
+  Read paths should be flat: ``per_item=0``. A function with a per-item
+  budget reports how many items it handled with ``budget_items(n)``; the
+  total is checked against ``max_queries + per_item * (n - 1)``. Without a
+  report only repeated shapes are checked.
+- ``max_repeats`` caps how often one query *shape* (SQL with literals and
+  parameter lists collapsed) may run in a call; a shape repeated once per row
+  is the signature of an N+1. ``None`` disables the check.
+
+``settings.QUERY_BUDGET_MODE`` decides what a decorated call does at run
+time: ``"off"`` (default, no overhead), ``"warn"`` (log a report) or
+``"raise"`` (``QueryBudgetExceeded``, used by the test suite). Tests measure
+with ``record_queries()`` at N=1 and N=100 and compare the counts with
+``QueryBudget.check``.
+"""
+
+from __future__ import annotations
+
+import functools
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_LIST_RE = re.compile(r"\((?:\s*(?:%s|\?)\s*,?)+\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A call ran more queries (or repeated a shape more) than declared."""
+
+
+def query_shape(sql: str) -> str:
+    """SQL with literals and IN/VALUES lists collapsed, for grouping."""
+    shape = _STRING_RE.sub("?", sql)
+    shape = _NUMBER_RE.sub("?", shape)
+    shape = _PARAM_LIST_RE.sub("(...)", shape)
+    return _SPACE_RE.sub(" ", shape).strip()
+
+
+# ---------- Recording ----------
+class QueryRecorder:
+    """``execute_wrapper`` that keeps every statement run while installed."""
+
+    def __init__(self):
+        self.queries: List[Tuple[str, float]] = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def seconds(self) -> float:
+        return sum(duration for _, duration in self.queries)
+
+    def shapes(self) -> Counter:
+        return Counter(query_shape(sql) for sql, _ in self.queries)
+
+    def repeated(self, limit: int) -> Dict[str, int]:
+        """Shapes run more than ``limit`` times."""
+        return {shape: n for shape, n in self.shapes().items() if n > limit}
+
+    def report(self, top: int = 5) -> str:
+        lines = [f"{self.count} queries in {self.seconds * 1000:.1f} ms"]
+        for shape, n in self.shapes().most_common(top):
+            lines.append(f"  {n:>4} x {shape[:200]}")
+        return "\n".join(lines)
+
+
+@contextmanager
+def record_queries() -> Iterator[QueryRecorder]:
+    """Record the queries run on every database alias by the current thread."""
+    recorder = QueryRecorder()
+    with ExitStack() as stack:
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(recorder))
+        yield recorder
+
+
+# ---------- Budgets ----------
+@dataclass(frozen=True)
+class QueryBudget:
+    max_queries: int
+    per_item: int = 0
+    max_repeats: Optional[int] = 5
+
+    def allowed(self, items: int = 1) -> int:
+        return self.max_queries + self.per_item * max(items - 1, 0)
+
+    def violations(
+        self, recorder: QueryRecorder, items: Optional[int] = 1
+    ) -> List[str]:
+        """Problems found; ``items=None`` checks repeated shapes only."""
+        problems = []
+        if items is not None and recorder.count > self.allowed(items):
+            problems.append(
+                f"{recorder.count} queries for {items} item(s), "
+                f"budget {self.allowed(items)}"
+            )
+        if self.max_repeats is not None:
+            for shape, n in recorder.repeated(self.max_repeats).items():
+                problems.append(f"repeated {n}x (max {self.max_repeats}): {shape}")
+        return problems
+
+    def check(
+        self, recorder: QueryRecorder, items: Optional[int] = 1, label: str = ""
+    ):
+        """Raise ``QueryBudgetExceeded`` with a report if over budget."""
+        problems = self.violations(recorder, items)
+        if problems:
+            raise QueryBudgetExceeded(
+                f"{label or 'call'} over query budget:\n  "
+                + "\n  ".join(problems)
+                + "\n"
+                + recorder.report()
+            )
+
+
+_calls = threading.local()
+
+
+def budget_items(n: int) -> None:
+    """Report the item count of the current budgeted call (no-op otherwise)."""
+    stack = getattr(_calls, "items", None)
+    if stack:
+        stack[-1] = n
+
+
+def _mode() -> str:
+    return str(getattr(settings, "QUERY_BUDGET_MODE", "off") or "off").lower()
+
+
+def query_budget(
+    max_queries: int, *, per_item: int = 0, max_repeats: Optional[int] = 5
+):
+    """
+    Declare the query budget of a view or task (see module docstring). The
+    budget is available as ``func.query_budget``.
+    """
+    budget = QueryBudget(max_queries, per_item, max_repeats)
+
+    def decorator(func):
+        label = f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            mode = _mode()
+            if mode == "off":
+                return func(*args, **kwargs)
+            stack = _calls.__dict__.setdefault("items", [])
+            stack.append(None)
+            try:
+                with record_queries() as recorder:
+                    result = func(*args, **kwargs)
+            finally:
+                reported = stack.pop()
+            # Per-item budgets need the count reported by the call (or only
+            # repeated shapes are checked).
+            items = 1 if budget.per_item == 0 else reported
+            problems = budget.violations(recorder, items)
+            if problems:
+                if mode == "raise":
+                    budget.check(recorder, items, label=label)
+                logger.warning(
+                    "%s over query budget: %s\n%s",
+                    label,
+                    "; ".join(problems),
+                    recorder.report(),
+                )
+            return result
+
+        wrapper.query_budget = budget
+        return wrapper
+
+    return decorator
+
+
+def budget_of(obj) -> Optional[QueryBudget]:
+    """Declared budget of a view, a function or a Celery task."""
+    for candidate in (obj, getattr(obj, "run", None)):
+        budget = getattr(candidate, "query_budget", None)
+        if isinstance(budget, QueryBudget):
+            return budget
+    return None
+
+
+__all__ = [
+    "QueryBudget",
+    "QueryBudgetExceeded",
+    "QueryRecorder",
+    "budget_items",
+    "budget_of",
+    "query_budget",
+    "query_shape",
+    "record_queries",
+]
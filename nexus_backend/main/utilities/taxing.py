@@ -1,7 +1,8 @@
 import re
 from decimal import Decimal
 
-from main.models import ZERO, OrderLine, TaxRate, _qmoney
+from main.models import ZERO, OrderLine, _qmoney
+from main.services import config_cache
 
 
 def compute_totals_from_lines(order):
@@ -137,16 +138,16 @@ def compute_totals_from_lines(order):
     excise_rate_pct = Decimal("10.00")  # default per business rule
 
     try:
-        vat_rec = TaxRate.objects.filter(description="VAT").first()
-        if vat_rec and vat_rec.percentage is not None:
-            vat_rate_pct = Decimal(vat_rec.percentage)
+        vat_pct = config_cache.tax_percentage("VAT")
+        if vat_pct is not None:
+            vat_rate_pct = vat_pct
     except Exception:
         pass
 
     try:
-        excise_rec = TaxRate.objects.filter(description="EXCISE").first()
-        if excise_rec and excise_rec.percentage is not None:
-            excise_rate_pct = Decimal(excise_rec.percentage)
+        excise_pct = config_cache.tax_percentage("EXCISE")
+        if excise_pct is not None:
+            excise_rate_pct = excise_pct
     except Exception:
         pass
 
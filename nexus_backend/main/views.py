@@ -3,7 +3,6 @@ import logging
 import re
 
 import requests
-from xhtml2pdf import pisa
 
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
@@ -530,6 +529,8 @@ def get_user_subscriptions(request):
 
 @login_required(login_url="login_page")
 def get_order_details_print(request, reference):
+    from xhtml2pdf import pisa
+
     order = get_object_or_404(Order, order_reference=reference)
     user = order.user
 
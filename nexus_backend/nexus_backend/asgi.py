@@ -2,6 +2,9 @@
 ASGI config for nexus_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Besides HTTP, it answers the server's lifespan events: startup opens the
+process-wide FlexPay HTTP session used by the async payment views, shutdown
+closes it (``main.services.flexpay_http``).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +16,25 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "nexus_backend.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from main.services import flexpay_http  # noqa: E402  (needs the app registry)
+
+
+async def lifespan(scope, receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await flexpay_http.open_pool()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await flexpay_http.close_pool()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -1,9 +1,18 @@
 import os
+import tempfile
 
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "nexus_backend.settings")
+if os.environ.get("CELERY_METRICS_PORT"):
+    # Pool processes write Prometheus samples here; must be set before
+    # prometheus_client is imported anywhere.
+    os.environ.setdefault(
+        "PROMETHEUS_MULTIPROC_DIR",
+        os.path.join(tempfile.gettempdir(), "prometheus-celery"),
+    )
 
 app = Celery("nexus_backend")
 
@@ -24,6 +33,37 @@ def debug_task(self):
     print(f"Request: {self.request!r}")
 
 
+@worker_init.connect
+def start_metrics(**kwargs):
+    """Task metrics, served for the whole pool on CELERY_METRICS_PORT."""
+    from nexus_backend import db_pool, metrics
+
+    if not metrics.enabled():
+        return
+    metrics.connect_celery_signals()
+    db_pool.install()
+    db_pool.connect_celery_signals()
+    port = int(os.environ.get("CELERY_METRICS_PORT") or 0)
+    if port:
+        metrics.reset_multiproc_dir()
+        metrics.start_celery_exporter(port)
+
+
+@worker_process_shutdown.connect
+def mark_metrics_process_dead(pid=None, **kwargs):
+    from nexus_backend import metrics
+
+    metrics.mark_process_dead(pid or os.getpid())
+
+
+@worker_process_init.connect
+def reset_db_pools(**kwargs):
+    """Each pool process opens its own DB pool (runs before other init hooks)."""
+    from nexus_backend import db_pool
+
+    db_pool.reset_after_fork()
+
+
 CELERY_BEAT_SCHEDULE = {
     "check-flexpay-transactions-every-5m": {
         "task": "nexus_backend.celery_tasks.tasks.check_flexpay_transactions",
@@ -35,9 +75,11 @@ CELERY_BEAT_SCHEDULE = {
         "schedule": 300.0,
         "options": {"queue": "default"},
     },
+    # Renewal orders/invoices; a no-op outside the pre-bill window and at
+    # most once a day (JobRun ledger).
     "generate-renewal-orders-every-morning": {
-        "task": "subscriptions.generate_renewal_orders_daily",
-        "schedule": 300.0,
+        "task": "nexus_backend.celery_tasks.tasks.run_prebill_and_collect",
+        "schedule": crontab(minute=0, hour=6),
         "options": {"queue": "default"},
     },
     "lock-feedbacks-daily": {
@@ -50,4 +92,22 @@ CELERY_BEAT_SCHEDULE = {
         "schedule": crontab(minute=30, hour=9),
         "options": {"queue": "default"},
     },
+    # Sweeper: commits already nudge the drain; this catches retries/backlog
+    "drain-notification-outbox": {
+        "task": "main.tasks.drain_notification_outbox",
+        "schedule": 15.0,
+        "options": {"queue": "default"},
+    },
+    "prune-job-runs-daily": {
+        "task": "main.tasks.prune_job_runs",
+        "schedule": crontab(minute=45, hour=3),
+        "options": {"queue": "default"},
+    },
+    "prune-otp-audit-daily": {
+        "task": "main.tasks.prune_otp_audit",
+        "schedule": crontab(minute=50, hour=3),
+        "options": {"queue": "default"},
+    },
 }
+# config_from_object() only reads Django settings, not this module
+app.conf.beat_schedule = CELERY_BEAT_SCHEDULE
@@ -1,34 +1,35 @@
 import logging
-from contextlib import contextmanager
-from datetime import date, timedelta
+from datetime import date, datetime, time, timedelta
 from decimal import Decimal
 from typing import Optional
 
 from celery import shared_task
 
-from django.core.cache import cache
 from django.db import IntegrityError, transaction
-from django.db.models import Q
+from django.db.models import Q, Sum
 from django.utils import timezone
 
 from billing_management.billing_services import enforce_cutoff, run_prebill
 from main.models import (
     ZERO,
     AccountEntry,
-    BillingConfig,
     Order,
     OrderLine,
     OrderTax,
     Subscription,
-    TaxRate,
     User,
     _qmoney,
 )
+from main.services import config_cache, job_runs
+from main.services.locks import job_lock
 from main.services.posting import create_entry
+from main.utilities.query_budget import budget_items, query_budget
 from stock.inventory import release_expired_reservations
 
 logger = logging.getLogger(__name__)
 
+FLEXPAY_POLL_JOB = "flexpay.poll"
+
 
 # ---------- scheduled job ----------
 @shared_task(name="nexus_backend.celery_tasks.tasks.cancel_expired_orders")
@@ -38,6 +39,8 @@ def cancel_expired_orders():
     - Locks only Order rows (no joins) to avoid Postgres FOR UPDATE restrictions on outer joins.
     - Uses skip_locked to allow concurrent workers without blocking.
     - Keeps per-order cancellation idempotent via Order.cancel().
+    - Cancelled orders leave the candidate set, so a tick with nothing expired
+      is a single EXISTS query (no lock, no JobRun).
     """
     now = timezone.now()
 
@@ -56,175 +59,37 @@ def cancel_expired_orders():
         "subscriptions_deleted": 0,
     }
 
-    with transaction.atomic():
-        # Lock only the Order rows. Use skip_locked where supported.
-        try:
-            lock_qs = base_qs.select_for_update(of=("self",), skip_locked=True)
-        except TypeError:
-            # Fallback if 'of' or 'skip_locked' not supported in the current backend/version
-            lock_qs = base_qs.select_for_update()
-
-        for order in lock_qs.iterator(chunk_size=200):
-            res = order.cancel(reason="expired (1h hold)")
-            if res.get("changed"):
-                summary["cancelled"] += 1
-                if res.get("freed_inventory"):
-                    summary["freed"] += 1
-                summary["movements_deleted"] += int(res.get("movements_deleted") or 0)
-                summary["subscriptions_deleted"] += int(
-                    res.get("subscriptions_deleted") or 0
-                )
-    return summary
-
+    if not base_qs.exists():
+        return summary
 
-# @shared_task(bind=True, autoretry_for=(requests.Timeout, requests.ConnectionError),
-#              retry_backoff=10, retry_kwargs={"max_retries": 3})
-# @shared_task(name="nexus_backend.celery_tasks.tasks.check_flexpay_transactions")
-# def check_flexpay_transactions():
-#     """
-#     Poll FlexPay for PaymentAttempts that are not completed.
-#     Mark ONLY the order linked to the current PaymentAttempt (same order_number) as paid
-#     when BOTH: response code == "0" AND transaction.status == "0".
-#     Also record coupon redemption (if any) once the order is paid.
-#     """
-#     attempts = (
-#         PaymentAttempt.objects.select_related("order")
-#         .exclude(status__in=["completed", "succeeded", "paid"])
-#         .order_by("-created_at")
-#     )
-#
-#     checked = 0
-#     updated_attempts = 0
-#     updated_orders = 0
-#
-#     for pa in attempts:
-#         order_number = pa.order_number
-#         if not order_number:
-#             logger.warning("PaymentAttempt %s has no order_number. Skipping.", pa.id)
-#             continue
-#
-#         try:
-#             headers = {
-#                 "Authorization": f"Bearer {nexus_backend.settings.FLEXPAY_API_KEY}",
-#                 "Content-Type": "application/json",
-#             }
-#
-#             resp = requests.get(
-#                 f"{FLEXPAY_CHECK_URL.rstrip('/')}/{order_number}",
-#                 headers=headers,
-#                 timeout=15,
-#             )
-#             checked += 1
-#
-#             if resp.status_code != 200:
-#                 logger.error(
-#                     "FlexPay check HTTP %s for orderNumber=%s",
-#                     resp.status_code,
-#                     order_number,
-#                 )
-#                 continue
-#
-#             data = resp.json() if resp.content else {}
-#             code = str(data.get("code", "")).strip()
-#
-#             if code == "0":
-#                 tx = data.get("transaction") or {}
-#                 tx_status = str(tx.get("status", "")).strip()
-#                 tx_reference = (tx.get("reference") or "").strip()
-#
-#                 # Optional: ensure the transaction refers to THIS attempt/order
-#                 expected_refs = set()
-#                 if pa.reference:
-#                     expected_refs.add(str(pa.reference).strip())
-#                 if pa.order and getattr(pa.order, "order_reference", None):
-#                     expected_refs.add(str(pa.order.order_reference).strip())
-#
-#                 if tx_reference and expected_refs and tx_reference not in expected_refs:
-#                     logger.warning(
-#                         "FlexPay reference mismatch for attempt %s: got '%s', expected one of %s. Skipping.",
-#                         pa.id, tx_reference, list(expected_refs),
-#                     )
-#                     continue
-#
-#                 # Prepare values (convert string amounts to Decimal)
-#                 amount = pa.amount
-#                 amount_customer = pa.amount_customer
-#                 try:
-#                     if tx.get("amount") is not None:
-#                         amount = Decimal(str(tx.get("amount")))
-#                 except (InvalidOperation, TypeError):
-#                     logger.warning("Invalid amount in FlexPay tx for attempt %s: %s", pa.id, tx.get("amount"))
-#
-#                 try:
-#                     if tx.get("amountCustomer") is not None:
-#                         amount_customer = Decimal(str(tx.get("amountCustomer")))
-#                 except (InvalidOperation, TypeError):
-#                     logger.warning("Invalid amountCustomer in FlexPay tx for attempt %s: %s", pa.id, tx.get("amountCustomer"))
-#
-#                 # Status mapping (only 'completed' when BOTH are "0")
-#                 new_status = "completed" if tx_status == "0" else ("pending" if tx_status in ("1", "") else tx_status)
-#
-#                 with transaction.atomic():
-#                     # Update PaymentAttempt
-#                     pa.code = code
-#                     if tx_reference:
-#                         pa.reference = tx_reference
-#                     pa.amount = amount
-#                     pa.amount_customer = amount_customer
-#                     if tx.get("currency"):
-#                         pa.currency = tx.get("currency")
-#                     pa.transaction_time = _parse_flexpay_datetime(tx.get("createdAt"))
-#                     pa.raw_payload = data
-#                     pa.status = new_status
-#                     pa.save(
-#                         update_fields=[
-#                             "code", "reference", "amount", "amount_customer",
-#                             "currency", "transaction_time", "raw_payload", "status",
-#                         ]
-#                     )
-#                     updated_attempts += 1
-#
-#                     # Mark ONLY this attempt's order as paid/fulfilled when BOTH are 0
-#                     if code == "0" and tx_status == "0" and pa.order:
-#                         order = pa.order
-#                         if order.payment_status != "paid":
-#                             order.payment_status = "paid"
-#                             order.status = "fulfilled"
-#                             order.save(update_fields=["payment_status", "status"])
-#                             updated_orders += 1
-#
-#                             # ✅ Record coupon redemption now that it's paid
-#                             record_coupon_redemption_if_any(order)
-#
-#                 logger.info(
-#                     "FlexPay OK -> Completed orderNumber=%s (attempt %s)",
-#                     order_number, pa.id,
-#                 )
-#
-#             elif code == "1":
-#                 logger.info(
-#                     "FlexPay: no transaction yet for orderNumber=%s (attempt %s)",
-#                     order_number, pa.id,
-#                 )
-#             else:
-#                 logger.warning(
-#                     "FlexPay unexpected response for %s: %s", order_number, data
-#                 )
-#
-#         except requests.Timeout:
-#             logger.exception("FlexPay timeout for orderNumber=%s", order_number)
-#         except Exception as e:
-#             logger.exception("FlexPay check error for orderNumber=%s: %s", order_number, e)
-#
-#     logger.info(
-#         "FlexPay checks done. checked=%s, attempts_updated=%s, orders_updated=%s",
-#         checked, updated_attempts, updated_orders,
-#     )
-#     return {
-#         "checked": checked,
-#         "attempts_updated": updated_attempts,
-#         "orders_updated": updated_orders,
-#     }
+    with job_lock("orders.cancel_expired", ttl=120) as lock:
+        if not lock:
+            return {**summary, "locked": True}
+        scanned = 0
+        with transaction.atomic():
+            # Lock only the Order rows. Use skip_locked where supported.
+            try:
+                lock_qs = base_qs.select_for_update(of=("self",), skip_locked=True)
+            except TypeError:
+                # Fallback if 'of' or 'skip_locked' not supported in the current
+                # backend/version
+                lock_qs = base_qs.select_for_update()
+
+            for order in lock_qs.iterator(chunk_size=200):
+                scanned += 1
+                res = order.cancel(reason="expired (1h hold)")
+                if res.get("changed"):
+                    summary["cancelled"] += 1
+                    if res.get("freed_inventory"):
+                        summary["freed"] += 1
+                    summary["movements_deleted"] += int(
+                        res.get("movements_deleted") or 0
+                    )
+                    summary["subscriptions_deleted"] += int(
+                        res.get("subscriptions_deleted") or 0
+                    )
+        lock.run.rows_scanned, lock.run.rows_changed = scanned, summary["cancelled"]
+    return summary
 
 
 # -------------------- core: build renewal --------------------
@@ -249,6 +114,18 @@ def _add_months(d: date, months: int) -> date:
     return date(y, m, day)
 
 
+def _chunks(iterable, size: int):
+    """Lists of up to ``size`` consecutive items of ``iterable``."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
 def _next_anchor(today: date, anchor_day: int) -> date:
     """Return the upcoming anchor date (this month or next) on [1..28]."""
     anchor_day = max(1, min(28, int(anchor_day or 20)))
@@ -270,12 +147,8 @@ def _gross_taxes(user, base: Decimal) -> tuple[Decimal, Decimal, Decimal]:
     if getattr(user, "is_tax_exempt", False):
         return ZERO, ZERO, base
 
-    excise_rate = TaxRate.objects.filter(description="EXCISE").values_list(
-        "percentage", flat=True
-    ).first() or Decimal("0.00")
-    vat_rate = TaxRate.objects.filter(description="VAT").values_list(
-        "percentage", flat=True
-    ).first() or Decimal("0.00")
+    excise_rate = config_cache.tax_percentage("EXCISE") or Decimal("0.00")
+    vat_rate = config_cache.tax_percentage("VAT") or Decimal("0.00")
 
     excise = _qmoney(base * excise_rate / Decimal("100"))
     vat = _qmoney((base + excise) * vat_rate / Decimal("100"))
@@ -283,15 +156,6 @@ def _gross_taxes(user, base: Decimal) -> tuple[Decimal, Decimal, Decimal]:
     return excise, vat, total
 
 
-def _acquire_lock(key: str, ttl: int = 1800) -> bool:
-    # Prevent duplicate runs across workers
-    return cache.add(key, "1", ttl)
-
-
-def _release_lock(key: str):
-    cache.delete(key)
-
-
 @transaction.atomic
 def _create_renewal_order_and_invoice(
     sub: Subscription, period_start: date, period_end: date, *, auto_apply_wallet: bool
@@ -331,14 +195,14 @@ def _create_renewal_order_and_invoice(
         OrderTax.objects.create(
             order=order,
             kind=OrderTax.Kind.EXCISE,
-            rate=TaxRate.objects.get(description="EXCISE").percentage,
+            rate=config_cache.tax_percentage("EXCISE"),
             amount=excise,
         )
     if vat > 0:
         OrderTax.objects.create(
             order=order,
             kind=OrderTax.Kind.VAT,
-            rate=TaxRate.objects.get(description="VAT").percentage,
+            rate=config_cache.tax_percentage("VAT"),
             amount=vat,
         )
 
@@ -426,26 +290,31 @@ def _create_renewal_order_and_invoice(
     max_retries=3,
     queue="billing",
 )
+@query_budget(12, per_item=40, max_repeats=None)
 def run_prebill_and_collect(self):
     """
     Daily task. When today reaches the "lead window" (anchor - prebill_lead_days),
     generate renewal orders/invoices for the *next* period and auto-apply wallets.
     Idempotent (UniqueConstraint on AccountEntry).
     """
-    cfg = BillingConfig.get()
+    cfg = config_cache.billing_config()
     today = timezone.localdate()
     next_anchor = _next_anchor(today, cfg.anchor_day)
     lead_open = next_anchor - timedelta(days=cfg.prebill_lead_days)
 
-    # run once per day (simple lock)
-    lock_key = f"billing:prebill:{today.isoformat()}"
-    if not _acquire_lock(lock_key, ttl=60 * 20):
-        return "Skip: lock held"
+    # Only act inside the lead window up to anchor day (inclusive safeguard)
+    if not (lead_open <= today <= next_anchor):
+        return f"No-op (today={today}, lead_open={lead_open}, anchor={next_anchor})"
+
+    # Daily job: beat, retries and manual triggers run it at most once a day.
+    midnight = timezone.make_aware(datetime.combine(today, time.min))
+    if job_runs.ran_since("billing.prebill_and_collect", midnight):
+        return f"Skip: already ran on {today}"
 
-    try:
-        # Only act inside the lead window up to anchor day (inclusive safeguard)
-        if not (lead_open <= today <= next_anchor):
-            return f"No-op (today={today}, lead_open={lead_open}, anchor={next_anchor})"
+    # One run at a time; the lease is renewed while the run lasts.
+    with job_lock("billing.prebill_and_collect") as lock:
+        if not lock:
+            return "Skip: lock held"
 
         # Eligible subs: active, started, not ended, not first cycle if already included in first order
         q = (
@@ -465,6 +334,8 @@ def run_prebill_and_collect(self):
         months = None  # per sub
 
         for sub in q.iterator(chunk_size=500):
+            lock.ensure_held()
+            lock.run.rows_scanned += 1
             # Determine period boundaries aligned to anchor and cycle
             months = _months_for_cycle(sub.billing_cycle)
             period_start = next_anchor
@@ -493,9 +364,9 @@ def run_prebill_and_collect(self):
                 # already invoiced for that period — safe to skip
                 continue
 
+        lock.run.rows_changed = created
+        budget_items(lock.run.rows_scanned)
         return f"prebilled={created} (window {lead_open}→{next_anchor})"
-    finally:
-        _release_lock(lock_key)
 
 
 @shared_task(
@@ -506,12 +377,13 @@ def run_prebill_and_collect(self):
     max_retries=3,
     queue="billing",
 )
+@query_budget(10, per_item=1, max_repeats=None)
 def run_cutoff_enforcement(self):
     """
     Daily task. If today == (anchor - cutoff_days_before_anchor) and a renewal invoice remains unpaid,
     auto-suspend subscription (optional via config).
     """
-    cfg = BillingConfig.get()
+    cfg = config_cache.billing_config()
     today = timezone.localdate()
     next_anchor = _next_anchor(today, cfg.anchor_day)
     cutoff_days = getattr(cfg, "cutoff_days_before_anchor", 1)
@@ -523,65 +395,120 @@ def run_cutoff_enforcement(self):
     if today != cutoff_date:
         return f"No-op (today={today}, cutoff={cutoff_date})"
 
-    # Find invoices for this upcoming period that remain due, and suspend the sub
-    months_map = {"monthly": 1, "quarterly": 3, "yearly": 12}
+    with job_lock("billing.cutoff_enforcement") as lock:
+        if not lock:
+            return "Skip: lock held"
 
-    suspended = 0
-    subs = Subscription.objects.select_related("user", "plan").filter(status="active")
-    for sub in subs.iterator(chunk_size=500):
-        months = months_map.get(sub.billing_cycle or "monthly", 1)
+        # Find invoices for this upcoming period that remain due, and suspend the
+        # subs. One page of subscriptions at a time: invoices and payments are
+        # loaded per page and the suspensions written in one UPDATE.
+        months_map = {"monthly": 1, "quarterly": 3, "yearly": 12}
         period_start = next_anchor
-        period_end = _add_months(period_start, months)
-
-        # Does an invoice exist for this sub/period?
-        inv = AccountEntry.objects.filter(
-            entry_type="invoice",
-            subscription=sub,
-            period_start=period_start,
-            period_end=period_end,
-        ).first()
-        if not inv:
-            continue
-
-        # How much is still due for this order (look at payments against this order)
-        order = inv.order
-        if not order:
-            continue
-        paid = (
-            -sum(
+
+        suspended = 0
+        subs = Subscription.objects.filter(status="active").only("id", "billing_cycle")
+        for chunk in _chunks(subs.order_by("id").iterator(chunk_size=500), 500):
+            lock.ensure_held()
+            period_ends = {
+                sub.id: _add_months(
+                    period_start, months_map.get(sub.billing_cycle or "monthly", 1)
+                )
+                for sub in chunk
+            }
+
+            # Does an invoice exist for this sub/period? (first one, by id)
+            invoices = {}
+            for inv in AccountEntry.objects.filter(
+                entry_type="invoice",
+                subscription_id__in=period_ends,
+                period_start=period_start,
+            ).order_by("id"):
+                if inv.period_end == period_ends[inv.subscription_id]:
+                    invoices.setdefault(inv.subscription_id, inv)
+            due = {sub_id: inv for sub_id, inv in invoices.items() if inv.order_id}
+            if not due:
+                continue
+
+            # How much is still due for each order (payments against the order)
+            payments = dict(
                 AccountEntry.objects.filter(
-                    order=order, entry_type="payment"
-                ).values_list("amount_usd", flat=True)
+                    order_id__in={inv.order_id for inv in due.values()},
+                    entry_type="payment",
+                )
+                .values("order_id")
+                .annotate(total=Sum("amount_usd"))
+                .values_list("order_id", "total")
             )
-            or ZERO
-        )
-        remaining = _qmoney(inv.amount_usd - paid)
-
-        if remaining > ZERO:
-            sub.status = "suspended"
-            sub.ended_at = None  # just suspended
-            sub.save(update_fields=["status"])
-            suspended += 1
-    return f"suspended={suspended}"
+            to_suspend = []
+            for sub_id, inv in due.items():
+                paid = -(payments.get(inv.order_id) or ZERO)
+                if _qmoney(inv.amount_usd - paid) > ZERO:
+                    to_suspend.append(sub_id)
+            if to_suspend:
+                suspended += Subscription.objects.filter(
+                    pk__in=to_suspend, status="active"
+                ).update(status="suspended")
+        return f"suspended={suspended}"
 
 
 @shared_task(ignore_result=True)
 def task_release_expired_reservations():
-    return release_expired_reservations()
+    with job_lock("stock.release_expired_reservations", ttl=120) as lock:
+        if not lock:
+            return 0
+        return release_expired_reservations()
 
 
-@contextmanager
-def task_lock(key: str, timeout: int = 60 * 30):  # 30 min default
+@shared_task(
+    name="nexus_backend.celery_tasks.tasks.check_flexpay_transactions",
+    ignore_result=True,
+)
+def check_flexpay_transactions():
     """
-    Simple cache-based mutex to avoid overlapping task runs.
-    Returns immediately if another worker holds the lock.
+    Beat poll of unsettled FlexPay attempts, one worker at a time. Only
+    attempts from the last ``FLEXPAY_POLL_LOOKBACK_HOURS`` are polled (older
+    ones no longer settle); those that leave the window unsettled are counted
+    (``expired``) and logged once. A tick with none of them is one EXISTS
+    query after the watermark read.
     """
-    acquired = cache.add(key, "1", timeout=timeout)
-    try:
-        yield acquired
-    finally:
-        if acquired:
-            cache.delete(key)
+    from django.conf import settings
+
+    from main.flexpaie import check_flexpay_transactions as poll_flexpay
+    from main.models import PaymentAttempt
+
+    hours = getattr(settings, "FLEXPAY_POLL_LOOKBACK_HOURS", 48)
+    since = timezone.now() - timedelta(hours=hours)
+    unsettled = PaymentAttempt.objects.exclude(
+        status__in=["completed", "succeeded", "paid"]
+    )
+    # Window start of the last run: attempts between it and ``since`` aged out
+    previous = job_runs.watermark_datetime(FLEXPAY_POLL_JOB)
+    horizon = min(previous, since) if previous else since
+    if not unsettled.filter(created_at__gt=horizon).exists():
+        return {"checked": 0}
+
+    with job_lock(FLEXPAY_POLL_JOB, ttl=60) as lock:
+        if not lock:
+            return {"locked": True}
+        expired = list(
+            unsettled.filter(
+                created_at__gt=horizon, created_at__lte=since
+            ).values_list("pk", flat=True)
+        )
+        if expired:
+            logger.warning(
+                "FlexPay poll: %s attempt(s) older than %sh left unsettled and "
+                "are no longer polled: %s",
+                len(expired),
+                hours,
+                expired,
+            )
+        result = poll_flexpay(created_after=since)
+        result["expired"] = len(expired)
+        lock.run.rows_scanned = result["checked"] + len(expired)
+        lock.run.rows_changed = result["attempts_updated"]
+        lock.run.watermark = job_runs.datetime_mark(since)
+        return result
 
 
 def _subs_qs_for_user(user_id: Optional[int] = None, email: Optional[str] = None):
@@ -613,9 +540,8 @@ def _subs_qs_for_user(user_id: Optional[int] = None, email: Optional[str] = None
 def prebill_renewals_task(
     self, *, user_id: int | None = None, email: str | None = None, dry_run: bool = False
 ):
-    lock_key = "billing:locks:prebill_renewals"
-    with task_lock(lock_key, timeout=60 * 50) as acquired:
-        if not acquired:
+    with job_lock("billing.prebill_renewals") as lock:
+        if not lock:
             logger.info("[prebill] skipped: another worker holds the lock")
             return {"processed": 0, "created": 0, "locked": True}
 
@@ -652,9 +578,8 @@ def prebill_renewals_task(
     soft_time_limit=30 * 60,
 )
 def enforce_cutoff_task(self, *, dry_run: bool = False):
-    lock_key = "billing:locks:enforce_cutoff"
-    with task_lock(lock_key, timeout=60 * 20) as acquired:
-        if not acquired:
+    with job_lock("billing.enforce_cutoff") as lock:
+        if not lock:
             logger.info("[cutoff] skipped: another worker holds the lock")
             return {"checked": 0, "suspended": 0, "locked": True}
 
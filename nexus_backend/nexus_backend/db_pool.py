@@ -0,0 +1,130 @@
+"""
+Database connection reuse for gunicorn and Celery processes (configured in
+settings, sized per ``PROCESS_TYPE``):
+
+  - persistent (default): each thread keeps its connection for
+    ``DB_CONN_MAX_AGE`` seconds; ``CONN_HEALTH_CHECKS`` validates it before
+    reuse at the start of a request or task, so a connection dropped by the
+    server is replaced instead of failing the request;
+  - pool (``DB_POOL=1``, psycopg 3): Django's ``psycopg_pool`` pool, one per
+    process and alias (``DB_POOL_SIZES``). A request waits at most
+    ``DB_POOL_TIMEOUT`` for a connection; returned connections are rolled
+    back if a transaction was left open, and checked before being reused.
+
+Web processes serving ASGI (``WEB_SERVER=asgi``) run sync ORM calls in a
+fresh thread-sensitive context per request, where persistent connections
+are never reused or closed; there ``CONN_MAX_AGE`` is forced to 0 unless the
+pool is on.
+
+Prefork: a pool opened in the Celery parent (its threads and sockets) must
+not be used by the children. ``reset_after_fork()`` (``worker_process_init``)
+drops the inherited pool objects without closing them: closing would end the
+parent's server sessions. Each child then opens its own pool on first use.
+Persistent connections are already discarded after fork by Celery's Django
+fixup. Gunicorn workers load the app after forking (no ``--preload``), so
+they start clean.
+
+Metrics: new connections are counted in persistent mode (the rate should
+stay near zero once warm); pool mode exports pool size, idle connections,
+waiting requests, wait time and timeouts, sampled after requests and tasks
+at most every ``SAMPLE_SECONDS``.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Dict
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from nexus_backend import metrics
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_SECONDS = 5.0
+
+_lock = threading.Lock()
+_last_sample = float("-inf")
+
+
+def _pool_options(conn):
+    return conn.settings_dict.get("OPTIONS", {}).get("pool")
+
+
+def pools() -> Dict:
+    """alias -> psycopg pool, for the aliases configured with one."""
+    return {
+        conn.alias: conn.pool for conn in connections.all() if _pool_options(conn)
+    }
+
+
+# ---------- Fork safety ----------
+def reset_after_fork() -> None:
+    """Forget pools inherited from the parent process (see module doc)."""
+    for conn in connections.all():
+        registry = getattr(type(conn), "_connection_pools", None)
+        if registry is not None and registry.pop(conn.alias, None) is not None:
+            logger.debug("db pool %s: dropped the parent's pool", conn.alias)
+
+
+# ---------- Metrics ----------
+def connection_opened(sender, connection, **kwargs):
+    if not _pool_options(connection):  # pooled checkouts are not new ones
+        metrics.DB_CONNECTIONS_OPENED.labels(connection.alias).inc()
+
+
+def observe(force: bool = False) -> None:
+    """Export pool statistics since the last sample."""
+    global _last_sample
+    now = time.monotonic()
+    with _lock:
+        if not force and now - _last_sample < SAMPLE_SECONDS:
+            return
+        _last_sample = now
+    for alias, pool in pools().items():
+        stats = pool.pop_stats()
+        states = {
+            "open": stats.get("pool_size", 0),
+            "idle": stats.get("pool_available", 0),
+            "waiting": stats.get("requests_waiting", 0),
+            "max": stats.get("pool_max", 0),
+        }
+        for state, value in states.items():
+            metrics.DB_POOL_CONNECTIONS.labels(alias, state).set(value)
+        metrics.DB_POOL_REQUESTS.labels(alias).inc(stats.get("requests_num", 0))
+        metrics.DB_POOL_WAIT.labels(alias).inc(
+            stats.get("requests_wait_ms", 0) / 1000
+        )
+        metrics.DB_POOL_TIMEOUTS.labels(alias).inc(stats.get("requests_errors", 0))
+        metrics.DB_CONNECTIONS_OPENED.labels(alias).inc(
+            stats.get("connections_num", 0)
+        )
+
+
+def task_finished(**kwargs):
+    observe()
+
+
+def install() -> None:
+    """Connect the metric receivers (idempotent)."""
+    connection_created.connect(
+        connection_opened, weak=False, dispatch_uid="db_pool_connection_opened"
+    )
+
+
+def connect_celery_signals() -> None:
+    from celery.signals import task_postrun
+
+    task_postrun.connect(task_finished, weak=False, dispatch_uid="db_pool_observe")
+
+
+__all__ = [
+    "pools",
+    "reset_after_fork",
+    "observe",
+    "install",
+    "connect_celery_signals",
+]
@@ -0,0 +1,191 @@
+"""
+Read-replica routing for reporting: BI dashboards, finance exports and
+ledger statements read from the ``reporting`` alias (a streaming replica,
+``REPORTING_DATABASE_URL``) so month-end aggregates do not compete with
+checkout and payment callbacks on the primary.
+
+Nothing goes to the replica unless asked for:
+
+  - ``@reporting_db`` on a view (or a ``get`` method, or a Celery task) pins
+    its reads for the whole call; ``with reporting():`` does the same for a
+    block. Writes inside always go to the primary, so only pin code that
+    does not read back what it just wrote;
+  - the alias is chosen once when the pin starts: the replica if it is
+    configured, reachable and at most ``REPORTING_MAX_LAG_SECONDS`` behind
+    the primary, else the primary. The lag is measured at most every
+    ``REPORTING_LAG_CHECK_SECONDS`` per process, and each decision is
+    counted in ``nexus_reporting_routes_total{outcome}``.
+
+Without ``REPORTING_DATABASE_URL`` (local dev, tests) pins are no-ops. For a
+local check against a second Postgres instance (not a replica: its lag is
+always 0), point ``REPORTING_DATABASE_URL`` at it and set
+``REPORTING_DATABASE_MIGRATE=1`` so ``migrate --database reporting`` builds
+the schema there.
+"""
+
+from __future__ import annotations
+
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from nexus_backend import metrics
+
+logger = logging.getLogger(__name__)
+
+REPORTING_ALIAS = "reporting"
+
+# 0 on a primary or a caught-up replica; otherwise how old the last replayed
+# transaction is (an idle primary leaves the replay timestamp old, hence the
+# LSN comparison first). NULL, too stale to use, when the WAL receiver is not
+# streaming: a disconnected replica has replayed all it received and would
+# otherwise report 0 forever. Reading its status needs pg_read_all_stats (or
+# pg_monitor) for the replica's user; without it every check says NULL.
+LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN NOT EXISTS (
+        SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming'
+    ) THEN NULL
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(
+        EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+    )
+END
+"""
+
+_pinned: ContextVar[Optional[str]] = ContextVar("reporting_alias", default=None)
+
+_lock = threading.Lock()
+_lag: Tuple[float, Optional[float]] = (float("-inf"), None)  # (checked_at, lag)
+
+
+def _configured() -> bool:
+    return REPORTING_ALIAS in settings.DATABASES
+
+
+def _max_lag() -> float:
+    return float(getattr(settings, "REPORTING_MAX_LAG_SECONDS", 30))
+
+
+def _check_interval() -> float:
+    return float(getattr(settings, "REPORTING_LAG_CHECK_SECONDS", 5))
+
+
+# ---------- Lag guard ----------
+def replica_lag() -> Optional[float]:
+    """
+    Seconds the replica is behind the primary (infinite when it is not
+    streaming from it); None if unreachable.
+    """
+    try:
+        with connections[REPORTING_ALIAS].cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            lag = cursor.fetchone()[0]
+            return float("inf") if lag is None else float(lag)
+    except Exception:
+        logger.warning("reporting replica: lag check failed", exc_info=True)
+        return None
+
+
+def _current_lag() -> Optional[float]:
+    global _lag
+    now = time.monotonic()
+    with _lock:
+        checked_at, lag = _lag
+    if now - checked_at < _check_interval():
+        return lag
+    lag = replica_lag()
+    with _lock:
+        _lag = (now, lag)
+    return lag
+
+
+def clear_local() -> None:
+    """Forget the cached replica lag (tests)."""
+    global _lag
+    with _lock:
+        _lag = (float("-inf"), None)
+
+
+def choose_alias() -> str:
+    """The replica if configured and fresh enough, else the primary."""
+    if not _configured():
+        return DEFAULT_DB_ALIAS
+    lag = _current_lag()
+    if lag is None:
+        outcome = "unavailable"
+    elif lag > _max_lag():
+        outcome = "lagging"
+        logger.info("reporting replica %.1fs behind, using the primary", lag)
+    else:
+        outcome = "replica"
+    if metrics.enabled():
+        metrics.REPORTING_ROUTES.labels(outcome).inc()
+    return REPORTING_ALIAS if outcome == "replica" else DEFAULT_DB_ALIAS
+
+
+# ---------- Pinning ----------
+@contextmanager
+def reporting():
+    """Route the reads of this block to the replica (see module doc)."""
+    if _pinned.get() is not None:  # nested: keep the outer decision
+        yield _pinned.get()
+        return
+    token = _pinned.set(choose_alias())
+    try:
+        yield _pinned.get()
+    finally:
+        _pinned.reset(token)
+
+
+def reporting_db(func):
+    """Run ``func`` (a view, view method or task) pinned to the replica."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with reporting():
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+# ---------- Router ----------
+class ReportingRouter:
+    """``DATABASE_ROUTERS`` entry: pinned reads to the chosen alias."""
+
+    def db_for_read(self, model, **hints):
+        return _pinned.get()
+
+    def db_for_write(self, model, **hints):
+        # Also for instances read from the replica and saved afterwards.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, REPORTING_ALIAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPORTING_ALIAS:
+            return bool(getattr(settings, "REPORTING_DATABASE_MIGRATE", False))
+        return None
+
+
+__all__ = [
+    "REPORTING_ALIAS",
+    "ReportingRouter",
+    "choose_alias",
+    "clear_local",
+    "replica_lag",
+    "reporting",
+    "reporting_db",
+]
@@ -0,0 +1,409 @@
+"""
+Prometheus instrumentation: requests, DB queries, outbound calls, Celery.
+
+Metrics
+  - ``nexus_http_request_duration_seconds{route,method,status}``: latency per
+    resolved URL name (``request.resolver_match.view_name``), status class;
+  - ``nexus_http_request_db_queries{route}`` / ``..._db_seconds{route}``:
+    queries and time spent in the database per request, measured with
+    ``connection.execute_wrapper`` on every configured alias;
+  - ``nexus_external_call_duration_seconds{service,outcome}``: FlexPay and
+    Twilio (every ``requests`` call, classified by host, and the async
+    ``main.services.flexpay_http`` calls) and SMTP (outbox);
+  - ``nexus_celery_task_duration_seconds{task}`` and
+    ``nexus_celery_task_total{task,outcome}``;
+  - ``nexus_cache_lookups_total{tier,result}``: ``main.services.caching``
+    lookups (tier l1/shared; result hit/miss/early/error);
+  - ``nexus_lock_wait_seconds{lock,outcome}``, ``nexus_lock_hold_seconds{lock}``
+    and ``nexus_lock_lost_total{lock}``: ``main.services.locks`` leases.
+  - ``nexus_otp_events_total{purpose,event}``: ``main.services.otp`` sends,
+    reused challenges, throttled requests and verification outcomes.
+  - ``nexus_reporting_routes_total{outcome}``: where ``nexus_backend.db_router``
+    sent a reporting pin (replica, or the primary because it was lagging or
+    unavailable).
+  - ``nexus_db_connections_opened_total{alias}`` and
+    ``nexus_db_pool_connections{alias,state}`` / ``nexus_db_pool_requests_total``
+    / ``nexus_db_pool_wait_seconds_total`` / ``nexus_db_pool_timeouts_total``:
+    connection reuse and pool saturation (``nexus_backend.db_pool``).
+
+Multiprocess mode: gunicorn workers and Celery pool processes each write
+their samples to ``PROMETHEUS_MULTIPROC_DIR`` (see ``gunicorn.conf.py``), and
+``metrics_view`` / the Celery exporter aggregate the directory on scrape.
+Without the variable (development, tests) the default in-process registry is
+served.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+import time
+from contextlib import ExitStack, asynccontextmanager, contextmanager
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+HOLD_BUCKETS = (0.1, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 1800.0, 3600.0, 7200.0)
+
+UNRESOLVED_ROUTE = "<unresolved>"
+
+REQUEST_LATENCY = Histogram(
+    "nexus_http_request_duration_seconds",
+    "Request latency by route.",
+    ["route", "method", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_DB_QUERIES = Histogram(
+    "nexus_http_request_db_queries",
+    "Database queries per request.",
+    ["route"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_SECONDS = Histogram(
+    "nexus_http_request_db_seconds",
+    "Time spent in the database per request.",
+    ["route"],
+    buckets=LATENCY_BUCKETS,
+)
+EXTERNAL_CALL_LATENCY = Histogram(
+    "nexus_external_call_duration_seconds",
+    "Outbound call latency (FlexPay, Twilio, SMTP...).",
+    ["service", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+CELERY_TASK_LATENCY = Histogram(
+    "nexus_celery_task_duration_seconds",
+    "Celery task run time.",
+    ["task"],
+    buckets=LATENCY_BUCKETS,
+)
+CELERY_TASKS = Counter(
+    "nexus_celery_task",
+    "Celery task outcomes.",
+    ["task", "outcome"],
+)
+CACHE_LOOKUPS = Counter(
+    "nexus_cache_lookups",
+    "Two-tier cache lookups (main.services.caching).",
+    ["tier", "result"],
+)
+LOCK_WAIT = Histogram(
+    "nexus_lock_wait_seconds",
+    "Time spent acquiring a distributed lock.",
+    ["lock", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+LOCK_HOLD = Histogram(
+    "nexus_lock_hold_seconds",
+    "How long a distributed lock was held.",
+    ["lock"],
+    buckets=HOLD_BUCKETS,
+)
+LOCKS_LOST = Counter(
+    "nexus_lock_lost",
+    "Leases that expired or were taken over before release.",
+    ["lock"],
+)
+OTP_EVENTS = Counter(
+    "nexus_otp_events",
+    "OTP sends and verification outcomes (main.services.otp).",
+    ["purpose", "event"],
+)
+REPORTING_ROUTES = Counter(
+    "nexus_reporting_routes",
+    "Reporting reads routed to the replica or back to the primary.",
+    ["outcome"],
+)
+DB_CONNECTIONS_OPENED = Counter(
+    "nexus_db_connections_opened",
+    "New database connections (TLS + auth handshakes).",
+    ["alias"],
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "nexus_db_pool_connections",
+    "Pooled connections by state (open, idle, waiting requests, max).",
+    ["alias", "state"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_REQUESTS = Counter(
+    "nexus_db_pool_requests",
+    "Connections handed out by the pool.",
+    ["alias"],
+)
+DB_POOL_WAIT = Counter(
+    "nexus_db_pool_wait_seconds",
+    "Time spent waiting for a pooled connection.",
+    ["alias"],
+)
+DB_POOL_TIMEOUTS = Counter(
+    "nexus_db_pool_timeouts",
+    "Requests that got no pooled connection within DB_POOL_TIMEOUT.",
+    ["alias"],
+)
+
+
+def enabled() -> bool:
+    return bool(getattr(settings, "METRICS_ENABLED", True))
+
+
+def status_class(status_code: int) -> str:
+    return f"{status_code // 100}xx"
+
+
+# ---------- Requests ----------
+class QueryTimer:
+    """``execute_wrapper`` that counts queries and sums their duration."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+def route_of(request) -> str:
+    match = getattr(request, "resolver_match", None)
+    return (match.view_name or match.route) if match else UNRESOLVED_ROUTE
+
+
+def observe_request(
+    request, status_code: int, seconds: float, queries: Optional[QueryTimer]
+):
+    """``queries`` is None when they were not measured (metrics disabled)."""
+    route = route_of(request)
+    status = status_class(status_code)
+    REQUEST_LATENCY.labels(route, request.method, status).observe(seconds)
+    if queries is not None:
+        REQUEST_DB_QUERIES.labels(route).observe(queries.count)
+        REQUEST_DB_SECONDS.labels(route).observe(queries.seconds)
+
+
+@contextmanager
+def track_queries():
+    """Count queries on every database alias for the current thread."""
+    timer = QueryTimer()
+    with ExitStack() as stack:
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(timer))
+        yield timer
+
+
+@asynccontextmanager
+async def atrack_queries():
+    """
+    ``track_queries`` for async code. The ORM runs in ``sync_to_async``
+    threads, and connections (with their wrappers) are per thread: the
+    wrappers are installed and removed through ``sync_to_async`` too, so
+    they land in the thread the request's thread-sensitive calls use (one
+    per request under ASGI, which also runs sync views there).
+    """
+    stack = ExitStack()
+    timer = await sync_to_async(stack.enter_context)(track_queries())
+    try:
+        yield timer
+    finally:
+        await sync_to_async(stack.close)()
+
+
+# ---------- Outbound calls ----------
+@contextmanager
+def external_call(service: str):
+    """Time an outbound call; the outcome is "error" if the block raises."""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        EXTERNAL_CALL_LATENCY.labels(service, outcome).observe(
+            time.perf_counter() - started
+        )
+
+
+_hosts_lock = threading.Lock()
+_service_hosts: Optional[Dict[str, str]] = None
+
+
+def _known_hosts() -> Dict[str, str]:
+    """host -> service for the providers configured in settings."""
+    global _service_hosts
+    if _service_hosts is None:
+        hosts = {"api.twilio.com": "twilio"}
+        for name in dir(settings):
+            if name.startswith("FLEXPAY_") and name.endswith("_URL"):
+                host = urlsplit(str(getattr(settings, name) or "")).hostname
+                if host:
+                    hosts[host] = "flexpay"
+        with _hosts_lock:
+            _service_hosts = hosts
+    return _service_hosts
+
+
+def service_for_url(url: str) -> str:
+    host = (urlsplit(url).hostname or "").lower()
+    hosts = _known_hosts()
+    if host in hosts:
+        return hosts[host]
+    if "flexpay" in host or "flexpaie" in host:
+        return "flexpay"
+    if host.endswith("twilio.com"):
+        return "twilio"
+    return "other"
+
+
+def instrument_requests() -> None:
+    """
+    Time every ``requests`` call (FlexPay call sites and the Twilio client
+    both go through ``HTTPAdapter.send``). Idempotent.
+    """
+    from requests.adapters import HTTPAdapter
+
+    if getattr(HTTPAdapter.send, "_nexus_metrics", False):
+        return
+    original = HTTPAdapter.send
+
+    def send(self, request, *args, **kwargs):
+        service = service_for_url(request.url)
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            response = original(self, request, *args, **kwargs)
+            outcome = status_class(response.status_code)
+            return response
+        finally:
+            EXTERNAL_CALL_LATENCY.labels(service, outcome).observe(
+                time.perf_counter() - started
+            )
+
+    send._nexus_metrics = True
+    HTTPAdapter.send = send
+
+
+# ---------- Celery ----------
+_task_started: Dict[str, float] = {}
+
+
+def task_started(task_id=None, **kwargs):
+    if task_id:
+        _task_started[task_id] = time.perf_counter()
+
+
+def task_finished(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    name = getattr(task, "name", None) or "unknown"
+    if started is not None:
+        CELERY_TASK_LATENCY.labels(name).observe(time.perf_counter() - started)
+    CELERY_TASKS.labels(name, (state or "unknown").lower()).inc()
+
+
+def connect_celery_signals() -> None:
+    from celery.signals import task_postrun, task_prerun
+
+    task_prerun.connect(task_started, weak=False, dispatch_uid="metrics_prerun")
+    task_postrun.connect(task_finished, weak=False, dispatch_uid="metrics_postrun")
+
+
+def start_celery_exporter(port: int) -> None:
+    """Serve the pool's aggregated metrics from the Celery parent process."""
+    from prometheus_client import start_http_server
+
+    start_http_server(port, registry=collector_registry())
+
+
+def reset_multiproc_dir() -> None:
+    """Start from an empty PROMETHEUS_MULTIPROC_DIR (stale samples of old pids)."""
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def mark_process_dead(pid: int) -> None:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid)
+
+
+# ---------- Exposition ----------
+def collector_registry():
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+    from prometheus_client import multiprocess
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. Requires ``Authorization: Bearer
+    <METRICS_AUTH_TOKEN>``; without a configured token it only answers in
+    DEBUG.
+    """
+    token = getattr(settings, "METRICS_AUTH_TOKEN", "")
+    if token:
+        supplied = request.headers.get("Authorization", "")
+        if not constant_time_compare(supplied, f"Bearer {token}"):
+            return HttpResponse("Unauthorized", status=401)
+    elif not settings.DEBUG:
+        raise Http404()
+    return HttpResponse(
+        generate_latest(collector_registry()), content_type=CONTENT_TYPE_LATEST
+    )
+
+
+__all__ = [
+    "enabled",
+    "route_of",
+    "observe_request",
+    "track_queries",
+    "external_call",
+    "instrument_requests",
+    "connect_celery_signals",
+    "start_celery_exporter",
+    "reset_multiproc_dir",
+    "mark_process_dead",
+    "collector_registry",
+    "metrics_view",
+]
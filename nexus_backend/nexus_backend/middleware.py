@@ -1,4 +1,9 @@
 import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from nexus_backend import db_pool, metrics
 
 logger = logging.getLogger(__name__)
 
@@ -25,3 +30,51 @@ class RequestLoggingMiddleware:
             logger.error(f"Response content: {response.content[:500]}")
 
         return response
+
+
+class MetricsMiddleware:
+    """
+    Per-route latency and DB query histograms (see ``nexus_backend.metrics``).
+    Keep it first in MIDDLEWARE so the timing covers the whole stack.
+
+    Async-capable, so under ASGI async views (payment probes) stay on the
+    event loop; queries are then counted in the request's thread-sensitive
+    ``sync_to_async`` thread, where the ORM runs (``metrics.atrack_queries``).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = metrics.enabled()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        with metrics.track_queries() as queries:
+            response = self.get_response(request)
+        metrics.observe_request(
+            request, response.status_code, time.perf_counter() - started, queries
+        )
+        db_pool.observe()
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        started = time.perf_counter()
+        async with metrics.atrack_queries() as queries:
+            response = await self.get_response(request)
+        metrics.observe_request(
+            request, response.status_code, time.perf_counter() - started, queries
+        )
+        db_pool.observe()
+        return response
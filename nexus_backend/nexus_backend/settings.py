@@ -13,14 +13,18 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import ctypes
 import ctypes.util
 import glob
+import importlib.util
 import os
 import ssl
 from os.path import exists, isdir, join
 from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 import certifi
 from environ import Env
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -202,6 +206,8 @@ if env.bool("TESTING", default=False):
     INSTALLED_APPS = [app for app in INSTALLED_APPS if app != "compressor"]
 
 MIDDLEWARE = [
+    # First, so latency/query metrics cover the whole stack
+    "nexus_backend.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -239,12 +245,21 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "nexus_backend.wsgi.application"
+ASGI_APPLICATION = "nexus_backend.asgi.application"
 
 FLEXPAY_MERCHANT_ID = env.str("FLEXPAY_MERCHANT_ID")
 FLEXPAY_API_KEY = env.str("FLEXPAY_API_KEY")
 FLEXPAY_MOBILE_URL = env.str("FLEXPAY_MOBILE_URL")
 FLEXPAY_CHECK_URL = env.str("FLEXPAY_CHECK_URL")
 FLEXPAY_CARD_URL = env.str("FLEXPAY_CARD_URL")
+# The beat poll only re-checks unsettled attempts created this recently.
+FLEXPAY_POLL_LOOKBACK_HOURS = env.int("FLEXPAY_POLL_LOOKBACK_HOURS", default=48)
+# Async gateway calls from the payment views (main.services.flexpay_http):
+# keep-alive connections per web process, default timeout, and
+# FLEXPAY_ASYNC_HTTP=0 to fall back to requests in a thread.
+FLEXPAY_ASYNC_HTTP = env.bool("FLEXPAY_ASYNC_HTTP", default=True)
+FLEXPAY_HTTP_POOL_SIZE = env.int("FLEXPAY_HTTP_POOL_SIZE", default=100)
+FLEXPAY_HTTP_TIMEOUT = env.float("FLEXPAY_HTTP_TIMEOUT", default=15.0)
 
 
 # SendGrid
@@ -421,6 +436,88 @@ else:
         }
     }
 
+# Read replica for reporting views (nexus_backend.db_router). Unset: every
+# query goes to the primary. Pinned reads fall back to the primary while the
+# replica is more than REPORTING_MAX_LAG_SECONDS behind.
+REPORTING_DATABASE_URL = env.str("REPORTING_DATABASE_URL", default="")
+if REPORTING_DATABASE_URL:
+    DATABASES["reporting"] = dj_database_url.parse(
+        REPORTING_DATABASE_URL, conn_max_age=600
+    )
+    DATABASES["reporting"]["ENGINE"] = "django.contrib.gis.db.backends.postgis"
+    DATABASES["reporting"]["TEST"] = {"MIRROR": "default"}
+DATABASE_ROUTERS = ["nexus_backend.db_router.ReportingRouter"]
+REPORTING_MAX_LAG_SECONDS = env.float("REPORTING_MAX_LAG_SECONDS", default=30.0)
+REPORTING_LAG_CHECK_SECONDS = env.float("REPORTING_LAG_CHECK_SECONDS", default=5.0)
+# Only for a standalone local copy: `migrate --database reporting`.
+REPORTING_DATABASE_MIGRATE = env.bool("REPORTING_DATABASE_MIGRATE", default=False)
+
+# Connection reuse (nexus_backend.db_pool): no TLS + auth handshake per
+# request or task. PROCESS_TYPE (web | worker | beat, as in the Dockerfile)
+# picks the sizing: gunicorn threads share their process's connections, a
+# prefork Celery child runs one task at a time.
+PROCESS_TYPE = env.str("PROCESS_TYPE", default="web")
+_db_role = "web" if PROCESS_TYPE == "web" else "worker"
+# WEB_SERVER (web role, as in the Dockerfile): wsgi (default) | asgi.
+WEB_SERVER = env.str("WEB_SERVER", default="wsgi")
+_asgi_web = _db_role == "web" and WEB_SERVER == "asgi"
+# DB_POOL=1: Django's psycopg 3 pool (needs psycopg[pool]); otherwise
+# persistent connections, validated before reuse.
+DB_POOL = env.bool("DB_POOL", default=False)
+if DB_POOL and importlib.util.find_spec("psycopg_pool") is None:
+    # Refuse to boot rather than quietly open a connection per request
+    raise ImproperlyConfigured("DB_POOL=1 requires psycopg[pool] to be installed")
+if DB_POOL:
+    from psycopg_pool import ConnectionPool as _ConnectionPool
+DB_POOL_SIZES = {
+    "web": (
+        env.int("DB_POOL_MIN_WEB", default=2),
+        env.int("DB_POOL_MAX_WEB", default=8),
+    ),
+    "worker": (
+        env.int("DB_POOL_MIN_WORKER", default=1),
+        env.int("DB_POOL_MAX_WORKER", default=2),
+    ),
+}
+DB_POOL_TIMEOUT = env.float("DB_POOL_TIMEOUT", default=10.0)
+DB_CONN_MAX_AGE = env.int(
+    "DB_CONN_MAX_AGE", default=600 if _db_role == "web" else 300
+)
+# Server-side cap on sessions left idle inside a transaction, so a leaked
+# transaction cannot hold a pooled connection forever (0: server default;
+# leave at 0 behind PgBouncer, which rejects the startup option).
+DB_IDLE_IN_TRANSACTION_TIMEOUT_MS = env.int(
+    "DB_IDLE_IN_TRANSACTION_TIMEOUT_MS", default=0
+)
+for _db in DATABASES.values():
+    if "postgresql" not in _db["ENGINE"] and "postgis" not in _db["ENGINE"]:
+        continue
+    _db_options = _db.setdefault("OPTIONS", {})
+    if DB_IDLE_IN_TRANSACTION_TIMEOUT_MS:
+        _db_options["options"] = (
+            f"-c idle_in_transaction_session_timeout="
+            f"{DB_IDLE_IN_TRANSACTION_TIMEOUT_MS}"
+        )
+    if DB_POOL:
+        _pool_min, _pool_max = DB_POOL_SIZES[_db_role]
+        _db["CONN_MAX_AGE"] = 0  # the pool owns connection lifetime
+        _db_options["pool"] = {
+            "min_size": _pool_min,
+            "max_size": _pool_max,
+            "timeout": DB_POOL_TIMEOUT,
+            "max_idle": 300,
+            "max_lifetime": 1800,
+            "check": _ConnectionPool.check_connection,
+        }
+    elif _asgi_web:
+        # Under ASGI, sync ORM calls run in per-request thread-sensitive
+        # contexts: a persistent connection is opened per request and never
+        # reused or closed, until Postgres runs out. Use DB_POOL=1 there.
+        _db["CONN_MAX_AGE"] = 0
+    else:
+        _db["CONN_MAX_AGE"] = DB_CONN_MAX_AGE
+        _db["CONN_HEALTH_CHECKS"] = True
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -562,6 +659,10 @@ COMPRESS_STORAGE = "compressor.storage.CompressorFileStorage"
 # Can be overridden via env var COMPRESS_OFFLINE.
 COMPRESS_OFFLINE = env.bool("COMPRESS_OFFLINE", default=not DEVELOPMENT_MODE)
 
+# Process-local config cache (BillingConfig, CompanySettings, TaxRate, FxRate):
+# how often a worker re-checks the shared version stamp, in seconds.
+CONFIG_CACHE_RECHECK_SECONDS = env_int_safe("CONFIG_CACHE_RECHECK_SECONDS", 5)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
@@ -628,6 +729,64 @@ FEEDBACK_SETTINGS = {
     ),
 }
 
+# Prometheus metrics (nexus_backend.metrics). /metrics requires
+# "Authorization: Bearer <METRICS_AUTH_TOKEN>"; without a token it is DEBUG-only.
+# Multiprocess mode is on when PROMETHEUS_MULTIPROC_DIR is set (gunicorn.conf.py
+# sets it for web workers; CELERY_METRICS_PORT enables the worker exporter).
+METRICS_ENABLED = env.bool("METRICS_ENABLED", default=True)
+METRICS_AUTH_TOKEN = env.str("METRICS_AUTH_TOKEN", default="")
+
+# Declared query budgets (main.utilities.query_budget): "off", "warn" (log the
+# offending query shapes) or "raise" (the test suite turns this on).
+QUERY_BUDGET_MODE = env.str("QUERY_BUDGET_MODE", default="off")
+
+# Cold-start budgets (nexus_backend.startup, `manage.py profile_imports`): ms
+# spent importing the project when a web or Celery process boots.
+COLD_START_BUDGET_MS = {
+    "web": env.int("COLD_START_BUDGET_WEB_MS", default=3000),
+    "celery": env.int("COLD_START_BUDGET_CELERY_MS", default=3500),
+}
+
+# Bulk invoice PDF export pool size (0: one worker per core)
+INVOICE_EXPORT_WORKERS = env.int("INVOICE_EXPORT_WORKERS", default=0)
+
+# Per-user preferences snapshot in the shared cache (main.services.preferences)
+USER_PREFS_CACHE_SECONDS = env.int("USER_PREFS_CACHE_SECONDS", default=600)
+
+# Reverse proxies in front of the app that append to X-Forwarded-For (load
+# balancer, ingress...). Client addresses are read that many hops from the
+# right; 0 uses REMOTE_ADDR (app exposed directly). Unset, the client address
+# is unknown and per-IP limits are skipped: behind App Platform REMOTE_ADDR
+# is the proxy, and one bucket for every user would lock everyone out.
+TRUSTED_PROXY_COUNT = env.int("TRUSTED_PROXY_COUNT", default=None)
+
+# One-time codes and their rate limits, kept in the shared cache
+# (main.services.otp). Limits are (requests, window seconds).
+OTP = {
+    "TTL_SECONDS": env.int("OTP_TTL_SECONDS", default=300),
+    "MAX_ATTEMPTS": env.int("OTP_MAX_ATTEMPTS", default=5),
+    "RESEND_COOLDOWN_SECONDS": env.int("OTP_RESEND_COOLDOWN_SECONDS", default=60),
+    "SEND_LIMITS": {
+        "user": (env.int("OTP_SENDS_PER_USER_HOUR", default=5), 3600),
+        "phone": (env.int("OTP_SENDS_PER_PHONE_HOUR", default=5), 3600),
+        "ip": (env.int("OTP_SENDS_PER_IP_HOUR", default=20), 3600),
+    },
+    "VERIFY_LIMITS": {"ip": (env.int("OTP_VERIFIES_PER_IP_10MIN", default=30), 600)},
+    "AUDIT_RETENTION_DAYS": env.int("OTP_AUDIT_RETENTION_DAYS", default=90),
+}
+
+# Email / SMS outbox (main.services.outbox)
+NOTIFICATION_OUTBOX = {
+    "BATCH_SIZE": env.int("OUTBOX_BATCH_SIZE", default=100),
+    # Messages per second, per channel, per drain worker
+    "RATE_LIMITS": {
+        "email": env.float("OUTBOX_EMAIL_RATE", default=10.0),
+        "sms": env.float("OUTBOX_SMS_RATE", default=5.0),
+    },
+    "MAX_ATTEMPTS": env.int("OUTBOX_MAX_ATTEMPTS", default=5),
+    "SMS_SENDER": env.str("OUTBOX_SMS_SENDER", default="NEXUS"),
+}
+
 
 if DEVELOPMENT_MODE:
     # Celery basics
@@ -643,6 +802,67 @@ CELERY_TIMEZONE = TIME_ZONE  # reuse Django TZ
 CELERY_ENABLE_UTC = False
 # Belt-and-suspenders: also list imports here
 CELERY_IMPORTS = ("nexus_backend.celery_tasks.tasks",)
+# JobRun history kept for the admin; each job's last successful run (and so
+# its watermark) is always kept.
+JOB_RUN_RETENTION_DAYS = env.int("JOB_RUN_RETENTION_DAYS", default=30)
+
+# Shared cache on Valkey (redis protocol), so idempotency keys, cache.add()
+# task locks and cached values are seen by every gunicorn and Celery process.
+# VALKEY_CACHE_URL defaults to the broker instance but database
+# VALKEY_CACHE_DB, never the broker's own: cache eviction or a flush must not
+# drop queued tasks. A non-redis URL (memory:// in local/test envs) falls back
+# to a per-process LocMemCache.
+def _valkey_db_url(url: str, db: int) -> str:
+    parts = urlsplit(url)
+    if parts.scheme == "unix":  # unix:///path/to.sock?db=N
+        query = [(k, v) for k, v in parse_qsl(parts.query) if k != "db"]
+        return f"unix://{parts.path}?{urlencode(query + [('db', db)])}"
+    if parts.scheme in ("redis", "rediss", "valkey", "valkeys"):
+        return urlunsplit(parts._replace(path=f"/{db}"))
+    return url
+
+
+VALKEY_CACHE_URL = env.str(
+    "VALKEY_CACHE_URL",
+    default=_valkey_db_url(VALKEY_URL, env.int("VALKEY_CACHE_DB", default=1)),
+)
+if VALKEY_CACHE_URL.startswith("valkey"):  # valkey:// and valkeys:// schemes
+    VALKEY_CACHE_URL = "redis" + VALKEY_CACHE_URL[len("valkey") :]
+if VALKEY_CACHE_URL.startswith(("redis", "unix")) and (
+    VALKEY_CACHE_URL == VALKEY_URL.replace("valkey", "redis", 1)
+):
+    raise ImproperlyConfigured(
+        "VALKEY_CACHE_URL must not share the Celery broker's database"
+    )
+if VALKEY_CACHE_URL.startswith(("redis://", "rediss://", "unix://")):
+    _cache_options = {
+        # One pool per process; gunicorn threads / Celery threads share it.
+        "max_connections": env.int("CACHE_MAX_CONNECTIONS", default=50),
+        "socket_connect_timeout": env.float("CACHE_CONNECT_TIMEOUT", default=1.0),
+        "socket_timeout": env.float("CACHE_SOCKET_TIMEOUT", default=1.0),
+        "retry_on_timeout": True,
+        "health_check_interval": 30,
+    }
+    if VALKEY_CACHE_URL.startswith("rediss://"):
+        _cache_options["ssl_cert_reqs"] = ssl.CERT_NONE  # same as the broker
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": VALKEY_CACHE_URL,
+            "KEY_PREFIX": env.str("CACHE_KEY_PREFIX", default="nexus"),
+            "TIMEOUT": 300,
+            "OPTIONS": _cache_options,
+        }
+    }
+else:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+
+# Per-process L1 in front of the shared cache (main.services.caching):
+# lifetime of L1 entries and namespace versions, and its size bound.
+CACHE_L1_SECONDS = env.int("CACHE_L1_SECONDS", default=5)
+CACHE_L1_MAX_ENTRIES = env.int("CACHE_L1_MAX_ENTRIES", default=1000)
 
 
 # Test settings
@@ -660,6 +880,7 @@ if "test" in os.sys.argv or "pytest" in os.sys.argv[0]:
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": ":memory:",
         }
+        DATABASES.pop("reporting", None)
 
     # Disable migrations for faster tests (kept for both SQLite and PostGIS runs)
     class DisableMigrations:
@@ -691,6 +912,11 @@ if "test" in os.sys.argv or "pytest" in os.sys.argv[0]:
     CELERY_TASK_ALWAYS_EAGER = True
     CELERY_TASK_EAGER_PROPAGATES = True
 
+    # Tests never share cache state with a running Valkey
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+
     # Disable Sentry during tests
     import sentry_sdk
 
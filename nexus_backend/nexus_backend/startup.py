@@ -0,0 +1,144 @@
+"""
+Cold start of web and worker processes: what importing the project costs,
+and a budget so it does not creep back up.
+
+A gunicorn worker imports every view module with the URLconf, and a Celery
+process imports every task module, before serving anything. The PDF, XLSX,
+SMS and timezone libraries (``DEFERRED_MODULES``) are therefore imported
+inside the functions that use them, never at module level. Most processes
+never render a PDF; those that do load them once on purpose (the bulk export
+pool via ``invoice_pdf.warm_up``, a Celery worker on its first PDF task via
+``invoice_pdf.warm_up_once``).
+
+``profile(target)`` boots a fresh interpreter the way that kind of process
+does (``BOOT_CODE``) under ``python -X importtime`` and returns the import
+time of every module. ``manage.py profile_imports`` prints the slowest ones
+and checks the boot against ``COLD_START_BUDGET_MS`` and against deferred
+modules sneaking back in.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List
+
+DEFERRED_MODULES = ("reportlab", "openpyxl", "xhtml2pdf", "twilio", "timezonefinder")
+
+BOOT_CODE = {
+    # wsgi.py runs django.setup(); the URLconf imports every view module.
+    "web": (
+        "from nexus_backend.wsgi import application\n"
+        "from django.urls import get_resolver\n"
+        "get_resolver().url_patterns\n"
+    ),
+    # What a worker child has loaded before its first task, including its
+    # worker_process_init hooks.
+    "celery": (
+        "import django\n"
+        "from celery.signals import worker_process_init\n"
+        "from nexus_backend.celery import app\n"
+        "django.setup()\n"
+        "app.loader.import_default_modules()\n"
+        "worker_process_init.send(sender=None)\n"
+    ),
+}
+
+# import time:       206 |        528 | _frozen_importlib_external
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)\s*$")
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+
+@dataclass(frozen=True)
+class ModuleImport:
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int  # 0 for a module imported by the boot code itself
+
+
+@dataclass
+class ImportProfile:
+    target: str
+    wall_ms: float
+    modules: List[ModuleImport] = field(default_factory=list)
+
+    @property
+    def import_ms(self) -> float:
+        """Time spent importing, nested imports counted once."""
+        return sum(m.cumulative_us for m in self.modules if m.depth == 0) / 1000
+
+    def slowest(self, n: int = 25, by: str = "cumulative") -> List[ModuleImport]:
+        key = "self_us" if by == "self" else "cumulative_us"
+        return sorted(self.modules, key=lambda m: getattr(m, key), reverse=True)[:n]
+
+    def deferred_loaded(self) -> List[str]:
+        """``DEFERRED_MODULES`` imported during boot (should be empty)."""
+        roots = {m.name.partition(".")[0] for m in self.modules}
+        return [name for name in DEFERRED_MODULES if name in roots]
+
+    def import_chain(self, name: str) -> List[str]:
+        """Who imported ``name``: its importers up to the boot code, innermost first."""
+        chain: List[str] = []
+        depth = None
+        # -X importtime lists a module after everything it imported.
+        for module in self.modules:
+            if depth is None:
+                if module.name == name or module.name.startswith(name + "."):
+                    chain, depth = [module.name], module.depth
+            elif module.depth < depth:
+                chain.append(module.name)
+                depth = module.depth
+                if depth == 0:
+                    break
+        return chain
+
+
+def parse_importtime(output: str) -> List[ModuleImport]:
+    """Parse the stderr of ``python -X importtime``; other lines are ignored."""
+    modules = []
+    for line in output.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append(
+                ModuleImport(name, int(self_us), int(cumulative_us), len(indent) // 2)
+            )
+    return modules
+
+
+def profile(target: str = "web", python: str = sys.executable) -> ImportProfile:
+    """Boot ``target`` in a new interpreter and record its imports."""
+    if target not in BOOT_CODE:
+        raise ValueError(f"Unknown target {target!r}, expected {sorted(BOOT_CODE)}")
+    env = dict(os.environ)
+    env.setdefault("DJANGO_SETTINGS_MODULE", "nexus_backend.settings")
+    started = time.perf_counter()
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", BOOT_CODE[target]],
+        cwd=PROJECT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        errors = [ln for ln in result.stderr.splitlines() if not _LINE.match(ln)]
+        raise RuntimeError(f"{target} boot failed:\n" + "\n".join(errors[-20:]))
+    return ImportProfile(target, wall_ms, parse_importtime(result.stderr))
+
+
+__all__ = [
+    "DEFERRED_MODULES",
+    "BOOT_CODE",
+    "ModuleImport",
+    "ImportProfile",
+    "parse_importtime",
+    "profile",
+]
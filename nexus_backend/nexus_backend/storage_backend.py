@@ -15,3 +15,12 @@ class PrivateMediaStorage(S3Boto3Storage):
     @property
     def querystring_auth(self):
         return True
+
+
+class PublicMediaStorage(S3Boto3Storage):
+    """Media anyone may load (avatars): CDN URLs that do not expire."""
+
+    location = "public"
+    default_acl = "public-read"
+    file_overwrite = False
+    querystring_auth = False
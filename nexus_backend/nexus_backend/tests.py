@@ -1,6 +1,15 @@
-from django.test import RequestFactory, TestCase
+from types import SimpleNamespace
 
-from nexus_backend.middleware import RequestLoggingMiddleware
+from asgiref.sync import async_to_sync, sync_to_async
+from prometheus_client import REGISTRY
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from nexus_backend.celery import app as celery_app
+from nexus_backend.metrics import metrics_view
+from nexus_backend.middleware import MetricsMiddleware, RequestLoggingMiddleware
 
 
 class RequestLoggingMiddlewareTests(TestCase):
@@ -24,3 +33,96 @@ class RequestLoggingMiddlewareTests(TestCase):
         request = self.factory.post("/client/orders/checkout/", data={"foo": "bar"})
         resp = self.middleware(request)
         self.assertEqual(resp.status_code, 200)
+
+
+class MetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+        def get_response(request):
+            request.resolver_match = SimpleNamespace(
+                view_name="metrics_test_view", route="metrics-test/"
+            )
+            get_user_model().objects.count()
+            get_user_model().objects.exists()
+            return HttpResponse("ok")
+
+        self.middleware = MetricsMiddleware(get_response)
+
+    def _sample(self, name, labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_records_latency_and_query_count_per_route(self):
+        route = {"route": "metrics_test_view"}
+        latency = {**route, "method": "GET", "status": "2xx"}
+        before_requests = self._sample(
+            "nexus_http_request_duration_seconds_count", latency
+        )
+        before_queries = self._sample("nexus_http_request_db_queries_sum", route)
+
+        resp = self.middleware(self.factory.get("/metrics-test/"))
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(
+            self._sample("nexus_http_request_duration_seconds_count", latency),
+            before_requests + 1,
+        )
+        self.assertEqual(
+            self._sample("nexus_http_request_db_queries_sum", route),
+            before_queries + 2,
+        )
+
+    def test_async_requests_record_their_queries(self):
+        async def get_response(request):
+            request.resolver_match = SimpleNamespace(
+                view_name="metrics_async_view", route="metrics-async/"
+            )
+            await sync_to_async(get_user_model().objects.count)()
+            await sync_to_async(get_user_model().objects.exists)()
+            return HttpResponse("ok")
+
+        middleware = MetricsMiddleware(get_response)
+        route = {"route": "metrics_async_view"}
+        before_count = self._sample("nexus_http_request_db_queries_count", route)
+        before_sum = self._sample("nexus_http_request_db_queries_sum", route)
+
+        resp = async_to_sync(middleware)(self.factory.get("/metrics-async/"))
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(
+            self._sample("nexus_http_request_db_queries_count", route),
+            before_count + 1,
+        )
+        self.assertEqual(
+            self._sample("nexus_http_request_db_queries_sum", route), before_sum + 2
+        )
+
+    @override_settings(METRICS_AUTH_TOKEN="scrape-token")
+    def test_metrics_endpoint_requires_token(self):
+        denied = metrics_view(self.factory.get("/metrics"))
+        allowed = metrics_view(
+            self.factory.get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-token")
+        )
+
+        self.assertEqual(denied.status_code, 401)
+        self.assertEqual(allowed.status_code, 200)
+        self.assertIn(b"nexus_http_request_duration_seconds", allowed.content)
+
+
+class CeleryBeatScheduleTests(SimpleTestCase):
+    def test_periodic_tasks_are_registered_with_the_app(self):
+        schedule = celery_app.conf.beat_schedule
+
+        for name in (
+            "drain-notification-outbox",
+            "generate-renewal-orders-every-morning",
+            "prune-job-runs-daily",
+            "prune-otp-audit-daily",
+        ):
+            self.assertIn(name, schedule)
+
+    def test_every_beat_entry_names_a_registered_task(self):
+        celery_app.loader.import_default_modules()
+
+        for name, entry in celery_app.conf.beat_schedule.items():
+            self.assertIn(entry["task"], celery_app.tasks, name)
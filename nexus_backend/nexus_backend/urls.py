@@ -21,6 +21,7 @@ from django.contrib import admin
 from django.urls import include, path
 
 from nexus_backend import settings
+from nexus_backend.metrics import metrics_view
 
 #
 # def trigger_error(request):
@@ -34,6 +35,7 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     path("i18n/", include("django.conf.urls.i18n")),
     path("api/", include("api.urls")),  # APIs généralement sans préfixe de langue
+    path("metrics", metrics_view, name="prometheus_metrics"),
     # path("user/", include("user.urls")),  # Moved to i18n_patterns for language support
 ]
 
@@ -4,7 +4,9 @@ from decimal import Decimal
 import pytest
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import Client, RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 
@@ -171,6 +173,64 @@ class AdminViewOrdersTests(TestCase):
         # Paid order should not be included when filtering only by q=unpaid reference
         self.assertNotIn(paid_order.order_reference, refs_q)
 
+    def test_admin_view_orders_cursor_walks_every_row_once(self):
+        orders = [
+            OrderFactory(user=self.user, total_price=Decimal("10.00")) for _ in range(4)
+        ]
+        inv_cons = Invoice.objects.create(
+            number="CONS-INV-0002",
+            user=self.user,
+            grand_total=Decimal("20.00"),
+            status="issued",
+            issued_at=timezone.now(),
+        )
+        for o in orders[:2]:
+            InvoiceOrder.objects.create(invoice=inv_cons, order=o)
+
+        rows, cursor, pages = [], None, 0
+        while True:
+            params = {"per_page": 2}
+            if cursor:
+                params["cursor"] = cursor
+            payload = self.client.get(reverse("admin_view_orders"), params).json()
+            self.assertTrue(payload["success"])
+            self.assertEqual(payload["total_count"], 5)
+            rows.extend(payload["orders"])
+            pages += 1
+            cursor = payload["next_cursor"]
+            if not payload["has_more"]:
+                self.assertIsNone(cursor)
+                break
+
+        refs = [r["reference"] for r in rows]
+        self.assertEqual(pages, 3)
+        self.assertEqual(len(refs), len(set(refs)))
+        self.assertEqual(
+            set(refs), {o.order_reference for o in orders} | {inv_cons.number}
+        )
+        cons_row = next(r for r in rows if r["is_consolidated"])
+        self.assertEqual(
+            sorted(cons_row["order_ids"]), sorted(o.id for o in orders[:2])
+        )
+
+    def test_admin_view_orders_query_count_does_not_grow_with_orders(self):
+        OrderFactory(user=self.user)
+        url = reverse("admin_view_orders")
+        self.client.get(url, {"per_page": 5})  # warm session/count cache
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url, {"per_page": 5})
+        for _ in range(10):
+            OrderFactory(user=self.user)
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(url, {"per_page": 5})
+
+        self.assertLessEqual(len(large.captured_queries), len(small.captured_queries))
+
+    def test_admin_view_orders_rejects_bad_cursor(self):
+        resp = self.client.get(reverse("admin_view_orders"), {"cursor": "not-a-cursor"})
+        self.assertEqual(resp.status_code, 400)
+
 
 class AdminOrderDetailsTests(TestCase):
     def setUp(self):
@@ -1,26 +1,23 @@
 import datetime as dt
+import hashlib
 import math
-import os
 from decimal import Decimal, InvalidOperation
 from io import BytesIO
 
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
-from reportlab.lib.units import mm
-from reportlab.platypus import (
-    Flowable,
-    Image,
-    Paragraph,
-    SimpleDocTemplate,
-    Spacer,
-    Table,
-    TableStyle,
-)
-
 from django.contrib.auth.decorators import login_required
 from django.db import transaction
-from django.db.models import Count, Q, Sum
+from django.db.models import (
+    BigIntegerField,
+    Count,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+)
 from django.db.models.functions import Coalesce
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, render
@@ -36,6 +33,7 @@ from main.models import (
     BillingAccount,
     ConsolidatedInvoice,
     Invoice,
+    InvoiceLine,
     InvoiceOrder,
     InvoicePayment,
     Order,
@@ -44,7 +42,14 @@ from main.models import (
     PaymentAttempt,
     Wallet,
 )
-from nexus_backend import settings
+from main.services import caching, pdf_assets
+from main.services.search import (
+    CONSOLIDATED_INVOICE_FIELDS,
+    ORDER_FIELDS,
+    apply_search,
+)
+from main.utilities.pagination import InvalidCursor, decode_cursor, encode_cursor
+from main.utilities.query_budget import query_budget
 from user.permissions import require_staff_role
 
 
@@ -144,217 +149,313 @@ def _safe_customer_label(u):
     return full or getattr(u, "email", "") or getattr(u, "username", "") or "—"
 
 
-@login_required(login_url="login_page")
-@require_staff_role(["admin", "manager", "finance", "sales"])
-def admin_view_orders(request):
-    """
-    JSON endpoint consumed by the Order Management page.
-    It merges single orders and consolidated invoices into one list,
-    exposes `invoice_line` so the UI can show a single-line designation.
-    Adds tax totals: `tax_total` (singles) and `sum_tax_total` (consolidated).
-    """
+# ---------------------------------------------------------------------------
+# Admin order list (singles + consolidated invoices, keyset paginated)
+# ---------------------------------------------------------------------------
+ORDER_STATUSES = {"pending_payment", "fulfilled", "cancelled", "awaiting_confirmation"}
+PAYMENT_STATUSES = {"paid", "unpaid", "partially_paid", "awaiting_confirmation"}
+INVOICE_STATUSES = {"draft", "issued", "paid", "overdue", "cancelled"}
+
+# Rows of both kinds share one ordering: (sort_ts DESC NULLS LAST, row_key DESC)
+# with row_key = 2 * id + kind, so ids from the two tables never tie.
+_KIND_ORDER = 0
+_KIND_INVOICE = 1
+
+ADMIN_ORDERS_COUNT_TTL = 60  # seconds
+
+
+def _decode_list_cursor(token: str):
+    """Returns (sort_ts | None, row_key) or None if the cursor is invalid."""
     try:
-        page = max(int(request.GET.get("page", 1)), 1)
-        per_page = max(min(int(request.GET.get("per_page", 20)), 200), 1)
-    except Exception:
-        page, per_page = 1, 20
+        values = decode_cursor(token)
+        if len(values) != 2 or not isinstance(values[1], int):
+            return None
+    except InvalidCursor:
+        return None
+    return values[0], values[1]
 
-    q = (request.GET.get("q") or "").strip()
-    status = (request.GET.get("status") or "").strip().lower()
 
-    # ---------------------
-    # Singles (Order rows)
-    # ---------------------
-    oqs = (
-        Order.objects.select_related("user", "plan")
-        .prefetch_related("taxes", "lines")
-        .all()
+def _keyset_after(ts_field: str, kind: int, cursor) -> Q:
+    """
+    Rows strictly after `cursor` in (ts DESC NULLS LAST, row_key DESC) order.
+    The row_key bound is turned back into a plain `id` bound so the
+    (ts, id) index can serve the range.
+    """
+    ts, key = cursor
+    max_id = (key - 1 - kind) // 2  # 2*id + kind < key
+    if ts is None:
+        return Q(**{f"{ts_field}__isnull": True, "id__lte": max_id})
+    return (
+        Q(**{f"{ts_field}__lt": ts})
+        | Q(**{ts_field: ts, "id__lte": max_id})
+        | Q(**{f"{ts_field}__isnull": True})
     )
 
-    if q:
-        oqs = oqs.filter(
-            Q(order_reference__icontains=q)
-            | Q(user__email__icontains=q)
-            | Q(user__first_name__icontains=q)
-            | Q(user__last_name__icontains=q)
-        )
 
+def _admin_order_querysets(q: str, status: str):
+    """Filtered (orders, consolidated invoices) querysets, without ordering."""
+    oqs = Order.objects.all()
+    if q:
+        oqs = apply_search(oqs, q, ORDER_FIELDS)
     # Allow filtering by either order.status or payment_status (common admin need)
     if status:
-        if status in {
-            "pending_payment",
-            "fulfilled",
-            "cancelled",
-            "awaiting_confirmation",
-        }:
+        if status in ORDER_STATUSES:
             oqs = oqs.filter(status__iexact=status)
-        elif status in {"paid", "unpaid", "partially_paid", "awaiting_confirmation"}:
+        elif status in PAYMENT_STATUSES:
             oqs = oqs.filter(payment_status__iexact=status)
 
-    singles = []
-    # Order by most recent first
-    for o in oqs.order_by("-created_at"):
-        # Latest invoice for this order (if any)
-        inv = (
-            Invoice.objects.filter(order_links__order=o)
-            .order_by("-issued_at", "-id")
-            .first()
-        )
+    # Consolidated = invoice covering more than one order
+    n_links = (
+        InvoiceOrder.objects.filter(invoice=OuterRef("pk"))
+        .order_by()
+        .values("invoice")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    ivqs = Invoice.objects.annotate(n_orders=Subquery(n_links)).filter(n_orders__gt=1)
+    if q:
+        ivqs = apply_search(ivqs, q, CONSOLIDATED_INVOICE_FIELDS)
+    if status in INVOICE_STATUSES:
+        ivqs = ivqs.filter(status__iexact=status)
+    return oqs, ivqs
 
-        invoice_line = None
-        invoice_number = None
-        if inv:
-            invoice_line = (
-                inv.lines.order_by("id").values_list("description", flat=True).first()
-            )
-            invoice_number = inv.number
 
-        vat_amt = (
-            o.taxes.filter(kind__iexact="VAT").aggregate(s=Sum("amount"))["s"] or ZERO
-        )
-        exc_amt = (
-            o.taxes.filter(kind__iexact="EXC").aggregate(s=Sum("amount"))["s"] or ZERO
-        )
-        tax_total = (vat_amt or ZERO) + (exc_amt or ZERO)
+def _admin_orders_total(oqs, ivqs, q: str, status: str) -> int:
+    """Row count for the toolbar; cached briefly because it scans both tables."""
+    digest = hashlib.md5(f"{q}\x00{status}".encode("utf-8")).hexdigest()
+    key = f"orders:admin_list:count:{digest}"
+    return caching.get_or_compute(
+        key, lambda: oqs.count() + ivqs.count(), ttl=ADMIN_ORDERS_COUNT_TTL
+    )
 
+
+def _tax_sum_subquery(kinds, **outer):
+    """SUM(OrderTax.amount) for the given kinds, correlated on `outer` lookups."""
+    kind_q = Q()
+    for k in kinds:
+        kind_q |= Q(kind__iexact=k)
+    return Coalesce(
+        Subquery(
+            OrderTax.objects.filter(kind_q, **outer)
+            .order_by()
+            .annotate(g=Value(1))
+            .values("g")
+            .annotate(s=Sum("amount"))
+            .values("s")[:1],
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+        ZERO,
+    )
+
+
+_VAT_KINDS = ("VAT",)
+_EXC_KINDS = ("EXC", OrderTax.Kind.EXCISE)
+
+
+def _fmt_dt(value) -> str:
+    return timezone.localtime(value).strftime("%Y-%m-%d %H:%M") if value else ""
+
+
+def _customer_label(user) -> str:
+    return user.get_full_name() or user.email or "—"
+
+
+def _hydrate_singles(ids):
+    """Order rows for one page: latest invoice + taxes come from SQL subqueries."""
+    if not ids:
+        return {}
+    latest_inv = InvoiceOrder.objects.filter(order=OuterRef("pk")).order_by(
+        "-invoice__issued_at", "-invoice_id"
+    )
+    first_line = InvoiceLine.objects.filter(invoice=OuterRef("inv_id")).order_by("id")
+    qs = (
+        Order.objects.filter(id__in=ids)
+        .select_related("user", "plan")
+        .annotate(
+            inv_id=Subquery(latest_inv.values("invoice_id")[:1]),
+            inv_number=Subquery(latest_inv.values("invoice__number")[:1]),
+            inv_line=Subquery(first_line.values("description")[:1]),
+            vat_sum=_tax_sum_subquery(_VAT_KINDS, order=OuterRef("pk")),
+            exc_sum=_tax_sum_subquery(_EXC_KINDS, order=OuterRef("pk")),
+        )
+    )
+    rows = {}
+    for o in qs:
+        vat_amt = o.vat_sum or ZERO
+        exc_amt = o.exc_sum or ZERO
+        invoice_line = o.inv_line if o.inv_id else None
         # Fallback description if there’s no invoice yet
         fallback_desc = invoice_line or (
             o.plan.name if getattr(o, "plan_id", None) else "Order"
         )
+        rows[o.id] = {
+            "id": o.id,
+            "reference": o.order_reference,
+            "reference_label": f"#{o.order_reference}",
+            "customer": _customer_label(o.user),
+            "status": o.status,
+            "payment_status": o.payment_status,
+            "date": _fmt_dt(o.created_at),
+            "total": str(o.total_price or ZERO),
+            "vat": str(vat_amt),
+            "exc": str(exc_amt),
+            "tax_total": str(vat_amt + exc_amt),
+            # single-line text the UI shows in the “Designation” column
+            "invoice_line": invoice_line,
+            "invoice_number": o.inv_number,
+            # Keep legacy key as fallback to avoid breaking older UI
+            "description": fallback_desc,
+            "is_consolidated": False,
+        }
+    return rows
+
+
+def _order_like_status(inv_status: str):
+    """Normalize consolidated invoice status to order-like statuses for the UI."""
+    inv_status = (inv_status or "").lower()
+    if inv_status == "paid":
+        return "fulfilled", "paid"
+    if inv_status in {"issued", "overdue"}:
+        return "pending_payment", "unpaid"
+    if inv_status in {"cancelled", "canceled"}:
+        return "cancelled", "cancelled"
+    return inv_status or "issued", "unpaid"
+
+
+def _hydrate_consolidated(ids):
+    """Consolidated invoice rows for one page (taxes summed across linked orders)."""
+    if not ids:
+        return {}
+    links = {}
+    for inv_id, order_id, ref in (
+        InvoiceOrder.objects.filter(invoice_id__in=ids)
+        .order_by("id")
+        .values_list("invoice_id", "order_id", "order__order_reference")
+    ):
+        links.setdefault(inv_id, []).append((order_id, ref))
 
-        singles.append(
-            {
-                "id": o.id,
-                "reference": o.order_reference,
-                "reference_label": f"#{o.order_reference}",
-                "customer": (o.user.get_full_name() or o.user.email or "—"),
-                "status": o.status,
-                "payment_status": o.payment_status,
-                "date": timezone.localtime(o.created_at).strftime("%Y-%m-%d %H:%M"),
-                "total": str(o.total_price or ZERO),
-                "vat": str(vat_amt),
-                "exc": str(exc_amt),
-                "tax_total": str(tax_total),  # <<< NEW
-                # NEW: single-line text the UI will show in the “Designation” column
-                "invoice_line": invoice_line,
-                "invoice_number": invoice_number,
-                # Keep legacy key as fallback to avoid breaking older UI
-                "description": fallback_desc,
-                "is_consolidated": False,
-            }
-        )
-
-    # ------------------------------------
-    # Consolidated (Invoice covering >1 order)
-    # ------------------------------------
-    ivqs = (
-        Invoice.objects.annotate(n_orders=Count("order_links"))
-        .filter(n_orders__gt=1)
+    first_line = InvoiceLine.objects.filter(invoice=OuterRef("pk")).order_by("id")
+    linked = {"order__invoice_links__invoice": OuterRef("pk")}
+    qs = (
+        Invoice.objects.filter(id__in=ids)
         .select_related("user")
-        .prefetch_related("lines", "order_links__order")
+        .annotate(
+            summary_line=Subquery(first_line.values("description")[:1]),
+            vat_sum=_tax_sum_subquery(_VAT_KINDS, **linked),
+            exc_sum=_tax_sum_subquery(_EXC_KINDS, **linked),
+        )
     )
+    rows = {}
+    for inv in qs:
+        vat_amt = inv.vat_sum or ZERO
+        exc_amt = inv.exc_sum or ZERO
+        inv_links = links.get(inv.id, [])
+        refs = [ref for _, ref in inv_links]
+        status, payment_status = _order_like_status(inv.status)
+        rows[inv.id] = {
+            "is_consolidated": True,
+            "consolidated_number": inv.number,
+            "reference": inv.number,
+            "customer": _customer_label(inv.user),
+            "status": status,
+            "payment_status": payment_status,
+            "date": _fmt_dt(inv.issued_at),
+            "total": str(inv.grand_total or ZERO),
+            "sum_vat": str(vat_amt),
+            "sum_exc": str(exc_amt),
+            "sum_tax_total": str(vat_amt + exc_amt),
+            "order_refs": refs,
+            "order_ids": [oid for oid, _ in inv_links],
+            # the single summary line text from the consolidated invoice
+            "invoice_line": inv.summary_line,
+            # Provide invoice_number so UI displays it like single invoices
+            "invoice_number": inv.number,
+            "description": inv.summary_line
+            or f"Consolidated invoice for {len(refs)} orders",
+        }
+    return rows
 
-    if q:
-        ivqs = ivqs.filter(
-            Q(number__icontains=q)
-            | Q(user__email__icontains=q)
-            | Q(user__first_name__icontains=q)
-            | Q(user__last_name__icontains=q)
-        )
 
-    # Typical invoice statuses: draft / issued / paid / overdue / cancelled
-    if status in {"draft", "issued", "paid", "overdue", "cancelled"}:
-        ivqs = ivqs.filter(status__iexact=status)
+@login_required(login_url="login_page")
+@require_staff_role(["admin", "manager", "finance", "sales"])
+@query_budget(10)
+def admin_view_orders(request):
+    """
+    JSON endpoint consumed by the Order Management page.
+    It merges single orders and consolidated invoices into one list,
+    exposes `invoice_line` so the UI can show a single-line designation.
+    Adds tax totals: `tax_total` (singles) and `sum_tax_total` (consolidated).
 
-    consolidated = []
-    for inv in ivqs.order_by("-issued_at", "-id"):
-        refs = list(
-            InvoiceOrder.objects.filter(invoice=inv).values_list(
-                "order__order_reference", flat=True
-            )
-        )
-        summary_line = (
-            inv.lines.order_by("id").values_list("description", flat=True).first()
-        )
+    The page is selected by one UNION ALL query over both sources ordered by
+    (date DESC, key DESC); only the rows on that page are then hydrated, so
+    the cost of a page does not grow with the number of orders.
 
-        # Compute taxes by summing OrderTax entries across all orders linked to this invoice
-        order_ids = list(
-            InvoiceOrder.objects.filter(invoice=inv).values_list("order_id", flat=True)
-        )
-        if order_ids:
-            vat_amt = (
-                OrderTax.objects.filter(order_id__in=order_ids, kind__iexact="VAT")
-                .aggregate(s=Sum("amount"))
-                .get("s")
-                or ZERO
-            )
-            exc_amt = (
-                OrderTax.objects.filter(order_id__in=order_ids, kind__iexact="EXC")
-                .aggregate(s=Sum("amount"))
-                .get("s")
-                or ZERO
+    Pagination: pass `cursor` (the `next_cursor` of the previous page) for
+    keyset paging; `page` still works as an offset fallback for jumps.
+    """
+    try:
+        page = max(int(request.GET.get("page", 1)), 1)
+        per_page = max(min(int(request.GET.get("per_page", 20)), 200), 1)
+    except Exception:
+        page, per_page = 1, 20
+
+    q = (request.GET.get("q") or "").strip()
+    status = (request.GET.get("status") or "").strip().lower()
+
+    cursor = None
+    raw_cursor = (request.GET.get("cursor") or "").strip()
+    if raw_cursor:
+        cursor = _decode_list_cursor(raw_cursor)
+        if cursor is None:
+            return JsonResponse(
+                {"success": False, "message": "Invalid cursor."}, status=400
             )
-        else:
-            vat_amt = ZERO
-            exc_amt = ZERO
-        sum_tax_total = (vat_amt or ZERO) + (exc_amt or ZERO)
-
-        # Normalize consolidated invoice status to order-like status for UI consistency
-        inv_status = (inv.status or "").lower()
-        if inv_status == "paid":
-            order_like_status = "fulfilled"
-            order_like_payment_status = "paid"
-        elif inv_status in {"issued", "overdue"}:
-            order_like_status = "pending_payment"
-            order_like_payment_status = "unpaid"
-        elif inv_status in {"cancelled", "canceled"}:
-            order_like_status = "cancelled"
-            order_like_payment_status = "cancelled"
-        else:
-            order_like_status = inv_status or "issued"
-            order_like_payment_status = "unpaid"
 
-        consolidated.append(
-            {
-                "is_consolidated": True,
-                "consolidated_number": inv.number,
-                "reference": inv.number,
-                "customer": (inv.user.get_full_name() or inv.user.email or "—"),
-                "status": order_like_status,
-                "payment_status": order_like_payment_status,
-                "date": timezone.localtime(inv.issued_at).strftime("%Y-%m-%d %H:%M")
-                if inv.issued_at
-                else "",
-                "total": str(inv.grand_total or ZERO),
-                "sum_vat": str(vat_amt),
-                "sum_exc": str(exc_amt),
-                "sum_tax_total": str(sum_tax_total),  # <<< NEW
-                "order_refs": refs,
-                # NEW: the single summary line text from the consolidated invoice
-                "invoice_line": summary_line,
-                # Provide invoice_number so UI displays it like single invoices
-                "invoice_number": inv.number,
-                "description": summary_line
-                or f"Consolidated invoice for {len(refs)} orders",
-            }
+    oqs, ivqs = _admin_order_querysets(q, status)
+
+    offset = 0 if cursor else (page - 1) * per_page
+    branch_limit = offset + per_page + 1
+
+    def _branch(qs, ts_field, kind):
+        if cursor:
+            qs = qs.filter(_keyset_after(ts_field, kind, cursor))
+        return (
+            qs.annotate(
+                sort_ts=F(ts_field),
+                row_key=ExpressionWrapper(
+                    F("id") * 2 + kind, output_field=BigIntegerField()
+                ),
+            )
+            .order_by(F(ts_field).desc(nulls_last=True), "-id")
+            .values_list("sort_ts", "row_key")[:branch_limit]
         )
 
-    # --------------------------
-    # Merge, sort, paginate
-    # --------------------------
-    rows = [*singles, *consolidated]
+    keys = list(
+        _branch(oqs, "created_at", _KIND_ORDER)
+        .union(_branch(ivqs, "issued_at", _KIND_INVOICE), all=True)
+        .order_by(F("sort_ts").desc(nulls_last=True), F("row_key").desc())[
+            offset : offset + per_page + 1
+        ]
+    )
+    has_more = len(keys) > per_page
+    keys = keys[:per_page]
+
+    order_ids = [k // 2 for _, k in keys if k % 2 == _KIND_ORDER]
+    invoice_ids = [k // 2 for _, k in keys if k % 2 == _KIND_INVOICE]
+    singles = _hydrate_singles(order_ids)
+    consolidated = _hydrate_consolidated(invoice_ids)
 
-    # Sort by datetime desc (singles have 'date' as string; we already formatted uniformly)
-    def _key(x):
-        return x.get("date", "")
+    page_rows = []
+    for _, k in keys:
+        src = singles if k % 2 == _KIND_ORDER else consolidated
+        row = src.get(k // 2)
+        if row is not None:
+            page_rows.append(row)
 
-    rows.sort(key=_key, reverse=True)
+    next_cursor = encode_cursor(keys[-1]) if has_more and keys else None
 
-    total_count = len(rows)
+    total_count = _admin_orders_total(oqs, ivqs, q, status)
     total_pages = max(1, math.ceil(total_count / per_page))
-    start = (page - 1) * per_page
-    end = start + per_page
-    page_rows = rows[start:end]
 
     return JsonResponse(
         {
@@ -363,6 +464,8 @@ def admin_view_orders(request):
             "per_page": per_page,
             "total_pages": total_pages,
             "total_count": total_count,
+            "has_more": has_more,
+            "next_cursor": next_cursor,
             "orders": page_rows,
         }
     )
@@ -1131,6 +1234,18 @@ def report_invoice_pdf(request, order_id: int):
     and redirects to the unified invoice-by-number PDF under /billing/invoice/<id>/pdf/.
     If no Invoice is linked yet, it falls back to legacy rendering below.
     """
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.lib.units import mm
+    from reportlab.platypus import (
+        Flowable,
+        Paragraph,
+        SimpleDocTemplate,
+        Spacer,
+        Table,
+        TableStyle,
+    )
 
     # Try to resolve an Invoice first and redirect to the new invoice-centric route
     try:
@@ -1401,9 +1516,9 @@ def report_invoice_pdf(request, order_id: int):
 
     # Header — LEFT ONLY
     left_block = []
-    logo_path = os.path.join(settings.BASE_DIR, "static", "images", "logo", "logo.png")
-    if os.path.exists(logo_path):
-        left_block.append(Image(logo_path, width=42 * mm, height=12 * mm))
+    logo = pdf_assets.logo_image(width=42 * mm, height=12 * mm)
+    if logo is not None:
+        left_block.append(logo)
     else:
         left_block.append(Paragraph("<b>NEXUS TELECOMS SA</b>", styles["H_BIG"]))
     left_block.append(Spacer(1, 2))
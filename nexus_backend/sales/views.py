@@ -49,7 +49,6 @@ from main.models import (
     BillingAccount,
     CompanyDocument,
     CompanyKYC,
-    CompanySettings,
     ConsolidatedInvoice,
     CouponRedemption,
     DiscountType,
@@ -65,9 +64,9 @@ from main.models import (
     StarlinkKitInventory,
     Subscription,
     SubscriptionPlan,
-    TaxRate,
     User,
 )
+from main.services import config_cache
 from main.utilities.taxing import compute_totals_from_lines
 from nexus_backend.settings import env
 from sales.sales_helpers import _dt, _qmoney, _supports_skip_locked
@@ -1164,7 +1163,7 @@ def submit_order_sales(request):
 
         # Helper: build a draft invoice from an order then issue it
         def _create_issue_invoice_for_order(order):
-            cs = CompanySettings.get()
+            cs = config_cache.company_settings()
             inv = Invoice.objects.using(using).create(
                 user=order.user,
                 currency=cs.default_currency or "USD",
@@ -1735,10 +1734,10 @@ def get_subscription_billing(request, subscription_id):
             else ZERO
         )
 
-        vat_rate = TaxRate.objects.filter(description__iexact="VAT").first()
-        excise_rate = TaxRate.objects.filter(description__iexact="EXCISE").first()
-        vat_pct = (vat_rate.percentage / 100) if vat_rate else Decimal("0.00")
-        excise_pct = (excise_rate.percentage / 100) if excise_rate else Decimal("0.00")
+        vat_rate = config_cache.tax_percentage("VAT")
+        excise_rate = config_cache.tax_percentage("EXCISE")
+        vat_pct = (vat_rate / 100) if vat_rate is not None else Decimal("0.00")
+        excise_pct = (excise_rate / 100) if excise_rate is not None else Decimal("0.00")
 
         vat_amount = ZERO
         excise_amount = ZERO
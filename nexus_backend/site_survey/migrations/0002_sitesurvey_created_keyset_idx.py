@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("site_survey", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="sitesurvey",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="sitesurvey_created_keyset_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("site_survey", "0002_sitesurvey_created_keyset_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sitesurveyphoto",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.AddField(
+            model_name="sitesurveyphoto",
+            name="variants",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="sitesurveyphoto",
+            name="taken_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name="sitesurveyphoto",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("content_hash", ""), _negated=True),
+                fields=("survey", "content_hash"),
+                name="survey_photo_hash_uniq",
+            ),
+        ),
+    ]
@@ -3,43 +3,19 @@ from decimal import Decimal
 from django.db import models
 from django.utils import timezone
 
-# Site Survey Models
-
-# Module-level cache for VAT rate to avoid repetitive database queries
-_vat_rate_cache = None
-_vat_rate_cache_time = None
-VAT_CACHE_DURATION = 300  # 5 minutes in seconds
+from main.services.photos import PhotoVariantsMixin
 
+# Site Survey Models
 
 def get_cached_vat_rate():
-    """Get VAT rate with module-level caching to reduce database hits."""
-    global _vat_rate_cache, _vat_rate_cache_time
-
-    from django.utils import timezone
-
-    # Check if cache is valid (exists and not expired)
-    current_time = timezone.now().timestamp()
-    if (
-        _vat_rate_cache is not None
-        and _vat_rate_cache_time is not None
-        and (current_time - _vat_rate_cache_time) < VAT_CACHE_DURATION
-    ):
-        return _vat_rate_cache
-
-    # Cache miss or expired - fetch from database
+    """VAT rate as a fraction, served from the process-local config cache."""
     try:
-        from main.models import TaxRate
+        from main.services.config_cache import tax_percentage
 
-        vat_rate_obj = TaxRate.objects.filter(description="VAT").first()
-        if vat_rate_obj:
-            _vat_rate_cache = vat_rate_obj.percentage / Decimal("100")
-        else:
-            _vat_rate_cache = Decimal("0.00")  # Fallback if VAT not found
-
-        _vat_rate_cache_time = current_time
-        return _vat_rate_cache
+        pct = tax_percentage("VAT")
+        return pct / Decimal("100") if pct is not None else Decimal("0.00")
     except Exception:
-        # If there's any error, return zero and don't cache
+        # If there's any error, return zero
         return Decimal("0.00")
 
 
@@ -169,6 +145,11 @@ class SiteSurvey(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["-created_at", "-id"], name="sitesurvey_created_keyset_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"Site Survey for Order {self.order.order_reference}"
@@ -287,7 +268,7 @@ class SiteSurveyResponse(models.Model):
         return f"Response to: {self.checklist_item.question}"
 
 
-class SiteSurveyPhoto(models.Model):
+class SiteSurveyPhoto(PhotoVariantsMixin, models.Model):
     """Photos taken during site survey"""
 
     PHOTO_TYPE_CHOICES = [
@@ -312,6 +293,23 @@ class SiteSurveyPhoto(models.Model):
     longitude = models.FloatField(null=True, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    # Filled by main.services.photos at ingest
+    content_hash = models.CharField(max_length=64, blank=True, default="")
+    variants = models.JSONField(default=dict, blank=True)
+    taken_at = models.DateTimeField(null=True, blank=True)
+
+    image_field_name = "photo"
+    parent_field_name = "survey"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["survey", "content_hash"],
+                condition=~models.Q(content_hash=""),
+                name="survey_photo_hash_uniq",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.get_photo_type_display()} - {self.survey}"
 
@@ -6,10 +6,12 @@ Gère l'envoi d'emails et SMS lors des rejets de surveys
 import logging
 
 from django.conf import settings
-from django.core.mail import send_mail
 from django.template.loader import render_to_string
+from django.utils import timezone
 from django.utils.html import strip_tags
 
+from main.services.outbox import queue_email, queue_sms
+
 logger = logging.getLogger(__name__)
 
 
@@ -55,13 +57,13 @@ def send_billing_notification(billing):
         plain_message = strip_tags(html_message)
 
         # Send email
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=getattr(settings, "DEFAULT_FROM_EMAIL", "nexus@example.com"),
-            recipient_list=[customer_email],
-            html_message=html_message,
-            fail_silently=False,
+        queue_email(
+            subject,
+            plain_message,
+            [customer_email],
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            html_body=html_message,
+            category="billing_notification",
         )
 
         logger.info(
@@ -126,13 +128,13 @@ def send_payment_confirmation(billing):
         plain_message = strip_tags(html_message)
 
         # Send email
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=getattr(settings, "DEFAULT_FROM_EMAIL", "nexus@example.com"),
-            recipient_list=[customer_email],
-            html_message=html_message,
-            fail_silently=False,
+        queue_email(
+            subject,
+            plain_message,
+            [customer_email],
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            html_body=html_message,
+            category="payment_confirmation",
         )
 
         logger.info(
@@ -179,13 +181,13 @@ def send_rejection_notification_to_technician(survey):
         plain_message = strip_tags(html_message)
 
         # Envoi de l'email
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=getattr(settings, "DEFAULT_FROM_EMAIL", "nexus@example.com"),
-            recipient_list=[survey.technician.email],
-            html_message=html_message,
-            fail_silently=False,
+        queue_email(
+            subject,
+            plain_message,
+            [survey.technician.email],
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            html_body=html_message,
+            category="survey_rejected",
         )
 
         logger.info(
@@ -242,13 +244,13 @@ def send_rejection_notification_to_customer(survey):
         plain_message = strip_tags(html_message)
 
         # Envoi de l'email
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=getattr(settings, "DEFAULT_FROM_EMAIL", "nexus@example.com"),
-            recipient_list=[customer_email],
-            html_message=html_message,
-            fail_silently=False,
+        queue_email(
+            subject,
+            plain_message,
+            [customer_email],
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            html_body=html_message,
+            category="survey_rejected",
         )
 
         logger.info(
@@ -302,13 +304,13 @@ def send_rejection_alert_to_admin(survey):
         plain_message = strip_tags(html_message)
 
         # Envoi de l'email
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=getattr(settings, "DEFAULT_FROM_EMAIL", "nexus@example.com"),
-            recipient_list=admin_emails,
-            html_message=html_message,
-            fail_silently=False,
+        queue_email(
+            subject,
+            plain_message,
+            admin_emails,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            html_body=html_message,
+            category="survey_rejected",
         )
 
         logger.info(
@@ -323,7 +325,7 @@ def send_rejection_alert_to_admin(survey):
 
 def send_rejection_sms_to_technician(survey):
     """
-    Envoie un SMS au technician (si service SMS configuré)
+    Met en file un SMS pour le technician (envoyé par l'outbox)
     """
     try:
         if not hasattr(survey.technician, "phone") or not survey.technician.phone:
@@ -332,31 +334,10 @@ def send_rejection_sms_to_technician(survey):
         # Message SMS court
         message = f"Nexus: Votre survey #{survey.id} (commande {survey.order.order_reference if survey.order else 'N/A'}) a été rejeté. Consultez votre email pour les détails."
 
-        # Si Twilio est configuré
-        if hasattr(settings, "TWILIO_ACCOUNT_SID") and settings.TWILIO_ACCOUNT_SID:
-            try:
-                from twilio.rest import Client
-
-                client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-
-                message_instance = client.messages.create(
-                    body=message,
-                    from_=settings.TWILIO_PHONE_NUMBER,
-                    to=survey.technician.phone,
-                )
-
-                logger.info(
-                    f"SMS envoyé au technician {survey.technician.phone} pour survey {survey.id}: {message_instance.sid}"
-                )
-                return True
-
-            except Exception as twilio_error:
-                logger.error(
-                    f"Erreur Twilio pour survey {survey.id}: {str(twilio_error)}"
-                )
-
-        # Fallback: log du message SMS
-        logger.info(f"SMS simulation pour {survey.technician.phone}: {message}")
+        queue_sms(survey.technician.phone, message, category="survey_rejected")
+        logger.info(
+            f"SMS de rejet mis en file pour {survey.technician.phone} (survey {survey.id})"
+        )
         return True
 
     except Exception as e:
@@ -487,12 +468,12 @@ def send_reassignment_notifications(
                 L'équipe NEXUS
                 """
 
-                send_mail(
-                    subject=subject,
-                    message=message,
+                queue_email(
+                    subject,
+                    message,
+                    [previous_technician.email],
                     from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[previous_technician.email],
-                    fail_silently=False,
+                    category="survey_reassigned",
                 )
 
                 results["previous_technician"] = True
@@ -546,12 +527,12 @@ def send_reassignment_notifications(
                 L'équipe NEXUS
                 """
 
-                send_mail(
-                    subject=subject,
-                    message=message,
+                queue_email(
+                    subject,
+                    message,
+                    [new_technician.email],
                     from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[new_technician.email],
-                    fail_silently=False,
+                    category="survey_reassigned",
                 )
 
                 results["new_technician"] = True
@@ -593,12 +574,12 @@ def send_reassignment_notifications(
                 L'équipe NEXUS
                 """
 
-                send_mail(
-                    subject=subject,
-                    message=message,
+                queue_email(
+                    subject,
+                    message,
+                    [site_survey.customer.email],
                     from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[site_survey.customer.email],
-                    fail_silently=False,
+                    category="survey_reassigned",
                 )
 
                 results["customer"] = True
@@ -635,12 +616,12 @@ def send_reassignment_notifications(
                 Le nouveau technicien a été notifié et le survey est maintenant en statut 'scheduled'.
                 """
 
-                send_mail(
-                    subject=subject,
-                    message=message,
+                queue_email(
+                    subject,
+                    message,
+                    admin_emails,
                     from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=admin_emails,
-                    fail_silently=False,
+                    category="survey_reassigned",
                 )
 
                 results["admin_confirmation"] = True
@@ -668,24 +649,12 @@ def send_reassignment_notifications(
 
 def send_sms_notification(phone_number, message):
     """
-    Utilitaire pour envoyer des SMS (Twilio ou simulation)
+    Utilitaire pour envoyer des SMS (via l'outbox de notifications)
     """
     try:
-        if hasattr(settings, "TWILIO_ACCOUNT_SID") and settings.TWILIO_ACCOUNT_SID:
-            from twilio.rest import Client
-
-            client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-
-            message_instance = client.messages.create(
-                body=message, from_=settings.TWILIO_PHONE_NUMBER, to=phone_number
-            )
-
-            logger.info(f"SMS envoyé à {phone_number}: {message_instance.sid}")
-            return True
-        else:
-            # Simulation SMS
-            logger.info(f"SMS simulation pour {phone_number}: {message}")
-            return True
+        queue_sms(phone_number, message, category="site_survey")
+        logger.info(f"SMS mis en file pour {phone_number}")
+        return True
 
     except Exception as e:
         logger.error(f"Erreur envoi SMS à {phone_number}: {str(e)}")
@@ -3,12 +3,13 @@ import logging
 import re
 from decimal import Decimal
 
-import requests
+from asgiref.sync import sync_to_async
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.db import IntegrityError, transaction
-from django.http import JsonResponse
+from django.db.models import Count
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils import timezone
@@ -16,6 +17,9 @@ from django.utils.translation import gettext as _
 from django.views.decorators.http import require_http_methods, require_POST
 
 from main.models import PaymentAttempt
+from main.services import flexpay_http
+from main.services.photos import queue_photo_ingest, stage_uploads
+from main.utilities.pagination import InvalidCursor, keyset_page, page_size
 
 # Import the models
 from .models import SiteSurvey, SiteSurveyChecklist, SiteSurveyPhoto, SiteSurveyResponse
@@ -124,10 +128,14 @@ def _create_additional_billing_if_needed(survey):
 @login_required
 @user_passes_test(lambda u: u.is_staff, login_url="login_page")
 def survey_dashboard_api(request):
-    """API endpoint for survey data (called by JavaScript in template)"""
-    surveys = SiteSurvey.objects.select_related(
-        "order", "technician", "approved_by"
-    ).all()
+    """
+    API endpoint for survey data (called by JavaScript in template).
+
+    Returns one page of surveys (newest first); pass `cursor` (the previous
+    `next_cursor`) for the next one. The first page also carries per-status
+    counts for the dashboard cards.
+    """
+    surveys = SiteSurvey.objects.all()
 
     # If user is a technician (not staff admin), filter to show only their assigned surveys
     if request.user.has_role("technician") and not request.user.is_superuser:
@@ -138,52 +146,75 @@ def survey_dashboard_api(request):
     if status_filter:
         surveys = surveys.filter(status=status_filter)
 
+    cursor = request.GET.get("cursor")
+    try:
+        page = keyset_page(
+            surveys.values(
+                "id",
+                "created_at",
+                "status",
+                "scheduled_date",
+                "survey_latitude",
+                "survey_longitude",
+                "installation_feasible",
+                "order__order_reference",
+                "technician__id_user",
+                "technician__full_name",
+                "technician__email",
+            ),
+            ordering=("-created_at", "-id"),
+            cursor=cursor,
+            page=request.GET.get("page"),
+            size=page_size(request, default=50),
+        )
+    except InvalidCursor:
+        return JsonResponse(
+            {"success": False, "message": "Invalid cursor."}, status=400
+        )
+
     # Convert to list of dictionaries for JSON response
     survey_data = []
-    for survey in surveys:
-        print(
-            f"Survey {survey.id}: technician object = {survey.technician}"
-        )  # Debug log
-
+    for survey in page.items:
         technician_name = "Unassigned"
-        if survey.technician:
+        if survey["technician__id_user"]:
             # Use full_name directly since get_full_name() might be empty
             technician_name = (
-                survey.technician.full_name
-                or survey.technician.email
-                or f"User {survey.technician.id_user}"
-            )
-            print(
-                f"Survey {survey.id}: technician.full_name = '{survey.technician.full_name}'"
+                survey["technician__full_name"]
+                or survey["technician__email"]
+                or f"User {survey['technician__id_user']}"
             )
 
         survey_data.append(
             {
-                "id": survey.id,
-                "order_reference": survey.order.order_reference if survey.order else "",
+                "id": survey["id"],
+                "order_reference": survey["order__order_reference"] or "",
                 "technician": technician_name,
                 "scheduled_at": (
-                    survey.scheduled_date.strftime("%Y-%m-%d")
-                    if survey.scheduled_date
+                    survey["scheduled_date"].strftime("%Y-%m-%d")
+                    if survey["scheduled_date"]
                     else "—"
                 ),
-                "status": survey.status,
-                "latitude": survey.survey_latitude,
-                "longitude": survey.survey_longitude,
-                "installation_feasible": survey.installation_feasible,
+                "status": survey["status"],
+                "latitude": survey["survey_latitude"],
+                "longitude": survey["survey_longitude"],
+                "installation_feasible": survey["installation_feasible"],
             }
         )
-        print(
-            f"Survey {survey.id}: final technician_name = '{technician_name}'"
-        )  # Debug log
 
-    return JsonResponse(
-        {
-            "surveys": survey_data,
-            "status_choices": SiteSurvey.STATUS_CHOICES,
-            "current_status": status_filter,
-        }
-    )
+    payload = {
+        "surveys": survey_data,
+        "status_choices": SiteSurvey.STATUS_CHOICES,
+        "current_status": status_filter,
+        **page.meta(),
+    }
+    if not cursor:
+        payload["status_counts"] = dict(
+            surveys.order_by()
+            .values_list("status")
+            .annotate(n=Count("id"))
+            .values_list("status", "n")
+        )
+    return JsonResponse(payload)
 
 
 @login_required
@@ -347,7 +378,7 @@ def survey_detail(request, survey_id):
 @login_required
 def technician_survey_list(request):
     """List of surveys assigned to the current technician"""
-    if "technician" not in request.user.roles:
+    if not request.user.has_role("technician"):
         messages.error(request, "Access denied")
         return redirect("login_page")
 
@@ -437,6 +468,13 @@ def get_location(request):
     return JsonResponse({"status": "success"})
 
 
+def _float_or_none(raw):
+    try:
+        return float(raw) if raw not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
 @login_required
 @require_POST
 def upload_survey_photos(request, survey_id):
@@ -477,32 +515,35 @@ def upload_survey_photos(request, survey_id):
                 status=400,
             )
 
-        uploaded_count = 0
+        # Stage the raw files; resizing, EXIF and dedupe run in a worker.
+        valid_types = dict(SiteSurveyPhoto.PHOTO_TYPE_CHOICES)
+        items, accepted = [], []
         for i, photo in enumerate(photos):
-            try:
-                # Validate photo file
-                if not photo.content_type.startswith("image/"):
-                    continue  # Skip non-image files
-
-                SiteSurveyPhoto.objects.create(
-                    survey=survey,
-                    photo=photo,
-                    photo_type=photo_types[i] if i < len(photo_types) else "other",
-                    description=descriptions[i] if i < len(descriptions) else "",
-                    latitude=(
-                        latitudes[i] if i < len(latitudes) and latitudes[i] else None
-                    ),
-                    longitude=(
-                        longitudes[i] if i < len(longitudes) and longitudes[i] else None
-                    ),
-                )
-                uploaded_count += 1
-            except Exception as e:
-                # Log the error but continue with other photos
-                print(f"Error uploading photo {i}: {str(e)}")
-                continue
+            if not (photo.content_type or "").startswith("image/"):
+                continue  # Skip non-image files
+            accepted.append(photo)
+            items.append(
+                {
+                    "fields": {
+                        "photo_type": (
+                            photo_types[i]
+                            if i < len(photo_types) and photo_types[i] in valid_types
+                            else "other"
+                        ),
+                        "description": (
+                            descriptions[i] if i < len(descriptions) else ""
+                        )[:255],
+                        "latitude": _float_or_none(
+                            latitudes[i] if i < len(latitudes) else None
+                        ),
+                        "longitude": _float_or_none(
+                            longitudes[i] if i < len(longitudes) else None
+                        ),
+                    }
+                }
+            )
 
-        if uploaded_count == 0:
+        if not items:
             return JsonResponse(
                 {
                     "success": False,
@@ -511,6 +552,11 @@ def upload_survey_photos(request, survey_id):
                 status=400,
             )
 
+        for item, staged in zip(items, stage_uploads(SiteSurveyPhoto, accepted)):
+            item["staged"] = staged
+        queue_photo_ingest(SiteSurveyPhoto, survey, items)
+        uploaded_count = len(items)
+
         return JsonResponse(
             {
                 "success": True,
@@ -1393,7 +1439,7 @@ def technicians_list(request):
     try:
         # Get technicians with their rejection statistics
         technicians = (
-            User.objects.filter(roles__contains="technician")
+            User.objects.with_role("technician")
             .annotate(
                 total_surveys=Count("site_surveys"),
                 rejected_surveys=Count(
@@ -1599,102 +1645,212 @@ def _map_flexpay_error_to_user_message(msg: str) -> str:
     return _("Payment could not be initiated at the moment. Please try again later.")
 
 
-@login_required(login_url="login_page")
-@require_http_methods(["GET", "POST"])
-def billing_payment(request, billing_id):
+def _billing_payment_request(request, user, billing_id):
     """
-    Customer payment interface for AdditionalBilling (mobile money + card).
-    - Authorizes the billing's customer
-    - For GET: renders methods
-    - For POST: calls FlexPay and records a PaymentAttempt when FlexPay returns success (code == "0")
+    Sync part of ``billing_payment`` before the gateway call: authorization,
+    the GET page, and validation of the POSTed method and fields. Returns a
+    response to send as is, or what the payment needs.
     """
     from main.models import PaymentMethod
-    from nexus_backend.settings import (
-        FLEXPAY_API_KEY,
-        FLEXPAY_CARD_URL,
-        FLEXPAY_MERCHANT_ID,
-        FLEXPAY_MOBILE_URL,
-    )
 
     from .models import AdditionalBilling  # adjust if nested differently
 
+    billing = get_object_or_404(AdditionalBilling, id=billing_id)
+
+    # Only the owner can access
+    if user != billing.customer:
+        return JsonResponse(
+            {"success": False, "message": _("Not authorized")}, status=403
+        )
+
+    # Must be approved to pay
+    if billing.status != "approved":
+        return JsonResponse(
+            {"success": False, "message": _("Billing not approved for payment")},
+            status=400,
+        )
+
+    if request.method == "GET":
+        methods = PaymentMethod.objects.filter(enabled=True)
+        return render(
+            request,
+            "site_survey/billing_payment.html",
+            {"billing": billing, "payment_methods": methods},
+        )
+
+    # ----- POST: validate -----
     try:
-        billing = get_object_or_404(AdditionalBilling, id=billing_id)
+        data = json.loads(request.body or "{}")
+    except json.JSONDecodeError:
+        return JsonResponse(
+            {"success": False, "message": _("Invalid JSON.")}, status=400
+        )
 
-        # Only the owner can access
-        if request.user != billing.customer:
-            return JsonResponse(
-                {"success": False, "message": _("Not authorized")}, status=403
-            )
+    payment_method = (data.get("payment_method") or "").strip()
+    payment_reference = (data.get("payment_reference") or "").strip()
+    phone_number = (data.get("phone_number") or "").strip()
+    email = (data.get("email") or "").strip()
 
-        # Must be approved to pay
-        if billing.status != "approved":
+    normalized_phone = ""
+
+    # Validate enabled payment method
+    try:
+        _selected_pm = PaymentMethod.objects.get(name=payment_method, enabled=True)
+    except PaymentMethod.DoesNotExist:
+        return JsonResponse(
+            {"success": False, "message": _("Invalid payment method")}, status=400
+        )
+
+    method_key = payment_method.lower()
+
+    # Field validation per method
+    if "mobile" in method_key or "momo" in method_key:
+        normalized_phone = _normalize_cd_phone(phone_number)
+        if not normalized_phone:
             return JsonResponse(
-                {"success": False, "message": _("Billing not approved for payment")},
+                {
+                    "success": False,
+                    "message": _(
+                        "Invalid phone number. Use 0XXXXXXXXX or 243XXXXXXXXX."
+                    ),
+                },
                 status=400,
             )
-
-        if request.method == "GET":
-            methods = PaymentMethod.objects.filter(enabled=True)
-            return render(
-                request,
-                "site_survey/billing_payment.html",
-                {"billing": billing, "payment_methods": methods},
+    elif "card" in method_key or "credit" in method_key:
+        if not email:
+            return JsonResponse(
+                {
+                    "success": False,
+                    "message": _("Email address is required for card payments"),
+                },
+                status=400,
             )
-
-        # ----- POST: initiate payment -----
-        try:
-            data = json.loads(request.body or "{}")
-        except json.JSONDecodeError:
+    else:
+        if not payment_reference:
             return JsonResponse(
-                {"success": False, "message": _("Invalid JSON.")}, status=400
+                {"success": False, "message": _("Payment reference is required")},
+                status=400,
             )
 
-        payment_method = (data.get("payment_method") or "").strip()
-        payment_reference = (data.get("payment_reference") or "").strip()
-        phone_number = (data.get("phone_number") or "").strip()
-        email = (data.get("email") or "").strip()
+    return {
+        "billing": billing,
+        "payment_method": payment_method,
+        "method_key": method_key,
+        "normalized_phone": normalized_phone,
+        "email": email,
+    }
 
-        normalized_phone = ""
 
-        # Validate enabled payment method
-        try:
-            _selected_pm = PaymentMethod.objects.get(name=payment_method, enabled=True)
-        except PaymentMethod.DoesNotExist:
-            return JsonResponse(
-                {"success": False, "message": _("Invalid payment method")}, status=400
+def _record_billing_attempt(
+    billing, payment_method, order_number, code, payment_type, raw_payload, billing_ref
+):
+    """
+    Record the PENDING PaymentAttempt of an accepted FlexPay initiation and
+    put the billing into processing (awaiting confirmation).
+    """
+    reference = billing.billing_reference
+    payment_for = "additional_billing"  # classify attempts
+    try:
+        with transaction.atomic():
+            attempt, created = PaymentAttempt.objects.get_or_create(
+                order=None,  # No Order here; tie by reference
+                order_number=str(order_number),
+                defaults={
+                    "code": code,
+                    "reference": reference,
+                    "amount": billing.total_amount or None,
+                    "amount_customer": billing.total_amount or None,
+                    "currency": "USD",
+                    "status": "pending",
+                    "payment_type": payment_type,
+                    "payment_for": payment_for,
+                    "transaction_time": timezone.now(),
+                    "raw_payload": raw_payload,
+                    # If you added a FK to AdditionalBilling on PaymentAttempt:
+                    # "billing": billing,
+                },
             )
-
-        method_key = payment_method.lower()
-
-        # Field validation per method
-        if "mobile" in method_key or "momo" in method_key:
-            normalized_phone = _normalize_cd_phone(phone_number)
-            if not normalized_phone:
-                return JsonResponse(
-                    {
-                        "success": False,
-                        "message": _(
-                            "Invalid phone number. Use 0XXXXXXXXX or 243XXXXXXXXX."
-                        ),
-                    },
-                    status=400,
+            if not created and attempt.status != "completed":
+                attempt.code = code
+                attempt.reference = reference
+                attempt.amount = billing.total_amount or attempt.amount
+                attempt.amount_customer = (
+                    billing.total_amount or attempt.amount_customer
                 )
-        elif "card" in method_key or "credit" in method_key:
-            if not email:
-                return JsonResponse(
-                    {
-                        "success": False,
-                        "message": _("Email address is required for card payments"),
-                    },
-                    status=400,
+                attempt.currency = "USD"
+                attempt.status = "pending"
+                attempt.payment_type = payment_type
+                attempt.payment_for = payment_for
+                attempt.transaction_time = timezone.now()
+                attempt.raw_payload = raw_payload
+                attempt.save(
+                    update_fields=[
+                        "code",
+                        "reference",
+                        "amount",
+                        "amount_customer",
+                        "currency",
+                        "status",
+                        "payment_type",
+                        "payment_for",
+                        "transaction_time",
+                        "raw_payload",
+                    ]
                 )
-        else:
-            if not payment_reference:
-                return JsonResponse(
-                    {"success": False, "message": _("Payment reference is required")},
-                    status=400,
+
+            if billing.status != "processing":
+                billing.status = "processing"
+                billing.payment_method = payment_method
+                billing.payment_reference = billing_ref
+                billing.save(
+                    update_fields=["status", "payment_method", "payment_reference"]
                 )
+    except IntegrityError:
+        pass
+
+
+def _send_billing_payment_confirmation(billing):
+    try:
+        from .notifications import send_payment_confirmation
+
+        send_payment_confirmation(billing)
+    except Exception as e:
+        logger.warning(
+            "Payment confirmation notification failed for billing %s: %s",
+            billing.id,
+            e,
+        )
+
+
+@login_required(login_url="login_page")
+@require_http_methods(["GET", "POST"])
+async def billing_payment(request, billing_id):
+    """
+    Customer payment interface for AdditionalBilling (mobile money + card).
+    - Authorizes the billing's customer
+    - For GET: renders methods
+    - For POST: calls FlexPay and records a PaymentAttempt when FlexPay returns success (code == "0")
+
+    Async: database work runs in a thread, and the FlexPay call goes through
+    ``main.services.flexpay_http`` so it does not hold a web worker.
+    """
+    from nexus_backend.settings import (
+        FLEXPAY_API_KEY,
+        FLEXPAY_CARD_URL,
+        FLEXPAY_MERCHANT_ID,
+        FLEXPAY_MOBILE_URL,
+    )
+
+    try:
+        user = await request.auser()
+        prepared = await sync_to_async(_billing_payment_request)(
+            request, user, billing_id
+        )
+        if isinstance(prepared, HttpResponse):
+            return prepared
+        billing = prepared["billing"]
+        payment_method = prepared["payment_method"]
+        method_key = prepared["method_key"]
 
         # Common values
         amount_str = str(billing.total_amount or "0.00")
@@ -1706,7 +1862,7 @@ def billing_payment(request, billing_id):
             payload = {
                 "merchant": FLEXPAY_MERCHANT_ID,
                 "type": "1",  # Mobile Money
-                "phone": normalized_phone,
+                "phone": prepared["normalized_phone"],
                 "reference": reference,
                 "amount": amount_str,
                 "currency": "USD",
@@ -1718,13 +1874,12 @@ def billing_payment(request, billing_id):
                 "Content-Type": "application/json",
                 "Authorization": f"Bearer {FLEXPAY_API_KEY}",
             }
-            flexpay_url = FLEXPAY_MOBILE_URL
 
             try:
-                resp = requests.post(
-                    flexpay_url, json=payload, headers=headers, timeout=30
+                resp = await flexpay_http.post(
+                    FLEXPAY_MOBILE_URL, json=payload, headers=headers, timeout=30
                 )
-            except requests.RequestException:
+            except flexpay_http.GatewayError:
                 logger.exception(
                     "FlexPay mobile request error for billing %s", billing.id
                 )
@@ -1751,79 +1906,16 @@ def billing_payment(request, billing_id):
                 trans_id = fp.get("transid")
 
                 if code == "0" and order_number:
-                    # Record PaymentAttempt (pending)
-                    try:
-                        with transaction.atomic():
-                            attempt, created = PaymentAttempt.objects.get_or_create(
-                                order=None,  # No Order here; tie by reference
-                                order_number=str(order_number),
-                                defaults={
-                                    "code": code,
-                                    "reference": reference,
-                                    "amount": billing.total_amount or None,
-                                    "amount_customer": billing.total_amount or None,
-                                    "currency": "USD",
-                                    "status": "pending",
-                                    "payment_type": "mobile",
-                                    "payment_for": payment_for,
-                                    "transaction_time": timezone.now(),
-                                    "raw_payload": {
-                                        "request": payload,
-                                        "response": fp,
-                                        "billing_id": billing.id,
-                                    },
-                                    # If you added a FK to AdditionalBilling on PaymentAttempt:
-                                    # "billing": billing,
-                                },
-                            )
-                            if not created and attempt.status != "completed":
-                                attempt.code = code
-                                attempt.reference = reference
-                                attempt.amount = billing.total_amount or attempt.amount
-                                attempt.amount_customer = (
-                                    billing.total_amount or attempt.amount_customer
-                                )
-                                attempt.currency = "USD"
-                                attempt.status = "pending"
-                                attempt.payment_type = "mobile"
-                                attempt.payment_for = payment_for
-                                attempt.transaction_time = timezone.now()
-                                attempt.raw_payload = {
-                                    "request": payload,
-                                    "response": fp,
-                                    "billing_id": billing.id,
-                                }
-                                attempt.save(
-                                    update_fields=[
-                                        "code",
-                                        "reference",
-                                        "amount",
-                                        "amount_customer",
-                                        "currency",
-                                        "status",
-                                        "payment_type",
-                                        "payment_for",
-                                        "transaction_time",
-                                        "raw_payload",
-                                    ]
-                                )
-
-                            # Put billing into processing/awaiting confirmation
-                            if billing.status != "processing":
-                                billing.status = "processing"
-                                billing.payment_method = payment_method
-                                # store a useful ref; prefer FlexPay transid or orderNumber
-                                billing.payment_reference = trans_id or order_number
-                                billing.save(
-                                    update_fields=[
-                                        "status",
-                                        "payment_method",
-                                        "payment_reference",
-                                    ]
-                                )
-                    except IntegrityError:
-                        pass
-
+                    await sync_to_async(_record_billing_attempt)(
+                        billing,
+                        payment_method,
+                        order_number,
+                        code,
+                        "mobile",
+                        {"request": payload, "response": fp, "billing_id": billing.id},
+                        # store a useful ref; prefer FlexPay transid or orderNumber
+                        trans_id or order_number,
+                    )
                     return JsonResponse(
                         {
                             "success": True,
@@ -1862,7 +1954,6 @@ def billing_payment(request, billing_id):
                 "Content-Type": "application/json",
                 "Authorization": f"Bearer {FLEXPAY_API_KEY}",
             }
-            card_url = FLEXPAY_CARD_URL
 
             # Per your working card view: include bearer inside JSON and snake_case keys
             payload = {
@@ -1880,10 +1971,10 @@ def billing_payment(request, billing_id):
             }
 
             try:
-                resp = requests.post(
-                    card_url, json=payload, headers=headers, timeout=30
+                resp = await flexpay_http.post(
+                    FLEXPAY_CARD_URL, json=payload, headers=headers, timeout=30
                 )
-            except requests.RequestException:
+            except flexpay_http.GatewayError:
                 logger.exception(
                     "FlexPay card request error for billing %s", billing.id
                 )
@@ -1920,80 +2011,22 @@ def billing_payment(request, billing_id):
 
             if code == "0" and order_number:
                 # Record a PENDING attempt (awaiting 3DS/card completion)
-                try:
-                    with transaction.atomic():
-                        attempt, created = PaymentAttempt.objects.get_or_create(
-                            order=None,
-                            order_number=str(order_number),
-                            defaults={
-                                "code": code,
-                                "reference": reference,
-                                "amount": billing.total_amount or None,
-                                "amount_customer": billing.total_amount or None,
-                                "currency": "USD",
-                                "status": "pending",
-                                "payment_type": "card",
-                                "payment_for": payment_for,
-                                "transaction_time": timezone.now(),
-                                "raw_payload": {
-                                    "request": {**payload, "email": email},
-                                    "response": fp,
-                                    "billing_id": billing.id,
-                                },
-                                # If you added FK:
-                                # "billing": billing,
-                            },
-                        )
-                        if not created and attempt.status != "completed":
-                            attempt.code = code
-                            attempt.reference = reference
-                            attempt.amount = billing.total_amount or attempt.amount
-                            attempt.amount_customer = (
-                                billing.total_amount or attempt.amount_customer
-                            )
-                            attempt.currency = "USD"
-                            attempt.status = "pending"
-                            attempt.payment_type = "card"
-                            attempt.payment_for = payment_for
-                            attempt.transaction_time = timezone.now()
-                            attempt.raw_payload = {
-                                "request": {**payload, "email": email},
-                                "response": fp,
-                                "billing_id": billing.id,
-                            }
-                            attempt.save(
-                                update_fields=[
-                                    "code",
-                                    "reference",
-                                    "amount",
-                                    "amount_customer",
-                                    "currency",
-                                    "status",
-                                    "payment_type",
-                                    "payment_for",
-                                    "transaction_time",
-                                    "raw_payload",
-                                ]
-                            )
-
-                        # Move billing to awaiting confirmation while user completes card flow
-                        if billing.status != "processing":
-                            billing.status = "processing"
-                            billing.payment_method = payment_method
-                            billing.payment_reference = order_number
-                            billing.save(
-                                update_fields=[
-                                    "status",
-                                    "payment_method",
-                                    "payment_reference",
-                                ]
-                            )
-                except IntegrityError:
-                    pass
+                await sync_to_async(_record_billing_attempt)(
+                    billing,
+                    payment_method,
+                    order_number,
+                    code,
+                    "card",
+                    {
+                        "request": {**payload, "email": prepared["email"]},
+                        "response": fp,
+                        "billing_id": billing.id,
+                    },
+                    order_number,
+                )
 
                 # Return the redirect URL (frontend will open in a new window)
                 if redirect_url:
-                    print("REDIRECT OK", redirect_url)
                     return JsonResponse(
                         {
                             "success": True,
@@ -2035,16 +2068,7 @@ def billing_payment(request, billing_id):
         # billing.save(update_fields=["status", "payment_method", "payment_reference"])
 
         # Optional: send confirmation
-        try:
-            from .notifications import send_payment_confirmation
-
-            send_payment_confirmation(billing)
-        except Exception as e:
-            logger.warning(
-                "Payment confirmation notification failed for billing %s: %s",
-                billing.id,
-                e,
-            )
+        await sync_to_async(_send_billing_payment_confirmation)(billing)
 
         return JsonResponse(
             {
@@ -4,11 +4,6 @@ import string
 import time
 from io import BytesIO
 
-import openpyxl
-from openpyxl.reader.excel import load_workbook
-from openpyxl.styles import Font
-from openpyxl.utils import get_column_letter
-
 from django.contrib.auth.decorators import login_required
 from django.db import IntegrityError, transaction
 from django.db.models import Count, Q
@@ -39,6 +34,10 @@ def stock_management(request):
 @login_required(login_url="login_page")
 @require_staff_role(["admin", "finance"])
 def download_stock_sample(request):
+    import openpyxl
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
+
     # Create workbook and worksheet
     wb = openpyxl.Workbook()
     ws = wb.active
@@ -94,6 +93,8 @@ def download_stock_sample(request):
 @require_staff_role(["admin", "finance"])
 @require_POST
 def upload_stock_excel(request):
+    from openpyxl.reader.excel import load_workbook
+
     excel_file = request.FILES.get("file")
     if not excel_file:
         return JsonResponse(
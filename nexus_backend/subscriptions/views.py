@@ -1,13 +1,26 @@
+import math
 from datetime import date, timedelta
 from decimal import ROUND_HALF_UP, Decimal
 
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
+from django.db.models import DateField, Exists, ExpressionWrapper, F, OuterRef
 from django.http import JsonResponse
 from django.shortcuts import render
 from django.views.decorators.http import require_GET
 
-from main.models import Subscription
+from main.models import PaymentAttempt, Subscription
+from main.services.search import (
+    SUBSCRIPTION_FIELDS,
+    SUBSCRIPTION_PHONE_FIELDS,
+    apply_search,
+)
+from main.utilities.pagination import (
+    InvalidCursor,
+    approximate_count,
+    keyset_page,
+    page_size,
+)
+from main.utilities.query_budget import query_budget
 from user.permissions import require_staff_role
 
 
@@ -29,41 +42,21 @@ def subscription_dashboard(request):
     return render(request, template, context)
 
 
-@login_required(login_url="login_page")
-@require_staff_role(["admin", "manager", "leadtechnician", "finance"])
 def get_overdue_customers():
+    """
+    Active subscriptions past their billing date with no subscription payment
+    in the 30 days before it (one query, see ``_overdue_subscriptions``).
+    """
     today = date.today()
-
-    # Step 1: Find subscriptions where next billing date has passed
-    overdue_subs = Subscription.objects.filter(
-        status="active", next_billing_date__lt=today
-    ).select_related("user", "order")
-
-    overdue_list = []
-
-    for sub in overdue_subs:
-        # Step 2: Check if any payment attempt for this subscription after last billing date
-        last_payment = (
-            sub.get_payment_attempts()
-            .filter(
-                status="completed",
-                transaction_time__date__gte=sub.next_billing_date - timedelta(days=30),
-            )
-            .exists()
-        )
-
-        if not last_payment:
-            days_overdue = (today - sub.next_billing_date).days
-            overdue_list.append(
-                {
-                    "id": sub.id,
-                    "name": sub.user.full_name if sub.user else "Unknown",
-                    "email": sub.user.email if sub.user else "—",
-                    "days_overdue": days_overdue,
-                }
-            )
-
-    return overdue_list
+    return [
+        {
+            "id": row["id"],
+            "name": row["user__full_name"] if row["user_id"] else "Unknown",
+            "email": row["user__email"] if row["user_id"] else "—",
+            "days_overdue": (today - row["next_billing_date"]).days,
+        }
+        for row in _overdue_subscriptions(Subscription.objects.all(), today)
+    ]
 
 
 ZERO = Decimal("0.00")
@@ -108,10 +101,98 @@ def _ui_status(model_status: str) -> str:
     return s
 
 
+# Columns read by the subscription table; rows are plain dicts.
+SUBSCRIPTION_LIST_FIELDS = (
+    "id",
+    "status",
+    "billing_cycle",
+    "started_at",
+    "next_billing_date",
+    "user_id",
+    "user__full_name",
+    "user__email",
+    "plan_id",
+    "plan__name",
+    "plan__monthly_price_usd",
+    "order__order_reference",
+    "order__latitude",
+    "order__longitude",
+    "order__kit_inventory__kit_number",
+    "order__kit_inventory__serial_number",
+)
+
+# Alerts are shown as short lists above the table, not paginated.
+ALERT_LIMIT = 50
+
+
+def _overdue_subscriptions(qs, today):
+    """
+    Rows of active subscriptions in `qs` past their billing date without a
+    completed subscription payment in the 30 days before it.
+    """
+    recent_payment = PaymentAttempt.objects.filter(
+        order=OuterRef("order"),
+        payment_for="subscription",
+        status="completed",
+        transaction_time__date__gte=ExpressionWrapper(
+            OuterRef("next_billing_date") - timedelta(days=30),
+            output_field=DateField(),
+        ),
+    )
+    return (
+        qs.filter(status="active", next_billing_date__lt=today)
+        .annotate(paid_recently=Exists(recent_payment))
+        .filter(paid_recently=False)
+        .order_by("next_billing_date", "id")
+        .values("id", "user_id", "user__full_name", "user__email", "next_billing_date")
+    )
+
+
+def _subscription_alerts(qs, today):
+    """Overdue / deactivated customers among `qs`, one query each."""
+    overdue = _overdue_subscriptions(qs, today)[:ALERT_LIMIT]
+    overdue_customers = [
+        {
+            "id": row["id"],
+            "name": row["user__full_name"] if row["user_id"] else "Unknown",
+            "email": row["user__email"] if row["user_id"] else "",
+            "days_overdue": (today - row["next_billing_date"]).days,
+        }
+        for row in overdue
+    ]
+
+    # Deactivated (model 'cancelled' → UI shows in alert)
+    deactivated = (
+        qs.filter(status="cancelled")
+        .order_by(F("ended_at").desc(nulls_last=True), "-id")
+        .values("id", "user_id", "user__full_name", "user__email", "ended_at")[
+            :ALERT_LIMIT
+        ]
+    )
+    deactivated_customers = [
+        {
+            "id": row["id"],
+            "name": row["user__full_name"] if row["user_id"] else "Unknown",
+            "email": row["user__email"] if row["user_id"] else "",
+            "deactivated_at": (
+                row["ended_at"].strftime("%Y-%m-%d") if row["ended_at"] else None
+            ),
+        }
+        for row in deactivated
+    ]
+    return overdue_customers, deactivated_customers
+
+
 @login_required(login_url="login_page")
 @require_staff_role(["admin", "manager", "leadtechnician", "finance"])
 @require_GET
+@query_budget(10)
 def getallcust_subscr(request):
+    """
+    One page of subscriptions (newest first) plus the overdue/deactivated
+    alert lists. Accepts `page` and `per_page`, or `cursor` (the previous
+    `next_cursor`) for keyset paging.
+    """
     today = date.today()
 
     search_term = (request.GET.get("search", "") or "").strip().lower()
@@ -121,119 +202,88 @@ def getallcust_subscr(request):
     status_map = {"pending": "suspended", "canceled": "cancelled"}
     model_status_filter = status_map.get(status_filter, status_filter)
 
-    qs = Subscription.objects.select_related(
-        "user", "plan", "order", "order__kit_inventory"
-    ).order_by("-started_at")
+    qs = Subscription.objects.all()
 
     # Search filter
     if search_term:
-        qs = qs.filter(
-            Q(user__full_name__icontains=search_term)
-            | Q(user__email__icontains=search_term)
-            | Q(plan__name__icontains=search_term)
-            | Q(status__icontains=search_term)
+        qs = apply_search(
+            qs,
+            search_term,
+            SUBSCRIPTION_FIELDS,
+            phone_fields=SUBSCRIPTION_PHONE_FIELDS,
         )
 
     # Status filter
     if model_status_filter and model_status_filter != "all":
         qs = qs.filter(status__iexact=model_status_filter)
 
-    data = []
-    overdue_customers = []
-    deactivated_customers = []
-
-    for sub in qs:
-        user = sub.user
-        plan = sub.plan
-        order = sub.order
+    size = page_size(request, default=20)
+    try:
+        page = keyset_page(
+            qs.values(*SUBSCRIPTION_LIST_FIELDS),
+            ordering=("-started_at", "-id"),
+            cursor=request.GET.get("cursor"),
+            page=request.GET.get("page"),
+            size=size,
+        )
+    except InvalidCursor:
+        return JsonResponse(
+            {"success": False, "message": "Invalid cursor."}, status=400
+        )
 
+    data = []
+    for sub in page.items:
         # Pricing per cycle for table display
-        monthly_price = plan.monthly_price_usd if plan else None
+        monthly_price = sub["plan__monthly_price_usd"]
         cycle_cost = (
-            _cycle_price(monthly_price, sub.billing_cycle)
+            _cycle_price(monthly_price, sub["billing_cycle"])
             if monthly_price is not None
             else None
         )
 
         # Kit ID (prefer kit_number; fall back to serial_number if you prefer)
-        kit_id = None
-        if order and getattr(order, "kit_inventory", None):
-            kit_id = order.kit_inventory.kit_number or order.kit_inventory.serial_number
-
-        # Location fields (address placeholder if you don't store one)
-        latitude = getattr(order, "latitude", None) if order else None
-        longitude = getattr(order, "longitude", None) if order else None
-        address = ""  # Fill from your source if/when available
+        kit_id = (
+            sub["order__kit_inventory__kit_number"]
+            or sub["order__kit_inventory__serial_number"]
+        )
 
         # Build subscription row
         data.append(
             {
-                "id": sub.id,
-                "user_name": user.full_name if user else "Unknown",
-                "user_email": user.email if user else "",
-                "plan_name": plan.name if plan else "—",
-                "status": _ui_status(sub.status),
+                "id": sub["id"],
+                "user_name": sub["user__full_name"] if sub["user_id"] else "Unknown",
+                "user_email": sub["user__email"] if sub["user_id"] else "",
+                "plan_name": sub["plan__name"] if sub["plan_id"] else "—",
+                "status": _ui_status(sub["status"]),
                 "cycle_cost": float(cycle_cost) if cycle_cost is not None else None,
-                "billing_cycle": (sub.billing_cycle or "monthly").lower(),
+                "billing_cycle": (sub["billing_cycle"] or "monthly").lower(),
                 "started_at": (
-                    sub.started_at.strftime("%Y-%m-%d") if sub.started_at else ""
+                    sub["started_at"].strftime("%Y-%m-%d") if sub["started_at"] else ""
                 ),
                 "next_billing_date": (
-                    sub.next_billing_date.strftime("%Y-%m-%d")
-                    if sub.next_billing_date
+                    sub["next_billing_date"].strftime("%Y-%m-%d")
+                    if sub["next_billing_date"]
                     else ""
                 ),
-                "order_ref": order.order_reference if order else "",
+                "order_ref": sub["order__order_reference"] or "",
                 "kit_id": kit_id or "—",
-                "latitude": latitude,
-                "longitude": longitude,
-                "address": address,
+                "latitude": sub["order__latitude"],
+                "longitude": sub["order__longitude"],
+                "address": "",  # Fill from your source if/when available
             }
         )
 
-        # Overdue detection (only for ACTIVE subs in model terms)
-        if (
-            sub.status == "active"
-            and sub.next_billing_date
-            and sub.next_billing_date < today
-        ):
-            last_payment_exists = (
-                sub.get_payment_attempts()
-                .filter(
-                    status="completed",
-                    transaction_time__date__gte=sub.next_billing_date
-                    - timedelta(days=30),
-                )
-                .exists()
-            )
-            if not last_payment_exists:
-                overdue_customers.append(
-                    {
-                        "id": sub.id,
-                        "name": user.full_name if user else "Unknown",
-                        "email": user.email if user else "",
-                        "days_overdue": (today - sub.next_billing_date).days,
-                    }
-                )
-
-        # Deactivated (model 'cancelled' → UI shows in alert)
-        if sub.status == "cancelled":
-            deactivated_customers.append(
-                {
-                    "id": sub.id,
-                    "name": user.full_name if user else "Unknown",
-                    "email": user.email if user else "",
-                    "deactivated_at": (
-                        sub.ended_at.strftime("%Y-%m-%d") if sub.ended_at else None
-                    ),
-                }
-            )
+    overdue_customers, deactivated_customers = _subscription_alerts(qs, today)
 
+    total_count = approximate_count(qs)
     return JsonResponse(
         {
             "success": True,
             "subscriptions": data,
             "overdue_customers": overdue_customers,
             "deactivated_customers": deactivated_customers,
+            "total_count": total_count,
+            "total_pages": max(1, math.ceil(total_count / size)),
+            **page.meta(),
         }
     )
@@ -1,11 +1,12 @@
 import json
+import math
 from datetime import datetime, timedelta
 from time import localtime
 
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.db import transaction
-from django.db.models import Count, Q
+from django.db.models import Count, Exists, F, OuterRef, Q
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
@@ -19,6 +20,14 @@ from main.models import (
     TechnicianAssignment,
     User,
 )
+from main.services.photos import queue_photo_ingest, stage_uploads
+from main.utilities.pagination import (
+    InvalidCursor,
+    approximate_count,
+    keyset_page,
+    page_size,
+)
+from tech.models import ActivationRequest
 from user.permissions import require_staff_role
 
 
@@ -29,18 +38,47 @@ def tech_dashboard(request):
     return render(request, template)
 
 
+def _fmt_job_dt(value, fmt):
+    if not value:
+        return ""
+    try:
+        return localtime(value).strftime(fmt)
+    except Exception:
+        return value.strftime(fmt)
+
+
+# Columns read by the installation job table; rows are plain dicts.
+INSTALLATION_JOB_FIELDS = (
+    "id",
+    "order__order_reference",
+    "order__user__full_name",
+    "order__user__phone",
+    "order__latitude",
+    "order__longitude",
+    "technician__full_name",
+    "planned_at",
+    "started_at",
+    "completed_at",
+    "location_confirmed",
+    "notes",
+)
+
+
 @login_required(login_url="login_page")
 @require_staff_role(["admin", "technician", "leadtechnician"])
 def installation_job_list(request):
+    """
+    Installation jobs, newest first, one page at a time (`cursor` / `page`,
+    `per_page`). The first page also carries the status counters and the
+    technician names used by the dashboard filters.
+    """
     # Get filter parameters from GET request
     filter_status = request.GET.get("status", "").strip()
     filter_technician = request.GET.get("technician", "").strip()
     search_query = request.GET.get("search", "").strip()
 
     # Base queryset
-    jobs = InstallationActivity.objects.select_related(
-        "order__user", "technician"
-    ).all()
+    jobs = InstallationActivity.objects.all()
 
     # Apply status filter
     if filter_status:
@@ -57,71 +95,79 @@ def installation_job_list(request):
 
     # Apply search filter
     if search_query:
-        print("HIT")
         jobs = jobs.filter(
             Q(order__order_reference__icontains=search_query)
             | Q(order__user__full_name__icontains=search_query)
             | Q(order__user__phone__icontains=search_query)
         )
 
+    cursor = request.GET.get("cursor")
+    try:
+        page = keyset_page(
+            jobs.values(*INSTALLATION_JOB_FIELDS),
+            ordering=("-id",),
+            cursor=cursor,
+            page=request.GET.get("page"),
+            size=page_size(request, default=50),
+        )
+    except InvalidCursor:
+        return JsonResponse(
+            {"success": False, "message": "Invalid cursor."}, status=400
+        )
+
     # Prepare data for JSON
     data = []
-    for job in jobs:
-        order = job.order
-        user = order.user if order else None
-
-        started_at_str = ""
-        if job.started_at:
-            try:
-                started_at_str = localtime(job.started_at).strftime("%Y-%m-%d %H:%M")
-            except Exception:
-                started_at_str = job.started_at.strftime("%Y-%m-%d %H:%M")
-
-        completed_at_str = ""
-        if job.completed_at:
-            try:
-                completed_at_str = localtime(job.completed_at).strftime(
-                    "%Y-%m-%d %H:%M"
-                )
-            except Exception:
-                completed_at_str = job.completed_at.strftime("%Y-%m-%d %H:%M")
-
-        scheduled_at_str = ""
-        if job.planned_at:
-            try:
-                scheduled_at_str = localtime(job.planned_at).strftime("%Y-%m-%d")
-            except Exception:
-                scheduled_at_str = job.planned_at.strftime("%Y-%m-%d")
-
+    for job in page.items:
         # Determine status
-        if job.completed_at:
+        if job["completed_at"]:
             status = "Completed"
-        elif job.started_at:
+        elif job["started_at"]:
             status = "In Progress"
         else:
             status = "Pending"
 
         data.append(
             {
-                "id": job.id,
-                "order_reference": order.order_reference if order else "",
-                "customer_name": user.full_name if user else "",
-                "customer_phone": user.phone if user else "",
-                "latitude": order.latitude if order else "",
-                "longitude": order.longitude if order else "",
+                "id": job["id"],
+                "order_reference": job["order__order_reference"] or "",
+                "customer_name": job["order__user__full_name"] or "",
+                "customer_phone": job["order__user__phone"] or "",
+                "latitude": job["order__latitude"],
+                "longitude": job["order__longitude"],
                 "status": status,
-                "technician": (
-                    job.technician.full_name if job.technician else "Not Assigned"
-                ),
-                "scheduled_at": scheduled_at_str,
-                "started_at": started_at_str,
-                "completed_at": completed_at_str,
-                "location_confirmed": job.location_confirmed,
-                "notes": job.notes or "",
+                "technician": job["technician__full_name"] or "Not Assigned",
+                "scheduled_at": _fmt_job_dt(job["planned_at"], "%Y-%m-%d"),
+                "started_at": _fmt_job_dt(job["started_at"], "%Y-%m-%d %H:%M"),
+                "completed_at": _fmt_job_dt(job["completed_at"], "%Y-%m-%d %H:%M"),
+                "location_confirmed": job["location_confirmed"],
+                "notes": job["notes"] or "",
             }
         )
 
-    return JsonResponse({"success": True, "jobs": data})
+    payload = {"success": True, "jobs": data, **page.meta()}
+    if not cursor:
+        # One aggregate instead of counting rows client-side
+        counts = jobs.aggregate(
+            unassigned=Count("id", filter=Q(technician__isnull=True)),
+            pending=Count(
+                "id", filter=Q(started_at__isnull=True, completed_at__isnull=True)
+            ),
+            in_progress=Count(
+                "id", filter=Q(started_at__isnull=False, completed_at__isnull=True)
+            ),
+            completed=Count("id", filter=Q(completed_at__isnull=False)),
+        )
+        payload["counts"] = counts
+        payload["total"] = (
+            counts["pending"] + counts["in_progress"] + counts["completed"]
+        )
+        payload["technicians"] = list(
+            jobs.filter(technician__isnull=False)
+            .order_by("technician__full_name")
+            .values_list("technician__full_name", flat=True)
+            .distinct()
+        )
+    return JsonResponse(payload)
 
 
 @login_required(login_url="login_page")
@@ -248,58 +294,80 @@ def technician_job_list(request):
       ],
       "total_pages": int,
       "current_page": int,
-      "total_jobs": int
+      "total_jobs": int,
+      "next_cursor": str|null,   # pass back as ?cursor= for the next page
+      "has_more": bool
     }
     """
     user = request.user
 
     # Pagination inputs (robust)
-    try:
-        page = int(request.GET.get("page", 1))
-    except (TypeError, ValueError):
-        page = 1
-    try:
-        per_page = int(request.GET.get("per_page", 10))
-    except (TypeError, ValueError):
-        per_page = 10
-
-    if page < 1:
-        page = 1
-    if per_page < 1 or per_page > 100:
-        per_page = 10
+    size = page_size(request, default=10)
 
     # Query - FIFO ordering (First In First Out): oldest assigned jobs first
     # Include jobs that are:
     # 1. Not completed yet (traditional logic)
     # 2. Completed but still within edit window (24h)
     activities = (
-        InstallationActivity.objects.select_related(
-            "order", "technician", "order__user"
-        )
-        .filter(technician=user)
+        InstallationActivity.objects.filter(technician=user)
         .filter(
             # Include: not submitted OR submitted but still editable
             Q(submitted_at__isnull=True)
             | Q(status="submitted", edit_deadline__gte=timezone.now())
         )
-        .order_by("planned_at", "id")
+    )
+    rows = (
+        activities.select_related("order", "order__user")
+        .only(
+            "id",
+            "status",
+            "is_draft",
+            "planned_at",
+            "started_at",
+            "completed_at",
+            "submitted_at",
+            "edit_deadline",
+            "version_number",
+            "order__id",
+            "order__order_reference",
+            "order__latitude",
+            "order__longitude",
+            "order__user__full_name",
+            "order__user__phone",
+        )
+        .annotate(
+            has_activation_request=Exists(
+                ActivationRequest.objects.filter(
+                    requested_activity=OuterRef("pk")
+                ).exclude(status="cancelled")
+            ),
+            subscription_activation_requested=F(
+                "order__subscription__activation_requested"
+            ),
+        )
     )
 
-    paginator = Paginator(activities, per_page)
-    page_obj = paginator.get_page(page)
+    try:
+        page = keyset_page(
+            rows,
+            ordering=("planned_at", "id"),
+            cursor=request.GET.get("cursor"),
+            page=request.GET.get("page"),
+            size=size,
+        )
+    except InvalidCursor:
+        return JsonResponse(
+            {"success": False, "message": "Invalid cursor."}, status=400
+        )
 
     jobs_payload = []
-    for activity in page_obj.object_list:
+    for activity in page.items:
         customer = activity.order.user
         # Construire l'adresse à partir des coordonnées de la commande
         address = "N/A"
         if activity.order.latitude is not None and activity.order.longitude is not None:
             address = f"{activity.order.latitude:.6f}, {activity.order.longitude:.6f}"
 
-        # Status - enhanced to handle submitted reports
-        if activity.status == "submitted":
-            status = "submitted"
-
         jobs_payload.append(
             {
                 "activity_id": activity.id,
@@ -326,29 +394,22 @@ def technician_job_list(request):
                 "edit_deadline": _fmt_iso(getattr(activity, "edit_deadline", None)),
                 "version_number": getattr(activity, "version_number", 1),
                 # Whether an activation request exists for this activity/subscription (non-cancelled)
-                "activation_requested": (
-                    __import__("tech")
-                    .models.ActivationRequest.objects.filter(
-                        requested_activity=activity
-                    )
-                    .exclude(status="cancelled")
-                    .exists()
-                    or (
-                        getattr(activity.order, "subscription", None) is not None
-                        and getattr(
-                            activity.order.subscription, "activation_requested", False
-                        )
-                    )
+                "activation_requested": bool(
+                    activity.has_activation_request
+                    or activity.subscription_activation_requested
                 ),
             }
         )
 
+    total_jobs = approximate_count(activities)
     return JsonResponse(
         {
             "jobs": jobs_payload,
-            "total_pages": paginator.num_pages,
-            "current_page": page_obj.number,
-            "total_jobs": paginator.count,
+            "total_pages": max(1, math.ceil(total_jobs / size)),
+            "current_page": page.number or 1,
+            "total_jobs": total_jobs,
+            "next_cursor": page.next_cursor,
+            "has_more": page.has_more,
         }
     )
 
@@ -579,7 +640,7 @@ def surveys_summary(request):
 @require_staff_role(["admin", "technician", "leadtechnician"])
 @require_GET
 def get_technicians(request):
-    technicians = User.objects.filter(roles__contains=["technician"])
+    technicians = User.objects.with_role("technician")
     data = [{"id": tech.id_user, "full_name": tech.full_name} for tech in technicians]
     print(data)
     return JsonResponse({"technicians": data})
@@ -590,7 +651,7 @@ def get_technicians(request):
 @require_GET
 def technicians_api(request):
     """API endpoint for technicians list (for site survey assignment)"""
-    technicians = User.objects.filter(roles__contains=["technician"])
+    technicians = User.objects.with_role("technician")
     data = [
         {"id": tech.id_user, "name": tech.full_name or tech.email}
         for tech in technicians
@@ -730,6 +791,21 @@ def job_complete(request, job_id):
     #     return JsonResponse({"success": False, "message": str(e)}, status=500)
 
 
+def _queue_installation_photos(activity, files_by_type):
+    """Stage uploaded photos and queue them for ingest (main.services.photos)."""
+    items, files = [], []
+    for photo_type, photos in files_by_type.items():
+        for photo in photos:
+            items.append({"fields": {"photo_type": photo_type}})
+            files.append(photo)
+    if not files:
+        return 0
+    for item, staged in zip(items, stage_uploads(InstallationPhoto, files)):
+        item["staged"] = staged
+    queue_photo_ingest(InstallationPhoto, activity, items)
+    return len(items)
+
+
 @login_required(login_url="login_page")
 @require_staff_role(["admin", "technician", "leadtechnician"])
 @require_POST
@@ -744,8 +820,7 @@ def upload_installation_photos(request, job_id):
             {"success": False, "message": "No photos uploaded."}, status=400
         )
 
-    for photo in photos:
-        InstallationPhoto.objects.create(installation_activity=job, image=photo)
+    _queue_installation_photos(job, {"evidence": photos})
 
     return JsonResponse({"success": True, "message": "Photos uploaded successfully."})
 
@@ -871,21 +946,15 @@ def save_installation_report(request, activity_id):
         photos_after = request.FILES.getlist("photos_after")
         photos_evidence = request.FILES.getlist("photos_evidence")
 
-        # Créer les objets InstallationPhoto pour chaque photo uploadée avec le bon type
-        for photo in photos_before:
-            InstallationPhoto.objects.create(
-                installation_activity=activity, image=photo, photo_type="before"
-            )
-
-        for photo in photos_after:
-            InstallationPhoto.objects.create(
-                installation_activity=activity, image=photo, photo_type="after"
-            )
-
-        for photo in photos_evidence:
-            InstallationPhoto.objects.create(
-                installation_activity=activity, image=photo, photo_type="evidence"
-            )
+        # Resizing, EXIF extraction and dedupe run in a worker
+        _queue_installation_photos(
+            activity,
+            {
+                "before": photos_before,
+                "after": photos_after,
+                "evidence": photos_evidence,
+            },
+        )
 
         # Déterminer si c'est une soumission finale ou un brouillon
         submit_final = request.POST.get("submit_final") == "true"
@@ -1126,7 +1195,8 @@ def get_installation_report_data(request, activity_id):
             "photos": [
                 {
                     "id": photo.id,
-                    "url": photo.image.url if photo.image else "",
+                    "url": photo.screen_url if photo.image else "",
+                    "thumb_url": photo.thumb_url if photo.image else "",
                     "uploaded_at": photo.uploaded_at.strftime("%Y-%m-%d %H:%M:%S"),
                     "photo_type": photo.photo_type,
                 }
@@ -1271,21 +1341,15 @@ def edit_installation_report(request, activity_id):
         photos_after = request.FILES.getlist("photos_after")
         photos_evidence = request.FILES.getlist("photos_evidence")
 
-        # Créer les objets InstallationPhoto pour chaque nouvelle photo uploadée avec le bon type
-        for photo in photos_before:
-            InstallationPhoto.objects.create(
-                installation_activity=activity, image=photo, photo_type="before"
-            )
-
-        for photo in photos_after:
-            InstallationPhoto.objects.create(
-                installation_activity=activity, image=photo, photo_type="after"
-            )
-
-        for photo in photos_evidence:
-            InstallationPhoto.objects.create(
-                installation_activity=activity, image=photo, photo_type="evidence"
-            )
+        # Resizing, EXIF extraction and dedupe run in a worker
+        _queue_installation_photos(
+            activity,
+            {
+                "before": photos_before,
+                "after": photos_after,
+                "evidence": photos_evidence,
+            },
+        )
 
         # Marquer comme édité et sauvegarder
         activity.mark_as_edited()
@@ -1346,10 +1410,10 @@ def delete_installation_photo(request, photo_id):
                 status=403,
             )
 
-        # Supprimer le fichier physique si nécessaire
+        # Supprimer le fichier physique et ses variantes si nécessaire
         if photo.image:
             try:
-                photo.image.delete(save=False)
+                photo.delete_files()
             except Exception as e:
                 print(f"Erreur lors de la suppression du fichier image: {e}")
 
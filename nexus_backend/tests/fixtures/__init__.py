@@ -242,11 +242,15 @@ def reset_mocks():
 
 @pytest.fixture(autouse=True)
 def clear_cache():
-    """Clear Django cache after each test"""
+    """Clear Django cache (and the process-local caches) after each test"""
     from django.core.cache import cache
 
+    from main.services import caching, config_cache
+
     yield
     cache.clear()
+    config_cache.clear_local()
+    caching.clear_local()
 
 
 # ============================================================================
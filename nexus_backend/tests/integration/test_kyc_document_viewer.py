@@ -1,5 +1,4 @@
 import os
-from urllib.parse import urlparse
 
 import pytest
 from django.conf import settings
@@ -9,27 +8,29 @@ from django.urls import reverse
 from main.models import PersonalKYC, User
 
 
-@pytest.mark.django_db
-def test_personal_kyc_pdf_viewer_generates_preview_and_logs_access(client):
-    """
-    Integration test: hitting the secure viewer endpoint for a personal KYC PDF
-    should:
-      - return HTML with an <img> preview (no raw PDF/media URL),
-      - create a preview image file under MEDIA_ROOT,
-      - log the access in KycDocumentAccessLog.
-    """
-    # Create compliance staff user
+def _staff(email, username):
     staff = User.objects.create_user(
-        email="compliance@example.com",
+        email=email,
         full_name="Compliance Officer",
-        username="compliance_user",
+        username=username,
         password="testpass",
     )
     staff.roles = ["compliance"]
     staff.save()
-    client.force_login(staff)
+    return staff
+
 
-    # Create end user and a PersonalKYC with a fake PDF file
+def _manifest_path(kyc):
+    return os.path.join(
+        settings.MEDIA_ROOT,
+        "kyc_previews",
+        "personal-main",
+        str(kyc.id),
+        "manifest.json",
+    )
+
+
+def _personal_kyc_with_pdf():
     end_user = User.objects.create_user(
         email="customer@example.com",
         full_name="Customer User",
@@ -39,6 +40,22 @@ def test_personal_kyc_pdf_viewer_generates_preview_and_logs_access(client):
     kyc = PersonalKYC.objects.create(user=end_user, status="pending")
     kyc.document_file.save("id_document.pdf", ContentFile(b"%PDF-1.4\n%fake test pdf"))
     kyc.save()
+    return kyc
+
+
+@pytest.mark.django_db
+def test_personal_kyc_pdf_viewer_generates_preview_and_logs_access(client):
+    """
+    Integration test: hitting the secure viewer endpoint for a personal KYC PDF
+    should:
+      - return HTML with <img> pages served by the watermarking endpoint
+        (no raw PDF/media URL),
+      - store the un-watermarked base previews under MEDIA_ROOT,
+      - log the access in KycDocumentAccessLog.
+    """
+    staff = _staff("compliance@example.com", "compliance_user")
+    client.force_login(staff)
+    kyc = _personal_kyc_with_pdf()
 
     url = reverse("kyc_document_view", args=["personal-main", kyc.id])
     response = client.get(url, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
@@ -49,22 +66,22 @@ def test_personal_kyc_pdf_viewer_generates_preview_and_logs_access(client):
     # We expect an <img>-based viewer, not an iframe to the raw PDF
     assert "<img" in html
     assert ".pdf" not in html
+    assert settings.MEDIA_URL not in html
 
-    # Extract the preview image URL from the HTML and ensure the file exists
-    # Very small and robust parse: look for src="..."
+    # Extract the first page URL from the HTML: src="..."
     marker = 'src="'
     assert marker in html
     start = html.index(marker) + len(marker)
     end = html.index('"', start)
     img_url = html[start:end]
+    assert img_url == reverse("kyc_document_page", args=["personal-main", kyc.id, 1])
+
+    page = client.get(img_url)
+    assert page.status_code == 200
+    assert page["Content-Type"] == "image/jpeg"
+    assert "no-store" in page["Cache-Control"]
 
-    # Map URL path back to MEDIA_ROOT path
-    parsed = urlparse(img_url)
-    media_url = settings.MEDIA_URL
-    assert parsed.path.startswith(media_url)
-    rel_path = parsed.path[len(media_url) :].lstrip("/")
-    abs_path = os.path.join(settings.MEDIA_ROOT, rel_path)
-    assert os.path.exists(abs_path)
+    assert os.path.exists(_manifest_path(kyc))
 
     # Access log should have one entry for this view
     from kyc_management.models import KycDocumentAccessLog
@@ -77,6 +94,36 @@ def test_personal_kyc_pdf_viewer_generates_preview_and_logs_access(client):
     )
 
 
+@pytest.mark.django_db
+def test_kyc_page_is_watermarked_per_viewer(client):
+    kyc = _personal_kyc_with_pdf()
+    url = reverse("kyc_document_page", args=["personal-main", kyc.id, 1])
+
+    client.force_login(_staff("first@example.com", "first_reviewer"))
+    first = client.get(url).content
+    client.force_login(_staff("second@example.com", "second_reviewer"))
+    second = client.get(url).content
+
+    assert first and second and first != second
+    assert client.get(
+        reverse("kyc_document_page", args=["personal-main", kyc.id, 99])
+    ).status_code == 404
+
+
+@pytest.mark.django_db
+def test_new_kyc_upload_is_prerendered(django_capture_on_commit_callbacks):
+    from kyc_management.previews import get_manifest
+
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        kyc = _personal_kyc_with_pdf()
+
+    assert len(callbacks) == 1
+    assert os.path.exists(_manifest_path(kyc))
+    manifest = get_manifest(kyc.document_file, "personal-main", kyc.id)
+    assert manifest["source"] == kyc.document_file.name
+    assert manifest["pages"] == 1
+
+
 @pytest.mark.django_db
 def test_kyc_document_view_requires_compliance_role(client):
     """
@@ -76,17 +76,20 @@ def test_complete_order_creation_workflow(authenticated_client, mock_flexpay, db
 
 
 @pytest.mark.integration
-def test_order_cancellation_workflow(authenticated_client, mailoutbox, db):
+def test_order_cancellation_workflow(
+    authenticated_client, mailoutbox, db, django_capture_on_commit_callbacks
+):
     """Test order cancellation sends email notification"""
     # Arrange
     user = UserFactory()
     authenticated_client.force_login(user)
     order = OrderFactory(user=user, status="pending")
 
-    # Act
-    response = authenticated_client.post(
-        f"/api/orders/{order.id}/cancel/", {"reason": "Customer changed mind"}
-    )
+    # Act (the email leaves through the outbox once the request commits)
+    with django_capture_on_commit_callbacks(execute=True):
+        response = authenticated_client.post(
+            f"/api/orders/{order.id}/cancel/", {"reason": "Customer changed mind"}
+        )
 
     # Assert
     assert response.status_code == 200
@@ -0,0 +1,72 @@
+"""
+Unit tests for benchmarks.harness
+
+- Stats summarise the timed rounds; setup runs untimed before each round
+- A saved report loads back and compares on medians with faster/slower/same
+- Skipped cases are recorded, isolated cases are rolled back
+"""
+
+import pytest
+
+from benchmarks import harness
+from main.models import Promotion
+
+
+def test_pedantic_times_rounds_and_runs_setup_each_round():
+    calls = []
+    bench = harness.Benchmark(rounds=4, warmup_rounds=2)
+    bench.extra_info["items"] = 3
+
+    result = bench.pedantic(
+        lambda x: calls.append(x) or x,
+        setup=lambda: ((len(calls),), {}),
+        iterations=2,
+    )
+
+    assert len(calls) == (4 + 2) * 2
+    assert result == 10  # setup saw 2 calls per earlier round
+    stats = bench.stats
+    assert stats.rounds == 4
+    assert stats.min <= stats.median <= stats.p95 <= stats.max
+    assert stats.extra_info == {"items": 3}
+
+
+def _report(**medians):
+    report = harness.Report("now", "abc123", {}, {})
+    for name, median in medians.items():
+        report.results[name] = harness.Stats.from_times([median])
+    return report
+
+
+def test_saved_report_round_trips_and_compares(tmp_path):
+    path = harness.save(_report(a=1.0, b=1.0, c=1.0, gone=1.0), "base", tmp_path)
+    baseline = harness.load("base", tmp_path)
+    assert harness.load(str(path)).results == baseline.results
+    assert baseline.commit == "abc123" and baseline.results["a"].median == 1.0
+
+    current = _report(a=1.5, b=0.5, c=1.05, new=1.0)
+    verdicts = {
+        row.name: row.verdict
+        for row in harness.compare(current, baseline, threshold=0.1)
+    }
+    assert verdicts == {"a": "slower", "b": "faster", "c": "same"}
+
+
+@pytest.mark.django_db
+def test_run_records_skips_and_rolls_back(monkeypatch):
+    monkeypatch.setattr(harness, "CASES", {})
+
+    @harness.case("demo", rounds=2)
+    def writes(benchmark):
+        Promotion.objects.create(name="Rolled back", value="5.00")
+        benchmark(Promotion.objects.count)
+
+    @harness.case("demo")
+    def missing(benchmark):
+        raise harness.BenchmarkSkipped("no dataset")
+
+    report = harness.run()
+
+    assert report.results["writes"].rounds == 2
+    assert report.skipped == {"missing": "no dataset"}
+    assert not Promotion.objects.filter(name="Rolled back").exists()
@@ -0,0 +1,61 @@
+"""
+Unit tests for nexus_backend.db_pool
+
+- Pool statistics are exported at most once per sample interval
+- Pools inherited from a parent process are forgotten, not closed
+- Outside pool mode, new connections are counted
+"""
+
+from unittest import mock
+
+from django.db import connections
+
+from nexus_backend import db_pool, metrics
+
+
+class FakePool:
+    def __init__(self):
+        self.closed = False
+
+    def pop_stats(self):
+        return {
+            "pool_size": 3,
+            "pool_available": 1,
+            "pool_max": 4,
+            "requests_num": 10,
+            "requests_wait_ms": 250,
+        }
+
+    def close(self):
+        self.closed = True
+
+
+def _value(metric, *labels):
+    return metric.labels(*labels)._value.get()
+
+
+def test_pool_stats_are_sampled(monkeypatch):
+    monkeypatch.setattr(db_pool, "pools", lambda: {"default": FakePool()})
+    monkeypatch.setattr(db_pool, "_last_sample", float("-inf"))
+    requests_before = _value(metrics.DB_POOL_REQUESTS, "default")
+
+    db_pool.observe()
+    db_pool.observe()  # within SAMPLE_SECONDS: skipped
+
+    assert _value(metrics.DB_POOL_REQUESTS, "default") == requests_before + 10
+    assert _value(metrics.DB_POOL_CONNECTIONS, "default", "idle") == 1
+
+
+def test_inherited_pools_are_dropped_without_closing():
+    pool = FakePool()
+    registry = {"default": pool}
+    wrapper = type(connections["default"])
+    with mock.patch.object(wrapper, "_connection_pools", registry, create=True):
+        db_pool.reset_after_fork()
+    assert registry == {} and not pool.closed
+
+
+def test_new_connections_are_counted():
+    before = _value(metrics.DB_CONNECTIONS_OPENED, "default")
+    db_pool.connection_opened(sender=None, connection=connections["default"])
+    assert _value(metrics.DB_CONNECTIONS_OPENED, "default") == before + 1
@@ -0,0 +1,85 @@
+"""
+Unit tests for nexus_backend.db_router
+
+- Without a reporting alias, pins are no-ops and everything uses the primary
+- A fresh replica serves pinned reads; a lagging, unreachable or
+  disconnected (WAL receiver not streaming) one does not
+- Writes always go to the primary; the replica is never migrated by default
+"""
+
+from unittest import mock
+
+import pytest
+
+from nexus_backend import db_router
+
+router = db_router.ReportingRouter()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_lag():
+    db_router.clear_local()
+    yield
+    db_router.clear_local()
+
+
+@pytest.fixture
+def replica(monkeypatch, settings):
+    settings.REPORTING_MAX_LAG_SECONDS = 30
+    monkeypatch.setattr(db_router, "_configured", lambda: True)
+    lag = mock.Mock(return_value=0.0)
+    monkeypatch.setattr(db_router, "replica_lag", lag)
+    return lag
+
+
+def test_pins_are_noops_without_a_replica():
+    assert router.db_for_read(None) is None
+    with db_router.reporting() as alias:
+        assert alias == "default"
+        assert router.db_for_read(None) == "default"
+    assert router.db_for_read(None) is None
+
+
+def test_fresh_replica_serves_pinned_reads(replica):
+    @db_router.reporting_db
+    def view():
+        return router.db_for_read(None), router.db_for_write(None)
+
+    assert view() == ("reporting", "default")
+    assert router.db_for_read(None) is None
+
+
+@pytest.mark.parametrize("lag", [120.0, None])
+def test_lagging_or_unreachable_replica_falls_back(replica, lag):
+    replica.return_value = lag
+    with db_router.reporting() as alias:
+        assert alias == "default"
+
+
+def test_disconnected_replica_counts_as_too_stale(monkeypatch, settings):
+    settings.REPORTING_MAX_LAG_SECONDS = 30
+    monkeypatch.setattr(db_router, "_configured", lambda: True)
+    conn = mock.MagicMock()
+    cursor = conn.cursor.return_value.__enter__.return_value
+    cursor.fetchone.return_value = (None,)  # no streaming WAL receiver
+    monkeypatch.setattr(db_router, "connections", {"reporting": conn})
+
+    assert db_router.replica_lag() == float("inf")
+    assert db_router.choose_alias() == "default"
+    assert "pg_stat_wal_receiver" in cursor.execute.call_args.args[0]
+
+
+def test_lag_is_checked_once_per_interval(replica, settings):
+    settings.REPORTING_LAG_CHECK_SECONDS = 60
+    for _ in range(3):
+        with db_router.reporting():
+            with db_router.reporting() as inner:  # nested pins keep the alias
+                assert inner == "reporting"
+    assert replica.call_count == 1
+
+
+def test_replica_is_not_migrated(settings):
+    assert router.allow_migrate("reporting", "main") is False
+    assert router.allow_migrate("default", "main") is None
+    settings.REPORTING_DATABASE_MIGRATE = True
+    assert router.allow_migrate("reporting", "main") is True
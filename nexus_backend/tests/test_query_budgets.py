@@ -0,0 +1,203 @@
+"""
+Query budgets of the hot views and billing tasks, measured at N=1 and N=100.
+
+A view or task passes when the N=100 run stays within its declared budget
+(``main.utilities.query_budget``) and runs (almost) as many queries as the
+N=1 run: a count that grows with N is an N+1.
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+from django.urls import reverse
+from django.utils import timezone
+
+from client_app import views as client_views
+from main.factories import (
+    OrderFactory,
+    SubscriptionFactory,
+    SubscriptionPlanFactory,
+    UserFactory,
+)
+from main.models import AccountEntry, Subscription
+from main.utilities.query_budget import budget_of, record_queries
+from nexus_backend.celery_tasks import tasks
+from orders import views as order_views
+from subscriptions import views as subscription_views
+
+# Queries a view may add between N=1 and N=100 (e.g. a second page exists).
+SLACK = 2
+
+
+@pytest.fixture(autouse=True)
+def budgets_raise(settings):
+    settings.QUERY_BUDGET_MODE = "raise"
+
+
+def _measure(make_rows, call, sizes=(1, 100)):
+    """Recorders of ``call()`` after ``make_rows`` grew the data to each size."""
+    recorders = []
+    created = 0
+    for n in sizes:
+        make_rows(n - created)
+        created = n
+        with record_queries() as recorder:
+            call()
+        recorders.append(recorder)
+    return recorders
+
+
+def _assert_flat(func, small, large):
+    budget = budget_of(func)
+    assert budget is not None, f"{func.__name__} declares no query budget"
+    budget.check(large, label=func.__name__)
+    assert large.count <= small.count + SLACK, (
+        f"{func.__name__}: {small.count} queries at N=1, "
+        f"{large.count} at N=100\n{large.report()}"
+    )
+
+
+@pytest.mark.django_db
+def test_admin_order_list_is_flat(staff_client):
+    customer = UserFactory()
+    plan = SubscriptionPlanFactory()
+
+    def call():
+        response = staff_client.get(reverse("admin_view_orders"))
+        assert response.status_code == 200
+
+    small, large = _measure(
+        lambda n: OrderFactory.create_batch(n, user=customer, plan=plan), call
+    )
+    _assert_flat(order_views.admin_view_orders, small, large)
+
+
+@pytest.mark.django_db
+def test_admin_subscription_list_is_flat(staff_client):
+    plan = SubscriptionPlanFactory()
+    overdue = date.today() - timedelta(days=5)
+
+    def make_rows(n):
+        for customer in UserFactory.create_batch(n):
+            SubscriptionFactory(
+                user=customer,
+                plan=plan,
+                order=OrderFactory(user=customer, plan=plan),
+                next_billing_date=overdue,
+            )
+
+    def call():
+        response = staff_client.get(reverse("getallcust_subscr"))
+        assert response.status_code == 200
+
+    small, large = _measure(make_rows, call)
+    _assert_flat(subscription_views.getallcust_subscr, small, large)
+
+
+@pytest.mark.django_db
+def test_overdue_customers_single_query():
+    plan = SubscriptionPlanFactory()
+    overdue = date.today() - timedelta(days=5)
+    results = []
+
+    def make_rows(n):
+        for customer in UserFactory.create_batch(n):
+            SubscriptionFactory(
+                user=customer,
+                plan=plan,
+                order=OrderFactory(user=customer, plan=plan),
+                next_billing_date=overdue,
+            )
+
+    def call():
+        results.append(subscription_views.get_overdue_customers())
+
+    small, large = _measure(make_rows, call)
+    assert small.count == large.count == 1
+    assert len(results[-1]) == 100
+    assert results[-1][0]["days_overdue"] == 5
+
+
+@pytest.mark.django_db
+def test_billing_history_is_flat(authenticated_client, user):
+    plan = SubscriptionPlanFactory()
+
+    def call():
+        response = authenticated_client.get(reverse("billing_history"))
+        assert response.status_code == 200
+
+    small, large = _measure(
+        lambda n: OrderFactory.create_batch(n, user=user, plan=plan), call
+    )
+    _assert_flat(client_views.billing_history, small, large)
+
+
+@pytest.mark.django_db
+def test_cutoff_enforcement_is_flat(monkeypatch):
+    # anchor 2026-01-20, cutoff the day before; invoices for Jan 20 -> Feb 20
+    monkeypatch.setattr(tasks.timezone, "localdate", lambda: date(2026, 1, 19))
+    cfg = tasks.config_cache.billing_config()  # a copy: safe to modify
+    cfg.anchor_day = 20
+    cfg.cutoff_days_before_anchor = 1
+    cfg.auto_suspend_on_cutoff = True
+    monkeypatch.setattr(tasks.config_cache, "billing_config", lambda: cfg)
+    plan = SubscriptionPlanFactory()
+
+    def make_rows(n):
+        for customer in UserFactory.create_batch(n):
+            order = OrderFactory(user=customer, plan=plan)
+            sub = SubscriptionFactory(user=customer, plan=plan, order=order)
+            AccountEntry.objects.create(
+                account=customer.billing_account,
+                entry_type="invoice",
+                amount_usd=Decimal("50.00"),
+                order=order,
+                subscription=sub,
+                period_start=date(2026, 1, 20),
+                period_end=date(2026, 2, 20),
+            )
+
+    results = []
+    small, large = _measure(
+        make_rows, lambda: results.append(tasks.run_cutoff_enforcement())
+    )
+    assert results == ["suspended=1", "suspended=99"]
+    _assert_flat(tasks.run_cutoff_enforcement, small, large)
+
+
+@pytest.mark.django_db
+def test_prebill_stays_within_its_per_subscription_budget(monkeypatch):
+    # anchor 2026-01-20 with a 5-day lead window; the daily-run guard is off
+    # so the task can run once per size.
+    monkeypatch.setattr(tasks.timezone, "localdate", lambda: date(2026, 1, 19))
+    monkeypatch.setattr(tasks.job_runs, "ran_since", lambda *a, **k: False)
+    cfg = tasks.config_cache.billing_config()  # a copy: safe to modify
+    cfg.anchor_day = 20
+    cfg.prebill_lead_days = 5
+    cfg.first_cycle_included_in_order = False
+    monkeypatch.setattr(tasks.config_cache, "billing_config", lambda: cfg)
+    plan = SubscriptionPlanFactory()
+    budget = budget_of(tasks.run_prebill_and_collect)
+    assert budget is not None and budget.per_item > 0
+
+    recorders = []
+    for n in (1, 10):
+        Subscription.objects.update(status="cancelled")  # billed last round
+        for customer in UserFactory.create_batch(n):
+            SubscriptionFactory(
+                user=customer,
+                plan=plan,
+                order=OrderFactory(user=customer, plan=plan),
+                started_at=timezone.now(),
+            )
+        with record_queries() as recorder:
+            result = tasks.run_prebill_and_collect()
+        assert result.startswith(f"prebilled={n} ")
+        budget.check(recorder, items=n, label="run_prebill_and_collect")
+        recorders.append(recorder)
+
+    small, large = recorders
+    per_subscription = (large.count - small.count) / 9
+    assert per_subscription <= budget.per_item, large.report()
@@ -0,0 +1,51 @@
+"""
+Unit tests for nexus_backend.startup
+
+- python -X importtime output is parsed into per-module timings
+- Deferred modules are reported with the chain of modules that imported them
+- Booting the web and Celery processes imports none of the deferred modules
+"""
+
+import pytest
+
+from nexus_backend import startup
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:        93 |         93 |   _io
+import time:       206 |        528 | _frozen_importlib_external
+import time:       410 |        410 |       reportlab.lib
+import time:      1200 |       1610 |     reportlab
+import time:       300 |       1910 |   main.invoices_helpers
+import time:       150 |       2060 | main.views
+some warning printed by an import
+"""
+
+
+def test_parse_importtime():
+    modules = startup.parse_importtime(IMPORTTIME)
+    assert [m.name for m in modules][:2] == ["_io", "_frozen_importlib_external"]
+    assert modules[-1] == startup.ModuleImport("main.views", 150, 2060, 0)
+
+    report = startup.ImportProfile("web", 10.0, modules)
+    assert report.import_ms == pytest.approx(2.588)
+    assert report.slowest(1, by="self")[0].name == "reportlab"
+
+
+def test_deferred_modules_are_traced_to_their_importer():
+    report = startup.ImportProfile("web", 10.0, startup.parse_importtime(IMPORTTIME))
+    assert report.deferred_loaded() == ["reportlab"]
+    assert report.import_chain("reportlab") == [
+        "reportlab.lib",
+        "reportlab",
+        "main.invoices_helpers",
+        "main.views",
+    ]
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("target", sorted(startup.BOOT_CODE))
+def test_boot_does_not_import_deferred_modules(target):
+    report = startup.profile(target)
+    assert report.modules
+    assert report.deferred_loaded() == []
@@ -3,11 +3,12 @@ from __future__ import annotations
 
 import json
 import logging
+import math
 from typing import Any, Dict
 
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import EmptyPage, Paginator
 from django.db import DatabaseError
+from django.db.models.functions import Left
 from django.db.utils import OperationalError, ProgrammingError
 from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, render
@@ -15,13 +16,26 @@ from django.utils.translation import gettext as _
 from django.views.decorators.http import require_GET, require_POST
 
 from main.models import Ticket
+from main.utilities.pagination import (
+    InvalidCursor,
+    approximate_count,
+    keyset_page,
+    page_number,
+    page_size,
+)
 
 logger = logging.getLogger(__name__)
 
 
+# Only the first characters of `message` are needed for the list preview.
+PREVIEW_CHARS = 120
+
+
 def _ticket_dict(t: Ticket) -> Dict[str, Any]:
-    msg = t.message or ""
-    preview = (msg[:120] + "…") if len(msg) > 120 else msg
+    msg = getattr(t, "message_head", None)
+    if msg is None:
+        msg = t.message or ""
+    preview = (msg[:PREVIEW_CHARS] + "…") if len(msg) > PREVIEW_CHARS else msg
     return {
         "id": t.id,
         "subject": t.subject,
@@ -38,30 +52,49 @@ def _ticket_dict(t: Ticket) -> Dict[str, Any]:
 @login_required
 @require_GET
 def tickets_list_api(request: HttpRequest) -> JsonResponse:
-    try:
-        page = int(request.GET.get("page", 1))
-    except (TypeError, ValueError):
-        page = 1
-    try:
-        per_page = int(request.GET.get("per_page", 10))
-    except (TypeError, ValueError):
-        per_page = 10
-    per_page = max(1, min(per_page, 50))
+    """
+    The user's tickets, most recently updated first. Accepts `page` and
+    `per_page`, or `cursor` (the previous `next_cursor`) for keyset paging.
+    """
+    size = page_size(request, default=10, maximum=50)
 
     try:
-        qs = Ticket.objects.filter(user=request.user).order_by("-updated_at", "-id")
-        paginator = Paginator(qs, per_page)
+        qs = Ticket.objects.filter(user=request.user)
+        total = approximate_count(qs)
+        total_pages = max(1, math.ceil(total / size))
+        cursor = request.GET.get("cursor")
+        number = min(page_number(request.GET.get("page")), total_pages)
+        rows = qs.only(
+            "id",
+            "user_id",
+            "subject",
+            "category",
+            "priority",
+            "status",
+            "created_at",
+            "updated_at",
+        ).annotate(message_head=Left("message", PREVIEW_CHARS + 1))
         try:
-            page_obj = paginator.page(page)
-        except EmptyPage:
-            page_obj = paginator.page(paginator.num_pages or 1)
-        data = [_ticket_dict(t) for t in page_obj.object_list]
+            page = keyset_page(
+                rows,
+                ordering=("-updated_at", "-id"),
+                cursor=cursor,
+                page=number,
+                size=size,
+            )
+        except InvalidCursor:
+            return JsonResponse(
+                {"success": False, "message": _("Invalid cursor.")}, status=400
+            )
+        data = [_ticket_dict(t) for t in page.items]
         return JsonResponse(
             {
                 "success": True,
                 "tickets": data,
-                "page": page_obj.number,
-                "total_pages": paginator.num_pages,
+                "page": page.number or number,
+                "total_pages": total_pages,
+                "next_cursor": page.next_cursor,
+                "has_more": page.has_more,
             },
             status=200,
         )
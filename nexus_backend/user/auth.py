@@ -1,5 +1,4 @@
 # auth_helpers.py
-import json
 import logging
 from functools import wraps
 
@@ -7,6 +6,8 @@ from django.contrib.auth.decorators import user_passes_test
 from django.shortcuts import redirect, resolve_url
 from django.utils.http import url_has_allowed_host_and_scheme
 
+from main.services.roles import parse_roles
+
 logger = logging.getLogger(__name__)
 
 # Where to send each role (URL **names**)
@@ -61,18 +62,8 @@ def require_full_login(view_func):
 
 def normalized_roles(user) -> list[str]:
     """Return user roles as a lowercase list, safely."""
-    roles = getattr(user, "roles", []) or []
-    if isinstance(roles, str):
-        # tolerate comma-delimited or JSON-encoded strings
-        try:
-            parsed = json.loads(roles)
-            if isinstance(parsed, list):
-                roles = parsed
-            else:
-                roles = [roles]
-        except Exception:
-            roles = [r.strip() for r in roles.split(",") if r.strip()]
-    return [str(r).strip().lower() for r in roles if r]
+    # tolerates comma-delimited or JSON-encoded strings
+    return parse_roles(getattr(user, "roles", None))
 
 
 def has_role(user, role):
@@ -38,7 +38,6 @@ Author: VirgoCoachman
 Date: 2025-11-05
 """
 
-import json
 import logging
 from functools import wraps
 from typing import Iterable
@@ -50,6 +49,8 @@ from django.contrib.auth.decorators import user_passes_test
 from django.core.exceptions import PermissionDenied
 from django.utils.translation import gettext_lazy as _
 
+from main.services.roles import parse_roles
+
 logger = logging.getLogger(__name__)
 
 
@@ -58,6 +59,23 @@ logger = logging.getLogger(__name__)
 # ============================================================================
 
 
+def compiled_roles(user) -> frozenset:
+    """
+    The user's roles as a frozenset of lowercase strings, parsed once.
+
+    ``main.models.User`` caches the parsed set on the instance
+    (``User.role_set``) until ``roles`` changes, so repeated checks during a
+    request cost a set lookup. Other user objects are parsed on each call.
+    """
+    if not user or not user.is_authenticated:
+        return frozenset()
+
+    role_set = getattr(user, "role_set", None)
+    if isinstance(role_set, frozenset):
+        return role_set
+    return frozenset(parse_roles(getattr(user, "roles", None)))
+
+
 def normalize_roles(user) -> set[str]:
     """
     Extract and normalize user roles to a set of lowercase strings.
@@ -79,30 +97,7 @@ def normalize_roles(user) -> set[str]:
         >>> normalize_roles(user)
         {'admin', 'manager'}
     """
-    if not user or not user.is_authenticated:
-        return set()
-
-    roles = getattr(user, "roles", []) or []
-
-    # Handle non-iterable types (int, dict, etc.) - convert to empty list
-    if not isinstance(roles, (list, str)):
-        roles = []
-
-    # Handle JSON string
-    if isinstance(roles, str):
-        try:
-            parsed = json.loads(roles)
-            if isinstance(parsed, list):
-                roles = parsed
-            else:
-                # Single role as string
-                roles = [roles]
-        except (json.JSONDecodeError, TypeError):
-            # Comma-separated string fallback
-            roles = [r.strip() for r in roles.split(",") if r.strip()]
-
-    # Normalize to lowercase set
-    return {str(r).strip().lower() for r in roles if r}
+    return set(compiled_roles(user))
 
 
 def user_has_role(user, role: str) -> bool:
@@ -126,8 +121,7 @@ def user_has_role(user, role: str) -> bool:
     if user.is_superuser:
         return True
 
-    user_roles = normalize_roles(user)
-    return role.lower() in user_roles
+    return role.lower() in compiled_roles(user)
 
 
 def user_has_any_role(user, roles: Iterable[str]) -> bool:
@@ -147,7 +141,7 @@ def user_has_any_role(user, roles: Iterable[str]) -> bool:
     if user.is_superuser:
         return True
 
-    user_roles = normalize_roles(user)
+    user_roles = compiled_roles(user)
     required_roles = {r.lower() for r in roles}
 
     return bool(user_roles & required_roles)
@@ -170,12 +164,45 @@ def user_has_all_roles(user, roles: Iterable[str]) -> bool:
     if user.is_superuser:
         return True
 
-    user_roles = normalize_roles(user)
+    user_roles = compiled_roles(user)
     required_roles = {r.lower() for r in roles}
 
     return required_roles.issubset(user_roles)
 
 
+# ============================================================================
+# PER-REQUEST DECISION CACHE
+# ============================================================================
+
+
+def request_has_role(request, *roles: str) -> bool:
+    """
+    ``user_has_any_role(request.user, roles)``, answered once per request.
+
+    Stacked decorators and DRF permission classes often ask the same question
+    several times per request. Answers are kept on the underlying HttpRequest
+    (shared with DRF's Request) and keyed on everything they depend on, so a
+    login, logout or role change mid-request is never served a stale answer.
+
+    Usage:
+        if request_has_role(request, "admin", "manager"):
+            ...
+    """
+    user = request.user
+    required = frozenset(r.lower() for r in roles)
+    http_request = getattr(request, "_request", request)
+    decisions = http_request.__dict__.setdefault("_rbac_decisions", {})
+    key = (
+        required,
+        getattr(user, "pk", None),
+        getattr(user, "is_superuser", False),
+        compiled_roles(user),
+    )
+    if key not in decisions:
+        decisions[key] = user_has_any_role(user, required)
+    return decisions[key]
+
+
 # ============================================================================
 # FUNCTION-BASED VIEW DECORATORS
 # ============================================================================
@@ -209,7 +236,7 @@ def require_role(
 
                 return redirect(reverse(login_url))
 
-            has_permission = user_has_role(request.user, role)
+            has_permission = request_has_role(request, role)
             if not has_permission:
                 logger.warning(
                     f"Access denied: User {request.user.email if request.user.is_authenticated else 'Anonymous'} "
@@ -257,7 +284,7 @@ def require_any_role(
 
                 return redirect(reverse(login_url))
 
-            has_permission = user_has_any_role(request.user, roles)
+            has_permission = request_has_role(request, *roles)
             if not has_permission:
                 logger.warning(
                     f"Access denied: User {request.user.email if request.user.is_authenticated else 'Anonymous'} "
@@ -399,7 +426,7 @@ def require_staff_role(
                 return view_func(request, *args, **kwargs)
 
             # Check specific roles
-            has_permission = user_has_any_role(request.user, roles)
+            has_permission = request_has_role(request, *roles)
 
             if not has_permission:
                 logger.warning(
@@ -462,7 +489,7 @@ class HasRole(permissions.BasePermission):
             )
             return False
 
-        return user_has_role(request.user, role)
+        return request_has_role(request, role)
 
 
 class HasAnyRole(permissions.BasePermission):
@@ -490,7 +517,7 @@ class HasAnyRole(permissions.BasePermission):
             )
             return False
 
-        return user_has_any_role(request.user, roles)
+        return request_has_role(request, *roles)
 
 
 class IsCustomerOnly(permissions.BasePermission):
@@ -515,7 +542,7 @@ class IsCustomerOnly(permissions.BasePermission):
             )
             return False
 
-        return user_has_role(request.user, "customer")
+        return request_has_role(request, "customer")
 
 
 class IsStaffWithRole(permissions.BasePermission):
@@ -544,7 +571,7 @@ class IsStaffWithRole(permissions.BasePermission):
             # If no specific roles, any staff is OK
             return True
 
-        return user_has_any_role(request.user, roles)
+        return request_has_role(request, *roles)
 
 
 # ============================================================================
@@ -8,21 +8,27 @@ Tests cover:
 - Security boundaries (customer vs staff)
 - Superuser bypass behavior
 - Malformed data handling
+- Compiled roles, role queries and the per-request decision cache
 
 Author: Security Audit Team
 Date: 2025-11-05
 """
 
 import pytest
+from rest_framework.request import Request
 from rest_framework.test import APIRequestFactory
 
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.template import Context, Template
 
 from user.permissions import (
     HasRole,
     IsCustomerOnly,
     IsStaffWithRole,
+    compiled_roles,
     normalize_roles,
+    request_has_role,
     require_customer_only,
     require_role,
     require_staff_role,
@@ -535,3 +541,82 @@ class TestPermissionIntegration:
 
         assert user_has_all_roles(multi_role_user, ["admin", "manager"]) is True
         assert user_has_all_roles(multi_role_user, ["admin", "nonexistent"]) is False
+
+
+# ============================================================================
+# COMPILED ROLES AND ROLE QUERIES
+# ============================================================================
+
+
+@pytest.mark.django_db
+class TestCompiledRoles:
+    """Roles are normalized on save, parsed once and queried through an index"""
+
+    def test_roles_are_normalized_on_save(self, db):
+        user = User.objects.create_user(
+            email="csv@example.com",
+            username="csv@example.com",
+            password="test",
+            roles="Technician, SALES,technician",
+        )
+        user.refresh_from_db()
+        assert user.roles == ["technician", "sales"]
+
+        user.add_role("Finance")
+        user.remove_role("SALES")
+        user.refresh_from_db()
+        assert user.roles == ["technician", "finance"]
+
+    def test_role_set_is_parsed_once_per_value(self, multi_role_user):
+        first = compiled_roles(multi_role_user)
+        assert first == {"admin", "manager", "finance"}
+        assert compiled_roles(multi_role_user) is first
+
+        multi_role_user.roles.remove("admin")
+        assert compiled_roles(multi_role_user) == {"manager", "finance"}
+        multi_role_user.roles = "Support"
+        assert multi_role_user.has_role("SUPPORT")
+
+    def test_with_role_matches_any_of_the_roles(
+        self, customer_user, admin_user, multi_role_user
+    ):
+        assert set(User.objects.with_role("Finance", "customer")) == {
+            customer_user,
+            multi_role_user,
+        }
+        assert not User.objects.with_role().exists()
+
+    def test_decisions_are_cached_per_request_and_user(self, admin_user, rf):
+        request = rf.get("/")
+        request.user = admin_user
+        assert request_has_role(request, "Admin") is True
+        assert len(request._rbac_decisions) == 1
+        assert request_has_role(request, "admin") is True
+        assert len(request._rbac_decisions) == 1
+
+        admin_user.roles = ["customer"]
+        assert request_has_role(request, "admin") is False
+        request.user = AnonymousUser()
+        assert request_has_role(request, "customer") is False
+
+    def test_drf_request_shares_the_decision_cache(self, admin_user):
+        http_request = APIRequestFactory().get("/")
+        request = Request(http_request)
+        request.user = admin_user
+
+        class MockView:
+            required_staff_roles = ["admin"]
+
+        assert IsStaffWithRole().has_permission(request, MockView()) is True
+        assert request_has_role(http_request, "admin") is True
+        assert len(http_request._rbac_decisions) == 1
+
+    def test_template_filter_uses_compiled_roles(self, multi_role_user):
+        template = Template(
+            "{% load role_tags %}{{ user|has_role:'FINANCE' }} "
+            "{{ user|has_role:'sales' }}"
+        )
+        rendered = template.render(Context({"user": multi_role_user}))
+        assert rendered == "True False"
+        anonymous = template.render(Context({"user": AnonymousUser()}))
+        assert anonymous == "False False"
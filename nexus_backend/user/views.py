@@ -1,7 +1,7 @@
+import ipaddress
 import json
 import logging
 import re
-from os import environ
 
 import phonenumbers
 
@@ -9,7 +9,6 @@ from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import authenticate, get_user_model, login, logout
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
@@ -57,11 +56,15 @@ def password_reset_request(request):
             "logo_url": logo_url,
         },
     )
-    email_message = EmailMultiAlternatives(
-        subject, "", settings.DEFAULT_FROM_EMAIL, [user.email]
+    queue_email(
+        str(subject),
+        "",
+        [user.email],
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        html_body=html_content,
+        category="password_reset",
+        sensitive=True,
     )
-    email_message.attach_alternative(html_content, "text/html")
-    email_message.send()
     return JsonResponse(
         {
             "success": True,
@@ -70,25 +73,22 @@ def password_reset_request(request):
     )
 
 
-from twilio.rest import Client
-
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.core.exceptions import FieldDoesNotExist
 from django.db import transaction
-from django.db.models import F
 from django.http import JsonResponse
 from django.shortcuts import redirect, render
 from django.urls import reverse
 from django.utils.http import url_has_allowed_host_and_scheme
-from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 from django.views.decorators.http import require_GET, require_POST
 
 from geo_regions.models import Region
 from main.calculations import generate_random_password
-from main.models import OTPVerification, User, UserRole
+from main.models import User, UserRole
 from main.phonenumber import format_phone_number
-from main.twilio_helpers import send_otp_sms
+from main.services import otp
+from main.services.outbox import queue_email, queue_sms
 from user.auth import role_redirect
 from user.permissions import require_staff_role
 
@@ -120,6 +120,38 @@ def _is_ajax(request) -> bool:
     return request.headers.get("X-Requested-With") == "XMLHttpRequest"
 
 
+def mask_phone(p: str) -> str:
+    """Return a masked phone like +243 ** *** **56"""
+    if not p or len(p) < 6:
+        return "***"
+    last = p[-2:]
+    return f"{p[:4]} ** *** **{last}"
+
+
+def _client_ip(request):
+    """
+    Client address for the per-IP OTP limits, or None if not an IP.
+
+    Clients can put anything at the front of X-Forwarded-For, so behind
+    ``TRUSTED_PROXY_COUNT`` proxies the address is the hop the outermost one
+    appended (counted from the right); with 0 it is REMOTE_ADDR. Unset, the
+    address is unknown (REMOTE_ADDR may be a shared proxy) and this is None.
+    """
+    proxies = getattr(settings, "TRUSTED_PROXY_COUNT", None)
+    if proxies is None:
+        return None
+    ip = request.META.get("REMOTE_ADDR", "")
+    if proxies > 0:
+        fwd = request.META.get("HTTP_X_FORWARDED_FOR", "")
+        hops = [hop.strip() for hop in fwd.split(",") if hop.strip()]
+        if len(hops) >= proxies:
+            ip = hops[-proxies]
+    try:
+        return str(ipaddress.ip_address(ip))
+    except ValueError:
+        return None
+
+
 # @anonymous_required
 def login_page(request):
     logger.info("Rendering login page for anonymous user.")
@@ -177,115 +209,59 @@ def login_request(request):
         # Original code assumed DRC (+243); keep behavior:
         return f"+243{p}"
 
-    def mask_phone(p: str) -> str:
-        """Return a masked phone like +243 ** *** **56"""
-        if not p or len(p) < 6:
-            return "***"
-        last = p[-2:]
-        return f"{p[:4]} ** *** **{last}"
-
     # ----------------------------------------------------------------------
 
-    # Clear previous unverified OTPs
-    OTPVerification.objects.filter(user=user, is_verified=False).delete()
-
-    # Create a fresh OTP challenge
-    otp_instance = OTPVerification(user=user)
-    otp_instance.generate_otp()  # sets otp, expiry, etc.
-    challenge_id = str(otp_instance.pk)
-
-    # Twilio config
-    twilio_sid = environ.get("TWILIO_ACCOUNT_SID")
-    twilio_token = environ.get("TWILIO_AUTH_TOKEN")
-    twilio_phone = environ.get("TWILIO_PHONE_NUMBER")
-
-    alpha_numeric = "NEXUS"
-    # alpha_numeric = twilio_phone  # or branded sender if allowed by country/SMS rules
-
     phone = getattr(user, "phone", "") or ""
     if not phone:
         # No delivery method available; abort 2FA challenge
-        otp_instance.delete()
         logger.error(f"OTP delivery failed for '{username}': No phone number.")
         return fail("No phone number on file. Cannot deliver OTP.", status=409)
 
     to_number = normalize_phone_e164_drc(phone)
 
-    if dev_mode:
-        print("OTP CODE:", otp_instance.otp)
-        # Harden session & persist minimal 2FA state
-        request.session.cycle_key()
-        request.session["pre_2fa_user_id"] = user.pk
-        request.session["2fa_pending"] = True
-        request.session["2fa_challenge_id"] = challenge_id
-        request.session["uid"] = user.id_user
-        # (Optionally stash 'next' in session if you use it after verification)
-        # request.session["post_login_next"] = request.session.get("next_url")
-
-        verify_url = reverse("verify_2fa")  # fallback page (not used by modal flow)
-
-        # === AJAX (modal) flow: tell frontend to open 2FA modal ===
-        if _is_ajax(request):
-            payload = {
-                "twofa_required": True,
-                "challenge_id": challenge_id,
-                "method": "sms",
-                "dest_masked": mask_phone(to_number),
-            }
-            # Optionally let UI show a soft note when SMS didn't send successfully:
-            # payload["delivery_warning"] = not sms_sent
-            return JsonResponse(payload, status=200)
-
-        # === Non-AJAX fallback: go to a standalone 2FA page ===
-        return redirect(verify_url)
-
+    # A login retried within the resend cooldown reuses the live challenge
+    # and sends nothing (main.services.otp).
+    try:
+        issued = otp.issue(user, otp.LOGIN, phone=to_number, ip=_client_ip(request))
+    except otp.OTPThrottled as exc:
+        logger.warning(f"OTP throttled for '{username}'.")
+        return fail(str(exc), status=429)
+    challenge_id = issued.challenge_id
+
+    if issued.code is None:
+        logger.info(f"Reusing live OTP challenge for '{username}'.")
+    elif dev_mode:
+        print("OTP CODE:", issued.code)
     else:
-        # Send OTP via Twilio (best-effort; continue to modal even if provider errors)
-        sms_sent = False
-        try:
-            if not (twilio_sid and twilio_token and alpha_numeric):
-                raise RuntimeError("Missing Twilio credentials or sender.")
-            sms_body = f"Hi {user.get_full_name() or user.username}, your OTP code is: {otp_instance.otp}"
-            logger.info(f"Sending OTP to '{username}' at ...{to_number[-4:]}")
-            twilio_client = Client(twilio_sid, twilio_token)
-            message = twilio_client.messages.create(
-                body=sms_body, from_=alpha_numeric, to=to_number
-            )
-            sms_sent = bool(getattr(message, "sid", None))
-            if sms_sent:
-                logger.info(
-                    f"[Twilio] SMS sent (SID: {message.sid}, Status: {message.status})"
-                )
-            else:
-                logger.warning("[Twilio] SMS send returned no SID.")
-        except Exception as e:
-            logger.error(f"Twilio SMS sending failed for '{username}': {e}")
-
-        # Harden session & persist minimal 2FA state
-        request.session.cycle_key()
-        request.session["pre_2fa_user_id"] = user.pk
-        request.session["2fa_pending"] = True
-        request.session["2fa_challenge_id"] = challenge_id
-        request.session["uid"] = user.id_user
-        # (Optionally stash 'next' in session if you use it after verification)
-        # request.session["post_login_next"] = request.session.get("next_url")
-
-        verify_url = reverse("verify_2fa")  # fallback page (not used by modal flow)
-
-        # === AJAX (modal) flow: tell frontend to open 2FA modal ===
-        if _is_ajax(request):
-            payload = {
-                "twofa_required": True,
-                "challenge_id": challenge_id,
-                "method": "sms",
-                "dest_masked": mask_phone(to_number),
-            }
-            # Optionally let UI show a soft note when SMS didn't send successfully:
-            # payload["delivery_warning"] = not sms_sent
-            return JsonResponse(payload, status=200)
+        # Queue the OTP SMS; the outbox worker delivers it outside the request.
+        sms_body = (
+            f"Hi {user.get_full_name() or user.username}, "
+            f"your OTP code is: {issued.code}"
+        )
+        logger.info(f"Queueing OTP for '{username}' to ...{to_number[-4:]}")
+        queue_sms(to_number, sms_body, category="otp", sensitive=True)
+
+    # Harden session & persist minimal 2FA state
+    request.session.cycle_key()
+    request.session["pre_2fa_user_id"] = user.pk
+    request.session["2fa_pending"] = True
+    request.session["2fa_challenge_id"] = challenge_id
+    request.session["uid"] = user.id_user
+
+    verify_url = reverse("verify_2fa")  # fallback page (not used by modal flow)
+
+    # === AJAX (modal) flow: tell frontend to open 2FA modal ===
+    if _is_ajax(request):
+        payload = {
+            "twofa_required": True,
+            "challenge_id": challenge_id,
+            "method": "sms",
+            "dest_masked": mask_phone(to_number),
+        }
+        return JsonResponse(payload, status=200)
 
-        # === Non-AJAX fallback: go to a standalone 2FA page ===
-        return redirect(verify_url)
+    # === Non-AJAX fallback: go to a standalone 2FA page ===
+    return redirect(verify_url)
 
 
 def logout_request(request):
@@ -332,46 +308,29 @@ def register(request):
             saving_user.is_active = False
             saving_user.save()
 
-            otp_instance = OTPVerification.objects.create(user=saving_user)
-            otp_instance.generate_otp()
-
-            twilio_sid = environ.get("TWILIO_ACCOUNT_SID")
-            twilio_token = environ.get("TWILIO_AUTH_TOKEN")
-            twilio_phone = environ.get("TWILIO_PHONE_NUMBER")
-
-            alpha_numeric = "NEXUS"
+            # Set first, so resend_otp works even if this send is throttled.
+            request.session["uid"] = saving_user.id_user
+            issued = otp.issue(
+                saving_user,
+                otp.SIGNUP,
+                phone=cleaned_phone,
+                ip=_client_ip(request),
+            )
 
             if dev_mode:
-                print("OTP CODE:", otp_instance.otp)
+                print("OTP CODE:", issued.code)
             else:
-                try:
-                    twilio_client = Client(twilio_sid, twilio_token)
-
-                    sms_body = f"Hi {full_name}, your OTP code is: {otp_instance.otp}"
-                    message = twilio_client.messages.create(
-                        body=sms_body, from_=alpha_numeric, to=f"+{cleaned_phone}"
-                    )
-
-                    # Log or confirm it was queued
-                    if message.sid:
-                        print(
-                            f"[Twilio] SMS successfully sent (SID: {message.sid}, Status: {message.status})"
-                        )
-                    else:
-                        print("[Twilio] SMS sending failed: No SID returned")
-
-                except Exception as e:
-                    print(f"[Twilio Error] {str(e)}")
-
-            request.session["uid"] = saving_user.id_user
+                sms_body = f"Hi {full_name}, your OTP code is: {issued.code}"
+                queue_sms(cleaned_phone, sms_body, category="otp", sensitive=True)
 
             return JsonResponse(
                 {
                     "success": True,
                     "message": "User registered. OTP sent.",
-                    # 'otp': otp_instance.otp  # For dev only; remove in production
                 }
             )
+        except otp.OTPThrottled as exc:
+            return JsonResponse({"success": False, "message": str(exc)}, status=429)
         except Exception:
             return JsonResponse(
                 {"success": False, "message": str("This email is already registered.")}
@@ -392,50 +351,33 @@ def verify_otp(request):
 
     try:
         user = User.objects.get(id_user=uid)
-        otp_entry = OTPVerification.objects.filter(user=user, is_verified=False).latest(
-            "created_at"
-        )
     except User.DoesNotExist:
         return JsonResponse({"success": False, "message": "User not found."})
-    except OTPVerification.DoesNotExist:
+
+    otp_input = (request.POST.get("otp") or "").strip()
+    try:
+        result = otp.verify(user, otp.SIGNUP, otp_input, ip=_client_ip(request))
+    except otp.OTPThrottled as exc:
+        return JsonResponse({"success": False, "message": str(exc)}, status=429)
+
+    if result.status == otp.EXPIRED:
         return JsonResponse(
             {
                 "success": False,
-                "message": "OTP session not found. Please register again.",
+                "message": "OTP expired or not found. Please request a new code.",
             }
         )
-
-    otp_input = (request.POST.get("otp") or "").strip()
-
-    # Expiry check (if model has expires_at)
-    if hasattr(otp_entry, "expires_at") and now() > otp_entry.expires_at:
-        otp_entry.delete()
+    if result.status == otp.LOCKED:
         return JsonResponse(
-            {"success": False, "message": "OTP expired. Please register again."}
+            {
+                "success": False,
+                "message": "Too many attempts. Please request a new code.",
+            }
         )
-
-    # Validate OTP
-    if otp_input != otp_entry.otp:
-        if hasattr(otp_entry, "attempts"):
-            otp_entry.attempts = (otp_entry.attempts or 0) + 1
-            otp_entry.save(update_fields=["attempts"])
-            if otp_entry.attempts >= 5:
-                otp_entry.delete()
-                return JsonResponse(
-                    {
-                        "success": False,
-                        "message": "Too many attempts. Please register again.",
-                    }
-                )
+    if not result.ok:
         return JsonResponse({"success": False, "message": "Invalid OTP. Try again."})
 
-    # Success → mark verified, activate, login
-    if hasattr(otp_entry, "is_verified"):
-        otp_entry.is_verified = True
-        otp_entry.save(update_fields=["is_verified"])
-    else:
-        otp_entry.delete()
-
+    # Success → activate, login
     user.is_active = True
     user.is_verified = True
     user.save(update_fields=["is_active", "is_verified"])
@@ -518,7 +460,7 @@ def verify_2fa(request):
         messages.error(request, msg)
         return redirect("verify_2fa")
 
-    # Fetch user + pending OTP entry (prefer challenge_id when provided)
+    # Fetch the pending user
     try:
         user = User.objects.get(pk=user_id)
     except User.DoesNotExist:
@@ -529,53 +471,40 @@ def verify_2fa(request):
         messages.error(request, msg)
         return redirect("login_page")
 
+    # Check the code against the cached challenge (main.services.otp)
     try:
-        if challenge_id:
-            otp_entry = OTPVerification.objects.filter(
-                pk=challenge_id, user=user, is_verified=False
-            ).latest("created_at")
-        else:
-            otp_entry = OTPVerification.objects.filter(
-                user=user, is_verified=False
-            ).latest("created_at")
-        logger.info("OTP entry found; expires at: %s", otp_entry.expires_at)
-    except OTPVerification.DoesNotExist:
-        msg = "OTP session not found. Please login again."
-        logger.error(msg)
+        result = otp.verify(
+            user,
+            otp.LOGIN,
+            otp_input,
+            challenge_id=challenge_id or request.session.get("2fa_challenge_id"),
+            ip=_client_ip(request),
+        )
+    except otp.OTPThrottled as exc:
+        logger.warning("OTP verification throttled for user %s", user.username)
+        if is_ajax:
+            return JsonResponse({"success": False, "message": str(exc)}, status=429)
+        messages.error(request, str(exc))
+        return redirect("verify_2fa")
+
+    if result.status == otp.EXPIRED:
+        logger.warning("No live OTP challenge for user %s", user.username)
+        msg = "OTP expired. Please login again."
         if is_ajax:
             return JsonResponse({"success": False, "message": msg}, status=400)
         messages.error(request, msg)
         return redirect("login_page")
 
-    # Expiry check
-    if now() > otp_entry.expires_at:
-        logger.warning("OTP expired for user %s", user.username)
-        otp_entry.delete()
-        msg = "OTP expired. Please login again."
+    if result.status == otp.LOCKED:
+        logger.error("Too many OTP attempts for user %s", user.username)
+        msg = "Too many attempts. Please login again."
         if is_ajax:
             return JsonResponse({"success": False, "message": msg}, status=400)
         messages.error(request, msg)
         return redirect("login_page")
 
-    # Validate OTP
-    if otp_input != otp_entry.otp:
+    if not result.ok:
         logger.warning("Invalid OTP for user %s", user.username)
-        OTPVerification.objects.filter(pk=otp_entry.pk).update(
-            attempt_count=F("attempt_count") + 1
-        )
-        otp_entry.refresh_from_db(fields=["attempt_count"])
-
-        if otp_entry.attempt_count >= 5:
-            logger.error(
-                "Too many OTP attempts for user %s; deleting OTP", user.username
-            )
-            otp_entry.delete()
-            msg = "Too many attempts. Please login again."
-            if is_ajax:
-                return JsonResponse({"success": False, "message": msg}, status=400)
-            messages.error(request, msg)
-            return redirect("login_page")
-
         msg = "Invalid OTP. Try again."
         if is_ajax:
             return JsonResponse({"success": False, "message": msg}, status=400)
@@ -583,19 +512,12 @@ def verify_2fa(request):
         return redirect("verify_2fa")
 
     # --- Success ---
-    otp_entry.is_verified = True
-    otp_entry.save(update_fields=["is_verified"])
-
-    # (Optional) clean other stale/pending OTPs for this user
-    OTPVerification.objects.filter(user=user, is_verified=False).exclude(
-        pk=otp_entry.pk
-    ).delete()
-
     login(request, user)
 
     # cleanup 2FA flags
     request.session.pop("pre_2fa_user_id", None)
     request.session.pop("2fa_pending", None)
+    request.session.pop("2fa_challenge_id", None)
 
     # Prefer a safe deep-link if we stashed it
     next_url = request.session.pop("post_login_next", None)
@@ -925,34 +847,16 @@ def staff_creation(request):
                     # print("[Users] 'region' field not present on User; skipping assignment.")
                     pass
 
-            # -------- SMS with Twilio (best-effort) --------
-            twilio_sid = environ.get("TWILIO_ACCOUNT_SID")
-            twilio_token = environ.get("TWILIO_AUTH_TOKEN")
-            twilio_phone = environ.get("TWILIO_PHONE_NUMBER")
-
-            alpha_numeric = "NEXUS"
-
+            # -------- Password SMS (delivered by the outbox) --------
             if dev_mode:
                 return JsonResponse(
                     {"success": True, "message": "User created successfully."}
                 )
             else:
-                if twilio_sid and twilio_token and twilio_phone:
-                    try:
-                        client = Client(twilio_sid, twilio_token)
-                        sms_body = f"Hi {full_name}, your password is: {password}"
-                        message = client.messages.create(
-                            body=sms_body, from_=alpha_numeric, to=phone_e164
-                        )
-                        if message.sid:
-                            print(
-                                f"[Twilio] SMS sent (SID: {message.sid}, Status: {message.status})"
-                            )
-                    except Exception as e:
-                        # Non-fatal: user is created; just log
-                        print(f"[Twilio Error] {e}")
-                else:
-                    print("[Twilio] Missing credentials; SMS not sent.")
+                sms_body = f"Hi {full_name}, your password is: {password}"
+                queue_sms(
+                    phone_e164, sms_body, category="account_created", sensitive=True
+                )
 
         return JsonResponse({"success": True, "message": "User created successfully."})
 
@@ -1041,36 +945,15 @@ def reset_user_password(request):
         full_name = user.full_name
         phone = user.phone
 
-        twilio_sid = environ.get("TWILIO_ACCOUNT_SID")
-        twilio_token = environ.get("TWILIO_AUTH_TOKEN")
-        twilio_phone = environ.get("TWILIO_PHONE_NUMBER")
-
-        # Try to send SMS via Twilio
-        sms_sent = False
-        if twilio_sid and twilio_token and twilio_phone:
-            try:
-                twilio_client = Client(twilio_sid, twilio_token)
-                sms_body = (
-                    f"Hi {full_name}, your password has been reset to : {new_password}"
-                )
-                message = twilio_client.messages.create(
-                    body=sms_body, from_=twilio_phone, to=phone
-                )
-                if message.sid:
-                    print(f"[Twilio] SMS sent successfully (SID: {message.sid})")
-                    sms_sent = True
-                else:
-                    print("[Twilio] SMS sending failed: No SID returned")
-            except Exception as e:
-                print(f"[Twilio Error] Failed to send SMS: {str(e)}")
-                # Don't fail the entire operation if SMS fails
-                sms_sent = False
-        else:
-            print("[Twilio] SMS credentials not configured - skipping SMS")
+        # Queue the SMS; the outbox worker delivers (and retries) it.
+        sms_body = f"Hi {full_name}, your password has been reset to : {new_password}"
+        sms_sent = bool(
+            queue_sms(phone, sms_body, category="password_reset", sensitive=True)
+        )
 
         message = "Password reset successfully."
         if sms_sent:
-            message += " New password sent via SMS."
+            message += " New password is being sent via SMS."
         else:
             message += " Please share the new password with the user."
 
@@ -1234,18 +1117,13 @@ def _get_pending_user(request):
         return None
 
 
-# If send_otp_sms is in another module, import it from there instead:
-# from apps.notifications.sms import send_otp_sms
-# Here we assume it's in the same module/file.
-
-
 def _send_otp(user, code: str) -> bool:
     """
-    Send the OTP to the user's phone using Twilio.
-    Falls back to logging if no phone is available or send fails.
+    Queue the OTP SMS for the user's phone (delivered by the outbox worker).
+    Without a phone nothing is sent; the code itself is never logged.
 
     Returns:
-        True if the SMS was queued successfully, False otherwise.
+        True if the SMS was queued, False otherwise.
     """
     full_name = (
         getattr(user, "full_name", "") or getattr(user, "username", "") or "Customer"
@@ -1253,32 +1131,25 @@ def _send_otp(user, code: str) -> bool:
     phone = (getattr(user, "phone", "") or "").strip()
 
     if not phone:
-        print(f"[OTP] No phone number on file for user {user}. Skipping SMS.")
-        print(f"[OTP] (Info) Code for {user.email or 'no-email'} is: {code}")
+        logger.warning("OTP SMS not sent for user %s: no phone number on file", user.pk)
         return False
 
-    ok, info = send_otp_sms(
-        full_name=full_name,
-        cleaned_phone=phone,  # accepts with or without leading '+'
-        otp_code=code,
-        alpha_sender="NEXUS",  # use your approved alphanumeric sender if supported
+    queue_sms(
+        phone,  # with or without leading '+'
+        f"Hi {full_name}, your OTP code is: {code}",
+        category="otp",
+        sensitive=True,
     )
-
-    if ok:
-        print(f"[OTP] SMS queued to {phone} (SID: {info})")
-        return True
-
-    print(f"[OTP] SMS failed for {phone}: {info}")
-    # Optional: email fallback could go here
-    # send_otp_email(user.email, code)  # implement if needed
-    return False
+    logger.info("OTP SMS queued for user %s to %s", user.pk, mask_phone(phone))
+    return True
 
 
 @require_POST
 def resend_otp(request):
     """
-    Create a fresh OTP for the pending user and send it.
-    Returns JSON {success, message}.
+    Send a new code for the pending login or signup challenge, at most once
+    per resend cooldown and within the per-user/phone/IP send limits.
+    Returns JSON {success, message[, challenge_id | retry_after]}.
     """
     user = _get_pending_user(request)
     if not user:
@@ -1287,11 +1158,36 @@ def resend_otp(request):
             status=400,
         )
 
-    # Create & generate a new OTP
-    otp_obj = OTPVerification.objects.create(user=user)
-    otp_obj.generate_otp()  # sets otp, expires_at, etc.
+    purpose = otp.LOGIN if request.session.get("2fa_pending") else otp.SIGNUP
+    try:
+        issued = otp.resend(
+            user,
+            purpose,
+            phone=(getattr(user, "phone", "") or "").strip(),
+            ip=_client_ip(request),
+        )
+    except otp.OTPThrottled as exc:
+        return JsonResponse(
+            {"success": False, "message": str(exc), "retry_after": exc.retry_after},
+            status=429,
+        )
+    if purpose == otp.LOGIN:
+        # A new challenge if the previous one had expired
+        request.session["2fa_challenge_id"] = issued.challenge_id
 
-    # Deliver it (implement your provider inside _send_otp)
-    _send_otp(user, otp_obj.otp)
+    if not _send_otp(user, issued.code):
+        return JsonResponse(
+            {
+                "success": False,
+                "message": "We could not send a code: no phone number on file.",
+            },
+            status=400,
+        )
 
-    return JsonResponse({"success": True, "message": "A new code was sent."})
+    return JsonResponse(
+        {
+            "success": True,
+            "message": "A new code was sent.",
+            "challenge_id": issued.challenge_id,
+        }
+    )